@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from assets.models import Asset
+
+
+class Command(BaseCommand):
+    help = 'Uzupełnia metadane plików assetów (rozmiar, MIME, SHA-256, wymiary) dla istniejących rekordów'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Przelicz wszystkie assety, nie tylko te bez skrótu treści',
+        )
+
+    def handle(self, *args, **options):
+        assets = Asset.objects.exclude(file='')
+        if not options['all']:
+            assets = assets.filter(content_hash='')
+
+        updated = missing = 0
+        for asset in assets.iterator(chunk_size=200):
+            if not asset.file.storage.exists(asset.file.name):
+                missing += 1
+                self.stdout.write(self.style.WARNING(f'Brak pliku: {asset.file.name} ({asset.slug})'))
+                continue
+            asset.refresh_file_metadata()
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Zaktualizowano {updated} assetów, brakujące pliki: {missing}'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Pochodne obrazu'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='file_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Rozmiar pliku (B)'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Wysokość'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Szerokość'),
+        ),
+    ]
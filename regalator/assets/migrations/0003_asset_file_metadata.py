@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_asset_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Skrót SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Typ MIME'),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='original_filename',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Oryginalna nazwa pliku'),
+        ),
+    ]
@@ -2,11 +2,24 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify
+import hashlib
+import mimetypes
 import os
 
+from wms.image_processing import read_dimensions
+from wms.images import IMAGE_EXTENSIONS, DerivativeImageMixin
+
+
+ASSET_BLOBS_DIR = 'assets/blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def asset_upload_path(instance, filename):
-    """Generuje ścieżkę dla uploadowanych plików"""
+    """Generuje ścieżkę dla uploadowanych plików (adresowaną skrótem treści)"""
+    if instance.content_hash:
+        ext = os.path.splitext(filename)[1].lower()
+        digest = instance.content_hash
+        return f'{ASSET_BLOBS_DIR}/{digest[:2]}/{digest}{ext}'
     return f'assets/{instance.category.name if instance.category else "uncategorized"}/{filename}'
 
 
@@ -41,8 +54,12 @@ class Tag(models.Model):
         return self.name
 
 
-class Asset(models.Model):
+class Asset(DerivativeImageMixin, models.Model):
     """Asset (zdjęcie, PDF, etc.)"""
+
+    derivative_source_field = 'file'
+    # Pod /media/assets/ - nginx nie serwuje tego katalogu, pochodne wysyła asset_derivative
+    derivative_dir = 'assets/derivatives'
     
     ASSET_TYPES = [
         ('image', 'Obraz'),
@@ -65,6 +82,9 @@ class Asset(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Zaktualizowano")
     is_public = models.BooleanField(default=True, verbose_name="Publiczne")
     is_splash_image = models.BooleanField(default=False, verbose_name="Obraz splash")
+    original_filename = models.CharField(max_length=255, blank=True, editable=False, verbose_name="Oryginalna nazwa pliku")
+    mime_type = models.CharField(max_length=100, blank=True, editable=False, verbose_name="Typ MIME")
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False, verbose_name="Skrót SHA-256")
     
     class Meta:
         verbose_name = "Asset"
@@ -82,8 +102,65 @@ class Asset(models.Model):
         # Jeśli ten asset ma być splash image, odznacz wszystkie inne
         if self.is_splash_image:
             Asset.objects.filter(is_splash_image=True).exclude(id=self.id).update(is_splash_image=False)
+
+        if self.file and not self.file._committed:
+            self.store_file_metadata()
         
         super().save(*args, **kwargs)
+
+    def _read_file_metadata(self):
+        """Liczy SHA-256, rozmiar, typ MIME i wymiary obrazu z bieżącego pliku"""
+        hasher = hashlib.sha256()
+        for chunk in self.file.chunks(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+
+        name = self.original_filename or os.path.basename(self.file.name)
+        self.content_hash = hasher.hexdigest()
+        self.original_filename = name
+        self.file_bytes = self.file.size
+        self.mime_type = (
+            getattr(self.file.file, 'content_type', None)
+            or mimetypes.guess_type(name)[0]
+            or 'application/octet-stream'
+        )
+        self.width = self.height = None
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+            try:
+                self.file.seek(0)
+                self.width, self.height = read_dimensions(self.file)
+            except Exception:
+                pass
+        self.file.seek(0)
+
+    def store_file_metadata(self):
+        """
+        Liczy metadane nowego pliku (rozmiar, MIME, SHA-256, wymiary) raz przy
+        uploadzie. Jeśli identyczna treść jest już w storage, asset wskazuje
+        na istniejący plik zamiast zapisywać kopię.
+        """
+        self.original_filename = os.path.basename(self.file.name)
+        self._read_file_metadata()
+
+        duplicate = (
+            Asset.objects.filter(content_hash=self.content_hash)
+            .exclude(pk=self.pk)
+            .only('file', 'width', 'height', 'derivatives')
+            .first()
+        )
+        if duplicate and self.file.storage.exists(duplicate.file.name):
+            # Współdzielony plik - także gotowe pochodne obrazu
+            self.file.name = duplicate.file.name
+            self.file._committed = True
+            self.derivatives = duplicate.derivatives
+        else:
+            self.derivatives = {}
+
+    def refresh_file_metadata(self):
+        """Uzupełnia metadane już zapisanego pliku (bez przenoszenia go w storage)"""
+        with self.file.open('rb'):
+            self._read_file_metadata()
+        fields = ['content_hash', 'original_filename', 'file_bytes', 'mime_type', 'width', 'height']
+        Asset.objects.filter(pk=self.pk).update(**{field: getattr(self, field) for field in fields})
     
     def generate_unique_slug(self):
         """Generuje unikalny slug na podstawie tytułu"""
@@ -101,17 +178,27 @@ class Asset(models.Model):
     @property
     def filename(self):
         """Zwraca nazwę pliku"""
-        return os.path.basename(self.file.name)
+        return self.original_filename or os.path.basename(self.file.name)
     
     @property
     def file_size(self):
-        """Zwraca rozmiar pliku w MB"""
-        try:
-            size_bytes = self.file.size
-            size_mb = size_bytes / (1024 * 1024)
-            return f"{size_mb:.2f} MB"
-        except:
+        """Zwraca rozmiar pliku w MB (z metadanych zapisanych przy uploadzie)"""
+        if self.file_bytes is None:
             return "Nieznany"
+        size_mb = self.file_bytes / (1024 * 1024)
+        return f"{size_mb:.2f} MB"
+
+    def original_url(self):
+        """Oryginał jest dostępny tylko przez chroniony download"""
+        from django.urls import reverse
+        return reverse('assets:asset_download', args=[self.slug]) + '?inline=1'
+
+    def derivative_url(self, size, image_format='webp'):
+        """Pochodne, tak jak oryginał, są dostępne tylko przez chroniony widok"""
+        if not self.derivative(size, image_format):
+            return self.original_url() if self.file else ''
+        from django.urls import reverse
+        return reverse('assets:asset_derivative', args=[self.slug, size, image_format])
     
     @property
     def file_extension(self):
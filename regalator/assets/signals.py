@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from wms.images import delete_derivatives, schedule_derivatives
+
+from .models import Asset
+
+
+@receiver(post_save, sender=Asset)
+def generate_asset_derivatives(sender, instance, **kwargs):
+    schedule_derivatives(instance)
+
+
+@receiver(post_delete, sender=Asset)
+def remove_asset_derivatives(sender, instance, **kwargs):
+    def _remove():
+        # Plik (i jego pochodne) może być współdzielony przez inne assety o tej samej treści
+        if not Asset.objects.filter(file=instance.file.name).exists():
+            delete_derivatives(instance)
+
+    transaction.on_commit(_remove)
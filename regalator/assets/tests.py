@@ -1,3 +1,99 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .models import Asset
+
+
+class AssetFileMetadataTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, WMS_IMAGE_DERIVATIVES_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='owner', password='test')
+
+    def _create(self, title, content=b'%PDF-1.4 test', name='instrukcja.pdf', **kwargs):
+        upload = SimpleUploadedFile(name, content, content_type='application/pdf')
+        return Asset.objects.create(
+            title=title, file=upload, file_type='pdf', uploaded_by=self.user, **kwargs
+        )
+
+    def test_metadata_is_stored_and_identical_content_is_shared(self):
+        first = self._create('Instrukcja')
+        second = self._create('Instrukcja kopia', name='kopia.pdf')
+
+        self.assertEqual(first.content_hash, second.content_hash)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith(f'assets/blobs/{first.content_hash[:2]}/'))
+        self.assertEqual(second.filename, 'kopia.pdf')
+        self.assertEqual(second.mime_type, 'application/pdf')
+        self.assertEqual(second.file_bytes, len(b'%PDF-1.4 test'))
+
+        # Rozmiar z bazy - bez dostępu do storage
+        with self.assertNumQueries(0):
+            self.assertEqual(first.file_size, '0.00 MB')
+
+    @override_settings(ASSETS_X_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_download_is_delegated_to_nginx(self):
+        asset = self._create('Instrukcja')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('assets:asset_download', args=[asset.slug]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{asset.file.name}')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_private_asset_is_not_downloadable_by_other_users(self):
+        asset = self._create('Prywatny', is_public=False)
+        self.client.force_login(User.objects.create_user(username='other', password='test'))
+
+        response = self.client.get(reverse('assets:asset_download', args=[asset.slug]))
+
+        self.assertEqual(response.status_code, 403)
+
+    def _create_image(self, title, **kwargs):
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 400), (20, 120, 200)).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('zdjecie.png', buffer.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            asset = Asset.objects.create(title=title, file=upload, file_type='image', uploaded_by=self.user, **kwargs)
+        asset.refresh_from_db()
+        return asset
+
+    @override_settings(ASSETS_X_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_derivatives_are_private_and_served_through_protected_view(self):
+        asset = self._create_image('Prywatne zdjęcie', is_public=False)
+        thumb = asset.derivative('thumb')
+        # /media/assets/ nie jest serwowane publicznie przez nginx
+        self.assertTrue(thumb['name'].startswith('assets/derivatives/'))
+        url = asset.derivative_url('thumb')
+        self.assertEqual(url, reverse('assets:asset_derivative', args=[asset.slug, 'thumb', 'webp']))
+
+        self.client.force_login(User.objects.create_user(username='other', password='test'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{thumb["name"]}')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+    def test_derivatives_outside_private_directory_are_regenerated(self):
+        asset = self._create_image('Zdjęcie')
+        derivatives = asset.derivatives
+        derivatives['sizes']['thumb']['webp']['name'] = 'derivatives/stara/thumb.webp'
+        Asset.objects.filter(pk=asset.pk).update(derivatives=derivatives)
+        asset.refresh_from_db()
+
+        self.assertFalse(asset.derivatives_are_current())
+        self.assertEqual(asset.derivative_url('thumb'), asset.original_url())
@@ -22,4 +22,5 @@ urlpatterns = [
     path('<slug:slug>/edit/', views.asset_edit, name='asset_edit'),
     path('<slug:slug>/delete/', views.asset_delete, name='asset_delete'),
     path('<slug:slug>/download/', views.asset_download, name='asset_download'),
+    path('<slug:slug>/derivatives/<slug:size>/<slug:image_format>/', views.asset_derivative, name='asset_derivative'),
 ] 
\ No newline at end of file
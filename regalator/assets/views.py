@@ -3,11 +3,17 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.http import content_disposition_header
 from django.views.decorators.http import require_http_methods
 from .models import Asset, Category, Tag
 from .forms import AssetUploadForm, AssetEditForm
 import os
+from urllib.parse import quote
+
+DERIVATIVE_CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
 
 
 @login_required
@@ -227,15 +233,64 @@ def tag_detail(request, tag_id):
 
 @login_required
 def asset_download(request, slug):
-    """Download assetu"""
+    """Download assetu (chroniony - plik wysyła nginx przez X-Accel-Redirect)"""
     asset = get_object_or_404(Asset, slug=slug)
-    
+    _check_access(request, asset)
+
     # Sprawdź czy plik istnieje
     if not asset.file:
         messages.error(request, 'Plik nie istnieje.')
         return redirect('assets:asset_detail', slug=asset.slug)
-    
-    # Tutaj można dodać logikę liczenia downloadów
-    return redirect(asset.file.url)
 
+    return _send_protected_file(
+        asset.file.storage,
+        asset.file.name,
+        content_type=asset.mime_type,
+        filename=asset.filename,
+        as_attachment=not request.GET.get('inline'),
+        size=asset.file_bytes,
+    )
+
+
+@login_required
+def asset_derivative(request, slug, size, image_format):
+    """Miniatura / wariant obrazu assetu - z tym samym sprawdzeniem uprawnień co download"""
+    asset = get_object_or_404(Asset, slug=slug)
+    _check_access(request, asset)
+
+    variant = asset.derivative(size, image_format)
+    if not variant:
+        raise Http404('Brak pochodnej obrazu')
+
+    return _send_protected_file(
+        asset.file.storage,
+        variant['name'],
+        content_type=DERIVATIVE_CONTENT_TYPES.get(image_format),
+        filename=os.path.basename(variant['name']),
+        as_attachment=False,
+        size=variant.get('bytes'),
+    )
+
+
+def _check_access(request, asset):
+    if not asset.is_public and asset.uploaded_by_id != request.user.id and not request.user.is_staff:
+        raise PermissionDenied
+
+
+def _send_protected_file(storage, name, *, content_type, filename, as_attachment, size=None):
+    accel_prefix = getattr(settings, 'ASSETS_X_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(name)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        if size is not None:
+            response['Content-Length'] = size
+        return response
 
+    # Bez nginx (runserver) plik wysyła Django
+    return FileResponse(
+        storage.open(name, 'rb'),
+        as_attachment=as_attachment,
+        filename=filename,
+        content_type=content_type or None,
+    )
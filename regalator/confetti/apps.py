@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ConfettiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'confetti'
+
+    def ready(self):
+        import confetti.signals  # noqa: F401
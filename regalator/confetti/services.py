@@ -4,15 +4,23 @@ Service helpers for Confetti settings.
 The services provide:
 - registry/validation hooks for known keys
 - helper APIs to read/write global and per-user settings with fallback
-- lightweight caching for global defaults
+- versioned settings bundles in the shared Django cache
+
+Global settings and each user's overrides are cached as whole bundles
+(``{key: value}``) under keys that embed a version number. Writes only bump
+the version, so every worker sees the change on its next read, and a read
+costs one ``get_many`` for the versions plus one for the bundles - no
+database queries once the bundles are warm.
 """
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, Iterable, Mapping, MutableMapping, Optional
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import transaction
 
@@ -20,7 +28,14 @@ from .models import ConfettiGlobalSetting, ConfettiUserSetting
 
 SettingValidator = Callable[[Any], Any]
 
-_GLOBAL_CACHE: MutableMapping[str, tuple[bool, Any]] = {}
+BUNDLE_CACHE_TIMEOUT = 60 * 60 * 24
+
+GLOBAL_VERSION_KEY = "confetti:globals:version"
+USERS_VERSION_KEY = "confetti:users:version"
+USER_VERSION_KEY = "confetti:user:{user_id}:version"
+GLOBAL_BUNDLE_KEY = "confetti:globals:{version}"
+USER_BUNDLE_KEY = "confetti:user:{user_id}:{users_version}:{version}"
+
 _registry: Dict[str, "SettingDefinition"] = {}
 
 
@@ -72,36 +87,138 @@ def _validate_value(key: str, value: Any) -> Any:
     return value
 
 
-def _get_cached_global_value(key: str) -> tuple[bool, Any]:
-    cached = _GLOBAL_CACHE.get(key)
-    if cached is not None:
-        return cached
+def _initial_version() -> int:
+    # Timestamp seed: an evicted version key never comes back as an old number
+    return int(time.time() * 1000)
 
-    record = (
-        ConfettiGlobalSetting.objects.filter(key=key)
-        .values("value")
-        .first()
-    )
-    if not record:
-        _GLOBAL_CACHE[key] = (False, None)
-        return _GLOBAL_CACHE[key]
 
-    _GLOBAL_CACHE[key] = (True, record["value"])
-    return _GLOBAL_CACHE[key]
+def _bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
 
 
-def _invalidate_global_cache(keys: Optional[Iterable[str]] = None) -> None:
-    if keys is None:
-        _GLOBAL_CACHE.clear()
-        return
+def _bump_versions(keys: Iterable[str]) -> None:
+    """
+    Bump now (so this worker reads its own write) and again after commit, so
+    a bundle rebuilt by another worker from pre-commit data is discarded.
+    """
+
+    keys = list(keys)
     for key in keys:
-        _GLOBAL_CACHE.pop(key, None)
+        _bump_version(key)
+    transaction.on_commit(lambda: [_bump_version(key) for key in keys])
+
+
+def _user_id(user) -> Optional[int]:
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+    return user.pk
+
+
+def _get_versions(user_id: Optional[int]) -> Dict[str, int]:
+    keys = [GLOBAL_VERSION_KEY]
+    if user_id is not None:
+        keys += [USERS_VERSION_KEY, USER_VERSION_KEY.format(user_id=user_id)]
+
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        seed = _initial_version()
+        for key in missing:
+            cache.add(key, seed, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def _build_global_bundle() -> Dict[str, Any]:
+    return dict(ConfettiGlobalSetting.objects.values_list("key", "value"))
+
+
+def _build_user_bundle(user_id: int) -> Dict[str, Any]:
+    return dict(
+        ConfettiUserSetting.objects.filter(user_id=user_id).values_list("key", "value")
+    )
+
+
+def _load_bundles(user=None) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """Return ``(global_bundle, user_bundle)`` from the cache, rebuilding misses."""
+
+    user_id = _user_id(user)
+    versions = _get_versions(user_id)
+
+    bundle_keys = {
+        "global": GLOBAL_BUNDLE_KEY.format(version=versions[GLOBAL_VERSION_KEY]),
+    }
+    if user_id is not None:
+        bundle_keys["user"] = USER_BUNDLE_KEY.format(
+            user_id=user_id,
+            users_version=versions[USERS_VERSION_KEY],
+            version=versions[USER_VERSION_KEY.format(user_id=user_id)],
+        )
+
+    cached = cache.get_many(bundle_keys.values())
+    to_store = {}
+
+    global_bundle = cached.get(bundle_keys["global"])
+    if global_bundle is None:
+        global_bundle = _build_global_bundle()
+        to_store[bundle_keys["global"]] = global_bundle
+
+    user_bundle: Dict[str, Any] = {}
+    if user_id is not None:
+        user_bundle = cached.get(bundle_keys["user"])
+        if user_bundle is None:
+            user_bundle = _build_user_bundle(user_id)
+            to_store[bundle_keys["user"]] = user_bundle
+
+    if to_store:
+        cache.set_many(to_store, BUNDLE_CACHE_TIMEOUT)
+    return global_bundle, user_bundle
+
+
+def invalidate_global_settings() -> None:
+    _bump_versions([GLOBAL_VERSION_KEY])
+
+
+def invalidate_user_settings(user_id) -> None:
+    _bump_versions([USER_VERSION_KEY.format(user_id=user_id)])
 
 
 def invalidate_confetti_cache(keys: Optional[Iterable[str]] = None) -> None:
-    """Public helper to clear cached global values."""
+    """
+    Public helper to drop cached settings in every worker.
+
+    ``keys`` is accepted for backwards compatibility; bundles are cached as a
+    whole, so any invalidation refreshes globals and all user overrides.
+    """
+
+    _bump_versions([GLOBAL_VERSION_KEY, USERS_VERSION_KEY])
+
+
+def get_many(
+    keys: Iterable[str],
+    *,
+    user=None,
+    defaults: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Return effective values for several keys at once, preferring user overrides.
+
+    Keys with no global value and no override fall back to ``defaults``
+    (or ``None``).
+    """
 
-    _invalidate_global_cache(keys)
+    defaults = defaults or {}
+    global_bundle, user_bundle = _load_bundles(user)
+    result: Dict[str, Any] = {}
+    for key in keys:
+        value = user_bundle.get(key)
+        if value is None:
+            value = global_bundle.get(key, defaults.get(key))
+        result[key] = value
+    return result
 
 
 def get_effective_setting(
@@ -111,33 +228,15 @@ def get_effective_setting(
     Return the effective setting for `key`, preferring the user override.
     """
 
-    if user is not None:
-        user_value = (
-            ConfettiUserSetting.objects.filter(user=user, key=key)
-            .values_list("value", flat=True)
-            .first()
-        )
-        if user_value is not None:
-            return user_value
-
-    exists, value = _get_cached_global_value(key)
-    if exists:
-        return value
-    return default
+    return get_many([key], user=user, defaults={key: default})[key]
 
 
 def get_effective_settings_for_user(user) -> Dict[str, Any]:
     """Return dict of keys -> values, merging global defaults and overrides."""
 
-    result: Dict[str, Any] = {}
-    for key, value in ConfettiGlobalSetting.objects.values_list("key", "value"):
-        result[key] = value
-
-    overrides = ConfettiUserSetting.objects.filter(user=user).values_list(
-        "key", "value"
-    )
-    for key, value in overrides:
-        result[key] = value
+    global_bundle, user_bundle = _load_bundles(user)
+    result = dict(global_bundle)
+    result.update(user_bundle)
     return result
 
 
@@ -158,7 +257,6 @@ def set_global_setting(
             "description": description,
         },
     )
-    _invalidate_global_cache([key])
     return obj
 
 
@@ -0,0 +1,17 @@
+"""Invalidate cached settings bundles on any write (services, admin, cascades)."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import services
+from .models import ConfettiGlobalSetting, ConfettiUserSetting
+
+
+@receiver([post_save, post_delete], sender=ConfettiGlobalSetting)
+def invalidate_global_bundle(sender, instance, **kwargs):
+    services.invalidate_global_settings()
+
+
+@receiver([post_save, post_delete], sender=ConfettiUserSetting)
+def invalidate_user_bundle(sender, instance, **kwargs):
+    services.invalidate_user_settings(instance.user_id)
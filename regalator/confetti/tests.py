@@ -32,3 +32,46 @@ class ConfettiServiceTests(TestCase):
         )
         value = services.get_effective_setting("ui.theme", user=self.user)
         self.assertEqual(value, "light")
+
+
+class ConfettiCacheTests(TestCase):
+    def setUp(self):
+        services.invalidate_confetti_cache()
+        self.user = get_user_model().objects.create_user(
+            username="bob", email="bob@example.com", password="test1234"
+        )
+        services.set_global_setting("ui.theme", "light")
+        services.set_global_setting("ui.density", "compact")
+        services.set_user_setting(self.user, "ui.theme", "dark")
+
+    def tearDown(self):
+        services.invalidate_confetti_cache()
+
+    def test_get_many_merges_overrides_and_defaults(self):
+        values = services.get_many(
+            ["ui.theme", "ui.density", "ui.missing"],
+            user=self.user,
+            defaults={"ui.missing": 10},
+        )
+        self.assertEqual(
+            values, {"ui.theme": "dark", "ui.density": "compact", "ui.missing": 10}
+        )
+
+    def test_warm_reads_do_not_query_database(self):
+        services.get_effective_setting("ui.theme", user=self.user)
+        with self.assertNumQueries(0):
+            services.get_effective_setting("ui.theme", user=self.user)
+            services.get_effective_setting("ui.density")
+            services.get_effective_settings_for_user(self.user)
+
+    def test_writes_bump_shared_version(self):
+        self.assertEqual(services.get_effective_setting("ui.density", user=self.user), "compact")
+
+        # Direct model write (e.g. admin in another worker) bypasses the services
+        setting = ConfettiGlobalSetting.objects.get(key="ui.density")
+        setting.value = "comfortable"
+        setting.save()
+        self.assertEqual(services.get_effective_setting("ui.density", user=self.user), "comfortable")
+
+        services.reset_user_setting(self.user, "ui.theme")
+        self.assertEqual(services.get_effective_setting("ui.theme", user=self.user), "light")
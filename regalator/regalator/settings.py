@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'wms.replica.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -136,14 +137,41 @@ else:
         }
     }
 
+# Replika tylko do odczytu dla list, raportów i eksportów (wms.replica).
+# MySQL: DB_REPLICA_HOST/DB_REPLICA_PORT, SQLite: DB_REPLICA_NAME (kopia db.sqlite3)
+WMS_READ_REPLICA = 'replica'
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES[WMS_READ_REPLICA] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default'].get('HOST', '')),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+# Po zapisie odczyty użytkownika idą do 'default' przez tyle sekund (read-your-writes)
+WMS_REPLICA_STICKY_SECONDS = int(os.getenv('WMS_REPLICA_STICKY_SECONDS', '5'))
+
 # Database routers
-DATABASE_ROUTERS = ['subiekt.routers.SubiektRouter']
+DATABASE_ROUTERS = ['subiekt.routers.SubiektRouter', 'wms.routers.ReplicaRouter']
 
 # Disable migrations for subiekt app (legacy database)
 MIGRATION_MODULES = {
     'subiekt': None,
 }
 
+# Cache współdzielony przez workery (wersje indeksów, ustawienia confetti).
+# Puste REDIS_CACHE_URL = cache w pamięci procesu (runserver, testy),
+# np. redis://redis:6379/1 w produkcji
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', '')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'regalator',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -186,7 +214,6 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "wms_builder/static"),
 ]
 
-print(STATICFILES_DIRS)
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -206,4 +233,31 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 
 # Subiekt settings
-SUBIEKT_MAGAZYN_ID = 2
\ No newline at end of file
+SUBIEKT_MAGAZYN_ID = 2
+# Pula wątków dla zapytań z widoków async (subiekt.async_client) - zarazem
+# limit równoległych zapytań/połączeń do Subiekta w jednym procesie
+SUBIEKT_ASYNC_WORKERS = int(os.environ.get('SUBIEKT_ASYNC_WORKERS', '4'))
+
+# Live updates (SSE) - pusty adres = broker w pamięci procesu,
+# np. redis://redis:6379/0 aby rozsyłać zdarzenia między workerami ASGI
+WMS_LIVE_BROKER_URL = os.environ.get('WMS_LIVE_BROKER_URL', '')
+
+# Pochodne obrazów (miniatury/WebP) - generowane w tle po zapisie zdjęcia,
+# WMS_IMAGE_DERIVATIVES_ASYNC=0 generuje je synchronicznie po commicie
+WMS_IMAGE_DERIVATIVES_ASYNC = os.environ.get('WMS_IMAGE_DERIVATIVES_ASYNC', '1') != '0'
+WMS_IMAGE_WORKERS = int(os.environ.get('WMS_IMAGE_WORKERS', '2'))
+
+# Formaty numerów dokumentów i zleceń, np. {'WZ': 'WZ/{year}/{number:05d}'};
+# klucze i wzorce domyślne w wms.numbering.DEFAULT_FORMATS
+WMS_NUMBER_FORMATS = {}
+
+# Eksport dokumentów do Subiekta GT (EDI++/EPP) - nadawca i symbol magazynu w pliku
+WMS_EPP_SENDER_NAME = os.environ.get('WMS_EPP_SENDER_NAME', 'Regalator')
+WMS_EPP_WAREHOUSE_SYMBOL = os.environ.get('WMS_EPP_WAREHOUSE_SYMBOL', 'MAG')
+
+# Cache fragmentów wierszy list produktów/stanów/lokalizacji (sekundy, 0 = wyłączony)
+WMS_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('WMS_FRAGMENT_CACHE_TIMEOUT', str(24 * 60 * 60)))
+
+# Chronione pobieranie assetów przez nginx (X-Accel-Redirect), np. /protected-media/;
+# puste = plik wysyła Django (runserver)
+ASSETS_X_ACCEL_REDIRECT_PREFIX = os.environ.get('ASSETS_X_ACCEL_REDIRECT_PREFIX', '')
@@ -19,7 +19,6 @@ from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.conf import settings
 from django.conf.urls.static import static
-from wms import views as wms_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
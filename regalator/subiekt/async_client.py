@@ -0,0 +1,133 @@
+"""
+Asynchroniczny dostęp do Subiekta dla widoków ASGI.
+
+Sterownik pyodbc jest blokujący, dlatego zapytania menedżerów
+(``tw_Towar.subiekt_objects``, ``dok_Dokument.dokument_objects``) wykonywane są
+w osobnej puli wątków o rozmiarze ``SUBIEKT_ASYNC_WORKERS``. Rozmiar puli
+ogranicza liczbę równoległych zapytań (i połączeń) do serwera Subiekta w całym
+procesie - nadmiarowe zapytania czekają w kolejce puli, a pętla zdarzeń w tym
+czasie obsługuje inne żądania.
+
+Połączenia Django są lokalne dla wątku, więc każdy wątek puli ma własne
+połączenie ``subiekt``; po zapytaniu jest ono zamykane zgodnie z
+``CONN_MAX_AGE``, tak jak po zwykłym żądaniu.
+
+Widok async może zlecić wiele zapytań naraz, np. pozycje wielu dokumentów::
+
+    documents = await async_client.get_zk(limit=20)
+    positions = await async_client.get_positions_for(documents)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .models import dok_Dokument, tw_Towar
+
+logger = logging.getLogger(__name__)
+
+SUBIEKT_ALIAS = 'subiekt'
+DEFAULT_WORKERS = 4
+# SQL Server przyjmuje do 2100 parametrów w jednym zapytaniu
+IN_CHUNK_SIZE = 500
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SUBIEKT_ASYNC_WORKERS', DEFAULT_WORKERS),
+                thread_name_prefix='subiekt',
+            )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    connection = connections[SUBIEKT_ALIAS]
+    connection.close_if_unusable_or_obsolete()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+async def run(func, *args, **kwargs):
+    """Wykonuje blokującą funkcję odczytu z Subiekta w puli wątków."""
+
+    return await sync_to_async(_call, thread_sensitive=False, executor=_get_executor())(func, args, kwargs)
+
+
+async def get_product_by_id(product_id: int) -> Optional[tw_Towar]:
+    return await run(tw_Towar.subiekt_objects.get_product_by_id, product_id)
+
+
+async def get_products_by_ids(product_ids: Iterable[int]) -> Dict[int, tw_Towar]:
+    """
+    Produkty po ``tw_Id`` - jedno zapytanie ``IN (...)`` na porcję
+    ``IN_CHUNK_SIZE`` identyfikatorów, porcje pobierane równolegle. Brakujące
+    w Subiekcie oraz porcje, których nie udało się pobrać (błąd jest
+    logowany), są pomijane.
+    """
+
+    product_ids = list(dict.fromkeys(product_ids))
+    chunks = [product_ids[start:start + IN_CHUNK_SIZE] for start in range(0, len(product_ids), IN_CHUNK_SIZE)]
+    results = await asyncio.gather(
+        *(run(tw_Towar.subiekt_objects.get_products_by_ids, chunk) for chunk in chunks),
+        return_exceptions=True,
+    )
+    products = {}
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            logger.warning('Nie udało się pobrać produktów %s-%s z Subiekta: %s', chunk[0], chunk[-1], result)
+            continue
+        products.update((product.tw_Id, product) for product in result)
+    return products
+
+
+async def get_zk(limit: int = 10) -> List[dok_Dokument]:
+    return await run(dok_Dokument.dokument_objects.get_zk, limit)
+
+
+async def get_zd(limit: int = 10) -> List[dok_Dokument]:
+    return await run(dok_Dokument.dokument_objects.get_zd, limit)
+
+
+async def get_new_zd(latest_document_id: int = 0, limit: int = 200) -> List[dok_Dokument]:
+    return await run(dok_Dokument.dokument_objects.get_new_zd, latest_document_id, limit)
+
+
+async def get_document_positions(document_id: int) -> List[dict]:
+    return await run(dok_Dokument.dokument_objects._get_document_positions, document_id)
+
+
+async def get_positions_for(documents: Iterable[dok_Dokument]) -> Dict[int, List[dict]]:
+    """
+    Pozycje wielu dokumentów pobierane równolegle, klucz to ``dok_Id``.
+    Dokument, którego pozycji nie udało się pobrać (błąd jest logowany),
+    dostaje pustą listę - tak jak dotychczasowa synchronizacja ZK/ZD.
+    """
+
+    document_ids = list(dict.fromkeys(document.dok_Id for document in documents))
+    results = await asyncio.gather(
+        *(get_document_positions(document_id) for document_id in document_ids),
+        return_exceptions=True,
+    )
+    positions = {}
+    for document_id, result in zip(document_ids, results):
+        if isinstance(result, Exception):
+            logger.warning('Nie udało się pobrać pozycji dokumentu %s z Subiekta: %s', document_id, result)
+            result = []
+        positions[document_id] = result
+    return positions
@@ -1,7 +1,7 @@
 from django.db import models
 from django.db import connections
 from django.conf import settings
-from typing import Optional
+from typing import Iterator, Optional
 from enum import Enum
 
 
@@ -82,6 +82,30 @@ class SubiektManager(models.Manager):
             
             return products
 
+    def get_stock_snapshot(self, mag_id: Optional[int] = None) -> list[tuple]:
+        """
+        Fetches the whole stock snapshot of one warehouse from tw_Stan in a single query.
+        Returns a list of (tw_Id, st_Stan, st_StanRez, tw_Symbol, tw_Nazwa) tuples.
+        """
+        if mag_id is None:
+            mag_id = getattr(settings, 'SUBIEKT_MAGAZYN_ID', 2)
+
+        query = """
+            SELECT
+                s.st_TowId,
+                ISNULL(s.st_Stan, 0) as st_Stan,
+                ISNULL(s.st_StanRez, 0) as st_StanRez,
+                ISNULL(t.tw_Symbol, '') as tw_Symbol,
+                ISNULL(t.tw_Nazwa, '') as tw_Nazwa
+            FROM [dbo].[tw_Stan] s
+            LEFT JOIN [dbo].[tw__Towar] t ON t.tw_Id = s.st_TowId
+            WHERE s.st_MagId = %s
+        """
+
+        with connections['subiekt'].cursor() as cursor:
+            cursor.execute(query, [mag_id])
+            return cursor.fetchall()
+
     def get_product_by_id(self, product_id: int) -> Optional['tw_Towar']:
         """
         Fetches a single product by ID with stock information using a raw SQL query for performance.
@@ -126,6 +150,86 @@ class SubiektManager(models.Manager):
             
             return product
 
+    def get_products_by_ids(self, product_ids: list[int]) -> list['tw_Towar']:
+        """
+        Fetches many products by ID with stock information in a single
+        ``WHERE tw_Id IN (...)`` query. IDs missing in Subiekt are skipped.
+        SQL Server accepts up to 2100 parameters - callers pass chunks.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return []
+
+        mag_id = getattr(settings, 'SUBIEKT_MAGAZYN_ID', 2)
+        placeholders = ', '.join(['%s'] * len(product_ids))
+
+        query = f"""
+            SELECT
+                t.tw_Id,
+                t.tw_Symbol,
+                t.tw_Nazwa,
+                t.tw_Opis,
+                ISNULL(s.st_Stan, 0) as st_Stan,
+                ISNULL(s.st_StanRez, 0) as st_StanRez,
+                ISNULL(g.grt_Nazwa, '') as grt_Nazwa
+            FROM [dbo].[tw__Towar] t
+            LEFT JOIN [dbo].[tw_Stan] s ON t.tw_Id = s.st_TowId AND s.st_MagId = %s
+            LEFT JOIN [dbo].[sl_GrupaTw] g ON t.tw_IdGrupa = g.grt_Id
+            WHERE t.tw_Id IN ({placeholders})
+        """
+
+        with connections['subiekt'].cursor() as cursor:
+            cursor.execute(query, [mag_id, *product_ids])
+
+            products = []
+            for row in cursor.fetchall():
+                product = tw_Towar(
+                    tw_Id=row[0],
+                    tw_Symbol=row[1],
+                    tw_Nazwa=row[2],
+                    tw_Opis=row[3] or ""
+                )
+
+                # Add stock information as attributes
+                product.st_Stan = float(row[4])
+                product.st_StanRez = float(row[5])
+                product.grt_Nazwa = row[6] or ""
+
+                products.append(product)
+
+            return products
+
+    def iter_product_codes(self, batch_size: int = 5000) -> Iterator[tuple]:
+        """
+        Streams all product codes from Subiekt in a single query:
+        the basic barcode (tw_PodstKodKresk), PLU (tw_PLU) and additional
+        barcodes from tw_KodKreskowy. Yields (tw_Id, source, code) tuples,
+        where source is 'ean', 'plu' or 'extra'; rows are fetched in
+        batches of ``batch_size``.
+        """
+        query = """
+            SELECT t.tw_Id, 'ean' AS source, LTRIM(RTRIM(t.tw_PodstKodKresk)) AS code
+            FROM [dbo].[tw__Towar] t
+            WHERE LTRIM(RTRIM(ISNULL(t.tw_PodstKodKresk, ''))) <> ''
+            UNION ALL
+            SELECT t.tw_Id, 'plu', CAST(t.tw_PLU AS varchar(20))
+            FROM [dbo].[tw__Towar] t
+            WHERE ISNULL(t.tw_PLU, 0) <> 0
+            UNION ALL
+            SELECT k.kk_IdTowar, 'extra', LTRIM(RTRIM(k.kk_Kod))
+            FROM [dbo].[tw_KodKreskowy] k
+            WHERE LTRIM(RTRIM(ISNULL(k.kk_Kod, ''))) <> ''
+        """
+
+        with connections['subiekt'].cursor() as cursor:
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row[0], row[1], row[2]
+
 
 class DokumentManager(models.Manager):
     def _get_documents(self, doc_type: int, limit: int = 10) -> list['dok_Dokument']:
@@ -1,7 +1,13 @@
 from django.test import TestCase, SimpleTestCase, TransactionTestCase
 from django.db import connections
 from django.conf import settings
-from .models import tw_Towar
+from django.test import override_settings
+from unittest import mock
+import asyncio
+import threading
+import time
+from . import async_client
+from .models import dok_Dokument, tw_Towar
 
 
 class SubiektConnectionTest(SimpleTestCase):
@@ -298,3 +304,66 @@ class SubiektModelTest(TestCase):
         )
         
         self.assertEqual(towar.opis_produktu, "")
+
+
+@override_settings(SUBIEKT_ASYNC_WORKERS=2)
+class AsyncClientTests(SimpleTestCase):
+    """Warstwa async nad blokującymi zapytaniami do Subiekta (pula wątków)"""
+
+    databases = {'default', 'subiekt'}
+
+    def setUp(self):
+        async_client._executor = None
+
+    def tearDown(self):
+        if async_client._executor is not None:
+            async_client._executor.shutdown(wait=True)
+        async_client._executor = None
+
+    def test_run_uses_own_connection_in_pool_thread(self):
+        def query():
+            with connections['subiekt'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                return threading.current_thread().name, cursor.fetchone()[0]
+
+        thread_name, value = asyncio.run(async_client.run(query))
+
+        self.assertTrue(thread_name.startswith('subiekt'))
+        self.assertEqual(value, 1)
+
+    def test_concurrency_is_bounded_by_pool_size(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def slow_query(number):
+            with lock:
+                running.append(number)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(number)
+            return number
+
+        async def fan_out():
+            return await asyncio.gather(*(async_client.run(slow_query, number) for number in range(6)))
+
+        self.assertEqual(asyncio.run(fan_out()), list(range(6)))
+        # Zapytania szły równolegle, ale nie więcej niż rozmiar puli
+        self.assertEqual(max(peak), 2)
+
+    def test_positions_for_documents_fetched_concurrently(self):
+        documents = [dok_Dokument(dok_Id=1), dok_Dokument(dok_Id=2), dok_Dokument(dok_Id=1)]
+
+        def positions(document_id):
+            if document_id == 2:
+                raise RuntimeError('timeout')
+            return [{'ob_Id': 10, 'tw_Id': 5}]
+
+        with mock.patch.object(dok_Dokument.dokument_objects, '_get_document_positions', side_effect=positions) as patched:
+            with self.assertLogs('subiekt.async_client', 'WARNING'):
+                result = asyncio.run(async_client.get_positions_for(documents))
+
+        self.assertEqual(patched.call_count, 2)
+        self.assertEqual(result, {1: [{'ob_Id': 10, 'tw_Id': 5}], 2: []})
+
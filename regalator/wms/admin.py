@@ -1,7 +1,11 @@
+import io
+
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
 from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
 from django.utils.text import slugify
 from .models import (
     Product, Location, Stock, CustomerOrder, OrderItem,
@@ -9,8 +13,10 @@ from .models import (
     SupplierOrder, SupplierOrderItem, ReceivingOrder, 
     ReceivingItem, ReceivingHistory, WarehouseDocument, DocumentItem,
     UserProfile, ProductGroup, ProductCode, ProductImage,
-    Company, CompanyAddress, StockMovement
+    Company, CompanyAddress, StockMovement, StockReconciliation, NumberSequence
 )
+from .epp import EPP_ENCODING, mark_exported, write_epp
+from .product_sync import sync_products
 
 
 class ProductCodeInline(admin.TabularInline):
@@ -163,7 +169,7 @@ class ProductAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at', 'total_stock', 'stock_difference', 'needs_sync']
     filter_horizontal = ['groups']
     inlines = [ProductCodeInline, ProductImageInline]
-    actions = ['update_variants_to_size_and_color']
+    actions = ['update_variants_to_size_and_color', 'sync_from_subiekt']
     
     def display_groups(self, obj):
         """Wyświetla grupy produktu"""
@@ -171,6 +177,26 @@ class ProductAdmin(admin.ModelAdmin):
     display_groups.short_description = 'Grupy'
     
     
+    @admin.action(description='Synchronizuj zaznaczone z Subiektem')
+    def sync_from_subiekt(self, request, queryset):
+        result = sync_products(queryset)
+        if not result.total:
+            self.message_user(request, 'Zaznaczone produkty nie są powiązane z Subiektem.', level='WARNING')
+            return
+        self.message_user(
+            request,
+            f'Zsynchronizowano {result.updated} z {result.total} produktów (nowe grupy: {result.groups_created}).',
+            level='SUCCESS',
+        )
+        if result.missing:
+            self.message_user(
+                request,
+                f'Brak w Subiekcie: {", ".join(str(subiekt_id) for subiekt_id in result.missing[:50])}',
+                level='WARNING',
+            )
+        for error in result.errors:
+            self.message_user(request, error, level='ERROR')
+    
     def update_variants_to_size_and_color(self, request, queryset):
         """Admin action to update variants JSON field to include SizeAndColor type for products without parents"""
         # Filter only products without parents
@@ -219,7 +245,7 @@ class ProductAdmin(admin.ModelAdmin):
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'location_type', 'barcode', 'is_active']
+    list_display = ['name', 'location_type', 'barcode', 'capacity', 'is_active']
     list_filter = ['location_type', 'is_active', 'created_at']
     search_fields = ['name', 'barcode', 'description']
     ordering = ['barcode']
@@ -356,11 +382,24 @@ class ReceivingHistoryAdmin(admin.ModelAdmin):
 
 @admin.register(WarehouseDocument)
 class WarehouseDocumentAdmin(admin.ModelAdmin):
-    list_display = ['document_number', 'document_type', 'document_date', 'status', 'supplier_order', 'customer_order']
+    list_display = ['document_number', 'document_type', 'document_date', 'status', 'supplier_order', 'customer_order', 'exported_at']
     list_filter = ['document_type', 'status', 'document_date']
     search_fields = ['document_number', 'supplier_order__order_number', 'customer_order__order_number']
     date_hierarchy = 'document_date'
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'exported_at']
+    actions = ['export_epp']
+
+    @admin.action(description='Eksportuj zaznaczone do pliku EPP (Subiekt GT)')
+    def export_epp(self, request, queryset):
+        stream = io.StringIO()
+        exported_ids = write_epp(queryset, stream)
+        mark_exported(exported_ids)
+        response = HttpResponse(
+            stream.getvalue().encode(EPP_ENCODING, errors='replace'),
+            content_type=f'text/plain; charset={EPP_ENCODING}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="regalator_{timezone.localdate():%Y%m%d}.epp"'
+        return response
     
     fieldsets = (
         ('Podstawowe informacje', {
@@ -370,14 +409,14 @@ class WarehouseDocumentAdmin(admin.ModelAdmin):
             'fields': ('supplier_order', 'customer_order')
         }),
         ('Dodatkowe', {
-            'fields': ('notes', 'created_at')
+            'fields': ('notes', 'created_at', 'exported_at')
         }),
     )
 
 
 @admin.register(DocumentItem)
 class DocumentItemAdmin(admin.ModelAdmin):
-    list_display = ['document', 'product', 'location', 'quantity']
+    list_display = ['document', 'product', 'source_location', 'location', 'quantity']
     list_filter = ['document__document_type', 'document__status', 'product', 'location']
     search_fields = ['document__document_number', 'product__name', 'product__codes__code']
     ordering = ['document', 'product']
@@ -487,3 +526,18 @@ class CompanyAddressAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(StockReconciliation)
+class StockReconciliationAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'magazyn_id', 'products_checked', 'discrepancies_count', 'total_abs_difference', 'duration_ms', 'created_by']
+    list_filter = ['magazyn_id', 'created_at']
+    readonly_fields = ['created_at', 'created_by', 'magazyn_id', 'products_checked', 'discrepancies_count', 'total_abs_difference', 'duration_ms']
+    ordering = ['-created_at']
+
+
+@admin.register(NumberSequence)
+class NumberSequenceAdmin(admin.ModelAdmin):
+    list_display = ['key', 'period', 'last_value']
+    list_filter = ['key']
+    ordering = ['key', '-period']
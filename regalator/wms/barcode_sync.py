@@ -0,0 +1,184 @@
+"""
+Zbiorcza synchronizacja kodów kreskowych z Subiekta.
+
+Wszystkie kody towarów - podstawowy kod kreskowy, PLU i dodatkowe kody
+z ``tw_KodKreskowy`` - są czytane jednym strumieniowanym zapytaniem
+(``tw_Towar.subiekt_objects.iter_product_codes``). Do tego dochodzi
+dotychczasowy kod ``tw_Id`` każdego produktu powiązanego z Subiektem.
+
+Stan docelowy jest porównywany z ``ProductCode`` w pamięci: istniejące kody
+czyta jedno zapytanie, a zmiany zapisują ``bulk_create`` i ``bulk_update``
+w jednej transakcji.
+
+Kody pochodzące z Subiektu rozpoznajemy po opisie (``SOURCE_DESCRIPTIONS``).
+Tylko takie kody synchronizacja przepina między produktami i dezaktywuje,
+gdy zniknęły z Subiekta. Kodów dodanych ręcznie w WMS nie zmienia; kolizja
+z nimi trafia do ``errors``.
+
+Operacje zbiorcze nie wysyłają sygnałów, dlatego wersję kodów (cache
+rozpoznawania kodów przy kompletacji i przyjęciach) oraz wiersze list
+unieważniamy raz, po zatwierdzeniu transakcji.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import fragment_cache
+from .models import Product, ProductCode
+
+# Ile wierszy z Subiekta pobierać jednym fetchmany
+DEFAULT_FETCH_SIZE = 5000
+BULK_BATCH_SIZE = 1000
+
+CODE_TYPE = 'barcode'
+SOURCE_DESCRIPTIONS = {
+    'ean': 'Kod kreskowy z Subiektu (tw_PodstKodKresk)',
+    'extra': 'Dodatkowy kod z Subiektu (tw_KodKreskowy)',
+    'plu': 'PLU z Subiektu (tw_PLU)',
+    'id': 'Kod z Subiektu (tw_Id)',
+}
+# Pierwszeństwo, gdy ten sam kod występuje w kilku źródłach
+SOURCE_PRIORITY = ('ean', 'extra', 'plu', 'id')
+SUBIEKT_DESCRIPTIONS = frozenset(SOURCE_DESCRIPTIONS.values())
+CODE_MAX_LENGTH = ProductCode._meta.get_field('code').max_length
+
+UPDATE_FIELDS = ['product', 'code_type', 'description', 'is_active', 'updated_at']
+
+
+@dataclass
+class BarcodeSyncResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    deactivated: int = 0
+    unchanged: int = 0
+    # tw_Id towarów z kodami w Subiekcie, których nie ma w WMS
+    unknown_products: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> int:
+        return self.created + self.updated + self.deactivated
+
+
+def sync_barcodes(*, dry_run: bool = False, fetch_size: int = DEFAULT_FETCH_SIZE) -> BarcodeSyncResult:
+    """Doprowadza kody z Subiektu w ``ProductCode`` do stanu z Subiekta."""
+
+    result = BarcodeSyncResult()
+    wanted = _wanted_codes(result, fetch_size)
+
+    existing = {
+        code: (pk, product_id, description, code_type, is_active)
+        for pk, code, product_id, description, code_type, is_active in ProductCode.objects.values_list(
+            'pk', 'code', 'product_id', 'description', 'code_type', 'is_active'
+        ).iterator()
+    }
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for code, (product_id, description) in wanted.items():
+        current = existing.pop(code, None)
+        if current is None:
+            to_create.append(ProductCode(
+                product_id=product_id,
+                code=code,
+                code_type=CODE_TYPE,
+                description=description,
+            ))
+            continue
+        pk, current_product_id, current_description, current_type, is_active = current
+        if current_description not in SUBIEKT_DESCRIPTIONS:
+            # Kod dodany ręcznie - zostawiamy bez zmian
+            if current_product_id != product_id:
+                result.errors.append(f'Kod {code}: w WMS przypisany ręcznie do innego produktu')
+            else:
+                result.unchanged += 1
+            continue
+        if (current_product_id, current_description, current_type, is_active) == (product_id, description, CODE_TYPE, True):
+            result.unchanged += 1
+            continue
+        to_update.append(ProductCode(
+            pk=pk,
+            product_id=product_id,
+            code=code,
+            code_type=CODE_TYPE,
+            description=description,
+            is_active=True,
+            # bulk_update nie ustawia auto_now
+            updated_at=now,
+        ))
+        result.updated += 1
+
+    # Kody z Subiektu, których w Subiekcie już nie ma
+    for code, (pk, product_id, description, code_type, is_active) in existing.items():
+        if is_active and description in SUBIEKT_DESCRIPTIONS:
+            to_update.append(ProductCode(
+                pk=pk,
+                product_id=product_id,
+                code=code,
+                code_type=code_type,
+                description=description,
+                is_active=False,
+                updated_at=now,
+            ))
+            result.deactivated += 1
+
+    with transaction.atomic():
+        ProductCode.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        ProductCode.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+        result.created = len(to_create)
+        if dry_run:
+            transaction.set_rollback(True)
+        elif result.changed:
+            from .order_candidates import bump_codes_version
+            transaction.on_commit(bump_codes_version)
+            fragment_cache.invalidate_rows('productcode')
+    return result
+
+
+def _wanted_codes(result: BarcodeSyncResult, fetch_size: int) -> Dict[str, Tuple[int, str]]:
+    """Kod -> (id produktu WMS, opis) dla wszystkich kodów z Subiekta."""
+
+    from subiekt.models import tw_Towar
+
+    products = dict(Product.objects.filter(subiekt_id__isnull=False).values_list('subiekt_id', 'pk'))
+    # kod -> (priorytet źródła, tw_Id, źródło)
+    best: Dict[str, Tuple[int, int, str]] = {}
+    unknown = set()
+
+    def offer(subiekt_id: int, source: str, code: str) -> None:
+        candidate = (SOURCE_PRIORITY.index(source), subiekt_id, source)
+        current = best.get(code)
+        if current is not None and current[1] != subiekt_id:
+            first, second = sorted((current[1], subiekt_id))
+            result.errors.append(f'Kod {code}: ma go kilka towarów w Subiekcie (tw_Id {first} i {second})')
+        if current is None or candidate < current:
+            best[code] = candidate
+
+    for subiekt_id in products:
+        offer(subiekt_id, 'id', str(subiekt_id))
+
+    for subiekt_id, source, code in tw_Towar.subiekt_objects.iter_product_codes(fetch_size):
+        result.rows += 1
+        code = (code or '').strip()
+        if not code or source not in SOURCE_DESCRIPTIONS:
+            continue
+        if subiekt_id not in products:
+            unknown.add(subiekt_id)
+            continue
+        if len(code) > CODE_MAX_LENGTH:
+            result.errors.append(f'Kod {code[:20]}...: dłuższy niż {CODE_MAX_LENGTH} znaków (tw_Id {subiekt_id})')
+            continue
+        offer(subiekt_id, source, code)
+
+    result.unknown_products = len(unknown)
+    return {
+        code: (products[subiekt_id], SOURCE_DESCRIPTIONS[source])
+        for code, (_, subiekt_id, source) in best.items()
+    }
@@ -0,0 +1,123 @@
+"""
+Budowanie dokumentów magazynowych PZ, WZ i MM z zakończonych operacji.
+
+- PZ - z pozycji Regalacji z przyjętą ilością,
+- WZ - z pobranych pozycji Terminacji,
+- MM - z ruchów typu ``transfer`` (przesunięcia między lokalizacjami).
+
+Pozycje są sumowane po (produkt, lokalizacja źródłowa, lokalizacja) i
+zapisywane jednym ``bulk_create``; numer dokumentu przydziela
+``wms.numbering`` w tej samej transakcji. Pozycje bez lokalizacji trafiają
+do lokalizacji domyślnej, a gdy jej nie ma - są pomijane.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DocumentItem, Location, WarehouseDocument
+from .numbering import SEQUENCE_MM, SEQUENCE_PZ, SEQUENCE_WZ, allocate_number
+
+# (id produktu, id lokalizacji źródłowej, id lokalizacji) -> ilość
+DocumentLines = Dict[Tuple[int, Optional[int], int], Decimal]
+
+DOCUMENT_SEQUENCES = {
+    'PZ': SEQUENCE_PZ,
+    'WZ': SEQUENCE_WZ,
+    'MM': SEQUENCE_MM,
+}
+
+
+def _aggregate(rows: Iterable[Tuple[int, Optional[int], Optional[int], Decimal]]) -> DocumentLines:
+    lines: DocumentLines = defaultdict(Decimal)
+    default_location_id = None
+    default_checked = False
+    for product_id, source_id, location_id, quantity in rows:
+        if not quantity or quantity <= 0:
+            continue
+        if location_id is None:
+            if not default_checked:
+                default_location_id = Location.objects.filter(is_default=True).values_list('id', flat=True).first()
+                default_checked = True
+            location_id = default_location_id
+            if location_id is None:
+                continue
+        lines[(product_id, source_id, location_id)] += quantity
+    return lines
+
+
+@transaction.atomic
+def create_document(document_type: str, lines: DocumentLines, *, ref: str = '', **fields) -> Optional[WarehouseDocument]:
+    """Tworzy dokument z zsumowanymi pozycjami (bez pozycji - nic nie tworzy)."""
+
+    if not lines:
+        return None
+    document = WarehouseDocument.objects.create(
+        document_number=allocate_number(DOCUMENT_SEQUENCES[document_type], ref=ref),
+        document_type=document_type,
+        document_date=timezone.localdate(),
+        status='completed',
+        **fields,
+    )
+    DocumentItem.objects.bulk_create(
+        [
+            DocumentItem(
+                document=document,
+                product_id=product_id,
+                source_location_id=source_id,
+                location_id=location_id,
+                quantity=quantity,
+            )
+            for (product_id, source_id, location_id), quantity in lines.items()
+        ],
+        batch_size=500,
+    )
+    return document
+
+
+def build_pz_document(receiving_order) -> Optional[WarehouseDocument]:
+    """PZ z pozycji Regalacji z przyjętą ilością."""
+
+    supplier_order = receiving_order.supplier_order
+    rows = receiving_order.items.filter(quantity_received__gt=0).values_list(
+        'product_id', 'location_id', 'quantity_received',
+    )
+    return create_document(
+        'PZ',
+        _aggregate((product_id, None, location_id, quantity) for product_id, location_id, quantity in rows),
+        ref=supplier_order.order_number,
+        supplier_order=supplier_order,
+        notes=f'Utworzone automatycznie z Regalacji {receiving_order.order_number}',
+    )
+
+
+def build_wz_document(picking_order) -> Optional[WarehouseDocument]:
+    """WZ z pobranych pozycji Terminacji."""
+
+    customer_order = picking_order.customer_order
+    rows = picking_order.items.filter(quantity_picked__gt=0).values_list(
+        'product_id', 'location_id', 'quantity_picked',
+    )
+    return create_document(
+        'WZ',
+        _aggregate((product_id, None, location_id, quantity) for product_id, location_id, quantity in rows),
+        ref=customer_order.order_number,
+        customer_order=customer_order,
+        notes=f'Utworzone automatycznie z Terminacji {picking_order.order_number}',
+    )
+
+
+def build_mm_document(movements, *, notes: str = '') -> Optional[WarehouseDocument]:
+    """MM z ruchów typu ``transfer`` (lista instancji lub queryset)."""
+
+    rows = [
+        (movement.product_id, movement.source_location_id, movement.target_location_id, movement.quantity)
+        for movement in movements
+        if movement.movement_type == 'transfer' and movement.source_location_id
+    ]
+    return create_document('MM', _aggregate(rows), notes=notes)
@@ -0,0 +1,200 @@
+"""
+Eksport dokumentów magazynowych do formatu EDI++ (EPP) Subiekta GT.
+
+Plik składa się z sekcji ``[INFO]`` oraz par ``[NAGLOWEK]``/``[ZAWARTOSC]``
+dla każdego dokumentu: pola rozdzielone przecinkami, teksty w cudzysłowach,
+kwoty z kropką, daty jako ``rrrrmmddggmmss``, kodowanie Windows-1250 i
+końce linii CRLF. Towar identyfikowany jest symbolem (``Product.code`` =
+``tw_Symbol``).
+
+Dokumenty są czytane partiami (``iterator`` z prefetchem pozycji) i
+zapisywane do strumienia w jednym przebiegu, więc dzienny plik nie wymaga
+trzymania wszystkich dokumentów w pamięci.
+
+WMS nie zna cen - pola cen i wartości są zerowe, Subiekt wycenia dokumenty
+przy imporcie. MM nie jest eksportowany domyślnie: przesunięcia między
+lokalizacjami odbywają się w obrębie jednego magazynu Subiekta.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Iterable, List, Optional, TextIO
+
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+from django.utils import timezone
+
+from .models import DocumentItem, WarehouseDocument
+
+EPP_VERSION = '1.05'
+EPP_ENCODING = 'cp1250'
+EPP_CODE_PAGE = 1250
+EPP_NEWLINE = '\r\n'
+DEFAULT_EXPORT_TYPES = ('PZ', 'WZ')
+EXPORT_CHUNK_SIZE = 200
+
+
+def _text(value) -> str:
+    value = '' if value is None else str(value)
+    return '"' + value.replace('"', '""').replace('\r', ' ').replace('\n', ' ') + '"'
+
+
+def _amount(value) -> str:
+    return f'{Decimal(value or 0):.4f}'
+
+
+def _timestamp(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+    else:
+        value = datetime.combine(value, time.min)
+    return value.strftime('%Y%m%d%H%M%S')
+
+
+def _line(*fields) -> str:
+    return ','.join('' if field is None else str(field) for field in fields) + EPP_NEWLINE
+
+
+def _info_line(date_from: date, date_to: date) -> str:
+    sender = getattr(settings, 'WMS_EPP_SENDER_NAME', 'Regalator')
+    warehouse_symbol = getattr(settings, 'WMS_EPP_WAREHOUSE_SYMBOL', 'MAG')
+    return _line(
+        _text(EPP_VERSION),
+        3,                              # cel komunikacji
+        EPP_CODE_PAGE,
+        _text(sender),                  # program wysyłający
+        _text(sender[:20]),             # nadawca - symbol
+        _text(sender),                  # nadawca - nazwa skrócona
+        _text(sender),                  # nadawca - nazwa pełna
+        _text(''), _text(''), _text(''), _text(''),  # miasto, kod, ulica, NIP
+        _text(warehouse_symbol),
+        _text(''), _text(''), _text(''),  # nazwa, opis, analityka magazynu
+        1,                              # plik obejmuje okres
+        _timestamp(date_from),
+        _timestamp(date_to),
+        _text(''),                      # osoba
+        _timestamp(timezone.now()),
+        _text('Polska'), _text('PL'), _text(''), 0,
+    )
+
+
+def _counterparty(document: WarehouseDocument):
+    """(symbol, nazwa, adres) kontrahenta dokumentu."""
+
+    if document.supplier_order_id:
+        order = document.supplier_order
+        return order.supplier_code, order.supplier_name, ''
+    if document.customer_order_id:
+        order = document.customer_order
+        return '', order.customer_name, order.customer_address
+    return '', '', ''
+
+
+def _header_line(document: WarehouseDocument, item_count: int) -> str:
+    symbol, name, address = _counterparty(document)
+    issued = _timestamp(document.document_date)
+    reference = ''
+    if document.supplier_order_id:
+        reference = document.supplier_order.order_number
+    elif document.customer_order_id:
+        reference = document.customer_order.order_number
+    target_warehouse = getattr(settings, 'WMS_EPP_WAREHOUSE_SYMBOL', 'MAG') if document.document_type == 'MM' else ''
+    return _line(
+        _text(document.document_type),
+        1,                              # status: wykonany
+        0,                              # status fiskalny
+        document.id,                    # numer dokumentu
+        _text(''),                      # numer dokumentu dostawcy
+        _text(''),                      # rozszerzenie numeru
+        _text(document.document_number),
+        _text(''), '',                  # dokument korygowany, data korekty
+        _text(reference),               # numer zamówienia
+        _text(target_warehouse),
+        _text(symbol),
+        _text(name[:50]),
+        _text(name),
+        _text(''), _text(''), _text(address),  # miasto, kod, ulica
+        _text(''),                      # NIP
+        _text(''), _text(''),           # kategoria, podtytuł
+        _text(''),                      # miejsce wystawienia
+        issued, issued, issued,         # wystawienie, sprzedaż/wydanie, otrzymanie
+        item_count,
+        1,                              # wg cen netto
+        _text(''),                      # aktywna cena
+        _amount(0), _amount(0), _amount(0), _amount(0),  # netto, VAT, brutto, koszt
+        _text(''), _amount(0),          # rabat
+        _text(''), '',                  # forma i termin płatności
+        _amount(0), _amount(0), 0, 0, 1,  # zapłacono, do zapłaty, zaokrąglenia, przeliczanie VAT
+        0,                              # statusy specjalne
+        _text(''), _text(''),           # wystawił, odebrał
+        _text(''),                      # podstawa wydania
+        _amount(0), _amount(0),         # opakowania
+        _text('PLN'), _amount(1),
+        _text(document.notes),
+        _text(''), _text(''), _text(''),  # komentarz, podtytuł, nieużywane
+        0, 0, 0,                        # import, eksport, rodzaj transakcji
+        _text(''), _amount(0), _text(''), _amount(0),  # płatność kartą i kredytowa
+        _text('Polska'), _text('PL'), 0,
+    )
+
+
+def _item_line(position: int, item: DocumentItem) -> str:
+    quantity = _amount(item.quantity)
+    return _line(
+        position,
+        1,                              # typ: towar
+        _text(item.product.code),
+        0, 0, 0, 0, _amount(0),         # rabaty
+        _text(item.product.unit),
+        quantity, quantity,             # ilość w j.m. i w j. magazynowej
+        _amount(0), _amount(0), _amount(0),  # ceny: magazynowa, netto, brutto
+        _amount(0),                     # stawka VAT
+        _amount(0), _amount(0), _amount(0), _amount(0),  # wartości i koszt
+        _text(''), _text(''),
+    )
+
+
+def exportable_documents(day: date, *, types: Iterable[str] = DEFAULT_EXPORT_TYPES,
+                         include_exported: bool = False) -> QuerySet:
+    documents = WarehouseDocument.objects.filter(
+        document_date=day, document_type__in=list(types), status='completed',
+    )
+    if not include_exported:
+        documents = documents.filter(exported_at__isnull=True)
+    return documents
+
+
+def write_epp(documents: QuerySet, stream: TextIO, *, date_from: Optional[date] = None,
+              date_to: Optional[date] = None) -> List[int]:
+    """Zapisuje dokumenty do strumienia tekstowego w jednym przebiegu; zwraca ich id."""
+
+    today = timezone.localdate()
+    stream.write('[INFO]' + EPP_NEWLINE)
+    stream.write(_info_line(date_from or today, date_to or date_from or today))
+
+    items = Prefetch(
+        'items', queryset=DocumentItem.objects.select_related('product').order_by('id'),
+    )
+    documents = (
+        documents.select_related('supplier_order', 'customer_order')
+        .prefetch_related(items)
+        .order_by('document_date', 'id')
+    )
+    exported_ids = []
+    for document in documents.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        document_items = list(document.items.all())
+        stream.write(EPP_NEWLINE + '[NAGLOWEK]' + EPP_NEWLINE)
+        stream.write(_header_line(document, len(document_items)))
+        stream.write(EPP_NEWLINE + '[ZAWARTOSC]' + EPP_NEWLINE)
+        for position, item in enumerate(document_items, start=1):
+            stream.write(_item_line(position, item))
+        exported_ids.append(document.id)
+    return exported_ids
+
+
+def mark_exported(document_ids: Iterable[int]) -> int:
+    return WarehouseDocument.objects.filter(id__in=list(document_ids)).update(exported_at=timezone.now())
@@ -0,0 +1,436 @@
+"""
+Eksport list (stany, ruchy, produkty, zamówienia, uzgodnienia) do CSV i XLSX.
+
+Filtry są wspólne z widokami list (``filter_*``), więc eksport zwraca
+dokładnie to, co użytkownik widzi na ekranie - tylko bez paginacji.
+
+Wiersze są czytane przez ``values_list(...).iterator(chunk_size=...)`` (bez
+instancji modeli i cache querysetu) i od razu zapisywane:
+
+- CSV jest wysyłany wiersz po wierszu,
+- XLSX powstaje w trybie write-only openpyxl w pliku tymczasowym, który jest
+  następnie wysyłany porcjami.
+
+W obu przypadkach zużycie pamięci nie zależy od liczby wierszy.
+"""
+
+from __future__ import annotations
+
+import csv
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from django.db.models import CharField, DecimalField, F, Func, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Abs, Cast, Coalesce
+from django.utils import timezone
+
+from .models import CustomerOrder, Location, Product, Stock, StockMovement, StockReconciliationLine
+
+ITERATOR_CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+
+CSV = 'csv'
+XLSX = 'xlsx'
+FORMATS = {
+    CSV: 'text/csv; charset=utf-8',
+    XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# --- Filtry list -------------------------------------------------------------
+
+def location_descendant_ids(location_id) -> List[int]:
+    """Lokalizacja i wszystkie jej dzieci (jedno zapytanie na poziom drzewa)."""
+
+    ids = [int(location_id)]
+    level = ids
+    while level:
+        level = list(Location.objects.filter(parent_id__in=level).values_list('id', flat=True))
+        ids.extend(level)
+    return ids
+
+
+def filter_stocks(params: Mapping[str, str], *, product_id=None, location_id=None) -> QuerySet:
+    """Stany z filtrami ``stock_list`` (search, location, product, product_id, location_id, subiekt_id)."""
+
+    search_query = params.get('search', '')
+    location_filter = params.get('location', '')
+    product_filter = params.get('product', '')
+    product_id = product_id or params.get('product_id', '')
+    location_id = location_id or params.get('location_id', '')
+    subiekt_id_filter = params.get('subiekt_id', '')
+
+    stocks = Stock.objects.filter(quantity__gt=0)
+
+    if search_query:
+        stocks = stocks.filter(
+            Q(product__code__icontains=search_query) |
+            Q(product__name__icontains=search_query) |
+            Q(location__barcode__icontains=search_query) |
+            Q(product__codes__code__icontains=search_query)
+        ).distinct()
+
+    # location_id z URL ma pierwszeństwo przed filtrem nazwy (włącznie z dziećmi)
+    if location_id:
+        try:
+            stocks = stocks.filter(location__id__in=location_descendant_ids(location_id))
+        except (TypeError, ValueError):
+            stocks = stocks.none()
+    elif location_filter:
+        stocks = stocks.filter(location__name__icontains=location_filter)
+
+    if product_filter:
+        stocks = stocks.filter(product__code=product_filter)
+
+    if product_id:
+        try:
+            stocks = stocks.filter(product__id=int(product_id))
+        except (TypeError, ValueError):
+            stocks = stocks.none()
+
+    if subiekt_id_filter:
+        stocks = stocks.filter(
+            Q(product__subiekt_id=subiekt_id_filter) |
+            Q(product__parent__subiekt_id=subiekt_id_filter)
+        )
+
+    return stocks.order_by('location__barcode', 'product__name')
+
+
+def filter_movements(params: Mapping[str, str]) -> QuerySet:
+    """Ruchy z filtrami ``movement_list`` (product, location, movement_type)."""
+
+    movements = StockMovement.objects.order_by('-created_at')
+
+    product_query = params.get('product')
+    location_query = params.get('location')
+    movement_type = params.get('movement_type')
+
+    if product_query:
+        movements = movements.filter(
+            Q(product__name__icontains=product_query) |
+            Q(product__code__icontains=product_query) |
+            Q(product__subiekt_id__icontains=product_query)
+        )
+
+    if location_query:
+        movements = movements.filter(
+            Q(source_location__name__icontains=location_query) |
+            Q(target_location__name__icontains=location_query)
+        )
+
+    if movement_type:
+        movements = movements.filter(movement_type=movement_type)
+
+    return movements
+
+
+def filter_orders(params: Mapping[str, str]) -> QuerySet:
+    """Zamówienia klientów z filtrami ``order_list`` (status, search, assigned)."""
+
+    status_filter = params.get('status', '')
+    search_query = params.get('search', '')
+    assigned_filter = params.get('assigned', '')
+
+    orders = CustomerOrder.objects.all()
+
+    if status_filter:
+        orders = orders.filter(status=status_filter)
+
+    if search_query:
+        orders = orders.filter(
+            Q(order_number__icontains=search_query) |
+            Q(customer_name__icontains=search_query)
+        )
+
+    if assigned_filter:
+        if assigned_filter == 'unassigned':
+            orders = orders.filter(pickingorder__assigned_to__isnull=True)
+        else:
+            try:
+                assigned_user_id = int(assigned_filter)
+            except (TypeError, ValueError):
+                assigned_user_id = None
+            if assigned_user_id:
+                orders = orders.filter(pickingorder__assigned_to_id=assigned_user_id)
+
+    return orders.order_by('-created_at')
+
+
+def filter_products(params: Mapping[str, str]) -> Tuple[QuerySet, List[str]]:
+    """
+    Produkty z filtrami ``product_list`` (search, group, subiekt).
+
+    Zwraca queryset i listę komunikatów o nieprawidłowych filtrach.
+    """
+
+    search_query = params.get('search', '')
+    group_filter = params.get('group_id', '') or params.get('group', '')
+    subiekt_filter = params.get('subiekt', '')
+    errors = []
+
+    products = Product.objects.all()
+
+    if search_query:
+        products = products.annotate(
+            subiekt_id_str=Cast('subiekt_id', CharField())
+        ).filter(
+            Q(code__icontains=search_query) |
+            Q(name__icontains=search_query) |
+            Q(codes__code__icontains=search_query) |
+            Q(variants__icontains=search_query) |
+            Q(subiekt_id_str__icontains=search_query)
+        ).distinct()
+
+    if group_filter:
+        if group_filter == 'no_group':
+            products = products.filter(groups__isnull=True)
+        else:
+            try:
+                products = products.filter(groups__id=int(group_filter))
+            except (ValueError, TypeError):
+                products = products.filter(groups__id__icontains=group_filter)
+                errors.append(f'Nieprawidłowy identyfikator grupy: "{group_filter}"')
+
+    if subiekt_filter:
+        if subiekt_filter == 'has_subiekt':
+            products = products.filter(subiekt_id__isnull=False)
+        elif subiekt_filter == 'no_subiekt':
+            products = products.filter(subiekt_id__isnull=True)
+        else:
+            try:
+                products = products.filter(subiekt_id=int(subiekt_filter))
+            except ValueError:
+                products = products.filter(subiekt_id__icontains=subiekt_filter)
+                errors.append(f'Nieprawidłowy identyfikator PLU Subiekt: "{subiekt_filter}"')
+
+    return products, errors
+
+
+def annotate_wms_stock(products: QuerySet) -> QuerySet:
+    """Dodaje ``wms_stock`` - stan WMS produktu razem z wariantami (jak ``Product.total_stock``)."""
+
+    total = (
+        Stock.objects.filter(Q(product_id=OuterRef('pk')) | Q(product__parent_id=OuterRef('pk')))
+        .order_by()
+        .values(total=Func(F('quantity'), function='SUM'))
+    )
+    quantity_field = DecimalField(max_digits=12, decimal_places=2)
+    return products.annotate(
+        wms_stock=Cast(Coalesce(Subquery(total), Value(Decimal('0'))), quantity_field)
+    )
+
+
+def filter_products_for_export(params: Mapping[str, str]) -> QuerySet:
+    """Filtry ``product_list`` łącznie ze statusem synchronizacji liczonym w bazie."""
+
+    products, _ = filter_products(params)
+    products = annotate_wms_stock(products)
+    sync_filter = params.get('sync', '')
+    if sync_filter in ('needs_sync', 'synced'):
+        products = products.filter(subiekt_id__isnull=False).annotate(
+            stock_difference=Abs(F('wms_stock') - F('subiekt_stock'))
+        )
+        if sync_filter == 'needs_sync':
+            products = products.filter(stock_difference__gt=Decimal('0.01'))
+        else:
+            products = products.filter(stock_difference__lte=Decimal('0.01'))
+    return products.order_by('name')
+
+
+def filter_reconciliation_lines(params: Mapping[str, str]) -> QuerySet:
+    """Pozycje raportu uzgodnienia (report, status, search)."""
+
+    try:
+        report_id = int(params.get('report', ''))
+    except (TypeError, ValueError):
+        return StockReconciliationLine.objects.none()
+
+    lines = StockReconciliationLine.objects.filter(reconciliation_id=report_id)
+
+    status_filter = params.get('status', '')
+    if status_filter:
+        lines = lines.filter(status=status_filter)
+
+    search_query = params.get('search', '')
+    if search_query:
+        search = Q(code__icontains=search_query) | Q(name__icontains=search_query)
+        if search_query.isdigit():
+            search |= Q(subiekt_id=int(search_query))
+        lines = lines.filter(search)
+
+    return lines.order_by('status', 'code', 'subiekt_id')
+
+
+# --- Definicje eksportów -----------------------------------------------------
+
+@dataclass(frozen=True)
+class ExportColumn:
+    header: str
+    field: str
+    choices: Optional[Mapping[str, str]] = None
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    name: str
+    title: str
+    columns: Tuple[ExportColumn, ...]
+    queryset: Callable[[Mapping[str, str]], QuerySet]
+
+    def rows(self, params: Mapping[str, str], *, chunk_size: int = ITERATOR_CHUNK_SIZE) -> Iterator[tuple]:
+        fields = [column.field for column in self.columns]
+        choices = [(index, column.choices) for index, column in enumerate(self.columns) if column.choices]
+        values = self.queryset(params).values_list(*fields).iterator(chunk_size=chunk_size)
+        for row in values:
+            if choices:
+                row = list(row)
+                for index, labels in choices:
+                    row[index] = labels.get(row[index], row[index])
+            yield row
+
+    def filename(self, export_format: str) -> str:
+        return f'{self.name}_{timezone.localtime():%Y%m%d_%H%M}.{export_format}'
+
+
+DATASETS: Dict[str, ExportDataset] = {
+    'stock': ExportDataset(
+        name='stany',
+        title='Stany magazynowe',
+        columns=(
+            ExportColumn('Lokalizacja', 'location__barcode'),
+            ExportColumn('Nazwa lokalizacji', 'location__name'),
+            ExportColumn('Kod produktu', 'product__code'),
+            ExportColumn('Nazwa produktu', 'product__name'),
+            ExportColumn('PLU Subiekt', 'product__subiekt_id'),
+            ExportColumn('Ilość', 'quantity'),
+            ExportColumn('Zarezerwowano', 'reserved_quantity'),
+            ExportColumn('Jednostka', 'product__unit'),
+            ExportColumn('Aktualizacja', 'updated_at'),
+        ),
+        queryset=filter_stocks,
+    ),
+    'movements': ExportDataset(
+        name='ruchy',
+        title='Ruchy magazynowe',
+        columns=(
+            ExportColumn('Data', 'created_at'),
+            ExportColumn('Typ', 'movement_type', dict(StockMovement.MOVEMENT_TYPES)),
+            ExportColumn('Kod produktu', 'product__code'),
+            ExportColumn('Nazwa produktu', 'product__name'),
+            ExportColumn('Ilość', 'quantity'),
+            ExportColumn('Z lokalizacji', 'source_location__name'),
+            ExportColumn('Do lokalizacji', 'target_location__name'),
+            ExportColumn('Wykonał', 'performed_by__username'),
+            ExportColumn('Notatka', 'note'),
+        ),
+        queryset=filter_movements,
+    ),
+    'products': ExportDataset(
+        name='produkty',
+        title='Produkty',
+        columns=(
+            ExportColumn('Kod produktu', 'code'),
+            ExportColumn('Nazwa', 'name'),
+            ExportColumn('Jednostka', 'unit'),
+            ExportColumn('PLU Subiekt', 'subiekt_id'),
+            ExportColumn('Stan WMS', 'wms_stock'),
+            ExportColumn('Stan Subiekt', 'subiekt_stock'),
+            ExportColumn('Zarezerwowano w Subiekcie', 'subiekt_stock_reserved'),
+            ExportColumn('Produkt nadrzędny', 'parent__code'),
+            ExportColumn('Ostatnia synchronizacja', 'last_sync_date'),
+        ),
+        queryset=filter_products_for_export,
+    ),
+    'orders': ExportDataset(
+        name='zamowienia',
+        title='Zamówienia klientów',
+        columns=(
+            ExportColumn('Numer', 'order_number'),
+            ExportColumn('Klient', 'customer_name'),
+            ExportColumn('Data zamówienia', 'order_date'),
+            ExportColumn('Status', 'status', dict(CustomerOrder.ORDER_STATUS)),
+            ExportColumn('Wartość', 'total_value'),
+            ExportColumn('Uwagi', 'notes'),
+            ExportColumn('Utworzono', 'created_at'),
+        ),
+        queryset=filter_orders,
+    ),
+    'reconciliation': ExportDataset(
+        name='uzgodnienie_stanow',
+        title='Uzgodnienie stanów',
+        columns=(
+            ExportColumn('Status', 'status', dict(StockReconciliationLine.STATUS_CHOICES)),
+            ExportColumn('Kod produktu', 'code'),
+            ExportColumn('Nazwa produktu', 'name'),
+            ExportColumn('PLU Subiekt', 'subiekt_id'),
+            ExportColumn('Stan WMS', 'wms_quantity'),
+            ExportColumn('Stan Subiekt', 'subiekt_quantity'),
+            ExportColumn('Zarezerwowano w Subiekcie', 'subiekt_reserved'),
+            ExportColumn('Różnica', 'difference'),
+        ),
+        queryset=filter_reconciliation_lines,
+    ),
+}
+
+
+# --- Zapis -------------------------------------------------------------------
+
+def _local(value):
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        # Arkusz nie obsługuje stref czasowych - czas lokalny magazynu
+        return timezone.make_naive(timezone.localtime(value))
+    return value
+
+
+def _csv_value(value):
+    value = _local(value)
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, Decimal):
+        # Excel z polskimi ustawieniami regionalnymi (separator ;)
+        return str(value).replace('.', ',')
+    return value
+
+
+class _Echo:
+    """Bufor dla csv.writer, który zwraca zapisany wiersz zamiast go przechowywać."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    writer = csv.writer(_Echo(), delimiter=';')
+    yield '\ufeff'.encode('utf-8') + writer.writerow(header).encode('utf-8')
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row]).encode('utf-8')
+
+
+def iter_xlsx(header: Sequence[str], rows: Iterable[Sequence], *, title: str = 'Eksport') -> Iterator[bytes]:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append([_local(value) for value in row])
+
+    with tempfile.TemporaryFile() as handle:
+        workbook.save(handle)
+        handle.seek(0)
+        while chunk := handle.read(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+def export_chunks(dataset: ExportDataset, params: Mapping[str, str], export_format: str) -> Iterator[bytes]:
+    header = [column.header for column in dataset.columns]
+    rows = dataset.rows(params)
+    if export_format == XLSX:
+        return iter_xlsx(header, rows, title=dataset.title)
+    return iter_csv(header, rows)
@@ -124,7 +124,7 @@ class LocationEditForm(forms.ModelForm):
     
     class Meta:
         model = Location
-        fields = ['name', 'barcode', 'description', 'is_active']
+        fields = ['name', 'barcode', 'description', 'capacity', 'is_active']
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -141,6 +141,12 @@ class LocationEditForm(forms.ModelForm):
                 'rows': 2,
                 'placeholder': 'Wprowadź opis lokalizacji'
             }),
+            'capacity': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'step': '0.01',
+                'min': '0',
+                'placeholder': 'Bez limitu'
+            }),
             'is_active': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
             }),
@@ -427,13 +433,53 @@ class ProductColorSizeForm(forms.ModelForm):
         return f"{base_code}-{size_part}-{color_part}"
 
 
+class LocationPickerWidget(forms.Widget):
+    """
+    Wybór lokalizacji z wyszukiwaniem po stronie serwera zamiast listy <option>.
+
+    ``value_field`` określa, co trafia do ukrytego pola: ``id`` lokalizacji
+    (pola formularzy) albo jej ``name`` (filtry list działające po nazwie).
+    """
+
+    template_name = 'wms/widgets/location_picker.html'
+
+    def __init__(self, attrs=None, value_field='id', placeholder='Wpisz kod lub nazwę lokalizacji'):
+        super().__init__(attrs)
+        self.value_field = value_field
+        self.placeholder = placeholder
+        self.exclude_ids = []
+
+    def _display_value(self, value):
+        if value in (None, ''):
+            return ''
+        if self.value_field == 'name':
+            return value
+        try:
+            location = Location.objects.filter(pk=value).values('name', 'barcode').first()
+        except (TypeError, ValueError):
+            location = None
+        if not location:
+            return ''
+        return f"{location['name']} ({location['barcode']})"
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget'].update({
+            'display_value': self._display_value(context['widget']['value']),
+            'value_field': self.value_field,
+            'placeholder': self.placeholder,
+            'exclude_ids': self.exclude_ids,
+        })
+        return context
+
+
 class StockTransferForm(forms.Form):
     """Formularz przesunięcia towaru między lokalizacjami"""
 
     target_location = forms.ModelChoiceField(
         queryset=Location.objects.none(),
         label="Lokalizacja docelowa",
-        widget=forms.Select(attrs={'class': 'form-select', 'required': True})
+        widget=LocationPickerWidget()
     )
     quantity = forms.DecimalField(
         max_digits=10,
@@ -455,10 +501,11 @@ class StockTransferForm(forms.Form):
         available_locations = Location.objects.filter(is_active=True)
         if self.stock:
             available_locations = available_locations.exclude(id=self.stock.location_id)
+            self.fields['target_location'].widget.exclude_ids = [self.stock.location_id]
             if not self.initial.get('quantity'):
                 self.initial['quantity'] = self.stock.quantity
 
-        self.fields['target_location'].queryset = available_locations.order_by('name')
+        self.fields['target_location'].queryset = available_locations
 
     def clean_target_location(self):
         target_location = self.cleaned_data['target_location']
@@ -0,0 +1,149 @@
+"""
+Cache fragmentów HTML wierszy list produktów, stanów i lokalizacji.
+
+Klucz wiersza to (nazwa fragmentu, model, pk, ``updated_at``) oraz wersje
+modeli, od których wiersz zależy (kody, zdjęcia, grupy...). Wersja modelu to
+licznik w cache współdzielonym przez procesy, podbijany z sygnałów
+save/delete (oraz z miejsc zapisujących przez ``update()``/``bulk_update``),
+więc policzenie klucza nie wymaga zapytań do bazy - wersje dla całej strony
+pobiera jedno ``get_many``.
+
+Stany zmieniają się przy każdym skanie, dlatego ich wersja jest liczona
+osobno dla każdego produktu (``ROW_OBJECT_DEPENDENCIES``) - skan unieważnia
+tylko wiersze produktu, którego dotyczył.
+
+Użycie w szablonie (``{% load wms_fragments %}``)::
+
+    {% cache_row 'stock-row' stock location_filter %} ... {% endcache_row %}
+
+Dodatkowe argumenty po obiekcie to wartości kontekstu, od których zależy
+treść wiersza (np. filtry w linkach).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+MODEL_VERSION_KEY = 'wms:fragments:{label}:version'
+OBJECT_VERSION_KEY = 'wms:fragments:{label}:{pk}:version'
+DEFAULT_FRAGMENT_TIMEOUT = 24 * 60 * 60
+# Podbij po zmianie znaczników wierszy w szablonach - stare fragmenty przestaną pasować
+ROW_MARKUP_VERSION = 3
+
+# Modele (model_name), od których zależy treść wiersza poza samym obiektem
+ROW_DEPENDENCIES = {
+    'product-row': ('productcode', 'productimage', 'productgroup'),
+    'stock-row': ('product', 'location'),
+    'location-row': ('location', 'locationimage'),
+}
+
+# Wersje per obiekt: wiersz -> (etykieta wersji, atrybut wiersza z id produktu)
+ROW_OBJECT_DEPENDENCIES = {
+    'product-row': (('stock', 'pk'),),
+    # Wiersz stanu pokazuje też różnicę sumy stanów produktu względem Subiekta
+    'stock-row': (('stock', 'product_id'),),
+}
+
+# Modele, których zapis/usunięcie podbija wersję (sygnały w wms.signals)
+VERSIONED_MODELS = frozenset(label for labels in ROW_DEPENDENCIES.values() for label in labels)
+
+
+def fragment_timeout() -> int:
+    """Czas życia fragmentu; 0 wyłącza cache wierszy."""
+
+    return getattr(settings, 'WMS_FRAGMENT_CACHE_TIMEOUT', DEFAULT_FRAGMENT_TIMEOUT)
+
+
+def _versions(keys: Dict[str, object]) -> Dict[object, int]:
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Znacznik czasu, żeby po wypadnięciu klucza nie wrócić do starej wersji
+        now = int(time.time() * 1000)
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return {name: found.get(key, 0) for key, name in keys.items()}
+
+
+def model_versions(labels: Iterable[str]) -> Dict[str, int]:
+    return _versions({MODEL_VERSION_KEY.format(label=label): label for label in labels})
+
+
+def object_versions(label: str, pks: Iterable) -> Dict[object, int]:
+    return _versions({OBJECT_VERSION_KEY.format(label=label, pk=pk): pk for pk in pks})
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def bump_model_version(label: str) -> None:
+    _bump(MODEL_VERSION_KEY.format(label=label))
+
+
+def bump_object_version(label: str, pk) -> None:
+    _bump(OBJECT_VERSION_KEY.format(label=label, pk=pk))
+
+
+def invalidate_rows(label: str) -> None:
+    """Podbija wersję modelu po zatwierdzeniu bieżącej transakcji."""
+
+    transaction.on_commit(lambda: bump_model_version(label))
+
+
+def invalidate_object_rows(label: str, pk) -> None:
+    """Podbija wersję jednego obiektu (np. stanów produktu) po zatwierdzeniu transakcji."""
+
+    if pk is not None:
+        transaction.on_commit(lambda: bump_object_version(label, pk))
+
+
+def invalidate_stock_rows(product) -> None:
+    """
+    Unieważnia wiersze zależne od stanów produktu (obiekt albo id): jego
+    własne i produktu nadrzędnego, którego wiersz pokazuje sumę z wariantami.
+    """
+
+    product_id = getattr(product, 'pk', product)
+    if hasattr(product, 'parent_id'):
+        parent_id = product.parent_id
+    else:
+        from .models import Product
+        parent_id = Product.objects.filter(pk=product_id).values_list('parent_id', flat=True).first()
+    for pk in {product_id, parent_id} - {None}:
+        invalidate_object_rows('stock', pk)
+
+
+def row_object_keys(name: str, obj) -> List[Tuple[str, object]]:
+    """(etykieta, pk) wersji per obiekt, od których zależy wiersz."""
+
+    return [(label, getattr(obj, attribute)) for label, attribute in ROW_OBJECT_DEPENDENCIES.get(name, ())]
+
+
+def row_key(
+    name: str,
+    obj,
+    versions: Dict[str, int],
+    vary_on: Iterable = (),
+    object_versions: Iterable[int] = (),
+) -> str:
+    parts = [
+        ROW_MARKUP_VERSION,
+        obj._meta.label_lower,
+        obj.pk,
+        getattr(obj, 'updated_at', ''),
+        *(versions[label] for label in ROW_DEPENDENCIES.get(name, ())),
+        *object_versions,
+        *vary_on,
+    ]
+    return make_template_fragment_key(f'wms:{name}', parts)
@@ -0,0 +1,107 @@
+"""
+Renderowanie pochodnych obrazów (miniatury, WebP).
+
+Moduł nie importuje modeli Django - funkcje są wywoływane także w procesach
+puli ``ProcessPoolExecutor`` (backfill), więc muszą działać na samych
+bajtach lub ścieżkach plików. Pillow importowany jest dopiero przy pierwszym
+obrazie - moduł ładują modele, więc trafia do startu każdego procesu.
+"""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING, Dict, Mapping, Tuple, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# nazwa rozmiaru -> maksymalna długość dłuższego boku w pikselach
+DEFAULT_SIZES: Mapping[str, int] = {
+    'thumb': 160,
+    'medium': 640,
+    'large': 1600,
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+@dataclass(slots=True)
+class RenderedVariant:
+    content: bytes
+    width: int
+    height: int
+
+
+@dataclass(slots=True)
+class RenderedImage:
+    width: int
+    height: int
+    variants: Dict[str, Dict[str, RenderedVariant]] = field(default_factory=dict)
+
+
+def _open(source: Union[bytes, str, IO[bytes]]) -> Image.Image:
+    from PIL import Image
+
+    if isinstance(source, (bytes, bytearray)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    from PIL import Image
+
+    pil_format, options = FORMATS[image_format]
+    if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif pil_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def read_dimensions(source: Union[bytes, str, IO[bytes]]) -> Tuple[int, int]:
+    """Wymiary obrazu po uwzględnieniu orientacji EXIF (bez dekodowania pikseli)."""
+
+    with _open(source) as image:
+        width, height = image.size
+        orientation = image.getexif().get(0x0112)
+    if orientation in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+
+def render_derivatives(source: Union[bytes, str], sizes: Mapping[str, int] = DEFAULT_SIZES) -> RenderedImage:
+    """Generuje wszystkie rozmiary w formatach WebP i JPEG."""
+
+    from PIL import Image, ImageOps
+
+    with _open(source) as original:
+        # Zdjęcia z telefonów mają orientację zapisaną w EXIF
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    rendered = RenderedImage(width=image.width, height=image.height)
+    # Od największego rozmiaru - kolejne miniatury skalowane z poprzedniej
+    working = image
+    for name, max_edge in sorted(sizes.items(), key=lambda entry: entry[1], reverse=True):
+        working = working.copy()
+        working.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        rendered.variants[name] = {
+            image_format: RenderedVariant(
+                content=_encode(working, image_format),
+                width=working.width,
+                height=working.height,
+            )
+            for image_format in FORMATS
+        }
+    return rendered
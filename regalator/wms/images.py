@@ -0,0 +1,272 @@
+"""
+Pochodne obrazów (miniatury i WebP) dla ``ProductImage``, ``LocationImage``
+i ``Asset``.
+
+Po zapisie nowego pliku generowanie jest zlecane po zatwierdzeniu transakcji
+do wątku w tle, żeby upload nie czekał na skalowanie. Duże partie
+(komenda ``backfill_image_derivatives``) renderowane są w puli procesów, a zapis do
+storage i bazy odbywa się w procesie głównym.
+
+Wynik trafia do pól modelu: wymiary i rozmiar oryginału oraz słownik
+``derivatives`` ze ścieżkami, wymiarami i rozmiarem każdego wariantu.
+Szablony wybierają wariant filtrem ``derivative_url`` (``wms_images``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, models, transaction
+
+from . import fragment_cache
+from .image_processing import DEFAULT_SIZES, EXTENSIONS, RenderedImage, render_derivatives
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff', '.heic')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class DerivativeImageMixin(models.Model):
+    """Pola i pomocnicze metody pochodnych obrazu dla modeli z plikiem."""
+
+    # Nazwa pola pliku, z którego generowane są pochodne
+    derivative_source_field = 'image'
+    # Katalog pochodnych w storage (modele z plikami prywatnymi nadpisują go)
+    derivative_dir = DERIVATIVES_DIR
+
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name="Szerokość")
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name="Wysokość")
+    file_bytes = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Rozmiar pliku (B)")
+    derivatives = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Pochodne obrazu")
+
+    class Meta:
+        abstract = True
+
+    @property
+    def source_file(self):
+        return getattr(self, self.derivative_source_field)
+
+    def has_image_source(self) -> bool:
+        name = self.source_file.name if self.source_file else ''
+        return bool(name) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+    def derivatives_are_current(self) -> bool:
+        if not self.derivatives or self.derivatives.get('source') != self.source_file.name:
+            return False
+        # Pochodne spoza derivative_dir (zapisane przed jego zmianą) generujemy ponownie
+        prefix = f'{self.derivative_dir}/'
+        return all(
+            variant['name'].startswith(prefix)
+            for formats in self.derivatives.get('sizes', {}).values()
+            for variant in formats.values()
+        )
+
+    def derivative(self, size: str, image_format: str = 'webp') -> Optional[dict]:
+        if not self.derivatives_are_current():
+            return None
+        return self.derivatives.get('sizes', {}).get(size, {}).get(image_format)
+
+    def derivative_url(self, size: str, image_format: str = 'webp') -> str:
+        """URL wariantu albo oryginału, jeśli pochodne nie są jeszcze gotowe."""
+
+        variant = self.derivative(size, image_format)
+        if variant:
+            return self.source_file.storage.url(variant['name'])
+        return self.original_url() if self.source_file else ''
+
+    def original_url(self) -> str:
+        return self.source_file.url
+
+
+def derivative_models():
+    """Modele korzystające z pochodnych obrazów."""
+
+    labels = ['wms.ProductImage', 'wms.LocationImage']
+    if apps.is_installed('assets'):
+        labels.append('assets.Asset')
+    return [apps.get_model(label) for label in labels]
+
+
+def _derivative_name(directory: str, source_name: str, size: str, image_format: str) -> str:
+    stem, _ = os.path.splitext(source_name)
+    return f'{directory}/{stem}/{size}.{EXTENSIONS[image_format]}'
+
+
+def delete_derivatives(instance) -> None:
+    storage = instance.source_file.storage
+    for formats in (instance.derivatives or {}).get('sizes', {}).values():
+        for variant in formats.values():
+            if storage.exists(variant['name']):
+                storage.delete(variant['name'])
+
+
+def store_derivatives(instance, rendered: RenderedImage) -> dict:
+    """Zapisuje warianty do storage i aktualizuje pola modelu (bez sygnałów save)."""
+
+    from django.core.files.base import ContentFile
+
+    source = instance.source_file
+    storage = source.storage
+    delete_derivatives(instance)
+
+    sizes = {}
+    for size, formats in rendered.variants.items():
+        sizes[size] = {}
+        for image_format, variant in formats.items():
+            name = _derivative_name(instance.derivative_dir, source.name, size, image_format)
+            if storage.exists(name):
+                storage.delete(name)
+            stored_name = storage.save(name, ContentFile(variant.content))
+            sizes[size][image_format] = {
+                'name': stored_name,
+                'width': variant.width,
+                'height': variant.height,
+                'bytes': len(variant.content),
+            }
+
+    fields = {
+        'width': rendered.width,
+        'height': rendered.height,
+        'file_bytes': source.size,
+        'derivatives': {'source': source.name, 'sizes': sizes},
+    }
+    type(instance).objects.filter(pk=instance.pk).update(**fields)
+    fragment_cache.invalidate_rows(instance._meta.model_name)
+    for field_name, value in fields.items():
+        setattr(instance, field_name, value)
+    return fields['derivatives']
+
+
+def _read_source(instance):
+    source = instance.source_file
+    try:
+        return source.path
+    except NotImplementedError:
+        # Storage bez lokalnych ścieżek (np. S3) - przekazujemy bajty
+        with source.open('rb') as handle:
+            return handle.read()
+
+
+def generate_derivatives(instance) -> Optional[dict]:
+    """Generuje pochodne jednego obiektu w bieżącym procesie."""
+
+    if not instance.has_image_source():
+        return None
+    rendered = render_derivatives(_read_source(instance), getattr(settings, 'WMS_IMAGE_DERIVATIVE_SIZES', DEFAULT_SIZES))
+    return store_derivatives(instance, rendered)
+
+
+def _generate_for_pk(model_label: str, pk) -> None:
+    try:
+        instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+        if instance is not None and not instance.derivatives_are_current():
+            generate_derivatives(instance)
+    except Exception:
+        logger.exception('Nie udało się wygenerować pochodnych dla %s #%s', model_label, pk)
+
+
+def _generate_in_background(model_label: str, pk) -> None:
+    try:
+        _generate_for_pk(model_label, pk)
+    finally:
+        # Wątek roboczy ma własne połączenie z bazą - zamknij je po zadaniu
+        close_old_connections()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'WMS_IMAGE_WORKERS', 2),
+                thread_name_prefix='wms-images',
+            )
+    return _executor
+
+
+def schedule_derivatives(instance) -> None:
+    """Zleca generowanie po zatwierdzeniu transakcji (w tle lub synchronicznie)."""
+
+    if not instance.has_image_source() or instance.derivatives_are_current():
+        return
+
+    model_label = instance._meta.label
+    pk = instance.pk
+
+    def _run():
+        if getattr(settings, 'WMS_IMAGE_DERIVATIVES_ASYNC', True):
+            _get_executor().submit(_generate_in_background, model_label, pk)
+        else:
+            _generate_for_pk(model_label, pk)
+
+    transaction.on_commit(_run)
+
+
+def derivative_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """Pula procesów renderujących dla całego przebiegu backfillu (``None`` gdy ``workers <= 0``)."""
+
+    return ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+
+def backfill_derivatives(
+    instances: Iterable,
+    *,
+    workers: int = 0,
+    force: bool = False,
+    pool: Optional[ProcessPoolExecutor] = None,
+):
+    """
+    Generuje pochodne dla wielu obiektów; renderuje w puli procesów ``pool``
+    (wspólnej dla wielu wywołań) albo - gdy jej nie podano, a ``workers > 0`` -
+    w puli utworzonej na czas wywołania.
+
+    Zwraca krotkę (liczba wygenerowanych, liczba błędów).
+    """
+
+    pending = [
+        instance for instance in instances
+        if instance.has_image_source() and (force or not instance.derivatives_are_current())
+    ]
+    if not pending:
+        return 0, 0
+
+    if pool is not None:
+        return _render_in_pool(pool, pending)
+
+    if workers > 0:
+        with derivative_pool(workers) as own_pool:
+            return _render_in_pool(own_pool, pending)
+
+    done = failed = 0
+    for instance in pending:
+        try:
+            generate_derivatives(instance)
+            done += 1
+        except Exception:
+            logger.exception('Nie udało się wygenerować pochodnych dla %s #%s', instance._meta.label, instance.pk)
+            failed += 1
+    return done, failed
+
+
+def _render_in_pool(pool: ProcessPoolExecutor, pending: list):
+    sizes = dict(getattr(settings, 'WMS_IMAGE_DERIVATIVE_SIZES', DEFAULT_SIZES))
+    done = failed = 0
+    futures = [(instance, pool.submit(render_derivatives, _read_source(instance), sizes)) for instance in pending]
+    for instance, future in futures:
+        try:
+            store_derivatives(instance, future.result())
+            done += 1
+        except Exception:
+            logger.exception('Nie udało się wygenerować pochodnych dla %s #%s', instance._meta.label, instance.pk)
+            failed += 1
+    return done, failed
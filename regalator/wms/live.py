@@ -0,0 +1,401 @@
+"""
+Kanał zdarzeń na żywo (Server-Sent Events) dla dashboardów i ekranów zleceń.
+
+Zmiany statusów i postępu ZK/ZD, Terminacji i Regalacji są zbierane w obrębie
+transakcji i publikowane raz, po ``commit``. Brokerem domyślnie jest kolejka
+w pamięci procesu; po ustawieniu ``WMS_LIVE_BROKER_URL`` (np. ``redis://...``)
+zdarzenia są rozsyłane przez Redis pub/sub pomiędzy wszystkimi procesami.
+
+Podsumowania dashboardów liczone są raz na zmianę i zapisywane w cache po
+``commit`` niezależnie od brokera - widzowie dostają gotowy wynik zamiast
+ponownie uruchamiać zapytania. Krótki czas życia wpisu ogranicza
+nieaktualność po zmianach bez sygnałów (``QuerySet.update``) i w cache
+lokalnym innych workerów.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_KEY = 'wms:live:dashboard:{}'
+DASHBOARD_CACHE_TIMEOUT = 30
+REDIS_CHANNEL = 'wms:live'
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+DASHBOARD_KOMPLETACJA = 'kompletacja'
+DASHBOARD_PRZYJECIA = 'przyjecia'
+
+
+def event_key(event: Dict[str, Any]) -> str:
+    if event.get('id') is None:
+        return event['topic']
+    return f"{event['topic']}:{event['id']}"
+
+
+class Subscription:
+    """Kolejka zdarzeń jednego klienta SSE, związana z pętlą asyncio."""
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        return event['topic'] in self.topics or event_key(event) in self.topics
+
+    def _put(self, event):
+        if self.queue.full():
+            # Wolny klient - najstarsze zdarzenie i tak zostanie nadpisane nowszym stanem
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def push(self, event: Dict[str, Any]) -> None:
+        if self.matches(event):
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Broker w pamięci procesu - wystarcza dla pojedynczego workera ASGI."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Przekazuje zdarzenie lokalnym subskrybentom."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.push(event)
+            except RuntimeError:
+                # Pętla klienta została już zamknięta
+                self.unsubscribe(subscription)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.deliver(event)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Broker oparty o Redis pub/sub (lub kompatybilny serwer).
+
+    Każdy proces uruchamia jeden wątek nasłuchujący kanał i przekazuje
+    zdarzenia do swoich lokalnych subskrybentów.
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._listener: Optional[threading.Thread] = None
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        try:
+            self._client.publish(REDIS_CHANNEL, json.dumps(event))
+        except Exception:
+            logger.exception('Nie udało się opublikować zdarzenia w Redis - dostarczam lokalnie')
+            self.deliver(event)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(topics)
+
+    def _ensure_listener(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name='wms-live-redis', daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(REDIS_CHANNEL)
+        for message in pubsub.listen():
+            try:
+                self.deliver(json.loads(message['data']))
+            except (TypeError, ValueError, KeyError):
+                logger.warning('Pominięto niepoprawne zdarzenie z Redis: %r', message)
+
+
+_broker: Optional[InProcessBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> InProcessBroker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'WMS_LIVE_BROKER_URL', '')
+                if url:
+                    try:
+                        _broker = RedisBroker(url)
+                    except ImportError:
+                        logger.warning('Brak pakietu redis - używam brokera w pamięci procesu')
+                        _broker = InProcessBroker()
+                else:
+                    _broker = InProcessBroker()
+    return _broker
+
+
+# --- Publikacja zmian (raz na transakcję) -----------------------------------
+
+_pending = threading.local()
+
+
+class _PendingBatch:
+    """Zdarzenia zebrane w jednej transakcji, publikowane po ``commit``."""
+
+    def __init__(self):
+        self.builders: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+
+    def __call__(self):
+        builders, self.builders = self.builders, {}
+        broker = get_broker()
+        for builder in builders.values():
+            try:
+                event = builder()
+            except Exception:
+                logger.exception('Nie udało się zbudować zdarzenia live')
+                continue
+            if event is None:
+                continue
+            # Cache zapisujemy tutaj, a nie w brokerze - Redis nie dostarcza lokalnie
+            # bez nasłuchującego wątku (WSGI), a cache musi być świeży zawsze
+            _remember_dashboard(event)
+            broker.publish(event)
+
+
+def _schedule(key: str, builder: Callable[[], Optional[Dict[str, Any]]]) -> None:
+    connection = transaction.get_connection()
+    batch = getattr(_pending, 'batch', None)
+    # Paczka jest aktualna tylko, gdy wciąż czeka w kolejce on_commit tej transakcji
+    # (po rollbacku lub commicie zaczynamy nową)
+    if batch is not None and connection.in_atomic_block and any(
+        entry[1] is batch for entry in connection.run_on_commit
+    ):
+        batch.builders[key] = builder
+        return
+
+    batch = _PendingBatch()
+    batch.builders[key] = builder
+    _pending.batch = batch
+    transaction.on_commit(batch)
+
+
+def notify_customer_order(order_id) -> None:
+    _schedule(f'customer_order:{order_id}', lambda: _customer_order_event(order_id))
+    notify_dashboard(DASHBOARD_KOMPLETACJA)
+
+
+def notify_picking_order(picking_id) -> None:
+    _schedule(f'picking_order:{picking_id}', lambda: _picking_order_event(picking_id))
+    notify_dashboard(DASHBOARD_KOMPLETACJA)
+
+
+def notify_supplier_order(order_id) -> None:
+    _schedule(f'supplier_order:{order_id}', lambda: _supplier_order_event(order_id))
+    notify_dashboard(DASHBOARD_PRZYJECIA)
+
+
+def notify_receiving_order(receiving_id) -> None:
+    _schedule(f'receiving_order:{receiving_id}', lambda: _receiving_order_event(receiving_id))
+    notify_dashboard(DASHBOARD_PRZYJECIA)
+
+
+def notify_dashboard(name: str) -> None:
+    _schedule(f'dashboard.{name}', lambda: _dashboard_event(name))
+
+
+def _progress(done, total) -> int:
+    if not total:
+        return 0
+    return int(done * 100 / total)
+
+
+def _customer_order_event(order_id):
+    from .models import CustomerOrder
+
+    order = CustomerOrder.objects.filter(id=order_id).only('id', 'status').first()
+    if order is None:
+        return None
+    return {
+        'topic': 'customer_order',
+        'id': order.id,
+        'data': {'status': order.status, 'status_display': order.get_status_display()},
+    }
+
+
+def _picking_order_event(picking_id):
+    from .models import PickingOrder
+
+    picking = (
+        PickingOrder.objects.filter(id=picking_id)
+        .annotate(
+            items_total=Count('items'),
+            items_completed=Count('items', filter=Q(items__is_completed=True)),
+        )
+        .first()
+    )
+    if picking is None:
+        return None
+    return {
+        'topic': 'picking_order',
+        'id': picking.id,
+        'data': {
+            'status': picking.status,
+            'status_display': picking.get_status_display(),
+            'customer_order_id': picking.customer_order_id,
+            'items_total': picking.items_total,
+            'items_completed': picking.items_completed,
+            'progress': _progress(picking.items_completed, picking.items_total),
+        },
+    }
+
+
+def _supplier_order_event(order_id):
+    from .models import SupplierOrder
+
+    order = SupplierOrder.objects.filter(id=order_id).only('id', 'status').first()
+    if order is None:
+        return None
+    return {
+        'topic': 'supplier_order',
+        'id': order.id,
+        'data': {'status': order.status, 'status_display': order.get_status_display()},
+    }
+
+
+def _receiving_order_event(receiving_id):
+    from .models import ReceivingOrder
+
+    receiving = (
+        ReceivingOrder.objects.filter(id=receiving_id)
+        .annotate(
+            items_total=Count('items'),
+            items_received=Count('items', filter=Q(items__quantity_received__gt=0)),
+        )
+        .first()
+    )
+    if receiving is None:
+        return None
+    return {
+        'topic': 'receiving_order',
+        'id': receiving.id,
+        'data': {
+            'status': receiving.status,
+            'status_display': receiving.get_status_display(),
+            'supplier_order_id': receiving.supplier_order_id,
+            'items_total': receiving.items_total,
+            'items_received': receiving.items_received,
+            'progress': _progress(receiving.items_received, receiving.items_total),
+        },
+    }
+
+
+def _dashboard_event(name):
+    return {
+        'topic': f'dashboard.{name}',
+        'id': None,
+        'data': compute_dashboard_summary(name),
+    }
+
+
+# --- Podsumowania dashboardów -----------------------------------------------
+
+def compute_dashboard_summary(name: str) -> Dict[str, int]:
+    """Liczniki dashboardu z jednego zapytania grupującego na model."""
+    from .models import CustomerOrder, PickingOrder, ReceivingOrder, SupplierOrder
+
+    if name == DASHBOARD_KOMPLETACJA:
+        by_status = dict(
+            CustomerOrder.objects.values_list('status').annotate(total=Count('id')).order_by()
+        )
+        return {
+            'pending_orders': by_status.get('pending', 0),
+            'created_orders': by_status.get('created', 0),
+            'in_progress_orders': by_status.get('in_progress', 0),
+            'partially_completed_orders': by_status.get('partially_completed', 0),
+            'completed_orders': by_status.get('completed', 0),
+            'active_picking_orders': PickingOrder.objects.filter(status='in_progress').count(),
+        }
+    if name == DASHBOARD_PRZYJECIA:
+        by_status = dict(
+            SupplierOrder.objects.values_list('status').annotate(total=Count('id')).order_by()
+        )
+        return {
+            'pending_supplier_orders': by_status.get('pending', 0),
+            'in_transit_supplier_orders': by_status.get('in_transit', 0),
+            'received_supplier_orders': by_status.get('received', 0),
+            'active_receiving': ReceivingOrder.objects.filter(status='in_progress').count(),
+        }
+    raise ValueError(f'Nieznany dashboard: {name}')
+
+
+def _remember_dashboard(event: Dict[str, Any]) -> None:
+    topic = event.get('topic', '')
+    if topic.startswith('dashboard.'):
+        cache.set(DASHBOARD_CACHE_KEY.format(topic.split('.', 1)[1]), event['data'], DASHBOARD_CACHE_TIMEOUT)
+
+
+def get_dashboard_summary(name: str) -> Dict[str, int]:
+    """Zwraca podsumowanie z cache; liczy je tylko, gdy wygasło."""
+    key = DASHBOARD_CACHE_KEY.format(name)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_dashboard_summary(name)
+        cache.set(key, summary, DASHBOARD_CACHE_TIMEOUT)
+    return summary
+
+
+# --- Strumień SSE ------------------------------------------------------------
+
+def format_sse(event: Dict[str, Any]) -> str:
+    payload = json.dumps({'id': event.get('id'), 'data': event.get('data')})
+    return f"event: {event['topic']}\ndata: {payload}\n\n"
+
+
+async def event_stream(topics: Iterable[str], *, heartbeat: float = HEARTBEAT_SECONDS):
+    broker = get_broker()
+    subscription = broker.subscribe(topics)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            event = await subscription.get(timeout=heartbeat)
+            if event is None:
+                # Komentarz podtrzymujący połączenie (proxy zamykają bezczynne strumienie)
+                yield ': ping\n\n'
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
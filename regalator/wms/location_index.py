@@ -0,0 +1,215 @@
+"""
+Indeks prefiksowy lokalizacji dla autouzupełniania i pickerów.
+
+Aktywne lokalizacje są trzymane w pamięci procesu jako posortowane listy
+kluczy (kod kreskowy, nazwa, kolejne słowa nazwy), więc wyszukiwanie to
+kilka przeszukań binarnych zamiast ``icontains`` po całej tabeli przy każdym
+naciśnięciu klawisza.
+
+Indeks jest unieważniany numerem wersji w cache współdzielonym przez procesy
+(``bump_location_index_version`` wywoływane z sygnałów ``Location``) - każdy
+proces przebudowuje swoją kopię leniwie przy pierwszym zapytaniu po zmianie.
+
+Ranking wyników:
+1. kod kreskowy równy zapytaniu,
+2. kod kreskowy zaczynający się od zapytania,
+3. nazwa zaczynająca się od zapytania,
+4. słowo nazwy zaczynające się od zapytania,
+5. zapytanie występujące w dowolnym miejscu kodu lub nazwy - tylko dla
+   zapytań od ``MIN_SUBSTRING_QUERY_LENGTH`` znaków i gdy żaden kod kreskowy
+   nie jest równy zapytaniu; przegląd kończy się po uzupełnieniu limitu.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from .models import Location
+
+LOCATION_INDEX_VERSION_KEY = 'wms:location_index:version'
+DEFAULT_RESULT_LIMIT = 10
+MIN_SUBSTRING_QUERY_LENGTH = 3
+
+_WORD_SPLIT = re.compile(r'[\s\-_/.,;:]+')
+
+RANK_EXACT_BARCODE = 0
+RANK_BARCODE_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_WORD_PREFIX = 3
+RANK_SUBSTRING = 4
+
+
+@dataclass(slots=True, frozen=True)
+class IndexedLocation:
+    id: int
+    name: str
+    barcode: str
+    location_type: str
+    location_type_display: str
+    # Znormalizowane klucze liczone raz, przy budowie indeksu
+    name_key: str = field(init=False, repr=False, compare=False)
+    barcode_key: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'name_key', _normalize(self.name))
+        object.__setattr__(self, 'barcode_key', _normalize(self.barcode))
+
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or '').strip().casefold()
+
+
+def _prefix_range(keys: List[Tuple[str, int]], prefix: str) -> Iterable[Tuple[str, int]]:
+    start = bisect_left(keys, (prefix, -1))
+    for position in range(start, len(keys)):
+        key = keys[position]
+        if not key[0].startswith(prefix):
+            break
+        yield key
+
+
+class LocationPrefixIndex:
+    """Niezmienny snapshot aktywnych lokalizacji z posortowanymi kluczami."""
+
+    def __init__(self, locations: Iterable[IndexedLocation]):
+        self.locations: Dict[int, IndexedLocation] = {}
+        barcode_keys = []
+        name_keys = []
+        word_keys = []
+        for location in locations:
+            self.locations[location.id] = location
+            barcode = location.barcode_key
+            name = location.name_key
+            if barcode:
+                barcode_keys.append((barcode, location.id))
+            if name:
+                name_keys.append((name, location.id))
+                for word in set(_WORD_SPLIT.split(name)[1:]):
+                    if word:
+                        word_keys.append((word, location.id))
+        self.barcode_keys = sorted(barcode_keys)
+        self.name_keys = sorted(name_keys)
+        self.word_keys = sorted(word_keys)
+        # Kolejność rankingu w obrębie jednego poziomu - przegląd "zawiera" może przerwać po limicie
+        self.ordered_ids = sorted(self.locations, key=self._sort_key)
+
+    def _sort_key(self, location_id: int) -> Tuple[str, str]:
+        location = self.locations[location_id]
+        return location.name_key, location.barcode
+
+    @classmethod
+    def build(cls) -> 'LocationPrefixIndex':
+        type_labels = dict(Location.LOCATION_TYPES)
+        rows = (
+            Location.objects.filter(is_active=True)
+            .values_list('id', 'name', 'barcode', 'location_type')
+            .iterator(chunk_size=2000)
+        )
+        return cls(
+            IndexedLocation(
+                id=location_id,
+                name=name or '',
+                barcode=barcode or '',
+                location_type=location_type or '',
+                location_type_display=type_labels.get(location_type, ''),
+            )
+            for location_id, name, barcode, location_type in rows
+        )
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = DEFAULT_RESULT_LIMIT,
+        allowed_ids: Optional[Iterable[int]] = None,
+        exclude_ids: Iterable[int] = (),
+    ) -> List[IndexedLocation]:
+        prefix = _normalize(query)
+        if not prefix or limit <= 0:
+            return []
+
+        allowed = set(allowed_ids) if allowed_ids is not None else None
+        excluded = set(exclude_ids)
+        ranked: Dict[int, Tuple[int, str, str]] = {}
+
+        def _add(location_id: int, rank: int) -> None:
+            if location_id in excluded or (allowed is not None and location_id not in allowed):
+                return
+            current = ranked.get(location_id)
+            if current is None or rank < current[0]:
+                ranked[location_id] = (rank, *self._sort_key(location_id))
+
+        for barcode, location_id in _prefix_range(self.barcode_keys, prefix):
+            _add(location_id, RANK_EXACT_BARCODE if barcode == prefix else RANK_BARCODE_PREFIX)
+        for _, location_id in _prefix_range(self.name_keys, prefix):
+            _add(location_id, RANK_NAME_PREFIX)
+        for _, location_id in _prefix_range(self.word_keys, prefix):
+            _add(location_id, RANK_WORD_PREFIX)
+
+        exact_hit = any(entry[0] == RANK_EXACT_BARCODE for entry in ranked.values())
+        if len(ranked) < limit and len(prefix) >= MIN_SUBSTRING_QUERY_LENGTH and not exact_hit:
+            # Zachowanie dotychczasowego wyszukiwania "zawiera" jako ostatni poziom rankingu
+            if allowed is None:
+                candidates = self.ordered_ids
+            else:
+                candidates = sorted((location_id for location_id in allowed if location_id in self.locations), key=self._sort_key)
+            for location_id in candidates:
+                if len(ranked) >= limit:
+                    break
+                if location_id in ranked:
+                    continue
+                location = self.locations[location_id]
+                if prefix in location.barcode_key or prefix in location.name_key:
+                    _add(location_id, RANK_SUBSTRING)
+
+        ordered = sorted(ranked.items(), key=lambda entry: entry[1])
+        return [self.locations[location_id] for location_id, _ in ordered[:limit]]
+
+
+_build_lock = threading.Lock()
+_index: Optional[LocationPrefixIndex] = None
+_index_version: Optional[int] = None
+
+
+def _current_version() -> int:
+    version = cache.get(LOCATION_INDEX_VERSION_KEY)
+    if version is None:
+        # Znacznik czasu zamiast 1 - po wypadnięciu klucza z cache wersja
+        # nie może wrócić do wartości, dla której proces ma już stary indeks
+        cache.add(LOCATION_INDEX_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(LOCATION_INDEX_VERSION_KEY)
+    return version
+
+
+def bump_location_index_version() -> None:
+    """Unieważnia indeks we wszystkich procesach (po zmianie lokalizacji)."""
+
+    try:
+        cache.incr(LOCATION_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(LOCATION_INDEX_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def get_location_index() -> LocationPrefixIndex:
+    """Zwraca aktualny indeks, przebudowując go po zmianie wersji."""
+
+    global _index, _index_version
+    version = _current_version()
+    if _index is not None and _index_version == version:
+        return _index
+    with _build_lock:
+        if _index is None or _index_version != version:
+            _index = LocationPrefixIndex.build()
+            _index_version = version
+    return _index
+
+
+def search_locations(query: str, **kwargs) -> List[IndexedLocation]:
+    return get_location_index().search(query, **kwargs)
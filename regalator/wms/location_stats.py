@@ -0,0 +1,116 @@
+"""
+Agregaty statystyk lokalizacji dla map cieplnych.
+
+Ilość towaru i liczba SKU pochodzą z indeksu ``LocationOccupancy``
+(odświeżanego przy zapisie ``Stock``), częstotliwość pobrań - z dziennych
+liczników ``LocationPickDaily`` doliczanych przy każdym skanie kompletacji.
+Odczyt mapy to jedno zapytanie do gotowego agregatu zamiast grupowania
+tabel stanów i historii przy każdym renderze.
+
+Komenda ``rebuild_location_stats`` (uruchamiana okresowo) przelicza oba
+agregaty od zera i usuwa dni starsze niż okres przechowywania.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import LocationOccupancy, LocationPickDaily, PickingHistory
+
+METRIC_QUANTITY = 'quantity'
+METRIC_SKUS = 'skus'
+METRIC_PICKS = 'picks'
+
+METRICS = {
+    METRIC_QUANTITY: 'Ilość towaru',
+    METRIC_SKUS: 'Liczba SKU',
+    METRIC_PICKS: 'Częstotliwość pobrań',
+}
+
+DEFAULT_PICK_DAYS = 30
+PICK_RETENTION_DAYS = 365
+
+
+def _since(days: int):
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def record_pick(location_id, quantity, scanned_at=None) -> None:
+    """Dolicza jedno pobranie do licznika dnia (``UPDATE ... SET x = x + 1``)."""
+
+    if not location_id:
+        return
+    day = timezone.localdate(scanned_at) if scanned_at else timezone.localdate()
+    counters = LocationPickDaily.objects.filter(location_id=location_id, day=day)
+    increment = {'pick_count': F('pick_count') + 1, 'quantity_picked': F('quantity_picked') + quantity}
+    if counters.update(**increment):
+        return
+    try:
+        with transaction.atomic():
+            LocationPickDaily.objects.create(
+                location_id=location_id, day=day, pick_count=1, quantity_picked=quantity,
+            )
+    except IntegrityError:
+        # Wiersz dnia utworzył równoległy zapis - wystarczy do niego doliczyć
+        counters.update(**increment)
+
+
+def forget_pick(location_id, quantity, scanned_at) -> None:
+    """Cofa pobranie usuniętego wpisu historii."""
+
+    if not location_id or not scanned_at:
+        return
+    LocationPickDaily.objects.filter(
+        location_id=location_id, day=timezone.localdate(scanned_at), pick_count__gt=0,
+    ).update(pick_count=F('pick_count') - 1, quantity_picked=F('quantity_picked') - quantity)
+
+
+@transaction.atomic
+def rebuild_pick_rollup(days: int = PICK_RETENTION_DAYS) -> int:
+    """Przelicza dzienne liczniki pobrań z ostatnich ``days`` dni jednym zapytaniem grupującym."""
+
+    start = timezone.make_aware(datetime.combine(_since(days), time.min))
+    rows = (
+        PickingHistory.objects.filter(scanned_at__gte=start, quantity_picked__gt=0)
+        .annotate(day=TruncDate('scanned_at'))
+        .values('location_scanned_id', 'day')
+        .annotate(picks=Count('id'), quantity=Sum('quantity_picked'))
+    )
+    entries = [
+        LocationPickDaily(
+            location_id=row['location_scanned_id'],
+            day=row['day'],
+            pick_count=row['picks'],
+            quantity_picked=row['quantity'] or Decimal('0'),
+        )
+        for row in rows
+    ]
+    LocationPickDaily.objects.all().delete()
+    LocationPickDaily.objects.bulk_create(entries, batch_size=500)
+    return len(entries)
+
+
+def location_metric_values(metric: str, *, days: Optional[int] = None) -> Dict[int, float]:
+    """Wartości metryki dla lokalizacji, które ją mają (brak wpisu oznacza zero)."""
+
+    if metric == METRIC_QUANTITY:
+        rows = LocationOccupancy.objects.values_list('location_id', 'total_quantity')
+    elif metric == METRIC_SKUS:
+        rows = LocationOccupancy.objects.values_list('location_id', 'sku_count')
+    elif metric == METRIC_PICKS:
+        rows = (
+            LocationPickDaily.objects.filter(day__gte=_since(days or DEFAULT_PICK_DAYS))
+            .values('location_id')
+            .annotate(picks=Sum('pick_count'))
+            .values_list('location_id', 'picks')
+        )
+    else:
+        raise ValueError(f'Nieznana metryka: {metric}')
+    return {location_id: float(value) for location_id, value in rows if value}
@@ -0,0 +1,64 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from wms.images import backfill_derivatives, derivative_models, derivative_pool
+
+
+class Command(BaseCommand):
+    help = 'Generuje miniatury i warianty WebP dla istniejących zdjęć produktów, lokalizacji i assetów'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            help='Ogranicz do modelu (np. wms.ProductImage); można podać wielokrotnie',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Liczba procesów renderujących (0 = w bieżącym procesie)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Liczba obiektów przekazywanych do puli jednorazowo',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Generuj ponownie także aktualne pochodne',
+        )
+
+    def handle(self, *args, **options):
+        selected = {label.lower() for label in options['models'] or []}
+        batch_size = max(options['batch_size'], 1)
+        total_done = total_failed = 0
+
+        # Jedna pula procesów na cały przebieg - start workerów nie powtarza się co partię
+        pool = derivative_pool(options['workers'])
+        try:
+            for model in derivative_models():
+                if selected and model._meta.label_lower not in selected:
+                    continue
+
+                ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+                done = failed = 0
+                for start in range(0, len(ids), batch_size):
+                    batch = list(model.objects.filter(pk__in=ids[start:start + batch_size]).order_by('pk'))
+                    batch_done, batch_failed = backfill_derivatives(batch, force=options['force'], pool=pool)
+                    done += batch_done
+                    failed += batch_failed
+
+                self.stdout.write(f'{model._meta.verbose_name_plural}: wygenerowano {done}, błędy {failed}')
+                total_done += done
+                total_failed += failed
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        style = self.style.SUCCESS if not total_failed else self.style.WARNING
+        self.stdout.write(style(f'Zakończono: wygenerowano {total_done}, błędy {total_failed}'))
@@ -0,0 +1,58 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wms import exports
+
+
+class Command(BaseCommand):
+    help = 'Eksportuje stany, ruchy, produkty lub zamówienia do CSV/XLSX (strumieniowo, stała pamięć)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exports.DATASETS), help='Rodzaj eksportu')
+        parser.add_argument(
+            '--format',
+            dest='export_format',
+            choices=sorted(exports.FORMATS),
+            default=exports.CSV,
+            help='Format pliku (domyślnie csv)',
+        )
+        parser.add_argument(
+            '--output',
+            '-o',
+            help='Plik wynikowy (domyślnie nazwa z datą; "-" = standardowe wyjście)',
+        )
+        parser.add_argument(
+            '--filter',
+            action='append',
+            default=[],
+            metavar='KLUCZ=WARTOŚĆ',
+            help='Filtr jak w parametrach listy, np. --filter movement_type=inbound; można podać wielokrotnie',
+        )
+
+    def handle(self, *args, **options):
+        dataset = exports.DATASETS[options['dataset']]
+        export_format = options['export_format']
+
+        params = {}
+        for item in options['filter']:
+            key, separator, value = item.partition('=')
+            if not separator:
+                raise CommandError(f'Nieprawidłowy filtr "{item}" - oczekiwano KLUCZ=WARTOŚĆ')
+            params[key.strip()] = value.strip()
+
+        output = options['output'] or dataset.filename(export_format)
+        chunks = exports.export_chunks(dataset, params, export_format)
+
+        if output == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        size = 0
+        with open(output, 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'{dataset.title}: zapisano {output} ({size / 1024:.1f} KB)'))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from wms.epp import DEFAULT_EXPORT_TYPES, EPP_ENCODING, exportable_documents, mark_exported, write_epp
+
+
+class Command(BaseCommand):
+    help = 'Eksportuje dokumenty magazynowe z danego dnia do pliku EDI++ (EPP) dla Subiekta GT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Dzień dokumentów w formacie RRRR-MM-DD (domyślnie dziś)')
+        parser.add_argument(
+            '--types',
+            default=','.join(DEFAULT_EXPORT_TYPES),
+            help=f'Typy dokumentów rozdzielone przecinkami (domyślnie {",".join(DEFAULT_EXPORT_TYPES)})',
+        )
+        parser.add_argument('--output', help='Ścieżka pliku (domyślnie regalator_RRRRMMDD.epp)')
+        parser.add_argument(
+            '--include-exported',
+            action='store_true',
+            help='Eksportuj także dokumenty już wyeksportowane wcześniej',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f'Nieprawidłowa data: {options["date"]}')
+        types = [value.strip().upper() for value in options['types'].split(',') if value.strip()]
+        if not set(types) <= {'PZ', 'WZ', 'MM'}:
+            raise CommandError('Dozwolone typy dokumentów: PZ, WZ, MM')
+
+        output = options['output'] or f'regalator_{day:%Y%m%d}.epp'
+        documents = exportable_documents(day, types=types, include_exported=options['include_exported'])
+        with transaction.atomic():
+            with open(output, 'w', encoding=EPP_ENCODING, errors='replace', newline='') as stream:
+                exported_ids = write_epp(documents, stream, date_from=day)
+            mark_exported(exported_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Wyeksportowano {len(exported_ids)} dokumentów do {output}')
+        )
@@ -0,0 +1,85 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wms.product_import import DEFAULT_CHUNK_SIZE, ProductImportError, import_products, write_error_report
+
+
+class Command(BaseCommand):
+    help = 'Importuje katalog produktów z pliku Excel (xlsx) lub CSV porcjami (bulk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, help='Ścieżka do pliku xlsx lub csv')
+        self.add_import_arguments(parser)
+
+    def add_import_arguments(self, parser):
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Aktualizuj istniejące produkty zamiast pomijać je',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Liczba wierszy zapisywanych w jednej transakcji',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Kodowanie pliku CSV (np. cp1250 dla eksportów z Subiekta)',
+        )
+        parser.add_argument(
+            '--errors',
+            dest='errors_path',
+            help='Zapisz raport błędnych wierszy do pliku CSV',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Sprawdź plik i policz zmiany bez zapisu do bazy',
+        )
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if not os.path.exists(file_path):
+            raise CommandError(f'Plik nie istnieje: {file_path}')
+
+        result = self.run_import(file_path, options)
+
+        if options['errors_path'] and result.errors:
+            with open(options['errors_path'], 'w', newline='', encoding='utf-8-sig') as handle:
+                write_error_report(result.errors, handle)
+            self.stdout.write(f'Raport błędów: {options["errors_path"]}')
+        else:
+            for error in result.errors[:20]:
+                self.stdout.write(self.style.WARNING(
+                    f'Wiersz {error.row} ({error.column}): {error.message} [{error.value}]'
+                ))
+            if len(result.errors) > 20:
+                self.stdout.write(f'... oraz {len(result.errors) - 20} kolejnych błędów (użyj --errors)')
+
+        prefix = '[DRY RUN] ' if options['dry_run'] else ''
+        style = self.style.SUCCESS if not result.errors else self.style.WARNING
+        self.stdout.write(style(
+            f'{prefix}Wierszy: {result.rows}, utworzono: {result.created}, zaktualizowano: {result.updated}, '
+            f'pominięto: {result.skipped}, nowe grupy: {result.groups_created}, nowe kody: {result.codes_created}, '
+            f'błędne wiersze: {result.failed_rows}'
+        ))
+
+    def run_import(self, file_path, options):
+        def progress(result):
+            if options['verbosity'] > 0:
+                self.stdout.write(f'  przetworzono {result.rows} wierszy...')
+
+        try:
+            return import_products(
+                file_path,
+                update=options['update'],
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                encoding=options['encoding'],
+                progress=progress,
+            )
+        except ProductImportError as exc:
+            raise CommandError(str(exc))
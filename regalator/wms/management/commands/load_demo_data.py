@@ -8,6 +8,7 @@ from wms.models import (
     PickingOrder, PickingItem, SupplierOrder, SupplierOrderItem,
     ReceivingOrder, ReceivingItem
 )
+from wms.numbering import SEQUENCE_RECEIVING, allocate_number
 
 class Command(BaseCommand):
     help = 'Ładuje dane demo do systemu WMS'
@@ -167,7 +168,7 @@ class Command(BaseCommand):
         # Rejestry przyjęć (Regalacja)
         for i, supplier_order in enumerate(supplier_orders[:2]):  # Tylko pierwsze 2 ZD
             receiving_order = ReceivingOrder.objects.create(
-                order_number=f'Regalacja-{supplier_order.order_number}-{timezone.now().strftime("%Y%m%d%H%M")}',
+                order_number=allocate_number(SEQUENCE_RECEIVING, ref=supplier_order.order_number),
                 supplier_order=supplier_order,
                 status='pending' if i == 0 else 'in_progress',
                 assigned_to=user,
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_LIMIT = 20
+
+
+def parse_importtime(output):
+    """Wiersze ``-X importtime`` jako (czas własny us, czas łączny us, poziom, moduł)."""
+
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        if not self_us.strip().isdigit():
+            continue  # nagłówek
+        level = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), level, name.strip()))
+    return entries
+
+
+class Command(BaseCommand):
+    help = 'Profil startu procesu (python -X importtime): django.setup() i URLconf, najwolniejsze importy'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=DEFAULT_LIMIT,
+            help=f'Ile najwolniejszych modułów pokazać (domyślnie {DEFAULT_LIMIT})',
+        )
+        parser.add_argument(
+            '--no-urls',
+            action='store_true',
+            help='Tylko django.setup() - bez importu URLconf (start komend manage.py)',
+        )
+        parser.add_argument(
+            '--module',
+            action='append',
+            default=[],
+            help='Dodatkowy moduł do zaimportowania po starcie (można podać wiele razy)',
+        )
+
+    def handle(self, *args, **options):
+        if options['limit'] < 1:
+            raise CommandError('--limit musi być większe od zera')
+
+        modules = list(options['module'])
+        if not options['no_urls']:
+            modules.insert(0, settings.ROOT_URLCONF)
+        code = 'import importlib, django; django.setup()\n' + ''.join(
+            f'importlib.import_module({module!r})\n' for module in modules
+        )
+
+        # Świeży interpreter - w bieżącym procesie wszystko jest już zaimportowane
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'regalator.settings'))
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=settings.BASE_DIR,
+        )
+        elapsed = time.perf_counter() - started
+        if process.returncode != 0:
+            raise CommandError(f'Start procesu nie powiódł się:\n{process.stderr[-2000:]}')
+
+        entries = parse_importtime(process.stderr)
+        if not entries:
+            raise CommandError('Brak danych -X importtime')
+        total_us = sum(self_us for self_us, _, _, _ in entries)
+
+        self.stdout.write(
+            f'Start procesu: {elapsed * 1000:.0f} ms (importy: {total_us / 1000:.0f} ms, '
+            f'{len(entries)} modułów)'
+        )
+        if modules:
+            self.stdout.write(f'Importowane po django.setup(): {", ".join(modules)}')
+
+        limit = options['limit']
+        self.stdout.write('\nNajwolniejsze importy - czas łączny (z zależnościami):')
+        for self_us, cumulative_us, level, name in sorted(entries, key=lambda entry: entry[1], reverse=True)[:limit]:
+            self.stdout.write(f'{cumulative_us / 1000:9.1f} ms  {"  " * level}{name}')
+
+        self.stdout.write('\nNajwolniejsze importy - czas własny modułu:')
+        for self_us, cumulative_us, level, name in sorted(entries, key=lambda entry: entry[0], reverse=True)[:limit]:
+            self.stdout.write(f'{self_us / 1000:9.1f} ms  {name}')
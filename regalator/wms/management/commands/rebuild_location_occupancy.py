@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from wms.putaway import rebuild_location_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Odbudowuje indeks zajętości lokalizacji (LocationOccupancy) na podstawie stanów magazynowych'
+
+    def handle(self, *args, **options):
+        count = rebuild_location_occupancy()
+        self.stdout.write(
+            self.style.SUCCESS(f'Zaktualizowano zajętość dla {count} lokalizacji')
+        )
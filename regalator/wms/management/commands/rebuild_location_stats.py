@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wms.location_stats import PICK_RETENTION_DAYS, rebuild_pick_rollup
+from wms.putaway import rebuild_location_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Przelicza agregaty map cieplnych: zajętość lokalizacji i dzienne liczniki pobrań'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=PICK_RETENTION_DAYS,
+            help=f'Ile dni historii kompletacji zachować w licznikach (domyślnie {PICK_RETENTION_DAYS})',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days musi być większe od zera')
+
+        locations = rebuild_location_occupancy()
+        pick_days = rebuild_pick_rollup(options['days'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Zaktualizowano zajętość dla {locations} lokalizacji, '
+                f'liczniki pobrań: {pick_days} wpisów z {options["days"]} dni'
+            )
+        )
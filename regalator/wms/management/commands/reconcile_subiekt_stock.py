@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wms.reconciliation import prune_reports, run_reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Uzgadnia stany WMS z Subiektem (tw_Stan) i zapisuje raport rozbieżności (do uruchamiania z crona)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--magazyn',
+            type=int,
+            help='ID magazynu w Subiekcie (domyślnie SUBIEKT_MAGAZYN_ID)',
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=0,
+            help='Zostaw tylko N najnowszych raportów (0 = nie usuwaj starszych)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = run_reconciliation(mag_id=options['magazyn'])
+        except Exception as exc:
+            raise CommandError(f'Błąd uzgadniania stanów: {exc}')
+
+        style = self.style.SUCCESS if not report.discrepancies_count else self.style.WARNING
+        self.stdout.write(style(
+            f'Sprawdzono {report.products_checked} pozycji, rozbieżności: {report.discrepancies_count} '
+            f'(suma różnic {report.total_abs_difference}), czas {report.duration_ms} ms'
+        ))
+
+        if options['keep'] > 0:
+            removed = prune_reports(options['keep'])
+            if removed:
+                self.stdout.write(f'Usunięto {removed} starszych raportów')
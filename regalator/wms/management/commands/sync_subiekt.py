@@ -1,9 +1,14 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from wms.models import Product, ProductGroup, ProductCode
+from wms.models import Product, ProductGroup
 from subiekt.models import tw_Towar
 from decimal import Decimal
 from wms.utils import sync_product_from_subiekt
+from wms.product_cleanup import DEFAULT_BATCH_SIZE, delete_unused_products, unused_products
+from wms.barcode_sync import sync_barcodes
+
+# Ile nieużywanych produktów wypisać w podglądzie
+UNUSED_PREVIEW_LIMIT = 200
 
 
 class Command(BaseCommand):
@@ -26,10 +31,26 @@ class Command(BaseCommand):
             action='store_true',
             help='Usuń nieużywane produkty (bez stanów, zamówień, itp.)',
         )
+        parser.add_argument(
+            '--sync-barcodes',
+            action='store_true',
+            help='Synchronizuj kody kreskowe (EAN, PLU, kody dodatkowe) wszystkich produktów z Subiektu',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Pokaż tylko listę produktów do usunięcia bez ich usuwania',
+            help='Pokaż tylko listę produktów do usunięcia (lub zmian kodów kreskowych) bez zapisu',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Liczba produktów usuwanych w jednej transakcji (domyślnie {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--no-input',
+            action='store_true',
+            help='Nie pytaj o potwierdzenie (uruchamianie z crona)',
         )
         parser.add_argument(
             '--interactive',
@@ -39,7 +60,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         # If specific arguments are provided, run the original logic
-        if any([options['drop_unused'], options['product_id'], options['force']]):
+        if any([options['drop_unused'], options['sync_barcodes'], options['product_id'], options['force']]):
             self.handle_legacy_mode(options)
             return
         
@@ -50,7 +71,13 @@ class Command(BaseCommand):
     def handle_legacy_mode(self, options):
         """Handles the original command logic for backward compatibility"""
         if options['drop_unused']:
-            self.drop_unused_products(options['dry_run'])
+            self.drop_unused_products(
+                options['dry_run'], batch_size=options['batch_size'], no_input=options['no_input'],
+            )
+            return
+
+        if options['sync_barcodes']:
+            self.sync_barcodes_from_subiekt(dry_run=options['dry_run'], no_input=options['no_input'])
             return
             
         self.stdout.write('Rozpoczynam synchronizację z Subiektem...')
@@ -334,161 +361,96 @@ class Command(BaseCommand):
         
         self.stdout.write('='*60)
     
-    def drop_unused_products(self, dry_run=False):
+    def drop_unused_products(self, dry_run=False, batch_size=DEFAULT_BATCH_SIZE, no_input=False):
         """Usuwa nieużywane produkty z systemu WMS"""
-        from wms.models import (
-            Stock, OrderItem, PickingItem, SupplierOrderItem, 
-            ReceivingItem, PickingHistory, ReceivingHistory, DocumentItem
-        )
-        
         self.stdout.write('🔍 Analizuję nieużywane produkty...')
-        
-        # Znajdź wszystkie produkty
-        all_products = Product.objects.all()
-        unused_products = []
-        
-        for product in all_products:
-            # Sprawdź czy produkt ma jakiekolwiek stany magazynowe
-            has_stock = Stock.objects.filter(product=product).exists()
-            
-            # Sprawdź czy produkt jest używany w zamówieniach klientów
-            has_order_items = OrderItem.objects.filter(product=product).exists()
-            
-            # Sprawdź czy produkt jest używany w zleceniach kompletacji
-            has_picking_items = PickingItem.objects.filter(product=product).exists()
-            
-            # Sprawdź czy produkt jest używany w zamówieniach do dostawców
-            has_supplier_order_items = SupplierOrderItem.objects.filter(product=product).exists()
-            
-            # Sprawdź czy produkt jest używany w przyjęciach
-            has_receiving_items = ReceivingItem.objects.filter(product=product).exists()
-            
-            # Sprawdź czy produkt jest używany w historii kompletacji
-            has_picking_history = PickingHistory.objects.filter(product_scanned=product).exists()
-            
-            # Sprawdź czy produkt jest używany w historii przyjęć
-            has_receiving_history = ReceivingHistory.objects.filter(product=product).exists()
-            
-            # Sprawdź czy produkt jest używany w dokumentach magazynowych
-            has_document_items = DocumentItem.objects.filter(product=product).exists()
-            
-            # Produkt jest nieużywany jeśli nie ma żadnych powiązań
-            is_unused = not any([
-                has_stock, has_order_items, has_picking_items, 
-                has_supplier_order_items, has_receiving_items,
-                has_picking_history, has_receiving_history, has_document_items
-            ])
-            
-            if is_unused:
-                unused_products.append(product)
-        
-        if not unused_products:
+
+        candidates = unused_products()
+        total = candidates.count()
+
+        if not total:
             self.stdout.write(
                 self.style.SUCCESS('✓ Nie znaleziono nieużywanych produktów do usunięcia.')
             )
             return
-        
-        # Wyświetl listę nieużywanych produktów
-        self.stdout.write(f'\n📋 Znaleziono {len(unused_products)} nieużywanych produktów:')
+
+        # Wyświetl listę nieużywanych produktów (przy dużych listach tylko początek)
+        self.stdout.write(f'\n📋 Znaleziono {total} nieużywanych produktów:')
         self.stdout.write('='*60)
-        
-        for i, product in enumerate(unused_products, 1):
+
+        preview = candidates.only('code', 'name', 'subiekt_id', 'created_at')[:UNUSED_PREVIEW_LIMIT]
+        for i, product in enumerate(preview.iterator(), 1):
             self.stdout.write(f'{i:3d}. {product.code} - {product.name}')
             if product.subiekt_id:
                 self.stdout.write(f'     Subiekt ID: {product.subiekt_id}')
             self.stdout.write(f'     Utworzono: {product.created_at.strftime("%Y-%m-%d %H:%M")}')
             self.stdout.write('')
-        
+        if total > UNUSED_PREVIEW_LIMIT:
+            self.stdout.write(f'... oraz {total - UNUSED_PREVIEW_LIMIT} kolejnych\n')
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING('🔍 Tryb podglądu - produkty nie zostały usunięte.')
             )
             return
-        
+
         # Pytaj o potwierdzenie usunięcia
-        confirm = input(f'\n❓ Czy chcesz usunąć {len(unused_products)} nieużywanych produktów? (y/N): ')
-        if confirm.lower() not in ['y', 'yes', 'tak']:
-            self.stdout.write('❌ Usuwanie anulowane.')
-            return
-        
-        # Usuń nieużywane produkty
-        deleted_count = 0
-        for product in unused_products:
-            try:
-                product_name = f"{product.code} - {product.name}"
-                product.delete()
-                deleted_count += 1
-                self.stdout.write(f'🗑️  Usunięto: {product_name}')
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'❌ Błąd podczas usuwania {product.code}: {str(e)}')
-                )
-        
+        if not no_input:
+            confirm = input(f'\n❓ Czy chcesz usunąć {total} nieużywanych produktów? (y/N): ')
+            if confirm.lower() not in ['y', 'yes', 'tak']:
+                self.stdout.write('❌ Usuwanie anulowane.')
+                return
+
+        def report_progress(result):
+            self.stdout.write(f'🗑️  Partia {result.batches}: usunięto łącznie {result.deleted_products} produktów')
+
+        result = delete_unused_products(batch_size=batch_size, progress=report_progress)
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f'❌ Błąd podczas usuwania: {error}'))
+        cascaded = {label: count for label, count in result.deleted_rows.items() if label != Product._meta.label}
+        if cascaded:
+            self.stdout.write('Usunięte powiązane rekordy: ' + ', '.join(
+                f'{label}: {count}' for label, count in sorted(cascaded.items())
+            ))
+
         self.stdout.write(
-            self.style.SUCCESS(f'\nPomyślnie usunięto {deleted_count} nieużywanych produktów.')
+            self.style.SUCCESS(f'\nPomyślnie usunięto {result.deleted_products} nieużywanych produktów.')
         )
-    
-    def sync_barcodes_from_subiekt(self):
-        """Synchronizes barcodes from Subiekt to WMS"""
+
+    def sync_barcodes_from_subiekt(self, dry_run=False, no_input=False):
+        """Synchronizuje kody kreskowe (EAN, PLU, kody dodatkowe) z Subiektu do WMS"""
         self.stdout.write('\nSynchronizacja kodów kreskowych z Subiektu')
         self.stdout.write('='*50)
-        
-        try:
-            # Get all products with Subiekt IDs
-            wms_products = Product.objects.filter(subiekt_id__isnull=False)
-            
-            if not wms_products.exists():
-                self.stdout.write(self.style.WARNING('Nie znaleziono produktów z ID Subiekt do synchronizacji kodów kreskowych.'))
-                return
-            
-            self.stdout.write(f'Znaleziono {wms_products.count()} produktów z ID Subiekt.')
+
+        if not Product.objects.filter(subiekt_id__isnull=False).exists():
+            self.stdout.write(self.style.WARNING('Nie znaleziono produktów z ID Subiekt do synchronizacji kodów kreskowych.'))
+            return
+
+        if not dry_run and not no_input:
             confirm = input('Czy chcesz kontynuować synchronizację kodów kreskowych? (y/N): ')
-            
             if confirm.lower() not in ['y', 'yes', 'tak']:
                 self.stdout.write('Synchronizacja anulowana.')
                 return
-            
-            synced_count = 0
-            created_count = 0
-            updated_count = 0
-            
-            for product in wms_products:
-                subiekt_id = str(product.subiekt_id)
-                
-                # Check if barcode already exists for this product
-                existing_code = ProductCode.objects.filter(
-                    product=product,
-                    code=subiekt_id,
-                    code_type='barcode'
-                ).first()
-                
-                if existing_code:
-                    # Update existing barcode if needed
-                    existing_code.description = 'Kod z Subiektu (tw_Id)'
-                    existing_code.save()
-                    updated_count += 1
-                    self.stdout.write(f'  Zaktualizowano kod: {product.code} - {subiekt_id}')
-                else:
-                    # Create new barcode
-                    ProductCode.objects.create(
-                        product=product,
-                        code=subiekt_id,
-                        code_type='barcode',
-                        description='Kod z Subiektu (tw_Id)'
-                    )
-                    created_count += 1
-                    self.stdout.write(f'  Utworzono kod: {product.code} - {subiekt_id}')
-                
-                synced_count += 1
-            
-            self.stdout.write(
-                self.style.SUCCESS(f'\nSynchronizacja zakończona:')
-            )
-            self.stdout.write(f'  Produkty przetworzone: {synced_count}')
-            self.stdout.write(f'  Nowe kody utworzone: {created_count}')
-            self.stdout.write(f'  Kody zaktualizowane: {updated_count}')
-            
+
+        try:
+            result = sync_barcodes(dry_run=dry_run)
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Błąd podczas synchronizacji kodów kreskowych: {str(e)}')
-            )
\ No newline at end of file
+            )
+            return
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(f'  {error}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\nSynchronizacja zakończona{" (podgląd - bez zapisu)" if dry_run else ""}:')
+        )
+        self.stdout.write(f'  Kody odczytane z Subiektu: {result.rows}')
+        self.stdout.write(f'  Nowe kody utworzone: {result.created}')
+        self.stdout.write(f'  Kody zaktualizowane: {result.updated}')
+        self.stdout.write(f'  Kody dezaktywowane: {result.deactivated}')
+        self.stdout.write(f'  Kody bez zmian: {result.unchanged}')
+        if result.unknown_products:
+            self.stdout.write(f'  Towary z Subiektu spoza WMS (pominięte): {result.unknown_products}')
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0009_alter_pickingitem_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationOccupancy',
+            fields=[
+                ('location', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='wms.location', verbose_name='Lokalizacja')),
+                ('total_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Łączna ilość')),
+                ('sku_count', models.PositiveIntegerField(default=0, verbose_name='Liczba produktów')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Zajętość lokalizacji',
+                'verbose_name_plural': 'Zajętość lokalizacji',
+            },
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='capacity',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Maksymalna łączna ilość towaru w lokalizacji (puste = bez limitu)', max_digits=10, null=True, verbose_name='Pojemność'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0010_location_capacity_locationoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationimage',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Pochodne obrazu'),
+        ),
+        migrations.AddField(
+            model_name='locationimage',
+            name='file_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Rozmiar pliku (B)'),
+        ),
+        migrations.AddField(
+            model_name='locationimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Wysokość'),
+        ),
+        migrations.AddField(
+            model_name='locationimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Szerokość'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Pochodne obrazu'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='file_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Rozmiar pliku (B)'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Wysokość'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Szerokość'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0011_image_derivatives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReconciliation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Utworzono')),
+                ('magazyn_id', models.IntegerField(verbose_name='ID magazynu Subiekt')),
+                ('products_checked', models.PositiveIntegerField(default=0, verbose_name='Sprawdzone produkty')),
+                ('discrepancies_count', models.PositiveIntegerField(default=0, verbose_name='Rozbieżności')),
+                ('total_abs_difference', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Suma różnic (wartość bezwzględna)')),
+                ('duration_ms', models.PositiveIntegerField(default=0, verbose_name='Czas wykonania (ms)')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Uruchomił')),
+            ],
+            options={
+                'verbose_name': 'Uzgodnienie stanów',
+                'verbose_name_plural': 'Uzgodnienia stanów',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockReconciliationLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subiekt_id', models.IntegerField(blank=True, null=True, verbose_name='ID w Subiekcie/PLU')),
+                ('code', models.CharField(blank=True, max_length=50, verbose_name='Kod produktu')),
+                ('name', models.CharField(blank=True, max_length=200, verbose_name='Nazwa produktu')),
+                ('wms_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Stan WMS')),
+                ('subiekt_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Stan Subiekt')),
+                ('subiekt_reserved', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Zarezerwowano w Subiekcie')),
+                ('difference', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Różnica (WMS - Subiekt)')),
+                ('status', models.CharField(choices=[('difference', 'Różnica stanów'), ('missing_in_wms', 'Brak produktu w WMS'), ('missing_in_subiekt', 'Brak powiązania z Subiektem')], default='difference', max_length=20, verbose_name='Status')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='wms.product', verbose_name='Produkt')),
+                ('reconciliation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='wms.stockreconciliation', verbose_name='Uzgodnienie')),
+            ],
+            options={
+                'verbose_name': 'Rozbieżność stanu',
+                'verbose_name_plural': 'Rozbieżności stanów',
+                'ordering': ['reconciliation', 'status', 'code'],
+                'indexes': [models.Index(fields=['reconciliation', 'status'], name='wms_stockre_reconci_b22b18_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0012_stock_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationPickDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Dzień')),
+                ('pick_count', models.PositiveIntegerField(default=0, verbose_name='Liczba pobrań')),
+                ('quantity_picked', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ilość pobrana')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_days', to='wms.location', verbose_name='Lokalizacja')),
+            ],
+            options={
+                'verbose_name': 'Pobrania z lokalizacji (dziennie)',
+                'verbose_name_plural': 'Pobrania z lokalizacji (dziennie)',
+                'indexes': [models.Index(fields=['day', 'location'], name='wms_locatio_day_1fa5b5_idx')],
+                'unique_together': {('location', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0013_location_pick_daily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=30, verbose_name='Typ numeracji')),
+                ('period', models.CharField(blank=True, default='', help_text='Rok lub rok-miesiąc, gdy format numeru zeruje licznik okresowo', max_length=7, verbose_name='Okres')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Ostatni numer')),
+            ],
+            options={
+                'verbose_name': 'Licznik numeracji',
+                'verbose_name_plural': 'Liczniki numeracji',
+                'unique_together': {('key', 'period')},
+            },
+        ),
+    ]
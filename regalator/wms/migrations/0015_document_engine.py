@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wms', '0014_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='documentitem',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='documentitem',
+            name='source_location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wms.location'),
+        ),
+        migrations.AddField(
+            model_name='warehousedocument',
+            name='exported_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Wyeksportowano do EPP'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='documentitem',
+            unique_together={('document', 'product', 'source_location', 'location')},
+        ),
+    ]
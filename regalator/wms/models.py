@@ -7,6 +7,9 @@ from decimal import Decimal
 import uuid
 import os
 
+from .images import DerivativeImageMixin
+
+
 def user_avatar_path(instance, filename):
     """Generuje ścieżkę dla avatarów użytkowników"""
     ext = filename.split('.')[-1]
@@ -240,6 +243,14 @@ class Location(models.Model):
     description = models.TextField(blank=True, verbose_name="Opis")
     is_active = models.BooleanField(default=True, verbose_name="Aktywna")
     is_default = models.BooleanField(default=False, verbose_name="Domyślna lokalizacja")
+    capacity = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Pojemność",
+        help_text="Maksymalna łączna ilość towaru w lokalizacji (puste = bez limitu)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -260,7 +271,7 @@ class Location(models.Model):
         return self.images.filter(is_primary=True).first()
 
 
-class LocationImage(models.Model):
+class LocationImage(DerivativeImageMixin, models.Model):
     """Zdjęcia lokalizacji w magazynie"""
     location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='images', verbose_name="Lokalizacja")
     image = models.ImageField(upload_to=location_image_path, verbose_name="Zdjęcie")
@@ -288,7 +299,7 @@ class LocationImage(models.Model):
         super().save(*args, **kwargs)
 
 
-class ProductImage(models.Model):
+class ProductImage(DerivativeImageMixin, models.Model):
     """Zdjęcia produktów"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images', verbose_name="Produkt")
     image = models.ImageField(upload_to=product_image_path, verbose_name="Zdjęcie")
@@ -333,6 +344,35 @@ class Stock(models.Model):
         return f"{self.product.name} w {self.location.name}: {self.quantity}"
 
 
+class LocationOccupancy(models.Model):
+    """Indeks zajętości lokalizacji aktualizowany przy każdym zapisie stanu"""
+    location = models.OneToOneField(
+        Location,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='occupancy',
+        verbose_name="Lokalizacja",
+    )
+    total_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Łączna ilość")
+    sku_count = models.PositiveIntegerField(default=0, verbose_name="Liczba produktów")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Zajętość lokalizacji"
+        verbose_name_plural = "Zajętość lokalizacji"
+
+    def __str__(self):
+        return f"{self.location.name}: {self.total_quantity} ({self.sku_count} SKU)"
+
+    def free_capacity(self, capacity=None):
+        """Zwraca wolne miejsce albo None, gdy lokalizacja nie ma limitu"""
+        if capacity is None:
+            capacity = self.location.capacity
+        if capacity is None:
+            return None
+        return capacity - self.total_quantity
+
+
 class StockMovement(models.Model):
     """Rejestr przesunięć stanów magazynowych"""
 
@@ -544,6 +584,28 @@ class PickingHistory(models.Model):
         return f"{self.product_scanned.name} - {self.quantity_picked} - {self.scanned_at}"
 
 
+class LocationPickDaily(models.Model):
+    """Dzienny licznik pobrań z lokalizacji (agregat ``PickingHistory``)"""
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        related_name='pick_days',
+        verbose_name="Lokalizacja",
+    )
+    day = models.DateField(verbose_name="Dzień")
+    pick_count = models.PositiveIntegerField(default=0, verbose_name="Liczba pobrań")
+    quantity_picked = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Ilość pobrana")
+
+    class Meta:
+        unique_together = ['location', 'day']
+        indexes = [models.Index(fields=['day', 'location'])]
+        verbose_name = "Pobrania z lokalizacji (dziennie)"
+        verbose_name_plural = "Pobrania z lokalizacji (dziennie)"
+
+    def __str__(self):
+        return f"{self.location.name} {self.day}: {self.pick_count}"
+
+
 class SupplierOrder(models.Model):
     """Zamówienie do dostawcy (ZD)"""
     SUPPLIER_STATUS_CHOICES = [
@@ -760,8 +822,26 @@ class ReceivingHistory(models.Model):
         return f"{self.product.name} - {self.quantity_received} w {self.location.name}"
 
 
+class NumberSequence(models.Model):
+    """Licznik numeracji dokumentów i zleceń (osobny wiersz na typ i okres)"""
+    key = models.CharField(max_length=30, verbose_name="Typ numeracji")
+    period = models.CharField(max_length=7, blank=True, default='', verbose_name="Okres",
+                              help_text="Rok lub rok-miesiąc, gdy format numeru zeruje licznik okresowo")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Ostatni numer")
+
+    class Meta:
+        unique_together = ['key', 'period']
+        verbose_name = "Licznik numeracji"
+        verbose_name_plural = "Liczniki numeracji"
+
+    def __str__(self):
+        if self.period:
+            return f"{self.key} {self.period}: {self.last_value}"
+        return f"{self.key}: {self.last_value}"
+
+
 class WarehouseDocument(models.Model):
-    """Dokument magazynowy (PZ)"""
+    """Dokument magazynowy (PZ, WZ, MM)"""
     DOCUMENT_TYPE_CHOICES = [
         ('PZ', 'Przyjęcie zewnętrzne'),
         ('WZ', 'Wydanie zewnętrzne'),
@@ -775,6 +855,7 @@ class WarehouseDocument(models.Model):
     document_date = models.DateField(default=timezone.now)
     status = models.CharField(max_length=20, default='draft')
     created_at = models.DateTimeField(auto_now_add=True)
+    exported_at = models.DateTimeField(null=True, blank=True, verbose_name="Wyeksportowano do EPP")
     notes = models.TextField(blank=True)
     
     class Meta:
@@ -789,10 +870,69 @@ class DocumentItem(models.Model):
     document = models.ForeignKey(WarehouseDocument, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    # Tylko MM - lokalizacja, z której towar został przesunięty do ``location``
+    source_location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, null=True, blank=True, related_name='+',
+    )
     quantity = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     
     class Meta:
-        unique_together = ['document', 'product', 'location']
+        unique_together = ['document', 'product', 'source_location', 'location']
     
     def __str__(self):
         return f"{self.product.name} - {self.quantity} w {self.location.name}"
+
+
+class StockReconciliation(models.Model):
+    """Raport uzgodnienia stanów WMS z Subiektem (tw_Stan) z danego momentu"""
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Uruchomił")
+    magazyn_id = models.IntegerField(verbose_name="ID magazynu Subiekt")
+    products_checked = models.PositiveIntegerField(default=0, verbose_name="Sprawdzone produkty")
+    discrepancies_count = models.PositiveIntegerField(default=0, verbose_name="Rozbieżności")
+    total_abs_difference = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Suma różnic (wartość bezwzględna)")
+    duration_ms = models.PositiveIntegerField(default=0, verbose_name="Czas wykonania (ms)")
+
+    class Meta:
+        verbose_name = "Uzgodnienie stanów"
+        verbose_name_plural = "Uzgodnienia stanów"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Uzgodnienie {self.created_at:%Y-%m-%d %H:%M} ({self.discrepancies_count} rozbieżności)"
+
+
+class StockReconciliationLine(models.Model):
+    """Rozbieżność stanu jednego produktu w raporcie uzgodnienia"""
+    STATUS_CHOICES = [
+        ('difference', 'Różnica stanów'),
+        ('missing_in_wms', 'Brak produktu w WMS'),
+        ('missing_in_subiekt', 'Brak powiązania z Subiektem'),
+    ]
+
+    reconciliation = models.ForeignKey(
+        StockReconciliation,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name="Uzgodnienie"
+    )
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Produkt")
+    subiekt_id = models.IntegerField(null=True, blank=True, verbose_name="ID w Subiekcie/PLU")
+    code = models.CharField(max_length=50, blank=True, verbose_name="Kod produktu")
+    name = models.CharField(max_length=200, blank=True, verbose_name="Nazwa produktu")
+    wms_quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Stan WMS")
+    subiekt_quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Stan Subiekt")
+    subiekt_reserved = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Zarezerwowano w Subiekcie")
+    difference = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Różnica (WMS - Subiekt)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='difference', verbose_name="Status")
+
+    class Meta:
+        verbose_name = "Rozbieżność stanu"
+        verbose_name_plural = "Rozbieżności stanów"
+        ordering = ['reconciliation', 'status', 'code']
+        indexes = [
+            models.Index(fields=['reconciliation', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.code or self.subiekt_id}: {self.difference}"
@@ -0,0 +1,79 @@
+"""
+Numeracja dokumentów magazynowych i zleceń.
+
+Każdy typ numeracji ma licznik w tabeli ``NumberSequence``. Przydział numeru
+to jedno ``UPDATE ... SET last_value = last_value + 1`` - blokuje wiersz
+licznika do końca transakcji wywołującego, więc równolegli operatorzy
+czekają na siebie zamiast kolidować na unikalnym numerze. Wycofanie
+transakcji cofa też licznik, dzięki czemu numeracja nie ma luk.
+
+Formaty numerów można nadpisać w ``settings.WMS_NUMBER_FORMATS``
+(``{typ: wzorzec}``). Wzorzec używa pól ``{number}``, ``{ref}`` (numer
+dokumentu źródłowego), ``{year}`` i ``{month}``; obecność ``{year}`` lub
+``{month}`` oznacza osobny licznik dla każdego roku lub miesiąca.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NumberSequence
+
+SEQUENCE_WZ = 'WZ'
+SEQUENCE_PZ = 'PZ'
+SEQUENCE_MM = 'MM'
+SEQUENCE_RECEIVING = 'receiving'
+SEQUENCE_PICKING = 'picking'
+
+DEFAULT_FORMATS = {
+    SEQUENCE_WZ: 'WZ-{ref}-{number}',
+    SEQUENCE_PZ: 'PZ-{ref}-{number}',
+    SEQUENCE_MM: 'MM-{year}-{number}',
+    SEQUENCE_RECEIVING: 'Regalacja-{ref}-{number}',
+    SEQUENCE_PICKING: 'Terminacja-{ref}-{number}',
+}
+
+
+def number_format(key: str) -> str:
+    pattern = getattr(settings, 'WMS_NUMBER_FORMATS', {}).get(key) or DEFAULT_FORMATS.get(key)
+    if not pattern:
+        raise ImproperlyConfigured(f'Brak formatu numeracji dla typu "{key}"')
+    if '{number' not in pattern:
+        raise ImproperlyConfigured(f'Format numeracji "{key}" musi zawierać pole {{number}}')
+    return pattern
+
+
+def _period(pattern: str, day: date) -> str:
+    if '{month' in pattern:
+        return f'{day.year}-{day.month:02d}'
+    if '{year' in pattern:
+        return str(day.year)
+    return ''
+
+
+@transaction.atomic
+def allocate_number(key: str, *, ref: str = '', day: Optional[date] = None) -> str:
+    """
+    Przydziela kolejny numer typu ``key`` w bieżącej transakcji.
+
+    Wywołujący powinien tworzyć dokument w tej samej transakcji - blokada
+    licznika trwa do jej zatwierdzenia.
+    """
+
+    pattern = number_format(key)
+    day = day or timezone.localdate()
+    period = _period(pattern, day)
+    counter = NumberSequence.objects.filter(key=key, period=period)
+    if not counter.update(last_value=F('last_value') + 1):
+        # Pierwszy numer typu/okresu - get_or_create obsługuje równoległe utworzenie wiersza
+        NumberSequence.objects.get_or_create(key=key, period=period)
+        counter.update(last_value=F('last_value') + 1)
+    number = counter.values_list('last_value', flat=True).get()
+    return pattern.format(number=number, ref=ref, year=day.year, month=day.month)
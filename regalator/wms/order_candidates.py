@@ -0,0 +1,227 @@
+"""
+Indeks kandydatów produktów dla autouzupełniania w kompletacji i regalacji.
+
+Dla każdego zlecenia budowana jest jednorazowo lista pozycji ze
+znormalizowaną nazwą, kodem produktu i kodami kreskowymi. Lista trafia do
+cache pod kluczem zawierającym wersję zlecenia, więc kolejne naciśnięcia
+klawiszy nie ładują pozycji ani kodów z bazy - dopasowanie odbywa się na
+gotowych napisach, a ilości pobierane są jednym zapytaniem tylko dla
+zwróconych N pozycji.
+
+Wersja zlecenia rośnie, gdy zmienia się skład pozycji (dodanie, usunięcie,
+zmiana produktu) albo kody produktów. Zapis samych ilości nie unieważnia
+indeksu, bo ilości nie są w nim przechowywane.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from .models import PickingItem, ProductCode, ReceivingItem
+
+PICKING = 'picking'
+RECEIVING = 'receiving'
+
+DEFAULT_RESULT_LIMIT = 10
+CANDIDATES_CACHE_TIMEOUT = 60 * 60
+
+VERSION_KEY = 'wms:order_candidates:{kind}:{order_id}:version'
+CODES_VERSION_KEY = 'wms:order_candidates:codes_version'
+CANDIDATES_KEY = 'wms:order_candidates:{kind}:{order_id}:{version}:{codes_version}'
+
+# Pola zapisywane przy skanowaniu - nie zmieniają składu indeksu
+QUANTITY_FIELDS = frozenset({
+    'quantity_picked',
+    'quantity_received',
+    'is_completed',
+    'location',
+    'notes',
+})
+
+RANK_EXACT_CODE = 0
+RANK_CODE_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_WORD_PREFIX = 3
+RANK_SUBSTRING = 4
+
+
+@dataclass(slots=True, frozen=True)
+class OrderCandidate:
+    item_id: int
+    product_id: int
+    name: str
+    code: str
+    product_code: str
+    name_key: str
+    code_keys: Tuple[str, ...]
+
+    def rank(self, query: str) -> Optional[int]:
+        best = None
+        for code in self.code_keys:
+            if code == query:
+                return RANK_EXACT_CODE
+            if code.startswith(query):
+                best = RANK_CODE_PREFIX
+            elif best is None and query in code:
+                best = RANK_SUBSTRING
+        if best == RANK_CODE_PREFIX:
+            return best
+        if self.name_key.startswith(query):
+            return RANK_NAME_PREFIX
+        if f' {query}' in self.name_key:
+            return RANK_WORD_PREFIX
+        if query in self.name_key:
+            return RANK_SUBSTRING
+        return best
+
+
+@dataclass(slots=True)
+class CandidateMatch:
+    candidate: OrderCandidate
+    item: object
+
+
+def normalize(value: Optional[str]) -> str:
+    return ' '.join((value or '').casefold().split())
+
+
+def _version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # Znacznik czasu, żeby po wypadnięciu klucza nie wrócić do starej wersji
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def bump_order_version(kind: str, order_id) -> None:
+    if order_id:
+        _bump(VERSION_KEY.format(kind=kind, order_id=order_id))
+
+
+def bump_codes_version() -> None:
+    _bump(CODES_VERSION_KEY)
+
+
+def _item_rows(kind: str, order_id) -> List[Tuple[int, int, str, str]]:
+    if kind == PICKING:
+        items = PickingItem.objects.filter(picking_order_id=order_id).order_by('id')
+    else:
+        items = ReceivingItem.objects.filter(receiving_order_id=order_id).order_by('sequence', 'id')
+    return list(items.values_list('id', 'product_id', 'product__name', 'product__code'))
+
+
+def build_candidates(kind: str, order_id) -> List[OrderCandidate]:
+    """Buduje listę kandydatów zlecenia (dwa zapytania niezależnie od liczby pozycji)."""
+
+    rows = _item_rows(kind, order_id)
+    codes: Dict[int, List[str]] = {}
+    product_codes = (
+        ProductCode.objects.filter(product_id__in={row[1] for row in rows}, is_active=True)
+        .order_by('code_type', 'code')
+        .values_list('product_id', 'code')
+    )
+    for product_id, code in product_codes:
+        codes.setdefault(product_id, []).append(code)
+
+    candidates = []
+    for item_id, product_id, name, product_code in rows:
+        product_codes_list = codes.get(product_id, [])
+        all_codes = [*product_codes_list, product_code or '']
+        candidates.append(OrderCandidate(
+            item_id=item_id,
+            product_id=product_id,
+            name=(name or '').strip(),
+            code=product_codes_list[0] if product_codes_list else '',
+            product_code=product_code or '',
+            name_key=normalize(name),
+            code_keys=tuple(dict.fromkeys(normalize(code) for code in all_codes if code)),
+        ))
+    return candidates
+
+
+def get_candidates(kind: str, order_id) -> List[OrderCandidate]:
+    key = CANDIDATES_KEY.format(
+        kind=kind,
+        order_id=order_id,
+        version=_version(VERSION_KEY.format(kind=kind, order_id=order_id)),
+        codes_version=_version(CODES_VERSION_KEY),
+    )
+    candidates = cache.get(key)
+    if candidates is None:
+        candidates = build_candidates(kind, order_id)
+        cache.set(key, candidates, CANDIDATES_CACHE_TIMEOUT)
+    return candidates
+
+
+def search_order_candidates(
+    kind: str,
+    order_id,
+    query: str,
+    *,
+    limit: int = DEFAULT_RESULT_LIMIT,
+    unique_products: bool = False,
+) -> List[CandidateMatch]:
+    """
+    Zwraca do ``limit`` najlepszych dopasowań wraz z aktualnymi pozycjami.
+
+    Pozycje (z ilościami) są doczytywane jednym zapytaniem tylko dla
+    zwracanych kandydatów.
+    """
+
+    needle = normalize(query)
+    if not needle:
+        return []
+
+    ranked = []
+    for position, candidate in enumerate(get_candidates(kind, order_id)):
+        rank = candidate.rank(needle)
+        if rank is not None:
+            ranked.append((rank, position, candidate))
+    ranked.sort(key=lambda entry: entry[:2])
+
+    selected: List[OrderCandidate] = []
+    seen_products = set()
+    for _, _, candidate in ranked:
+        if unique_products:
+            if candidate.product_id in seen_products:
+                continue
+            seen_products.add(candidate.product_id)
+        selected.append(candidate)
+        if len(selected) >= limit:
+            break
+
+    if not selected:
+        return []
+
+    if kind == PICKING:
+        items = PickingItem.objects.select_related('location').only(
+            'id', 'quantity_to_pick', 'quantity_picked', 'location', 'location__name'
+        )
+    else:
+        items = ReceivingItem.objects.only('id', 'quantity_ordered', 'quantity_received')
+    items_by_id = items.in_bulk([candidate.item_id for candidate in selected])
+
+    return [
+        CandidateMatch(candidate=candidate, item=items_by_id[candidate.item_id])
+        for candidate in selected
+        if candidate.item_id in items_by_id
+    ]
+
+
+def remaining_quantity(item) -> Decimal:
+    if isinstance(item, PickingItem):
+        return (item.quantity_to_pick or Decimal('0')) - (item.quantity_picked or Decimal('0'))
+    return max(Decimal('0'), (item.quantity_ordered or Decimal('0')) - (item.quantity_received or Decimal('0')))
@@ -0,0 +1,123 @@
+"""
+Wyszukiwanie i usuwanie nieużywanych produktów.
+
+Produkt jest nieużywany, jeśli nie odwołuje się do niego żaden stan,
+ruch magazynowy, pozycja zamówienia, kompletacji, przyjęcia, dokumentu ani
+historia skanów. Wszystkie warunki składane są w jedno zapytanie
+(``NOT EXISTS`` dla każdej relacji), zamiast sprawdzania produktu po produkcie.
+
+Usuwanie odbywa się partiami - każda partia we własnej transakcji, więc
+kaskada (kody, zdjęcia, przypisania do grup) obejmuje ograniczoną liczbę
+wierszy, a przerwanie komendy nie cofa już usuniętych partii.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+
+from .models import (
+    DocumentItem,
+    OrderItem,
+    PickingHistory,
+    PickingItem,
+    Product,
+    ReceivingHistory,
+    ReceivingItem,
+    Stock,
+    StockMovement,
+    SupplierOrderItem,
+)
+
+DEFAULT_BATCH_SIZE = 500
+
+# (model, pole wskazujące produkt) - każde powiązanie oznacza, że produkt jest w użyciu
+USAGE_RELATIONS = (
+    (Stock, 'product'),
+    (StockMovement, 'product'),
+    (OrderItem, 'product'),
+    (PickingItem, 'product'),
+    (PickingHistory, 'product_scanned'),
+    (SupplierOrderItem, 'product'),
+    (ReceivingItem, 'product'),
+    (ReceivingHistory, 'product'),
+    (DocumentItem, 'product'),
+    # Usunięcie produktu nadrzędnego skasowałoby jego warianty
+    (Product, 'parent'),
+)
+
+
+@dataclass
+class CleanupResult:
+    candidates: int = 0
+    deleted_products: int = 0
+    batches: int = 0
+    # etykieta modelu -> liczba usuniętych wierszy (z kaskadą)
+    deleted_rows: Counter = field(default_factory=Counter)
+    errors: List[str] = field(default_factory=list)
+
+
+def unused_products() -> QuerySet:
+    """Produkty bez żadnych powiązań (jedno zapytanie z anty-złączeniami)."""
+
+    conditions = {
+        f'_used_by_{model._meta.model_name}_{field_name}': Exists(
+            model.objects.filter(**{field_name: OuterRef('pk')})
+        )
+        for model, field_name in USAGE_RELATIONS
+    }
+    return (
+        Product.objects.alias(**conditions)
+        .filter(**{name: False for name in conditions})
+        .order_by('pk')
+    )
+
+
+def _id_batches(queryset: QuerySet, batch_size: int) -> Iterator[List[int]]:
+    """Kolejne partie identyfikatorów (stronicowanie po kluczu, bez OFFSET)."""
+
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def delete_unused_products(
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+    progress: Optional[Callable[[CleanupResult], None]] = None,
+) -> CleanupResult:
+    """
+    Usuwa nieużywane produkty partiami po ``batch_size``.
+
+    Przed usunięciem każdej partii warunek jest sprawdzany ponownie w tej
+    samej transakcji, więc produkt użyty w międzyczasie nie zostanie usunięty.
+    W trybie ``dry_run`` jedynie liczy kandydatów.
+    """
+
+    result = CleanupResult(candidates=unused_products().count())
+    if dry_run or not result.candidates:
+        return result
+
+    for ids in _id_batches(unused_products(), batch_size):
+        try:
+            with transaction.atomic():
+                still_unused = list(unused_products().filter(pk__in=ids).values_list('pk', flat=True))
+                _, per_model = Product.objects.filter(pk__in=still_unused).delete()
+        except Exception as exc:
+            result.errors.append(f'Partia {ids[0]}-{ids[-1]}: {exc}')
+            continue
+        result.batches += 1
+        result.deleted_products += per_model.get(Product._meta.label, 0)
+        result.deleted_rows.update(per_model)
+        if progress:
+            progress(result)
+    return result
@@ -0,0 +1,417 @@
+"""
+Strumieniowy import katalogu produktów z plików Excel (xlsx) i CSV.
+
+Wiersze są czytane strumieniowo (openpyxl w trybie read-only albo
+``csv.reader``) i przetwarzane porcjami. Dla każdej porcji:
+
+- walidacja odbywa się na kolumnach ramki pandas (maski błędów zamiast
+  sprawdzania wiersz po wierszu),
+- istniejące produkty, grupy i kody są rozwiązywane jednym zapytaniem na
+  porcję,
+- zapis idzie przez ``bulk_create`` / ``bulk_update`` w jednej transakcji.
+
+PLU i kody kreskowe trafiają do ``ProductCode``. Błędne wiersze nie
+przerywają importu - zbierane są w raporcie (numer wiersza, kolumna, opis).
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Product, ProductCode, ProductGroup
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# pole importu -> akceptowane nagłówki kolumn (bez rozróżniania wielkości liter)
+FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'code': ('symbol', 'kod', 'kod produktu', 'code', 'sku'),
+    'name': ('nazwa', 'name'),
+    'description': ('opis', 'description'),
+    'plu': ('plu',),
+    'barcode': ('ean', 'barcode', 'kod kreskowy', 'kod_kreskowy'),
+    'stock': ('stan', 'stock'),
+    'group': ('grupa', 'group'),
+    'unit': ('typ_opakowania', 'jednostka', 'jm', 'unit'),
+}
+REQUIRED_FIELDS = ('code', 'name')
+TEXT_FIELDS = ('code', 'name', 'description', 'plu', 'barcode', 'group', 'unit')
+
+PRODUCT_CODE_MAX_LENGTH = Product._meta.get_field('code').max_length
+PRODUCT_NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+PRODUCT_UNIT_MAX_LENGTH = Product._meta.get_field('unit').max_length
+GROUP_CODE_MAX_LENGTH = ProductGroup._meta.get_field('code').max_length
+SUBIEKT_ID_MAX = 2 ** 31 - 1
+# DecimalField(max_digits=10, decimal_places=2)
+STOCK_MAX = Decimal('1e8')
+
+
+@dataclass(slots=True)
+class RowError:
+    row: int
+    column: str
+    value: str
+    message: str
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    groups_created: int = 0
+    codes_created: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+    @property
+    def failed_rows(self) -> int:
+        return len({error.row for error in self.errors})
+
+
+class ProductImportError(ValueError):
+    """Plik nie nadaje się do importu (np. brak wymaganych kolumn)."""
+
+
+def _normalize_header(value) -> str:
+    return ' '.join(str(value or '').strip().lower().replace('_', ' ').split())
+
+
+def map_columns(header: Sequence) -> Dict[str, int]:
+    """Mapuje pola importu na indeksy kolumn na podstawie nagłówka."""
+
+    positions = {_normalize_header(name): index for index, name in enumerate(header)}
+    mapping = {}
+    for field_name, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            index = positions.get(_normalize_header(alias))
+            if index is not None:
+                mapping[field_name] = index
+                break
+
+    missing = [field_name for field_name in REQUIRED_FIELDS if field_name not in mapping]
+    if missing:
+        expected = ', '.join(FIELD_ALIASES[field_name][0] for field_name in missing)
+        raise ProductImportError(f'Brak wymaganych kolumn: {expected}')
+    return mapping
+
+
+def _iter_xlsx(path: str) -> Iterator[Sequence]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path: str, encoding: str) -> Iterator[Sequence]:
+    with open(path, newline='', encoding=encoding) as handle:
+        sample = handle.read(64 * 1024)
+        handle.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(handle, dialect)
+
+
+def iter_rows(path: str, *, encoding: str = 'utf-8-sig') -> Tuple[Dict[str, int], Iterator[Tuple[int, Sequence]]]:
+    """
+    Otwiera plik i zwraca mapowanie kolumn oraz iterator ``(numer wiersza, wartości)``.
+
+    Numeracja wierszy odpowiada arkuszowi (nagłówek to wiersz 1), puste
+    wiersze są pomijane.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        rows = _iter_xlsx(path)
+    elif extension in ('.csv', '.txt'):
+        rows = _iter_csv(path, encoding)
+    else:
+        raise ProductImportError(f'Nieobsługiwany format pliku: {extension or path}')
+
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ProductImportError('Plik jest pusty')
+    mapping = map_columns(header)
+
+    def numbered():
+        for number, values in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in values):
+                yield number, values
+
+    return mapping, numbered()
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ''
+        if value.is_integer():
+            # Excel zapisuje PLU/EAN jako liczby - bez końcówki ".0"
+            return str(int(value))
+    return str(value).strip()
+
+
+def build_frame(rows: List[Tuple[int, Sequence]], mapping: Dict[str, int]) -> pd.DataFrame:
+    """Buduje ramkę porcji z kolumnami pól importu i numerem wiersza jako indeksem."""
+
+    import pandas as pd
+
+    data = {
+        field_name: [values[index] if index < len(values) else None for _, values in rows]
+        for field_name, index in mapping.items()
+    }
+    frame = pd.DataFrame(data, index=[number for number, _ in rows], dtype=object)
+    for field_name in TEXT_FIELDS:
+        if field_name in frame:
+            frame[field_name] = frame[field_name].map(_cell_text)
+        else:
+            frame[field_name] = ''
+    if 'stock' in frame:
+        stock_text = frame['stock'].map(_cell_text).str.replace(',', '.', regex=False)
+        frame['stock_value'] = pd.to_numeric(stock_text, errors='coerce')
+        frame['stock_invalid'] = (stock_text != '') & frame['stock_value'].isna()
+    else:
+        frame['stock_value'] = float('nan')
+        frame['stock_invalid'] = False
+    frame['unit'] = frame['unit'].where(frame['unit'] != '', 'szt')
+    return frame
+
+
+def validate_frame(frame: pd.DataFrame) -> List[RowError]:
+    """Zwraca błędy walidacji porcji; sprawdzenia działają na całych kolumnach."""
+
+    checks = [
+        (frame['code'] == '', 'code', 'Brak symbolu produktu'),
+        (frame['name'] == '', 'name', 'Brak nazwy produktu'),
+        (frame['code'].str.len() > PRODUCT_CODE_MAX_LENGTH, 'code',
+         f'Symbol dłuższy niż {PRODUCT_CODE_MAX_LENGTH} znaków'),
+        (frame['name'].str.len() > PRODUCT_NAME_MAX_LENGTH, 'name',
+         f'Nazwa dłuższa niż {PRODUCT_NAME_MAX_LENGTH} znaków'),
+        (frame['unit'].str.len() > PRODUCT_UNIT_MAX_LENGTH, 'unit',
+         f'Jednostka dłuższa niż {PRODUCT_UNIT_MAX_LENGTH} znaków'),
+        (frame['stock_invalid'].astype(bool), 'stock', 'Stan nie jest liczbą'),
+        (frame['stock_value'].abs() >= float(STOCK_MAX), 'stock', 'Stan poza zakresem'),
+    ]
+    errors = []
+    for mask, column, message in checks:
+        for row in frame.index[mask]:
+            errors.append(RowError(row, column, str(frame.at[row, column]), message))
+    return errors
+
+
+class ProductImporter:
+    """Import porcjami; ``update=False`` pomija produkty już istniejące w bazie."""
+
+    def __init__(self, *, update: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False):
+        self.update = update
+        self.chunk_size = max(chunk_size, 1)
+        self.dry_run = dry_run
+        self.seen_codes: Dict[str, int] = {}
+
+    def run(self, path: str, *, progress=None, encoding: str = 'utf-8-sig') -> ImportResult:
+        mapping, rows = iter_rows(path, encoding=encoding)
+        result = ImportResult()
+        for chunk in _chunks(rows, self.chunk_size):
+            with transaction.atomic():
+                self.import_chunk(build_frame(chunk, mapping), mapping, result)
+                if self.dry_run:
+                    transaction.set_rollback(True)
+            if progress:
+                progress(result)
+
+        if not self.dry_run and (result.codes_created or result.created or result.updated):
+            # Indeks kandydatów przechowuje też symbol i nazwę produktu
+            from .order_candidates import bump_codes_version
+            transaction.on_commit(bump_codes_version)
+        if not self.dry_run and (result.created or result.updated):
+            # bulk_create/bulk_update nie wysyłają sygnałów - wiersze list unieważniamy tutaj
+            from .fragment_cache import bump_model_version
+            for label in ('product', 'productcode', 'productgroup'):
+                bump_model_version(label)
+        return result
+
+    def import_chunk(self, frame: pd.DataFrame, mapping: Dict[str, int], result: ImportResult) -> None:
+        result.rows += len(frame)
+        errors = validate_frame(frame)
+        # Symbol powtórzony w pliku (także w poprzednich porcjach)
+        for row, code in frame['code'].items():
+            first_row = self.seen_codes.get(code)
+            if code and first_row is not None:
+                errors.append(RowError(row, 'code', code, f'Symbol powtórzony w pliku (wiersz {first_row})'))
+            elif code:
+                self.seen_codes[code] = row
+        result.errors.extend(errors)
+
+        valid = frame.drop(index={error.row for error in errors})
+        result.skipped += len(frame) - len(valid)
+        if valid.empty:
+            return
+
+        existing = Product.objects.in_bulk(list(valid['code']), field_name='code')
+        if not self.update:
+            known = valid['code'].isin(existing.keys())
+            result.skipped += int(known.sum())
+            valid = valid[~known]
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for record in valid.to_dict('records'):
+            product = existing.get(record['code'])
+            if product is None:
+                product = Product(code=record['code'])
+                to_create.append(product)
+            else:
+                # bulk_update nie ustawia auto_now
+                product.updated_at = now
+                to_update.append(product)
+            self._apply(product, record, mapping)
+
+        update_fields = self._update_fields(mapping)
+        if to_create:
+            Product.objects.bulk_create(to_create)
+        if to_update:
+            Product.objects.bulk_update(to_update, update_fields)
+        result.created += len(to_create)
+        result.updated += len(to_update)
+
+        # bulk_create nie zwraca kluczy na każdej bazie - jedno zapytanie po zapisie
+        products = Product.objects.in_bulk(list(valid['code']), field_name='code')
+        if 'group' in mapping:
+            self._assign_groups(valid, products, result)
+        self._create_codes(valid, products, result)
+
+    def _apply(self, product: Product, record: dict, mapping: Dict[str, int]) -> None:
+        product.name = record['name']
+        if 'description' in mapping:
+            product.description = record['description']
+        if 'unit' in mapping or product.pk is None:
+            product.unit = record['unit']
+        stock_value = record['stock_value']
+        if 'stock' in mapping and stock_value == stock_value:  # NaN - brak stanu
+            product.subiekt_stock = Decimal(str(stock_value)).quantize(Decimal('0.01'))
+        plu = record['plu']
+        if plu.isdigit() and int(plu) <= SUBIEKT_ID_MAX:
+            product.subiekt_id = int(plu)
+
+    @staticmethod
+    def _update_fields(mapping: Dict[str, int]) -> List[str]:
+        fields = ['name', 'updated_at']
+        for field_name, model_field in (('description', 'description'), ('unit', 'unit'),
+                                        ('stock', 'subiekt_stock'), ('plu', 'subiekt_id')):
+            if field_name in mapping:
+                fields.append(model_field)
+        return fields
+
+    def _assign_groups(self, valid: pd.DataFrame, products: Dict[str, Product], result: ImportResult) -> None:
+        names = set(valid['group']) - {''}
+        if not names:
+            return
+
+        groups = {}
+        for group in ProductGroup.objects.filter(name__in=names).order_by('id'):
+            groups.setdefault(group.name, group)
+
+        missing = sorted(names - groups.keys())
+        if missing:
+            used_codes = set(ProductGroup.objects.filter(
+                code__in=[name.upper()[:GROUP_CODE_MAX_LENGTH] for name in missing]
+            ).values_list('code', flat=True))
+            new_groups = []
+            for name in missing:
+                code = base = name.upper()[:GROUP_CODE_MAX_LENGTH]
+                counter = 1
+                while code in used_codes:
+                    suffix = f'-{counter}'
+                    code = base[:GROUP_CODE_MAX_LENGTH - len(suffix)] + suffix
+                    counter += 1
+                used_codes.add(code)
+                new_groups.append(ProductGroup(
+                    name=name,
+                    code=code,
+                    description=f'Grupa produktów: {name}',
+                    color='#6c757d',
+                ))
+            ProductGroup.objects.bulk_create(new_groups)
+            result.groups_created += len(new_groups)
+            for group in ProductGroup.objects.filter(name__in=missing).order_by('id'):
+                groups.setdefault(group.name, group)
+
+        through = Product.groups.through
+        links = [
+            through(product_id=products[code].pk, productgroup_id=groups[name].pk)
+            for code, name in zip(valid['code'], valid['group'])
+            if name and code in products and name in groups
+        ]
+        through.objects.bulk_create(links, ignore_conflicts=True)
+
+    def _create_codes(self, valid: pd.DataFrame, products: Dict[str, Product], result: ImportResult) -> None:
+        wanted = []
+        for row, code, plu, barcode in valid[['code', 'plu', 'barcode']].itertuples():
+            product = products.get(code)
+            if product is None:
+                continue
+            for column, value in (('plu', plu), ('barcode', barcode)):
+                if value and value != code:
+                    wanted.append((row, column, value, product))
+        if not wanted:
+            return
+
+        assigned = dict(
+            ProductCode.objects.filter(code__in={value for _, _, value, _ in wanted})
+            .values_list('code', 'product_id')
+        )
+        new_codes = []
+        for row, column, value, product in wanted:
+            owner = assigned.get(value)
+            if owner is None:
+                assigned[value] = product.pk
+                new_codes.append(ProductCode(
+                    product=product,
+                    code=value,
+                    code_type='barcode',
+                    description='PLU z importu' if column == 'plu' else 'Kod z importu',
+                ))
+            elif owner != product.pk:
+                result.errors.append(RowError(row, column, value, 'Kod przypisany do innego produktu'))
+        ProductCode.objects.bulk_create(new_codes)
+        result.codes_created += len(new_codes)
+
+
+def import_products(path: str, **options) -> ImportResult:
+    progress = options.pop('progress', None)
+    encoding = options.pop('encoding', 'utf-8-sig')
+    return ProductImporter(**options).run(path, progress=progress, encoding=encoding)
+
+
+def write_error_report(errors: Iterable[RowError], handle) -> None:
+    """Zapisuje raport błędów jako CSV (średnik, jak eksporty dla Excela)."""
+
+    writer = csv.writer(handle, delimiter=';')
+    writer.writerow(['wiersz', 'kolumna', 'wartość', 'błąd'])
+    for error in sorted(errors, key=lambda error: error.row):
+        writer.writerow([error.row, error.column, error.value, error.message])
+
@@ -0,0 +1,197 @@
+"""
+Zbiorcza synchronizacja produktów WMS z Subiektem.
+
+Produkty (zaznaczone na liście, cały wynik filtra albo zaznaczone w adminie)
+są przetwarzane porcjami po ``chunk_size``. Dla każdej porcji:
+
+- dane z Subiekta pobiera jedno zapytanie ``WHERE tw_Id IN (...)``,
+- grupy są rozwiązywane jednym zapytaniem, brakujące tworzone przez
+  ``bulk_create``,
+- produkty zapisuje jeden ``bulk_update``, a przypisania do grup jeden
+  ``bulk_create`` tabeli pośredniej - wszystko w jednej transakcji.
+
+``iter_sync_products`` zwraca wynik po każdej porcji, więc widok listy
+produktów może strumieniować postęp do przeglądarki.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import fragment_cache, order_candidates
+from .models import Product, ProductGroup
+from .product_cleanup import _id_batches
+
+# SQL Server przyjmuje do 2100 parametrów w jednym zapytaniu
+DEFAULT_CHUNK_SIZE = 500
+
+SYNC_FIELDS = ['code', 'name', 'description', 'subiekt_stock', 'subiekt_stock_reserved', 'last_sync_date', 'updated_at']
+GROUP_CODE_MAX_LENGTH = ProductGroup._meta.get_field('code').max_length
+
+
+@dataclass
+class ProductSyncResult:
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    groups_created: int = 0
+    batches: int = 0
+    # subiekt_id produktów, których nie ma już w Subiekcie
+    missing: List[int] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def percent(self) -> int:
+        if not self.total:
+            return 100
+        return int(self.processed * 100 / self.total)
+
+    def as_dict(self) -> dict:
+        return {
+            'total': self.total,
+            'processed': self.processed,
+            'percent': self.percent,
+            'updated': self.updated,
+            'groups_created': self.groups_created,
+            'missing': len(self.missing),
+            'errors': len(self.errors),
+        }
+
+
+def iter_sync_products(queryset: QuerySet, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[ProductSyncResult]:
+    """
+    Synchronizuje produkty z ``queryset`` powiązane z Subiektem; po każdej
+    porcji zwraca bieżący (ten sam) obiekt wyniku. Błąd porcji jest
+    zapisywany w ``errors`` i nie przerywa kolejnych.
+    """
+
+    queryset = queryset.filter(subiekt_id__isnull=False).order_by('pk')
+    result = ProductSyncResult(total=queryset.count())
+    for ids in _id_batches(queryset, max(chunk_size, 1)):
+        try:
+            with transaction.atomic():
+                _sync_chunk(ids, result)
+        except Exception as exc:
+            result.errors.append(f'Partia {ids[0]}-{ids[-1]}: {exc}')
+        result.processed += len(ids)
+        result.batches += 1
+        yield result
+
+
+def sync_products(
+    queryset: QuerySet,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[ProductSyncResult], None]] = None,
+) -> ProductSyncResult:
+    result = ProductSyncResult(total=0)
+    for result in iter_sync_products(queryset, chunk_size=chunk_size):
+        if progress:
+            progress(result)
+    return result
+
+
+def _sync_chunk(ids: List[int], result: ProductSyncResult) -> None:
+    from subiekt.models import tw_Towar
+
+    products = list(Product.objects.filter(pk__in=ids).only('pk', 'subiekt_id', *SYNC_FIELDS))
+    subiekt_products = {
+        subiekt_product.tw_Id: subiekt_product
+        for subiekt_product in tw_Towar.subiekt_objects.get_products_by_ids(
+            sorted({product.subiekt_id for product in products})
+        )
+    }
+
+    # Symbol jest unikalny - kolizja z produktem spoza porcji wycofałaby całą porcję
+    taken_codes = set(
+        Product.objects.filter(code__in=[item.tw_Symbol for item in subiekt_products.values()])
+        .exclude(pk__in=ids)
+        .values_list('code', flat=True)
+    )
+
+    now = timezone.now()
+    to_update = []
+    group_names = {}
+    for product in products:
+        subiekt_product = subiekt_products.get(product.subiekt_id)
+        if subiekt_product is None:
+            result.missing.append(product.subiekt_id)
+            continue
+        if subiekt_product.tw_Symbol in taken_codes:
+            result.errors.append(
+                f'{product.code}: symbol {subiekt_product.tw_Symbol} z Subiektu ma już inny produkt'
+            )
+            continue
+        taken_codes.add(subiekt_product.tw_Symbol)
+        product.code = subiekt_product.tw_Symbol
+        product.name = subiekt_product.tw_Nazwa
+        product.description = subiekt_product.tw_Opis or ''
+        product.subiekt_stock = Decimal(str(getattr(subiekt_product, 'st_Stan', 0)))
+        product.subiekt_stock_reserved = Decimal(str(getattr(subiekt_product, 'st_StanRez', 0)))
+        product.last_sync_date = now
+        # bulk_update nie ustawia auto_now
+        product.updated_at = now
+        to_update.append(product)
+        if getattr(subiekt_product, 'grt_Nazwa', ''):
+            group_names[product.pk] = subiekt_product.grt_Nazwa
+
+    Product.objects.bulk_update(to_update, SYNC_FIELDS)
+    result.updated += len(to_update)
+    if group_names:
+        _assign_groups(group_names, result)
+
+    # bulk_update/bulk_create nie wysyłają sygnałów - wiersze list i indeks kandydatów
+    # (symbol i nazwa produktu przy skanowaniu) unieważniamy tutaj
+    for label in ('product', 'productgroup'):
+        fragment_cache.invalidate_rows(label)
+    if to_update:
+        transaction.on_commit(order_candidates.bump_codes_version)
+
+
+def _assign_groups(group_names: Dict[int, str], result: ProductSyncResult) -> None:
+    """Dodaje produkty do grup z Subiektu (brakujące grupy tworzy), nie usuwa innych przypisań."""
+
+    names = set(group_names.values())
+    groups = {}
+    for group in ProductGroup.objects.filter(name__in=names).order_by('id'):
+        groups.setdefault(group.name, group)
+
+    missing = sorted(names - groups.keys())
+    if missing:
+        used_codes = set(ProductGroup.objects.filter(
+            code__in=[name[:GROUP_CODE_MAX_LENGTH] for name in missing]
+        ).values_list('code', flat=True))
+        new_groups = []
+        for name in missing:
+            code = base = name[:GROUP_CODE_MAX_LENGTH]
+            counter = 1
+            while code in used_codes:
+                suffix = f'-{counter}'
+                code = base[:GROUP_CODE_MAX_LENGTH - len(suffix)] + suffix
+                counter += 1
+            used_codes.add(code)
+            new_groups.append(ProductGroup(
+                name=name,
+                code=code,
+                description=f'Grupa z Subiektu: {name}',
+                color='#007bff',
+            ))
+        ProductGroup.objects.bulk_create(new_groups)
+        result.groups_created += len(new_groups)
+        for group in ProductGroup.objects.filter(name__in=missing).order_by('id'):
+            groups.setdefault(group.name, group)
+
+    through = Product.groups.through
+    through.objects.bulk_create(
+        [
+            through(product_id=product_id, productgroup_id=groups[name].pk)
+            for product_id, name in group_names.items()
+        ],
+        ignore_conflicts=True,
+    )
@@ -0,0 +1,230 @@
+"""
+Podpowiedzi lokalizacji odkładczych (putaway) dla regalacji.
+
+Ranking kandydatów opiera się na indeksie ``LocationOccupancy`` utrzymywanym
+przez sygnały zapisu ``Stock`` - pojedyncza podpowiedź czyta gotowe wartości
+z indeksu zamiast agregować całą tabelę stanów.
+
+Kolejność kryteriów:
+1. lokalizacje, w których ten sam produkt już leży,
+2. lokalizacje, w których zmieści się pozostała ilość,
+3. odległość w układzie buildera magazynu (``wms_builder``),
+4. ilość wolnego miejsca.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+
+from .models import Location, LocationOccupancy, Stock
+
+PUTAWAY_LOCATION_TYPES = ('shelf', 'rack')
+MAX_PUTAWAY_CANDIDATES = 500
+
+# (id magazynu, x, y) - środek elementu buildera w układzie magazynu
+Position = Tuple[int, float, float]
+
+
+@dataclass(slots=True)
+class PutawaySuggestion:
+    location: Location
+    same_product: bool
+    stocked_quantity: Decimal
+    free_capacity: Optional[Decimal]
+    distance: Optional[float]
+
+    @property
+    def fits(self) -> bool:
+        return self.free_capacity is None or self.free_capacity > 0
+
+
+def refresh_location_occupancy(location_id) -> Optional[LocationOccupancy]:
+    """Przelicza wpis indeksu zajętości dla jednej lokalizacji."""
+
+    if not location_id:
+        return None
+
+    totals = Stock.objects.filter(location_id=location_id, quantity__gt=0).aggregate(
+        total=Sum('quantity'),
+        skus=Count('product_id', distinct=True),
+    )
+    if not totals['skus']:
+        # Pusta lokalizacja nie potrzebuje wpisu - brak wiersza oznacza zero
+        LocationOccupancy.objects.filter(location_id=location_id).delete()
+        return None
+
+    occupancy, _ = LocationOccupancy.objects.update_or_create(
+        location_id=location_id,
+        defaults={
+            'total_quantity': totals['total'] or Decimal('0'),
+            'sku_count': totals['skus'],
+        },
+    )
+    return occupancy
+
+
+@transaction.atomic
+def rebuild_location_occupancy() -> int:
+    """Odbudowuje cały indeks zajętości jednym zapytaniem grupującym."""
+
+    rows = (
+        Stock.objects.filter(quantity__gt=0)
+        .values('location_id')
+        .annotate(total=Sum('quantity'), skus=Count('product_id', distinct=True))
+    )
+    entries = [
+        LocationOccupancy(
+            location_id=row['location_id'],
+            total_quantity=row['total'] or Decimal('0'),
+            sku_count=row['skus'],
+        )
+        for row in rows
+    ]
+    LocationOccupancy.objects.all().delete()
+    LocationOccupancy.objects.bulk_create(entries, batch_size=500)
+    return len(entries)
+
+
+def _builder_relations() -> List[str]:
+    if not apps.is_installed('wms_builder'):
+        return []
+    return ['warehouse_shelf__rack__zone', 'warehouse_rack__zone', 'warehouse_zone']
+
+
+def _related_or_none(obj, attr):
+    try:
+        return getattr(obj, attr)
+    except ObjectDoesNotExist:
+        return None
+
+
+def location_position(location) -> Optional[Position]:
+    """Zwraca środek lokalizacji w układzie buildera albo None."""
+
+    shelf = _related_or_none(location, 'warehouse_shelf')
+    if shelf is not None:
+        rack = shelf.rack
+        zone = rack.zone
+        return (
+            zone.warehouse_id,
+            float(zone.x + rack.x + shelf.x + shelf.width / 2),
+            float(zone.y + rack.y + shelf.y + shelf.height / 2),
+        )
+
+    rack = _related_or_none(location, 'warehouse_rack')
+    if rack is not None:
+        zone = rack.zone
+        return (
+            zone.warehouse_id,
+            float(zone.x + rack.x + rack.width / 2),
+            float(zone.y + rack.y + rack.height / 2),
+        )
+
+    zone = _related_or_none(location, 'warehouse_zone')
+    if zone is not None:
+        return (
+            zone.warehouse_id,
+            float(zone.x + zone.width / 2),
+            float(zone.y + zone.height / 2),
+        )
+    return None
+
+
+def _centroid(positions: List[Position]) -> Optional[Position]:
+    """Środek ciężkości pozycji z najczęściej występującego magazynu."""
+
+    if not positions:
+        return None
+    by_warehouse: Dict[int, List[Position]] = {}
+    for position in positions:
+        by_warehouse.setdefault(position[0], []).append(position)
+    warehouse_id, group = max(by_warehouse.items(), key=lambda entry: len(entry[1]))
+    return (
+        warehouse_id,
+        sum(p[1] for p in group) / len(group),
+        sum(p[2] for p in group) / len(group),
+    )
+
+
+def _distance(origin: Optional[Position], position: Optional[Position]) -> Optional[float]:
+    if origin is None or position is None:
+        return None
+    if origin[0] != position[0]:
+        return math.inf
+    return math.hypot(origin[1] - position[1], origin[2] - position[2])
+
+
+def suggest_putaway_locations(receiving_item, *, origin=None, limit: int = 5) -> List[PutawaySuggestion]:
+    """
+    Zwraca listę najlepszych lokalizacji dla pozycji regalacji.
+
+    ``origin`` to opcjonalna lokalizacja odniesienia (np. aktualnie wybrana
+    przez operatora), używana do liczenia odległości, gdy produkt nie leży
+    jeszcze nigdzie w magazynie.
+    """
+
+    remaining = (receiving_item.quantity_ordered or Decimal('0')) - (receiving_item.quantity_received or Decimal('0'))
+    needed = max(remaining, Decimal('0'))
+
+    stocked = dict(
+        Stock.objects.filter(
+            product_id=receiving_item.product_id,
+            quantity__gt=0,
+            location__is_active=True,
+        ).values_list('location_id', 'quantity')
+    )
+
+    has_active_children = Location.objects.filter(parent=OuterRef('pk'), is_active=True)
+    candidates = (
+        Location.objects.filter(is_active=True, location_type__in=PUTAWAY_LOCATION_TYPES)
+        .exclude(Exists(has_active_children))
+        .select_related('occupancy', *_builder_relations())
+        .order_by('occupancy__total_quantity', 'name')
+    )
+    candidate_list = list(candidates[:MAX_PUTAWAY_CANDIDATES])
+    # Lokalizacje z tym samym produktem zawsze biorą udział w rankingu
+    missing_ids = set(stocked).difference(loc.id for loc in candidate_list)
+    if missing_ids:
+        candidate_list.extend(candidates.filter(id__in=missing_ids))
+
+    positions = {loc.id: location_position(loc) for loc in candidate_list}
+    reference = _centroid([positions[loc_id] for loc_id in stocked if positions.get(loc_id)])
+    if reference is None and origin is not None:
+        reference = positions.get(origin.id) if origin.id in positions else location_position(origin)
+
+    suggestions = []
+    for location in candidate_list:
+        occupancy = _related_or_none(location, 'occupancy')
+        if location.capacity is None:
+            free_capacity = None
+        elif occupancy is not None:
+            free_capacity = occupancy.free_capacity(location.capacity)
+        else:
+            free_capacity = location.capacity
+        same_product = location.id in stocked
+        if free_capacity is not None and free_capacity <= 0 and not same_product:
+            continue
+        suggestions.append(PutawaySuggestion(
+            location=location,
+            same_product=same_product,
+            stocked_quantity=stocked.get(location.id, Decimal('0')),
+            free_capacity=free_capacity,
+            distance=_distance(reference, positions.get(location.id)),
+        ))
+
+    def _rank(suggestion: PutawaySuggestion):
+        fits_needed = suggestion.free_capacity is None or suggestion.free_capacity >= needed
+        distance = suggestion.distance if suggestion.distance is not None else math.inf
+        free = suggestion.free_capacity if suggestion.free_capacity is not None else Decimal('Infinity')
+        return (not suggestion.same_product, not fits_needed, distance, -free, suggestion.location.name)
+
+    suggestions.sort(key=_rank)
+    return suggestions[:limit]
@@ -0,0 +1,210 @@
+"""
+Uzgodnienie stanów WMS z Subiektem dla całego katalogu naraz.
+
+Zamiast liczyć ``Product.stock_difference`` produkt po produkcie, pobierane
+są dwie migawki jako tablice:
+
+- stany Subiekta z ``tw_Stan`` dla ``SUBIEKT_MAGAZYN_ID`` (jedno zapytanie),
+- sumy ``Stock`` per produkt w WMS, z wariantami zsumowanymi do produktu
+  nadrzędnego (jak ``Product.total_stock``).
+
+Różnice liczone są w pandas/NumPy (importowanych dopiero przy uzgodnieniu,
+żeby nie spowalniać startu workerów), a rozbieżności zapisywane jako raport
+``StockReconciliation`` z pozycjami ``StockReconciliationLine``. Komenda
+``reconcile_subiekt_stock`` pozwala uruchamiać uzgodnienie z crona.
+"""
+
+from __future__ import annotations
+
+import time
+from decimal import Decimal
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Product, Stock, StockReconciliation, StockReconciliationLine
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Ta sama tolerancja co Product.needs_sync
+TOLERANCE = 0.01
+
+STATUS_OK = 'ok'
+STATUS_DIFFERENCE = 'difference'
+STATUS_MISSING_IN_WMS = 'missing_in_wms'
+STATUS_MISSING_IN_SUBIEKT = 'missing_in_subiekt'
+
+LINE_COLUMNS = [
+    'product_id', 'subiekt_id', 'code', 'name',
+    'wms_quantity', 'subiekt_quantity', 'subiekt_reserved', 'difference', 'status',
+]
+
+
+def subiekt_frame(rows: Iterable[tuple]) -> pd.DataFrame:
+    """Migawka Subiekta: ``subiekt_id``, stany oraz symbol i nazwa towaru."""
+
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(
+        list(rows), columns=['subiekt_id', 'subiekt_quantity', 'subiekt_reserved', 'subiekt_code', 'subiekt_name']
+    )
+    frame['subiekt_id'] = frame['subiekt_id'].astype('int64')
+    for column in ('subiekt_quantity', 'subiekt_reserved'):
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0).astype('float64')
+    return frame.drop_duplicates('subiekt_id')
+
+
+def wms_frame() -> pd.DataFrame:
+    """Produkty główne WMS ze stanem zsumowanym razem z wariantami."""
+
+    import pandas as pd
+
+    products = pd.DataFrame.from_records(
+        list(Product.objects.values_list('id', 'parent_id', 'code', 'name', 'subiekt_id')),
+        columns=['product_id', 'parent_id', 'code', 'name', 'subiekt_id'],
+    )
+    stock = pd.DataFrame.from_records(
+        list(
+            Stock.objects.order_by()
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        ),
+        columns=['product_id', 'wms_quantity'],
+    )
+    stock['wms_quantity'] = pd.to_numeric(stock['wms_quantity'], errors='coerce').fillna(0.0).astype('float64')
+
+    # Wariant -> produkt nadrzędny
+    root_of = products['parent_id'].fillna(products['product_id']).astype('int64')
+    root_by_product = pd.Series(root_of.to_numpy(), index=products['product_id'].to_numpy())
+    stock['root_id'] = stock['product_id'].map(root_by_product)
+    totals = stock.groupby('root_id')['wms_quantity'].sum()
+
+    roots = products[products['parent_id'].isna()].drop(columns='parent_id').copy()
+    roots['wms_quantity'] = roots['product_id'].map(totals).fillna(0.0).astype('float64')
+    roots['subiekt_id'] = roots['subiekt_id'].astype('Int64')
+    return roots
+
+
+def compare(wms: pd.DataFrame, subiekt: pd.DataFrame, *, tolerance: float = TOLERANCE) -> pd.DataFrame:
+    """
+    Zestawia obie migawki i nadaje status każdej pozycji.
+
+    Zwraca ramkę z kolumnami ``LINE_COLUMNS`` dla wszystkich sprawdzonych
+    pozycji (także zgodnych - status ``ok``).
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    linked = wms[wms['subiekt_id'].notna()].copy()
+    linked['subiekt_id'] = linked['subiekt_id'].astype('int64')
+    merged = linked.merge(subiekt, on='subiekt_id', how='outer', indicator=True)
+    merged[['wms_quantity', 'subiekt_quantity', 'subiekt_reserved']] = (
+        merged[['wms_quantity', 'subiekt_quantity', 'subiekt_reserved']].fillna(0.0)
+    )
+    merged['difference'] = merged['wms_quantity'] - merged['subiekt_quantity']
+
+    differs = merged['difference'].abs().to_numpy() > tolerance
+    only_subiekt = (merged['_merge'] == 'right_only').to_numpy()
+    merged['status'] = np.select(
+        [only_subiekt & differs, differs],
+        [STATUS_MISSING_IN_WMS, STATUS_DIFFERENCE],
+        default=STATUS_OK,
+    )
+
+    # Produkty ze stanem w WMS, ale bez PLU Subiekta
+    unlinked = wms[wms['subiekt_id'].isna()].copy()
+    unlinked['subiekt_quantity'] = 0.0
+    unlinked['subiekt_reserved'] = 0.0
+    unlinked['difference'] = unlinked['wms_quantity']
+    unlinked['status'] = np.where(
+        unlinked['wms_quantity'].abs().to_numpy() > tolerance, STATUS_MISSING_IN_SUBIEKT, STATUS_OK
+    )
+
+    # Towary tylko w Subiekcie opisujemy symbolem i nazwą z Subiekta
+    merged['code'] = merged['code'].fillna(merged['subiekt_code'])
+    merged['name'] = merged['name'].fillna(merged['subiekt_name'])
+
+    result = pd.concat([merged.drop(columns='_merge'), unlinked], ignore_index=True)
+    result[['code', 'name']] = result[['code', 'name']].fillna('')
+    return result[LINE_COLUMNS]
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(round(float(value), 2)))
+
+
+def _optional_int(value) -> Optional[int]:
+    import pandas as pd
+
+    return None if pd.isna(value) else int(value)
+
+
+def run_reconciliation(
+    *,
+    user=None,
+    mag_id: Optional[int] = None,
+    subiekt_rows: Optional[Iterable[tuple]] = None,
+) -> StockReconciliation:
+    """
+    Wykonuje pełne uzgodnienie i zapisuje raport z rozbieżnościami.
+
+    ``subiekt_rows`` pozwala podać gotową migawkę w formacie
+    ``SubiektManager.get_stock_snapshot``;
+    domyślnie jest pobierana z bazy Subiekta.
+    """
+
+    started = time.monotonic()
+    if mag_id is None:
+        mag_id = getattr(settings, 'SUBIEKT_MAGAZYN_ID', 2)
+    if subiekt_rows is None:
+        from subiekt.models import tw_Towar
+        subiekt_rows = tw_Towar.subiekt_objects.get_stock_snapshot(mag_id)
+
+    lines = compare(wms_frame(), subiekt_frame(subiekt_rows))
+    discrepancies = lines[lines['status'] != STATUS_OK]
+
+    with transaction.atomic():
+        report = StockReconciliation.objects.create(
+            created_by=user if user is not None and user.is_authenticated else None,
+            magazyn_id=mag_id,
+            products_checked=len(lines),
+            discrepancies_count=len(discrepancies),
+            total_abs_difference=_decimal(discrepancies['difference'].abs().sum()),
+        )
+        StockReconciliationLine.objects.bulk_create(
+            (
+                StockReconciliationLine(
+                    reconciliation=report,
+                    product_id=_optional_int(row.product_id),
+                    subiekt_id=_optional_int(row.subiekt_id),
+                    code=row.code[:50],
+                    name=row.name[:200],
+                    wms_quantity=_decimal(row.wms_quantity),
+                    subiekt_quantity=_decimal(row.subiekt_quantity),
+                    subiekt_reserved=_decimal(row.subiekt_reserved),
+                    difference=_decimal(row.difference),
+                    status=row.status,
+                )
+                for row in discrepancies.itertuples(index=False)
+            ),
+            batch_size=1000,
+        )
+        report.duration_ms = int((time.monotonic() - started) * 1000)
+        report.save(update_fields=['duration_ms'])
+    return report
+
+
+def prune_reports(keep: int) -> int:
+    """Usuwa starsze raporty (z pozycjami), zostawiając ``keep`` najnowszych."""
+
+    stale_ids = list(
+        StockReconciliation.objects.order_by('-created_at', '-id').values_list('id', flat=True)[keep:]
+    )
+    if stale_ids:
+        StockReconciliation.objects.filter(id__in=stale_ids).delete()
+    return len(stale_ids)
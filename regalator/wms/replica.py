@@ -0,0 +1,127 @@
+"""
+Odczyt list, raportów i eksportów z repliki bazy danych.
+
+Widoki oznaczone ``@read_from_replica`` czytają z aliasu
+``settings.WMS_READ_REPLICA`` (np. ``replica``), o ile jest on skonfigurowany
+w ``DATABASES``; zapisy zawsze idą do ``default`` (``wms.routers.ReplicaRouter``).
+
+Read-your-writes: ``ReplicaStickinessMiddleware`` zapamiętuje w cache, że
+użytkownik zapisał coś do bazy, i przez ``WMS_REPLICA_STICKY_SECONDS`` sekund
+jego odczyty idą do ``default`` - lista pokazana zaraz po skanie nie trafi na
+replikę, która jeszcze nie dogoniła mastera.
+
+Lokalnie: dwa pliki SQLite (``DB_REPLICA_NAME`` wskazuje kopię
+``db.sqlite3``) albo dwie instancje MySQL (``DB_REPLICA_HOST``/``DB_REPLICA_PORT``).
+"""
+
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_STICKY_SECONDS = 5
+STICKY_KEY = 'wms:replica:sticky:{user_id}'
+
+_WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_use_replica = contextvars.ContextVar('wms_use_replica', default=False)
+
+
+def replica_alias() -> Optional[str]:
+    """Alias repliki albo ``None``, gdy replika nie jest skonfigurowana."""
+
+    alias = getattr(settings, 'WMS_READ_REPLICA', '')
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def sticky_seconds() -> int:
+    return getattr(settings, 'WMS_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+def replica_active() -> bool:
+    return _use_replica.get()
+
+
+@contextmanager
+def use_replica():
+    """Odczyty wewnątrz bloku (poza transakcją) idą do repliki."""
+
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def mark_write(user) -> None:
+    if user is not None and user.is_authenticated:
+        cache.set(STICKY_KEY.format(user_id=user.pk), 1, sticky_seconds())
+
+
+def is_sticky(user) -> bool:
+    if user is None or not user.is_authenticated:
+        return False
+    return bool(cache.get(STICKY_KEY.format(user_id=user.pk)))
+
+
+def _stream_from_replica(content):
+    with use_replica():
+        yield from content
+
+
+def read_from_replica(view_func):
+    """
+    Dekorator widoku tylko do odczytu - zapytania idą do repliki.
+
+    Nie działa dla żądań modyfikujących i dla użytkownika, który przed chwilą
+    coś zapisał. Odpowiedź strumieniowa czyta z repliki także w trakcie
+    wysyłania.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if (
+            replica_alias() is None
+            or request.method not in ('GET', 'HEAD')
+            or is_sticky(getattr(request, 'user', None))
+        ):
+            return view_func(request, *args, **kwargs)
+
+        with use_replica():
+            response = view_func(request, *args, **kwargs)
+        if getattr(response, 'streaming', False):
+            response.streaming_content = _stream_from_replica(response.streaming_content)
+        return response
+
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """Oznacza użytkownika, którego żądanie zapisało coś do ``default``."""
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote = False
+
+        def detect_write(execute, sql, params, many, context):
+            nonlocal wrote
+            if not wrote and sql.lstrip().upper().startswith(_WRITE_PREFIXES):
+                wrote = True
+            return execute(sql, params, many, context)
+
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(detect_write):
+            response = self.get_response(request)
+        if wrote:
+            mark_write(getattr(request, 'user', None))
+        return response
@@ -0,0 +1,33 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .replica import replica_active, replica_alias
+
+
+class ReplicaRouter:
+    """
+    Router kierujący odczyty widoków ``@read_from_replica`` do repliki.
+    Zapisy zawsze trafiają do 'default' - także dla obiektów wczytanych z repliki.
+    Modele Subiekta obsługuje SubiektRouter (musi być przed tym routerem).
+    """
+
+    def db_for_read(self, model, **hints):
+        """Replika tylko w aktywnym kontekście i poza transakcją na 'default'."""
+        if model._meta.app_label == 'subiekt' or not replica_active():
+            return None
+        alias = replica_alias()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        """Replika jest tylko do odczytu."""
+        if model._meta.app_label == 'subiekt':
+            return None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Obiekty z 'default' i repliki to te same dane."""
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -1,13 +1,21 @@
 from decimal import Decimal
 
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from django.core.signals import Signal
 from django.contrib.auth.models import User
 from django.db.models import Count, Q
 from django.utils import timezone
 
+from . import fragment_cache, live
 from .models import (
+    CustomerOrder,
+    Location,
+    LocationImage,
+    ProductCode,
+    ProductGroup,
+    ProductImage,
     Product,
     UserProfile,
     PickingOrder,
@@ -17,9 +25,13 @@ from .models import (
     ReceivingOrder,
     ReceivingItem,
     PickingHistory,
-    ReceivingHistory,
-    StockMovement,
+    Stock,
 )
+from .images import delete_derivatives, schedule_derivatives
+from .location_index import bump_location_index_version
+from .location_stats import forget_pick, record_pick
+from . import order_candidates
+from .putaway import refresh_location_occupancy
 
 # Custom signal for product updates
 product_updated = Signal()
@@ -229,42 +241,158 @@ def sync_supplier_on_receiving_item_delete(sender, instance, **kwargs):
         _sync_supplier_order_status(receiving_order.supplier_order)
 
 
-@receiver(post_save, sender=ReceivingHistory)
-def create_movement_on_receiving_history(sender, instance, created, **kwargs):
-    if not created:
-        return
+@receiver(post_save, sender=PickingHistory)
+def count_pick_on_picking_history(sender, instance, created, **kwargs):
+    if created and (instance.quantity_picked or 0) > 0:
+        record_pick(instance.location_scanned_id, instance.quantity_picked, instance.scanned_at)
 
-    quantity = instance.quantity_received or Decimal('0')
-    if quantity <= 0:
-        return
 
-    StockMovement.objects.create(
-        product=instance.product,
-        source_location=None,
-        target_location=instance.location,
-        quantity=quantity,
-        movement_type='inbound',
-        performed_by=instance.scanned_by,
-        note=f"Regalacja {instance.receiving_order.order_number}" if instance.receiving_order_id else ''
-    )
+@receiver(post_delete, sender=PickingHistory)
+def uncount_pick_on_picking_history_delete(sender, instance, **kwargs):
+    if (instance.quantity_picked or 0) > 0:
+        forget_pick(instance.location_scanned_id, instance.quantity_picked, instance.scanned_at)
 
 
-@receiver(post_save, sender=PickingHistory)
-def create_movement_on_picking_history(sender, instance, created, **kwargs):
-    if not created:
-        return
+@receiver(post_save, sender=Stock)
+def refresh_occupancy_on_stock_save(sender, instance, **kwargs):
+    refresh_location_occupancy(instance.location_id)
 
-    quantity = instance.quantity_picked or Decimal('0')
-    if quantity <= 0:
-        return
 
-    StockMovement.objects.create(
-        product=instance.product_scanned,
-        source_location=instance.location_scanned,
-        target_location=None,
-        quantity=quantity,
-        movement_type='outbound',
-        performed_by=instance.user,
-        note=f"Terminacja {instance.picking_item.picking_order.order_number}" if instance.picking_item_id else ''
-    )
+@receiver(post_delete, sender=Stock)
+def refresh_occupancy_on_stock_delete(sender, instance, **kwargs):
+    refresh_location_occupancy(instance.location_id)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_index(sender, instance, **kwargs):
+    transaction.on_commit(bump_location_index_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCode)
+@receiver(post_delete, sender=ProductCode)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductGroup)
+@receiver(post_delete, sender=ProductGroup)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=LocationImage)
+@receiver(post_delete, sender=LocationImage)
+def invalidate_row_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate_rows(sender._meta.model_name)
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def invalidate_stock_row_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate_stock_rows(instance.product_id)
+
+
+@receiver(m2m_changed, sender=Product.groups.through)
+def invalidate_row_fragments_on_groups_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        fragment_cache.invalidate_rows('productgroup')
+
+
+@receiver(post_save, sender=LocationImage)
+@receiver(post_save, sender=ProductImage)
+def generate_image_derivatives(sender, instance, **kwargs):
+    schedule_derivatives(instance)
+
+
+@receiver(post_delete, sender=LocationImage)
+@receiver(post_delete, sender=ProductImage)
+def remove_image_derivatives(sender, instance, **kwargs):
+    transaction.on_commit(lambda: delete_derivatives(instance))
+
+
+def _changes_candidate_index(created, update_fields):
+    return created or update_fields is None or not order_candidates.QUANTITY_FIELDS.issuperset(update_fields)
+
+
+@receiver(post_save, sender=PickingItem)
+def invalidate_picking_candidates(sender, instance, created, update_fields=None, **kwargs):
+    if _changes_candidate_index(created, update_fields):
+        order_id = instance.picking_order_id
+        transaction.on_commit(lambda: order_candidates.bump_order_version(order_candidates.PICKING, order_id))
+
+
+@receiver(post_save, sender=ReceivingItem)
+def invalidate_receiving_candidates(sender, instance, created, update_fields=None, **kwargs):
+    if _changes_candidate_index(created, update_fields):
+        order_id = instance.receiving_order_id
+        transaction.on_commit(lambda: order_candidates.bump_order_version(order_candidates.RECEIVING, order_id))
+
+
+@receiver(post_delete, sender=PickingItem)
+def invalidate_picking_candidates_on_delete(sender, instance, **kwargs):
+    order_id = instance.picking_order_id
+    transaction.on_commit(lambda: order_candidates.bump_order_version(order_candidates.PICKING, order_id))
+
 
+@receiver(post_delete, sender=ReceivingItem)
+def invalidate_receiving_candidates_on_delete(sender, instance, **kwargs):
+    order_id = instance.receiving_order_id
+    transaction.on_commit(lambda: order_candidates.bump_order_version(order_candidates.RECEIVING, order_id))
+
+
+@receiver(post_save, sender=ProductCode)
+@receiver(post_delete, sender=ProductCode)
+def invalidate_candidates_on_code_change(sender, instance, **kwargs):
+    transaction.on_commit(order_candidates.bump_codes_version)
+
+
+# Indeks kandydatów przechowuje symbol i nazwę produktu
+CANDIDATE_PRODUCT_FIELDS = frozenset({'code', 'name'})
+
+
+@receiver(post_save, sender=Product)
+def invalidate_candidates_on_product_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or CANDIDATE_PRODUCT_FIELDS.intersection(update_fields):
+        transaction.on_commit(order_candidates.bump_codes_version)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_candidates_on_product_delete(sender, instance, **kwargs):
+    transaction.on_commit(order_candidates.bump_codes_version)
+
+
+@receiver(post_save, sender=CustomerOrder)
+def publish_customer_order_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'status' in update_fields:
+        live.notify_customer_order(instance.id)
+
+
+@receiver(post_save, sender=SupplierOrder)
+def publish_supplier_order_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'status' in update_fields:
+        live.notify_supplier_order(instance.id)
+
+
+@receiver(post_save, sender=PickingOrder)
+@receiver(post_delete, sender=PickingOrder)
+def publish_picking_order_change(sender, instance, **kwargs):
+    live.notify_picking_order(instance.id)
+
+
+@receiver(post_save, sender=PickingItem)
+@receiver(post_delete, sender=PickingItem)
+def publish_picking_item_change(sender, instance, **kwargs):
+    if instance.picking_order_id:
+        live.notify_picking_order(instance.picking_order_id)
+
+
+@receiver(post_save, sender=ReceivingOrder)
+@receiver(post_delete, sender=ReceivingOrder)
+def publish_receiving_order_change(sender, instance, **kwargs):
+    live.notify_receiving_order(instance.id)
+
+
+@receiver(post_save, sender=ReceivingItem)
+@receiver(post_delete, sender=ReceivingItem)
+def publish_receiving_item_change(sender, instance, **kwargs):
+    if instance.receiving_order_id:
+        live.notify_receiving_order(instance.receiving_order_id)
@@ -0,0 +1,85 @@
+// Aktualizacje na żywo (Server-Sent Events)
+//
+// Strona deklaruje subskrypcje atrybutem data-live-topics="temat1,temat2".
+// Zdarzenia aktualizują elementy oznaczone:
+//   data-live-key="picking_order:12"  - kontener obiektu (pomijany dla dashboardów)
+//   data-live-field="progress"         - tekst z pola zdarzenia
+//   data-live-progress                 - szerokość paska postępu (pole "progress")
+//   data-live-status-class="status-"   - podmiana klasy statusu
+// Dodatkowo na body wywoływane jest zdarzenie "live:<temat>" dla własnych skryptów.
+(function () {
+    function collectTopics() {
+        const topics = new Set();
+        document.querySelectorAll('[data-live-topics]').forEach(function (element) {
+            (element.dataset.liveTopics || '').split(',').forEach(function (topic) {
+                topic = topic.trim();
+                if (topic) {
+                    topics.add(topic);
+                }
+            });
+        });
+        return Array.from(topics);
+    }
+
+    function applyFields(scope, data) {
+        scope.querySelectorAll('[data-live-field]').forEach(function (element) {
+            const field = element.dataset.liveField;
+            if (!(field in data)) {
+                return;
+            }
+            element.textContent = data[field];
+            const statusPrefix = element.dataset.liveStatusClass;
+            if (statusPrefix && data.status) {
+                Array.from(element.classList).forEach(function (cls) {
+                    if (cls.indexOf(statusPrefix) === 0) {
+                        element.classList.remove(cls);
+                    }
+                });
+                element.classList.add(statusPrefix + data.status);
+            }
+        });
+        if ('progress' in data) {
+            scope.querySelectorAll('[data-live-progress]').forEach(function (bar) {
+                bar.style.width = data.progress + '%';
+                bar.setAttribute('aria-valuenow', data.progress);
+                bar.dataset.progressValue = data.progress;
+            });
+        }
+    }
+
+    function handleEvent(topic, payload) {
+        const data = payload.data || {};
+        if (payload.id === null || payload.id === undefined) {
+            document.querySelectorAll('[data-live-topics]').forEach(function (scope) {
+                applyFields(scope, data);
+            });
+        } else {
+            document.querySelectorAll('[data-live-key="' + topic + ':' + payload.id + '"]').forEach(function (scope) {
+                applyFields(scope, data);
+            });
+        }
+        document.body.dispatchEvent(new CustomEvent('live:' + topic, { detail: payload }));
+    }
+
+    function connect() {
+        const topics = collectTopics();
+        if (!topics.length || typeof EventSource === 'undefined') {
+            return;
+        }
+        const scope = document.querySelector('[data-live-url]');
+        const baseUrl = scope ? scope.dataset.liveUrl : '/live/events/';
+        const source = new EventSource(baseUrl + '?topics=' + encodeURIComponent(topics.join(',')));
+        const eventNames = new Set(topics.map(function (topic) { return topic.split(':')[0]; }));
+        eventNames.forEach(function (eventName) {
+            source.addEventListener(eventName, function (event) {
+                try {
+                    handleEvent(eventName, JSON.parse(event.data));
+                } catch (error) {
+                    console.warn('Niepoprawne zdarzenie live', error);
+                }
+            });
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', connect);
+})();
@@ -0,0 +1,82 @@
+// Picker lokalizacji (LocationPickerWidget)
+//
+// Podpowiedzi są pobierane przez HTMX z htmx_locations_autocomplete, a wybór
+// zapisuje do ukrytego pola id albo nazwę lokalizacji (data-value-field).
+(function () {
+    function getParts(picker) {
+        return {
+            hidden: picker.querySelector('[data-location-picker-value]'),
+            input: picker.querySelector('input[type="text"]'),
+            suggestions: picker.querySelector('.location-picker-suggestions')
+        };
+    }
+
+    function setSuggestionsVisible(suggestions, visible) {
+        suggestions.classList.toggle('show', visible);
+        suggestions.style.display = visible ? 'block' : 'none';
+    }
+
+    function selectItem(picker, item) {
+        const parts = getParts(picker);
+        const name = item.dataset.locationName || item.textContent.trim();
+        if (picker.dataset.valueField === 'name') {
+            parts.hidden.value = name;
+            parts.input.value = name;
+        } else {
+            parts.hidden.value = item.dataset.locationId;
+            parts.input.value = item.dataset.locationBarcode ? name + ' (' + item.dataset.locationBarcode + ')' : name;
+        }
+        parts.hidden.dispatchEvent(new Event('change', { bubbles: true }));
+        setSuggestionsVisible(parts.suggestions, false);
+    }
+
+    document.addEventListener('htmx:afterSwap', function (event) {
+        const suggestions = event.target;
+        if (!suggestions.classList || !suggestions.classList.contains('location-picker-suggestions')) {
+            return;
+        }
+        setSuggestionsVisible(suggestions, suggestions.innerHTML.trim() !== '');
+    });
+
+    document.addEventListener('input', function (event) {
+        const picker = event.target.closest('[data-location-picker]');
+        if (!picker || event.target.type !== 'text') {
+            return;
+        }
+        // Wpisany tekst unieważnia poprzedni wybór; filtr po nazwie działa też na fragmencie
+        const hidden = getParts(picker).hidden;
+        hidden.value = picker.dataset.valueField === 'name' ? event.target.value : '';
+    });
+
+    document.addEventListener('keydown', function (event) {
+        const picker = event.target.closest('[data-location-picker]');
+        if (!picker || event.target.type !== 'text') {
+            return;
+        }
+        const parts = getParts(picker);
+        if (event.key === 'Escape') {
+            setSuggestionsVisible(parts.suggestions, false);
+        } else if (event.key === 'Enter' && picker.dataset.valueField !== 'name' && !parts.hidden.value) {
+            // Skaner kończy kod Enterem - wybierz najlepsze dopasowanie zamiast wysyłać pusty formularz
+            event.preventDefault();
+            const first = parts.suggestions.querySelector('.autocomplete-item');
+            if (first) {
+                selectItem(picker, first);
+            }
+        }
+    });
+
+    document.addEventListener('click', function (event) {
+        const item = event.target.closest('[data-location-picker] .autocomplete-item');
+        if (item) {
+            event.preventDefault();
+            selectItem(item.closest('[data-location-picker]'), item);
+            return;
+        }
+        document.querySelectorAll('[data-location-picker] .location-picker-suggestions.show').forEach(function (suggestions) {
+            if (!suggestions.closest('[data-location-picker]').contains(event.target)) {
+                setSuggestionsVisible(suggestions, false);
+            }
+        });
+    });
+})();
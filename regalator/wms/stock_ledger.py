@@ -0,0 +1,154 @@
+"""
+Księga stanów magazynowych - jedyne miejsce zmieniające ``Stock``.
+
+Każda zmiana to warunkowy ``UPDATE ... SET quantity = quantity + %s``
+(dla wydania z warunkiem ``quantity >= %s``, więc stan nie zejdzie poniżej
+zera nawet przy równoległych skanach) oraz wpis ``StockMovement`` w tej
+samej transakcji. Nie ma odczytu przed zapisem, więc równoległe operacje
+nie gubią swoich zmian.
+
+Zapisy przez ``update()`` nie wywołują sygnałów ``Stock`` - indeks
+``LocationOccupancy`` i wersja stanów produktu we fragmentach wierszy
+(``wms.fragment_cache``) odświeżane są tutaj, po każdej zmianie.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import fragment_cache
+from .models import Stock, StockMovement
+from .putaway import refresh_location_occupancy
+
+
+class InsufficientStock(ValueError):
+    """Wydanie większe niż stan w lokalizacji."""
+
+    def __init__(self, available):
+        self.available = available or Decimal('0')
+        super().__init__(f'Niewystarczający stan magazynowy. Dostępne: {self.available}')
+
+
+def _id(obj) -> Optional[int]:
+    return getattr(obj, 'pk', obj)
+
+
+def _stock(product_id, location_id):
+    return Stock.objects.filter(product_id=product_id, location_id=location_id)
+
+
+def _increase(product_id, location_id, quantity) -> None:
+    changes = {'quantity': F('quantity') + quantity, 'updated_at': timezone.now()}
+    if _stock(product_id, location_id).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            # bulk_create - bez sygnałów, zajętość odświeża księga
+            Stock.objects.bulk_create([Stock(product_id=product_id, location_id=location_id, quantity=quantity)])
+    except IntegrityError:
+        # Rekord utworzył równoległy zapis
+        _stock(product_id, location_id).update(**changes)
+
+
+def _decrease(product_id, location_id, quantity, *, clamp: bool, untracked_ok: bool) -> Decimal:
+    """Zmniejsza stan; zwraca ilość faktycznie zdjętą ze stanu."""
+
+    stocks = _stock(product_id, location_id)
+    changes = {'quantity': F('quantity') - quantity, 'updated_at': timezone.now()}
+    if stocks.filter(quantity__gte=quantity).update(**changes):
+        applied = quantity
+    else:
+        available = stocks.select_for_update().values_list('quantity', flat=True).first()
+        if available is None and untracked_ok:
+            # Lokalizacja bez ewidencji stanu - ruch zapisujemy, stanu nie ma czego zmniejszać
+            return quantity
+        if not clamp:
+            raise InsufficientStock(available)
+        applied = available or Decimal('0')
+        if applied:
+            stocks.update(quantity=Decimal('0'), updated_at=timezone.now())
+    # Pusty rekord bez rezerwacji nie jest potrzebny
+    stocks.filter(quantity=0, reserved_quantity=0).delete()
+    return applied
+
+
+def _stock_changed(product, *location_ids) -> None:
+    for location_id in location_ids:
+        refresh_location_occupancy(location_id)
+    # Tylko wiersze tego produktu - nie cała lista
+    fragment_cache.invalidate_stock_rows(product)
+
+
+def _movement(product_id, source_id, target_id, quantity, movement_type, user, note) -> StockMovement:
+    return StockMovement.objects.create(
+        product_id=product_id,
+        source_location_id=source_id,
+        target_location_id=target_id,
+        quantity=quantity,
+        movement_type=movement_type,
+        performed_by=user if user is not None and user.is_authenticated else None,
+        note=note[:255],
+    )
+
+
+@transaction.atomic
+def receive(product, location, quantity, *, user=None, note: str = '') -> Optional[StockMovement]:
+    """Przyjęcie ``quantity`` na lokalizację (ruch ``inbound``)."""
+
+    if quantity <= 0:
+        return None
+    product_id, location_id = _id(product), _id(location)
+    _increase(product_id, location_id, quantity)
+    movement = _movement(product_id, None, location_id, quantity, 'inbound', user, note)
+    _stock_changed(product, location_id)
+    return movement
+
+
+@transaction.atomic
+def issue(product, location, quantity, *, user=None, note: str = '', clamp: bool = False,
+          untracked_ok: bool = False) -> Optional[StockMovement]:
+    """
+    Wydanie ``quantity`` z lokalizacji (ruch ``outbound``).
+
+    Bez ``clamp`` brak wystarczającego stanu kończy się ``InsufficientStock``;
+    z ``clamp`` zdejmowane jest tyle, ile jest. ``untracked_ok`` pozwala wydać
+    z lokalizacji, która nie ma rekordu stanu.
+    """
+
+    if quantity <= 0:
+        return None
+    product_id, location_id = _id(product), _id(location)
+    applied = _decrease(product_id, location_id, quantity, clamp=clamp, untracked_ok=untracked_ok)
+    if not applied:
+        return None
+    movement = _movement(product_id, location_id, None, applied, 'outbound', user, note)
+    _stock_changed(product, location_id)
+    return movement
+
+
+@transaction.atomic
+def transfer(product, source, target, quantity, *, user=None, note: str = '') -> StockMovement:
+    """Przesunięcie między lokalizacjami (ruch ``transfer``)."""
+
+    product_id, source_id, target_id = _id(product), _id(source), _id(target)
+    _decrease(product_id, source_id, quantity, clamp=False, untracked_ok=False)
+    _increase(product_id, target_id, quantity)
+    movement = _movement(product_id, source_id, target_id, quantity, 'transfer', user, note)
+    _stock_changed(product, source_id, target_id)
+    return movement
+
+
+def adjust(product, location, delta, *, user=None, note: str = '', clamp: bool = False,
+           untracked_ok: bool = False) -> Optional[StockMovement]:
+    """Korekta o ``delta`` (dodatnia - przyjęcie, ujemna - wydanie)."""
+
+    if delta > 0:
+        return receive(product, location, delta, user=user, note=note)
+    if delta < 0:
+        return issue(product, location, -delta, user=user, note=note, clamp=clamp, untracked_ok=untracked_ok)
+    return None
@@ -0,0 +1,72 @@
+from django import template
+from django.core.cache import cache
+
+from wms import fragment_cache
+
+register = template.Library()
+
+VERSIONS_RENDER_KEY = 'wms_fragment_versions'
+
+
+class RowCacheNode(template.Node):
+    def __init__(self, nodelist, name, obj, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+        self.vary_on = vary_on
+
+    def _versions(self, context):
+        # Wersje pobierane raz na renderowanie szablonu, nie raz na wiersz
+        versions = context.render_context.get(VERSIONS_RENDER_KEY)
+        if versions is None:
+            versions = fragment_cache.model_versions(fragment_cache.VERSIONED_MODELS)
+            context.render_context[VERSIONS_RENDER_KEY] = versions
+        return versions
+
+    def _object_versions(self, name, obj):
+        # Wersje stanów są per produkt - jedno get_many na wiersz
+        keys = fragment_cache.row_object_keys(name, obj)
+        versions = {}
+        for label in {label for label, _ in keys}:
+            versions[label] = fragment_cache.object_versions(label, [pk for key_label, pk in keys if key_label == label])
+        return [versions[label].get(pk, 0) for label, pk in keys]
+
+    def render(self, context):
+        timeout = fragment_cache.fragment_timeout()
+        obj = self.obj.resolve(context)
+        if not timeout or obj is None:
+            return self.nodelist.render(context)
+
+        name = self.name.resolve(context)
+        key = fragment_cache.row_key(
+            name,
+            obj,
+            self._versions(context),
+            [var.resolve(context) for var in self.vary_on],
+            self._object_versions(name, obj),
+        )
+        content = cache.get(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, timeout)
+        return content
+
+
+@register.tag
+def cache_row(parser, token):
+    """
+    Cache wiersza listy: ``{% cache_row 'product-row' product [vary ...] %}``
+    ... ``{% endcache_row %}``. Zależności wiersza opisuje
+    ``wms.fragment_cache.ROW_DEPENDENCIES``.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' wymaga nazwy fragmentu i obiektu")
+    nodelist = parser.parse(('endcache_row',))
+    parser.delete_first_token()
+    return RowCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -0,0 +1,19 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def derivative_url(obj, spec='thumb'):
+    """
+    URL pochodnej obrazu: ``{{ photo|derivative_url:"thumb" }}`` (WebP)
+    albo ``{{ photo|derivative_url:"medium:jpeg" }}``.
+
+    Gdy pochodne nie są jeszcze wygenerowane, zwraca URL oryginału.
+    """
+    if not obj:
+        return ''
+    size, _, image_format = str(spec).partition(':')
+    if hasattr(obj, 'derivative_url'):
+        return obj.derivative_url(size, image_format or 'webp')
+    return getattr(obj, 'url', '')
@@ -1,23 +1,71 @@
+import io
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 from datetime import date
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from django.test import RequestFactory, TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 
 from confetti import services as confetti_services
+from subiekt.models import dok_Dokument, tw_Towar
 
 from .context_processors import AUTO_SAVE_REGALACJE_KEY
 from .models import (
+    CustomerOrder,
     Location,
+    LocationOccupancy,
+    LocationPickDaily,
+    OrderItem,
+    PickingHistory,
+    PickingItem,
+    PickingOrder,
     Product,
+    ProductCode,
+    ProductGroup,
+    ProductImage,
     ReceivingItem,
     ReceivingOrder,
+    Stock,
+    StockMovement,
+    StockReconciliation,
     SupplierOrder,
     SupplierOrderItem,
 )
+from . import fragment_cache, live, order_candidates, stock_ledger
+from .images import backfill_derivatives
+from . import location_index
+from .location_index import get_location_index, search_locations
+from .management.commands.profile_startup import parse_importtime
+from .documents import build_mm_document, build_pz_document, build_wz_document
+from .epp import exportable_documents, write_epp
+from .numbering import SEQUENCE_PZ, SEQUENCE_WZ, allocate_number
+from .location_stats import METRIC_PICKS, METRIC_SKUS, location_metric_values, rebuild_pick_rollup
+from .order_candidates import search_order_candidates
+from .product_import import import_products
+from .product_cleanup import delete_unused_products, unused_products
+from .product_sync import sync_products
+from .barcode_sync import SOURCE_DESCRIPTIONS, sync_barcodes
+from .putaway import rebuild_location_occupancy, suggest_putaway_locations
+from .reconciliation import run_reconciliation
+from .replica import ReplicaStickinessMiddleware, is_sticky, read_from_replica, replica_active, use_replica
+from .routers import ReplicaRouter
+from .views.picking import _apply_picking_operation
 
 
 class SettingsMenuPartialTests(TestCase):
@@ -159,6 +207,25 @@ class ReceivingFastAutoSaveTests(TestCase):
         self.assertEqual(self.receiving_item.quantity_received, Decimal('5'))
 
 
+    def test_intake_does_not_invalidate_candidate_index(self):
+        version_key = order_candidates.VERSION_KEY.format(
+            kind=order_candidates.RECEIVING, order_id=self.receiving_order.id
+        )
+        cache.set(version_key, 1, None)
+        self.client.post(self.submit_url, {'location_code': self.location.barcode}, HTTP_HX_REQUEST='true')
+
+        for mode, quantity in (('append', '2'), ('overwrite', '4')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    self.submit_url,
+                    {'receiving_item_id': str(self.receiving_item.id), 'quantity': quantity, 'mode': mode},
+                    HTTP_HX_REQUEST='true',
+                )
+
+        self.receiving_item.refresh_from_db()
+        self.assertEqual(self.receiving_item.quantity_received, Decimal('4'))
+        self.assertEqual(cache.get(version_key), 1)
+
 class SettingsPageTests(TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(
@@ -175,3 +242,1234 @@ class SettingsPageTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Automatycznie zapisuj regalacje')
         self.assertContains(response, 'hx-post')
+
+
+class PutawaySuggestionTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(code='P100', name='Produkt 100')
+        self.other_product = Product.objects.create(code='P200', name='Produkt 200')
+        self.loc_same = Location.objects.create(name='A1', location_type='shelf', barcode='A1')
+        self.loc_empty = Location.objects.create(
+            name='A2', location_type='shelf', barcode='A2', capacity=Decimal('50')
+        )
+        self.loc_full = Location.objects.create(
+            name='A3', location_type='shelf', barcode='A3', capacity=Decimal('10')
+        )
+        supplier_order = SupplierOrder.objects.create(
+            order_number='ZD-9',
+            supplier_name='Dostawca',
+            order_date=date.today(),
+            expected_delivery_date=date.today(),
+        )
+        supplier_item = SupplierOrderItem.objects.create(
+            supplier_order=supplier_order,
+            product=self.product,
+            quantity_ordered=Decimal('8'),
+        )
+        receiving_order = ReceivingOrder.objects.create(
+            order_number='REG-9', supplier_order=supplier_order
+        )
+        self.receiving_item = ReceivingItem.objects.create(
+            receiving_order=receiving_order,
+            supplier_order_item=supplier_item,
+            product=self.product,
+            quantity_ordered=Decimal('8'),
+        )
+
+    def test_stock_writes_keep_occupancy_index_updated(self):
+        stock = Stock.objects.create(
+            product=self.product, location=self.loc_same, quantity=Decimal('4')
+        )
+        occupancy = LocationOccupancy.objects.get(location=self.loc_same)
+        self.assertEqual(occupancy.total_quantity, Decimal('4'))
+        self.assertEqual(occupancy.sku_count, 1)
+
+        stock.quantity = Decimal('7')
+        stock.save()
+        occupancy.refresh_from_db()
+        self.assertEqual(occupancy.total_quantity, Decimal('7'))
+
+        stock.delete()
+        self.assertFalse(LocationOccupancy.objects.filter(location=self.loc_same).exists())
+
+    def test_rebuild_matches_incremental_index(self):
+        Stock.objects.create(product=self.product, location=self.loc_same, quantity=Decimal('3'))
+        Stock.objects.create(product=self.other_product, location=self.loc_same, quantity=Decimal('2'))
+        LocationOccupancy.objects.all().delete()
+
+        self.assertEqual(rebuild_location_occupancy(), 1)
+        occupancy = LocationOccupancy.objects.get(location=self.loc_same)
+        self.assertEqual(occupancy.total_quantity, Decimal('5'))
+        self.assertEqual(occupancy.sku_count, 2)
+
+    def test_same_product_ranked_first_and_full_locations_skipped(self):
+        Stock.objects.create(product=self.product, location=self.loc_same, quantity=Decimal('1'))
+        Stock.objects.create(product=self.other_product, location=self.loc_full, quantity=Decimal('10'))
+
+        suggestions = suggest_putaway_locations(self.receiving_item)
+        locations = [suggestion.location for suggestion in suggestions]
+
+        self.assertEqual(locations[0], self.loc_same)
+        self.assertTrue(suggestions[0].same_product)
+        self.assertIn(self.loc_empty, locations)
+        self.assertNotIn(self.loc_full, locations)
+
+
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        cache.delete(live.DASHBOARD_CACHE_KEY.format(live.DASHBOARD_KOMPLETACJA))
+        self.published = []
+        self._original_publish = live.get_broker().publish
+        live.get_broker().publish = self.published.append
+
+    def tearDown(self):
+        live.get_broker().publish = self._original_publish
+        cache.delete(live.DASHBOARD_CACHE_KEY.format(live.DASHBOARD_KOMPLETACJA))
+
+    def test_changes_in_one_transaction_are_published_once_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = CustomerOrder.objects.create(
+                order_number='ZK-1', customer_name='Klient', customer_address='Adres'
+            )
+            order.status = 'in_progress'
+            order.save(update_fields=['status'])
+            self.assertEqual(self.published, [])
+
+        topics = sorted(event['topic'] for event in self.published)
+        self.assertEqual(topics, ['customer_order', 'dashboard.kompletacja'])
+        order_event = next(e for e in self.published if e['topic'] == 'customer_order')
+        self.assertEqual(order_event['data']['status'], 'in_progress')
+
+    def test_dashboard_summary_is_refreshed_after_commit_without_local_delivery(self):
+        cache.set(live.DASHBOARD_CACHE_KEY.format(live.DASHBOARD_KOMPLETACJA), {'pending_orders': 7})
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomerOrder.objects.create(
+                order_number='ZK-2', customer_name='Klient', customer_address='Adres', status='pending'
+            )
+
+        # Broker tylko publikuje (jak Redis bez nasłuchu pod WSGI), a cache i tak jest świeży
+        with self.assertNumQueries(0):
+            summary = live.get_dashboard_summary(live.DASHBOARD_KOMPLETACJA)
+        self.assertEqual(summary['pending_orders'], 1)
+
+    async def test_subscription_receives_only_matching_events(self):
+        broker = live.InProcessBroker()
+        subscription = broker.subscribe(['picking_order:5'])
+        broker.deliver({'topic': 'picking_order', 'id': 6, 'data': {}})
+        broker.deliver({'topic': 'picking_order', 'id': 5, 'data': {'progress': 50}})
+
+        event = await subscription.get(timeout=1)
+        self.assertEqual(event['id'], 5)
+        self.assertIsNone(await subscription.get(timeout=0.01))
+        broker.unsubscribe(subscription)
+
+    def test_stream_endpoint_is_disabled_under_wsgi(self):
+        user = get_user_model().objects.create_user(username='supervisor', password='pass1234')
+        self.client.force_login(user)
+        response = self.client.get(reverse('wms:live_events'), {'topics': 'dashboard.kompletacja'})
+        self.assertEqual(response.status_code, 204)
+
+
+
+class LocationTreeTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='magazynier', password='pass1234')
+        self.client.force_login(user)
+        self.zone = Location.objects.create(name='Strefa A', location_type='zone', barcode='ZA')
+        self.rack = Location.objects.create(name='Regał A1', location_type='rack', barcode='RA1', parent=self.zone)
+        self.shelf = Location.objects.create(name='Półka A1-1', location_type='shelf', barcode='PA11', parent=self.rack)
+        self.other_rack = Location.objects.create(name='Regał A2', location_type='rack', barcode='RA2', parent=self.zone)
+
+    def _tree_ids(self, response):
+        return [node[0].id for node in response.context['location_tree']]
+
+    def test_collapsed_tree_renders_only_roots(self):
+        response = self.client.get(reverse('wms:location_list'))
+        self.assertEqual(self._tree_ids(response), [self.zone.id])
+        self.assertEqual(response.context['location_tree'][0][-1], 2)
+        self.assertNotContains(response, 'Regał A1')
+
+    def test_children_endpoint_returns_children_and_remembers_expansion(self):
+        response = self.client.get(
+            reverse('wms:htmx_location_tree_children', args=[self.zone.id]), {'level': 1}
+        )
+        self.assertContains(response, 'Regał A1')
+        self.assertContains(response, 'Regał A2')
+        self.assertNotContains(response, 'Półka A1-1')
+        self.assertIn(self.zone.id, self.client.session['location_tree_expanded'])
+
+        response = self.client.get(reverse('wms:location_list'))
+        self.assertEqual(self._tree_ids(response), [self.zone.id, self.rack.id, self.other_rack.id])
+
+    def test_search_loads_matches_with_ancestor_path(self):
+        response = self.client.get(reverse('wms:location_list'), {'search': 'PA11'})
+        self.assertEqual(self._tree_ids(response), [self.zone.id, self.rack.id, self.shelf.id])
+        matched = {node[0].id: node[2] for node in response.context['location_tree']}
+        self.assertTrue(matched[self.shelf.id])
+        self.assertFalse(matched[self.zone.id])
+
+
+class LocationIndexTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='magazynier', password='pass1234')
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exact = Location.objects.create(name='Regał B', location_type='rack', barcode='A1')
+            self.prefix = Location.objects.create(name='Półka zimna', location_type='shelf', barcode='A10')
+            self.by_name = Location.objects.create(name='A1 strefa', location_type='zone', barcode='Z9')
+            self.inactive = Location.objects.create(name='A1 stara', barcode='A11', is_active=False)
+
+    def test_exact_barcode_ranks_before_prefix_and_name_hits(self):
+        results = search_locations('a1')
+        self.assertEqual([loc.id for loc in results], [self.exact.id, self.prefix.id, self.by_name.id])
+
+    def test_substring_fallback_uses_prebuilt_keys_and_is_skipped_after_exact_hit(self):
+        index = get_location_index()
+        with mock.patch('wms.location_index._normalize', wraps=location_index._normalize) as normalize:
+            self.assertEqual([loc.id for loc in index.search('efa')], [self.by_name.id])
+            self.assertEqual([loc.id for loc in index.search('z9')], [self.by_name.id])
+        # Tylko normalizacja zapytań - klucze lokalizacji są liczone przy budowie indeksu
+        self.assertEqual(normalize.call_count, 2)
+
+        with mock.patch.object(index, 'ordered_ids', new=mock.MagicMock()) as ordered_ids:
+            index.search('z9')
+            index.search('zi')  # za krótkie na wyszukiwanie "zawiera"
+        ordered_ids.__iter__.assert_not_called()
+
+    def test_index_is_rebuilt_after_location_change(self):
+        search_locations('a1')
+        with self.assertNumQueries(0):
+            search_locations('a10')
+        with self.captureOnCommitCallbacks(execute=True):
+            created = Location.objects.create(name='Nowa', barcode='A100')
+        self.assertIn(created.id, [loc.id for loc in search_locations('a100')])
+
+    def test_autocomplete_excludes_requested_locations(self):
+        response = self.client.get(
+            reverse('wms:htmx_locations_autocomplete'), {'q': 'A1', 'exclude': self.exact.id}
+        )
+        self.assertNotContains(response, 'data-location-id="{}"'.format(self.exact.id))
+        self.assertContains(response, 'data-location-id="{}"'.format(self.prefix.id))
+        self.assertEqual(response['HX-Trigger'], 'location-autocomplete')
+
+    def test_transfer_form_uses_remote_picker(self):
+        product = Product.objects.create(name='Produkt', code='P-1')
+        stock = Stock.objects.create(product=product, location=self.exact, quantity=Decimal('5'))
+        response = self.client.get(reverse('wms:stock_transfer', args=[stock.id]))
+        self.assertContains(response, 'data-location-picker')
+        self.assertNotContains(response, '<option')
+
+        response = self.client.post(reverse('wms:stock_transfer', args=[stock.id]), {
+            'target_location': self.prefix.id,
+            'quantity': '2',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Stock.objects.get(location=self.prefix, product=product).quantity, Decimal('2'))
+
+        response = self.client.get(reverse('wms:stock_list'), {'location': self.prefix.name})
+        self.assertContains(response, 'data-value-field="name"')
+        self.assertNotContains(response, '<option value="{}"'.format(self.by_name.name))
+
+
+class OrderCandidateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='worker', password='pass1234')
+        self.client.force_login(self.user)
+        self.supplier_order = SupplierOrder.objects.create(
+            order_number='ZD-7',
+            supplier_name='Dostawca',
+            order_date=date.today(),
+            expected_delivery_date=date.today(),
+        )
+        self.receiving_order = ReceivingOrder.objects.create(
+            order_number='REG-7',
+            supplier_order=self.supplier_order,
+            status='in_progress',
+            assigned_to=self.user,
+        )
+        self.bolt = self._add_item('P-100', 'Śruba <M8>', Decimal('10'), Decimal('4'), barcode='5900001')
+        self.nut = self._add_item('P-200', 'Nakrętka 5900001 zestaw', Decimal('3'), Decimal('0'))
+
+    def _add_item(self, code, name, ordered, received, barcode=None):
+        product = Product.objects.create(code=code, name=name)
+        if barcode:
+            ProductCode.objects.create(product=product, code=barcode)
+        supplier_item = SupplierOrderItem.objects.create(
+            supplier_order=self.supplier_order,
+            product=product,
+            quantity_ordered=ordered,
+        )
+        return ReceivingItem.objects.create(
+            receiving_order=self.receiving_order,
+            supplier_order_item=supplier_item,
+            product=product,
+            quantity_ordered=ordered,
+            quantity_received=received,
+            sequence=supplier_item.id,
+        )
+
+    def test_exact_barcode_ranks_first_and_quantities_are_current(self):
+        search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, '5900001')
+        ReceivingItem.objects.filter(id=self.bolt.id).update(quantity_received=Decimal('6'))
+
+        with self.assertNumQueries(1):
+            matches = search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, '5900001')
+
+        self.assertEqual([match.item.id for match in matches], [self.bolt.id, self.nut.id])
+        self.assertEqual(order_candidates.remaining_quantity(matches[0].item), Decimal('4'))
+
+    def test_new_items_invalidate_cached_candidates(self):
+        search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, 'podkładka')
+        with self.captureOnCommitCallbacks(execute=True):
+            washer = self._add_item('P-300', 'Podkładka', Decimal('1'), Decimal('0'))
+
+        matches = search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, 'podkładka')
+        self.assertEqual([match.item.id for match in matches], [washer.id])
+
+    def test_product_rename_invalidates_cached_candidates(self):
+        search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, 'wkręt')
+        product = self.bolt.product
+        product.name = 'Wkręt M8'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        matches = search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, 'wkręt')
+        self.assertEqual([match.item.id for match in matches], [self.bolt.id])
+
+    def test_deactivated_code_no_longer_resolves(self):
+        matches = search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, '5900001')
+        self.assertEqual(matches[0].item.id, self.bolt.id)
+        code = ProductCode.objects.get(code='5900001')
+        code.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            code.save()
+
+        matches = search_order_candidates(order_candidates.RECEIVING, self.receiving_order.id, '5900001')
+        self.assertNotIn(self.bolt.id, [match.item.id for match in matches])
+
+    def test_autocomplete_renders_escaped_options(self):
+        response = self.client.get(
+            reverse('wms:htmx_receiving_product_autocomplete', args=[self.receiving_order.id]),
+            {'product': 'śruba'},
+        )
+        self.assertContains(response, 'Śruba &lt;M8&gt;')
+        self.assertContains(response, 'data-product-default-quantity="6"')
+        self.assertContains(response, 'Przyjęto 4.00 / 10.00 (pozostało 6.00)')
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, WMS_IMAGE_DERIVATIVES_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = Product.objects.create(code='IMG-1', name='Produkt ze zdjęciem')
+
+    def _upload(self, size=(2400, 1200)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG')
+        return SimpleUploadedFile('zdjecie.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_derivatives_are_generated_after_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=self._upload())
+
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (2400, 1200))
+        self.assertGreater(image.file_bytes, 0)
+        thumb = image.derivative('thumb')
+        self.assertEqual((thumb['width'], thumb['height']), (160, 80))
+        self.assertTrue(image.derivative_url('thumb').endswith('/thumb.webp'))
+        self.assertTrue(image.derivative_url('large', 'jpeg').endswith('/large.jpg'))
+
+    def test_template_filter_falls_back_to_original_until_generated(self):
+        image = ProductImage.objects.create(product=self.product, image=self._upload((100, 100)))
+        template = Template('{% load wms_images %}{{ image|derivative_url:"thumb" }}')
+        self.assertEqual(template.render(Context({'image': image})), image.image.url)
+
+        done, failed = backfill_derivatives([image])
+        self.assertEqual((done, failed), (1, 0))
+        self.assertTrue(template.render(Context({'image': image})).endswith('/thumb.webp'))
+
+
+    def test_backfill_command_reuses_one_process_pool(self):
+        images = [ProductImage.objects.create(product=self.product, image=self._upload((100, 100))) for _ in range(3)]
+        with mock.patch('wms.images.ProcessPoolExecutor', side_effect=ThreadPoolExecutor) as pool_class:
+            call_command('backfill_image_derivatives', model=['wms.ProductImage'], workers=2, batch_size=1, stdout=io.StringIO())
+
+        pool_class.assert_called_once_with(max_workers=2)
+        for image in images:
+            image.refresh_from_db()
+            self.assertTrue(image.derivatives_are_current())
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.existing = Product.objects.create(code='UP-1', name='Stara nazwa')
+
+    def _write_xlsx(self, rows):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['symbol', 'nazwa', 'opis', 'plu', 'stan', 'grupa', 'typ_opakowania'])
+        for row in rows:
+            sheet.append(row)
+        path = f'{self.tmpdir}/katalog.xlsx'
+        workbook.save(path)
+        return path
+
+    def test_xlsx_import_creates_updates_and_reports_errors(self):
+        path = self._write_xlsx([
+            ['UP-1', 'Nowa nazwa', '', 5901234567890, 3, 'Cyrkon', 'szt'],
+            ['UP-2', 'Blok cyrkonowy', 'opis', 12345, '2,5', 'Cyrkon', None],
+            ['UP-3', None, '', None, 1, '', 'szt'],
+            ['UP-4', 'Zły stan', '', None, 'dużo', '', 'szt'],
+            ['UP-2', 'Duplikat', '', None, 1, '', 'szt'],
+        ])
+
+        # Stała liczba zapytań na porcję, niezależnie od liczby wierszy
+        with self.assertNumQueries(15):
+            result = import_products(path, update=True, chunk_size=3)
+
+        self.assertEqual((result.created, result.updated, result.failed_rows), (1, 1, 3))
+        self.assertEqual(sorted(error.row for error in result.errors), [4, 5, 6])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Nowa nazwa')
+        self.assertEqual(self.existing.subiekt_stock, Decimal('3.00'))
+        self.assertTrue(self.existing.codes.filter(code='5901234567890').exists())
+
+        created = Product.objects.get(code='UP-2')
+        self.assertEqual(created.subiekt_stock, Decimal('2.50'))
+        self.assertEqual(created.subiekt_id, 12345)
+        self.assertEqual(created.unit, 'szt')
+        group = ProductGroup.objects.get(name='Cyrkon')
+        self.assertEqual(set(group.products.values_list('code', flat=True)), {'UP-1', 'UP-2'})
+
+    def test_csv_import_skips_existing_without_update(self):
+        path = f'{self.tmpdir}/katalog.csv'
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('symbol;nazwa;ean\nUP-1;Inna nazwa;111\nUP-9;Nowy;999\n')
+
+        result = import_products(path)
+
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Stara nazwa')
+        self.assertEqual(ProductCode.objects.get(code='999').product.code, 'UP-9')
+
+
+    def test_update_without_new_codes_invalidates_order_candidates(self):
+        path = f'{self.tmpdir}/katalog.csv'
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('symbol;nazwa\nUP-1;Nowa nazwa\n')
+
+        with mock.patch.object(order_candidates, 'bump_codes_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = import_products(path, update=True)
+
+        self.assertEqual((result.updated, result.codes_created), (1, 0))
+        bump.assert_called_once_with()
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='ksiegowa', password='pass1234')
+        self.client.force_login(self.user)
+        self.zone = Location.objects.create(name='Strefa A', location_type='zone', barcode='ZA')
+        self.shelf = Location.objects.create(name='A-01', location_type='shelf', barcode='A01', parent=self.zone)
+        self.other = Location.objects.create(name='B-01', location_type='shelf', barcode='B01')
+        self.product = Product.objects.create(code='EXP-1', name='Śruba M6', subiekt_id=77, subiekt_stock=Decimal('5'))
+        Stock.objects.create(product=self.product, location=self.shelf, quantity=Decimal('2.50'))
+        Stock.objects.create(product=self.product, location=self.other, quantity=Decimal('1'))
+        StockMovement.objects.create(
+            product=self.product, target_location=self.shelf, quantity=Decimal('2.50'),
+            movement_type='inbound', performed_by=self.user,
+        )
+
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_stock_csv_uses_list_filters(self):
+        url = reverse('wms:export_dataset', args=['stock'])
+        response = self.client.get(url, {'location_id': self.zone.id, 'format': 'csv'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines = self._content(response).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('Lokalizacja;'))
+        self.assertIn('A01;A-01;EXP-1;Śruba M6;77;2,50', lines[1])
+
+    def test_movements_xlsx_is_readable(self):
+        from openpyxl import load_workbook
+
+        url = reverse('wms:export_dataset', args=['movements'])
+        response = self.client.get(url, {'movement_type': 'inbound', 'format': 'xlsx'})
+
+        workbook = load_workbook(io.BytesIO(self._content(response)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1], 'Przyjęcie')
+        self.assertEqual(rows[1][2], 'EXP-1')
+        self.assertEqual(rows[1][7], 'ksiegowa')
+
+    def test_products_needs_sync_filter_matches_list(self):
+        Product.objects.create(code='EXP-2', name='Synced', subiekt_id=78, subiekt_stock=Decimal('0'))
+        url = reverse('wms:export_dataset', args=['products'])
+        response = self.client.get(url, {'sync': 'needs_sync'})
+
+        lines = self._content(response).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+        fields = lines[1].split(';')
+        self.assertEqual(fields[:4], ['EXP-1', 'Śruba M6', 'szt', '77'])
+        self.assertEqual(Decimal(fields[4].replace(',', '.')), Decimal('3.5'))
+
+    def test_list_pages_link_to_export_with_filters(self):
+        response = self.client.get(reverse('wms:stock_list_by_location', args=[self.zone.id]))
+        self.assertContains(response, f'location_id={self.zone.id}&format=xlsx')
+        for name, dataset in (('movement_list', 'movements'), ('product_list', 'products'), ('order_list', 'orders')):
+            response = self.client.get(reverse(f'wms:{name}'), {'search': 'x'})
+            self.assertContains(response, reverse('wms:export_dataset', args=[dataset]) + '?search=x')
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='magazyn', password='pass1234')
+        self.client.force_login(self.user)
+        location = Location.objects.create(name='A-01', location_type='shelf', barcode='A01')
+        self.parent = Product.objects.create(code='REC-1', name='Kabel', subiekt_id=77)
+        variant = Product.objects.create(code='REC-1-CZ', name='Kabel czarny', parent=self.parent)
+        self.unlinked = Product.objects.create(code='REC-2', name='Bez PLU')
+        self.in_sync = Product.objects.create(code='REC-3', name='Zgodny', subiekt_id=78)
+        Stock.objects.create(product=self.parent, location=location, quantity=Decimal('2'))
+        Stock.objects.create(product=variant, location=location, quantity=Decimal('1.5'))
+        Stock.objects.create(product=self.unlinked, location=location, quantity=Decimal('4'))
+        Stock.objects.create(product=self.in_sync, location=location, quantity=Decimal('1'))
+        self.subiekt_rows = [
+            (77, Decimal('5'), Decimal('1'), 'REC-1', 'Kabel'),
+            (78, Decimal('1'), Decimal('0'), 'REC-3', 'Zgodny'),
+            (999, Decimal('3'), Decimal('0'), 'SUB-ONLY', 'Tylko Subiekt'),
+        ]
+
+    def test_reconciliation_rolls_up_variants_and_classifies_lines(self):
+        report = run_reconciliation(user=self.user, mag_id=2, subiekt_rows=self.subiekt_rows)
+
+        self.assertEqual(report.products_checked, 4)
+        self.assertEqual(report.discrepancies_count, 3)
+        self.assertEqual(report.total_abs_difference, Decimal('8.50'))
+        lines = {line.code: line for line in report.lines.all()}
+        self.assertEqual(set(lines), {'REC-1', 'REC-2', 'SUB-ONLY'})
+        self.assertEqual(lines['REC-1'].status, 'difference')
+        self.assertEqual(lines['REC-1'].product, self.parent)
+        self.assertEqual(lines['REC-1'].wms_quantity, Decimal('3.5'))
+        self.assertEqual(lines['REC-1'].difference, Decimal('-1.5'))
+        self.assertEqual(lines['REC-2'].status, 'missing_in_subiekt')
+        self.assertEqual(lines['SUB-ONLY'].status, 'missing_in_wms')
+        self.assertIsNone(lines['SUB-ONLY'].product)
+        self.assertEqual(lines['SUB-ONLY'].name, 'Tylko Subiekt')
+
+    def test_detail_filters_and_export(self):
+        report = run_reconciliation(subiekt_rows=self.subiekt_rows)
+        self.assertIsNone(report.created_by)
+
+        url = reverse('wms:reconciliation_detail', args=[report.id])
+        self.assertContains(self.client.get(reverse('wms:reconciliation_list')), url)
+        self.assertContains(self.client.get(url), 'Tylko Subiekt')
+        response = self.client.get(url, {'status': 'missing_in_wms'}, HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'SUB-ONLY')
+        self.assertNotContains(response, 'REC-2')
+
+        response = self.client.get(
+            reverse('wms:export_dataset', args=['reconciliation']), {'report': report.id, 'search': 'REC'}
+        )
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('Status;Kod produktu'))
+
+    def test_run_from_list_reports_subiekt_errors(self):
+        with self.assertLogs('wms.views', level='ERROR'):
+            response = self.client.post(reverse('wms:reconciliation_list'), follow=True)
+        self.assertContains(response, 'Nie udało się uzgodnić stanów z Subiektem')
+        self.assertFalse(StockReconciliation.objects.exists())
+
+
+class ProductCleanupTests(TestCase):
+    def setUp(self):
+        location = Location.objects.create(name='A-01', location_type='shelf', barcode='A01')
+        self.with_stock = Product.objects.create(code='USED-1', name='Na stanie')
+        Stock.objects.create(product=self.with_stock, location=location, quantity=Decimal('1'))
+        self.with_history = Product.objects.create(code='USED-2', name='Z historią ruchów')
+        StockMovement.objects.create(
+            product=self.with_history, target_location=location, quantity=Decimal('1'), movement_type='inbound',
+        )
+        self.parent = Product.objects.create(code='USED-3', name='Nadrzędny')
+        self.variant = Product.objects.create(code='USED-3-A', name='Wariant', parent=self.parent)
+        Stock.objects.create(product=self.variant, location=location, quantity=Decimal('2'))
+        self.unused = [
+            Product.objects.create(code=f'FREE-{index}', name=f'Nieużywany {index}') for index in range(5)
+        ]
+        ProductCode.objects.create(product=self.unused[0], code='5900000000001', code_type='barcode')
+
+    def test_detection_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            ids = list(unused_products().values_list('id', flat=True))
+        self.assertEqual(ids, [product.id for product in self.unused])
+
+    def test_batched_delete_cascades_and_keeps_used_products(self):
+        self.assertEqual(delete_unused_products(dry_run=True).deleted_products, 0)
+        self.assertEqual(Product.objects.count(), 9)
+
+        batches = []
+        result = delete_unused_products(batch_size=2, progress=lambda current: batches.append(current.batches))
+
+        self.assertEqual(result.candidates, 5)
+        self.assertEqual(result.deleted_products, 5)
+        self.assertEqual(batches, [1, 2, 3])
+        self.assertEqual(result.deleted_rows['wms.ProductCode'], 1)
+        self.assertEqual(
+            set(Product.objects.values_list('code', flat=True)), {'USED-1', 'USED-2', 'USED-3', 'USED-3-A'}
+        )
+
+    def test_command_runs_without_prompt(self):
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command('sync_subiekt', drop_unused=True, dry_run=True, stdout=out)
+        self.assertIn('Znaleziono 5 nieużywanych produktów', out.getvalue())
+        self.assertEqual(Product.objects.count(), 9)
+
+        call_command('sync_subiekt', drop_unused=True, no_input=True, stdout=io.StringIO())
+        self.assertEqual(Product.objects.count(), 4)
+
+
+class LocationStatsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='picker', password='pass1234')
+        self.location = Location.objects.create(name='A-01', location_type='shelf', barcode='A01')
+        self.other = Location.objects.create(name='A-02', location_type='shelf', barcode='A02')
+        self.product = Product.objects.create(code='PICK-1', name='Produkt')
+        order = CustomerOrder.objects.create(order_number='ZK-7', customer_name='Klient', customer_address='Adres')
+        order_item = OrderItem.objects.create(
+            order=order, product=self.product, quantity=Decimal('10'), total_price=Decimal('10'),
+        )
+        picking_order = PickingOrder.objects.create(order_number='T-7', customer_order=order)
+        self.picking_item = PickingItem.objects.create(
+            picking_order=picking_order, order_item=order_item, product=self.product,
+            location=self.location, quantity_to_pick=Decimal('10'),
+        )
+
+    def _pick(self, location, quantity='1'):
+        return PickingHistory.objects.create(
+            picking_item=self.picking_item, user=self.user, location_scanned=location,
+            product_scanned=self.product, quantity_picked=Decimal(quantity),
+        )
+
+    def test_picks_are_counted_incrementally(self):
+        self._pick(self.location)
+        self._pick(self.location, '2')
+        history = self._pick(self.other)
+
+        counter = LocationPickDaily.objects.get(location=self.location)
+        self.assertEqual((counter.pick_count, counter.quantity_picked), (2, Decimal('3')))
+        history.delete()
+        self.assertEqual(location_metric_values(METRIC_PICKS, days=7), {self.location.id: 2.0})
+
+    def test_rebuild_recomputes_rollup_from_history(self):
+        self._pick(self.location)
+        self._pick(self.other)
+        LocationPickDaily.objects.update(pick_count=99)
+
+        self.assertEqual(rebuild_pick_rollup(days=30), 2)
+        self.assertEqual(
+            location_metric_values(METRIC_PICKS), {self.location.id: 1.0, self.other.id: 1.0},
+        )
+
+    def test_stock_metrics_read_occupancy_index(self):
+        Stock.objects.create(product=self.product, location=self.location, quantity=Decimal('4'))
+
+        with self.assertNumQueries(1):
+            values = location_metric_values(METRIC_SKUS)
+        self.assertEqual(values, {self.location.id: 1.0})
+
+
+class NumberingTests(TestCase):
+    def test_numbers_are_sequential_per_type(self):
+        self.assertEqual(allocate_number(SEQUENCE_WZ, ref='ZK-1'), 'WZ-ZK-1-1')
+        self.assertEqual(allocate_number(SEQUENCE_WZ, ref='ZK-1'), 'WZ-ZK-1-2')
+        self.assertEqual(allocate_number(SEQUENCE_PZ, ref='ZD-1'), 'PZ-ZD-1-1')
+
+    def test_rolled_back_allocation_leaves_no_gap(self):
+        allocate_number(SEQUENCE_WZ, ref='ZK-1')
+        try:
+            with transaction.atomic():
+                allocate_number(SEQUENCE_WZ, ref='ZK-2')
+                raise RuntimeError('dokument nie powstał')
+        except RuntimeError:
+            pass
+
+        self.assertEqual(allocate_number(SEQUENCE_WZ, ref='ZK-3'), 'WZ-ZK-3-2')
+
+    @override_settings(WMS_NUMBER_FORMATS={SEQUENCE_WZ: 'WZ/{year}/{number:04d}'})
+    def test_yearly_format_keeps_counter_per_year(self):
+        allocate_number(SEQUENCE_WZ, day=date(2025, 12, 31))
+
+        self.assertEqual(allocate_number(SEQUENCE_WZ, day=date(2025, 12, 31)), 'WZ/2025/0002')
+        self.assertEqual(allocate_number(SEQUENCE_WZ, day=date(2026, 1, 1)), 'WZ/2026/0001')
+        # Kolejny numer: UPDATE licznika i odczyt wartości (plus savepoint)
+        with CaptureQueriesContext(connection) as queries:
+            allocate_number(SEQUENCE_WZ, day=date(2026, 1, 1))
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']],
+            ['UPDATE', 'SELECT'],
+        )
+
+
+class DocumentEngineTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='docs', password='pass1234')
+        self.shelf = Location.objects.create(name='A-01', location_type='shelf', barcode='A01')
+        self.other = Location.objects.create(name='A-02', location_type='shelf', barcode='A02')
+        self.product = Product.objects.create(code='SYM-1', name='Śruba "M8"')
+        self.customer_order = CustomerOrder.objects.create(
+            order_number='ZK-9', customer_name='Klient Sp. z o.o.', customer_address='Łódź, ul. Długa 1',
+        )
+        self.picking_order = PickingOrder.objects.create(order_number='T-9', customer_order=self.customer_order)
+        for quantity in ('2', '3'):
+            order_item = OrderItem.objects.create(
+                order=self.customer_order, product=self.product, quantity=Decimal(quantity), total_price=Decimal('0'),
+            )
+            PickingItem.objects.create(
+                picking_order=self.picking_order, order_item=order_item, product=self.product,
+                location=self.shelf, quantity_to_pick=Decimal(quantity), quantity_picked=Decimal(quantity),
+            )
+
+    def test_wz_sums_picked_lines_with_bulk_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            document = build_wz_document(self.picking_order)
+
+        item_inserts = [query for query in queries if query['sql'].startswith('INSERT') and 'wms_documentitem' in query['sql']]
+        self.assertEqual(len(item_inserts), 1)
+
+        self.assertEqual(document.document_type, 'WZ')
+        self.assertEqual(document.document_number, 'WZ-ZK-9-1')
+        self.assertEqual(
+            list(document.items.values_list('product__code', 'location__barcode', 'quantity')),
+            [('SYM-1', 'A01', Decimal('5.00'))],
+        )
+
+    def test_pz_and_mm_documents(self):
+        supplier_order = SupplierOrder.objects.create(
+            order_number='ZD-9', supplier_name='Dostawca', order_date=date(2026, 1, 1),
+            expected_delivery_date=date(2026, 1, 2),
+        )
+        supplier_item = SupplierOrderItem.objects.create(
+            supplier_order=supplier_order, product=self.product, quantity_ordered=Decimal('4'),
+        )
+        receiving_order = ReceivingOrder.objects.create(order_number='R-9', supplier_order=supplier_order)
+        ReceivingItem.objects.create(
+            receiving_order=receiving_order, supplier_order_item=supplier_item, product=self.product,
+            quantity_ordered=Decimal('4'), quantity_received=Decimal('4'), location=self.shelf,
+        )
+        movement = StockMovement.objects.create(
+            product=self.product, source_location=self.shelf, target_location=self.other, quantity=Decimal('1'),
+        )
+
+        pz = build_pz_document(receiving_order)
+        mm = build_mm_document([movement])
+
+        self.assertEqual(pz.items.get().quantity, Decimal('4.00'))
+        item = mm.items.get()
+        self.assertEqual((item.source_location, item.location), (self.shelf, self.other))
+        self.assertIsNone(build_mm_document([]))
+
+    def test_daily_epp_export(self):
+        build_wz_document(self.picking_order)
+        stream = io.StringIO()
+
+        exported_ids = write_epp(exportable_documents(timezone.localdate()), stream)
+
+        content = stream.getvalue()
+        self.assertEqual(len(exported_ids), 1)
+        self.assertTrue(content.startswith('[INFO]\r\n"1.05",'))
+        self.assertIn('[NAGLOWEK]\r\n"WZ",1,0,', content)
+        self.assertIn('"Klient Sp. z o.o."', content)
+        self.assertIn('[ZAWARTOSC]\r\n1,1,"SYM-1",', content)
+        self.assertIn(',"szt",5.0000,5.0000,', content)
+        content.encode('cp1250')
+
+    def test_export_command_marks_documents(self):
+        from django.core.management import call_command
+
+        build_wz_document(self.picking_order)
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/dzien.epp'
+            call_command('export_epp', output=output, stdout=io.StringIO())
+            with open(output, encoding='cp1250', newline='') as stream:
+                self.assertIn('"WZ-ZK-9-1"', stream.read())
+
+        self.assertFalse(exportable_documents(timezone.localdate()).exists())
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='ledger', password='pass1234')
+        self.shelf = Location.objects.create(name='L-01', location_type='shelf', barcode='L01')
+        self.other = Location.objects.create(name='L-02', location_type='shelf', barcode='L02')
+        self.product = Product.objects.create(code='LED-1', name='Produkt księgi')
+
+    def test_receive_creates_stock_movement_and_occupancy(self):
+        stock_ledger.receive(self.product, self.shelf, Decimal('3'), user=self.user, note='PZ')
+        stock_ledger.receive(self.product, self.shelf, Decimal('2'), user=self.user, note='PZ')
+
+        self.assertEqual(Stock.objects.get(product=self.product, location=self.shelf).quantity, Decimal('5'))
+        self.assertEqual(
+            list(StockMovement.objects.values_list('movement_type', 'target_location', 'quantity')),
+            [('inbound', self.shelf.id, Decimal('2')), ('inbound', self.shelf.id, Decimal('3'))],
+        )
+        self.assertEqual(LocationOccupancy.objects.get(location=self.shelf).sku_count, 1)
+
+    def test_issue_beyond_stock_raises_and_keeps_stock(self):
+        stock_ledger.receive(self.product, self.shelf, Decimal('2'))
+
+        with self.assertRaises(stock_ledger.InsufficientStock) as raised:
+            stock_ledger.issue(self.product, self.shelf, Decimal('5'))
+
+        self.assertEqual(raised.exception.available, Decimal('2'))
+        self.assertEqual(Stock.objects.get(product=self.product, location=self.shelf).quantity, Decimal('2'))
+        self.assertFalse(StockMovement.objects.filter(movement_type='outbound').exists())
+
+    def test_clamped_issue_empties_and_removes_stock(self):
+        stock_ledger.receive(self.product, self.shelf, Decimal('2'))
+
+        movement = stock_ledger.issue(self.product, self.shelf, Decimal('5'), clamp=True)
+
+        self.assertEqual(movement.quantity, Decimal('2'))
+        self.assertFalse(Stock.objects.filter(product=self.product).exists())
+
+    def test_transfer_moves_stock_between_locations(self):
+        stock_ledger.receive(self.product, self.shelf, Decimal('4'))
+
+        movement = stock_ledger.transfer(self.product, self.shelf, self.other, Decimal('3'), user=self.user)
+
+        self.assertEqual(movement.movement_type, 'transfer')
+        self.assertEqual(
+            dict(Stock.objects.filter(product=self.product).values_list('location_id', 'quantity')),
+            {self.shelf.id: Decimal('1'), self.other.id: Decimal('3')},
+        )
+
+    def test_picking_creates_single_outbound_movement(self):
+        stock_ledger.receive(self.product, self.shelf, Decimal('5'))
+        customer_order = CustomerOrder.objects.create(order_number='ZK-L', customer_name='Klient')
+        order_item = OrderItem.objects.create(
+            order=customer_order, product=self.product, quantity=Decimal('2'), total_price=Decimal('0'),
+        )
+        picking_order = PickingOrder.objects.create(order_number='T-L', customer_order=customer_order)
+        picking_item = PickingItem.objects.create(
+            picking_order=picking_order, order_item=order_item, product=self.product,
+            location=self.shelf, quantity_to_pick=Decimal('2'),
+        )
+
+        _apply_picking_operation(picking_order, picking_item, self.shelf, Decimal('2'), self.user, 'add')
+
+        self.assertEqual(Stock.objects.get(product=self.product, location=self.shelf).quantity, Decimal('3'))
+        self.assertEqual(
+            list(StockMovement.objects.filter(movement_type='outbound').values_list('quantity', 'note')),
+            [(Decimal('2'), 'Terminacja T-L')],
+        )
+
+
+@override_settings(WMS_READ_REPLICA='default')
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_use_replica_only_inside_context(self):
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(Product))
+        with use_replica():
+            self.assertEqual(router.db_for_read(Product), 'default')
+            self.assertIsNone(router.db_for_read(tw_Towar))
+        self.assertEqual(router.db_for_write(Product), 'default')
+
+    @override_settings(WMS_READ_REPLICA='')
+    def test_without_replica_everything_stays_on_default(self):
+        with use_replica():
+            self.assertIsNone(ReplicaRouter().db_for_read(Product))
+
+
+@override_settings(WMS_READ_REPLICA='default')
+class ReplicaStickinessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(username='replica', password='pass1234')
+
+    def _request(self, method):
+        request = getattr(self.factory, method)('/')
+        request.user = self.user
+        return request
+
+    def test_user_reads_from_default_after_write(self):
+        @read_from_replica
+        def report(request):
+            return HttpResponse('replica' if replica_active() else 'default')
+
+        def scan(request):
+            Location.objects.create(name='R-01', location_type='shelf', barcode='R01')
+            return HttpResponse('ok')
+
+        self.assertEqual(report(self._request('get')).content, b'replica')
+        self.assertEqual(report(self._request('post')).content, b'default')
+
+        ReplicaStickinessMiddleware(scan)(self._request('post'))
+
+        self.assertTrue(is_sticky(self.user))
+        self.assertEqual(report(self._request('get')).content, b'default')
+
+    def test_read_only_request_does_not_make_user_sticky(self):
+        ReplicaStickinessMiddleware(lambda request: HttpResponse(Location.objects.count()))(self._request('get'))
+
+        self.assertFalse(is_sticky(self.user))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='fragments', password='pass1234')
+        self.client.force_login(self.user)
+        self.shelf = Location.objects.create(name='F-01', location_type='shelf', barcode='F01')
+        self.products = [
+            Product.objects.create(code=f'FR-{index}', name=f'Produkt {index}') for index in range(5)
+        ]
+
+    def test_product_rows_are_served_from_cache(self):
+        url = reverse('wms:product_list')
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(url)
+
+        self.assertLess(len(warm), len(cold) - len(self.products))
+        self.assertContains(response, 'Produkt 3')
+
+    def test_code_change_invalidates_product_rows(self):
+        url = reverse('wms:product_list')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductCode.objects.create(product=self.products[0], code='5901234123457', code_type='barcode')
+
+        self.assertContains(self.client.get(url), '5901234123457')
+
+    def test_ledger_change_invalidates_stock_rows(self):
+        url = reverse('wms:stock_list')
+        with self.captureOnCommitCallbacks(execute=True):
+            stock_ledger.receive(self.products[0], self.shelf, Decimal('2'))
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stock_ledger.receive(self.products[0], self.shelf, Decimal('5'))
+
+        self.assertContains(self.client.get(url), '7,00 szt')
+
+
+    def test_stock_change_invalidates_only_rows_of_that_product(self):
+        variant = Product.objects.create(code='FR-0-XL', name='Wariant', parent=self.products[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            stock_ledger.receive(self.products[1], self.shelf, Decimal('1'))
+        url = reverse('wms:product_list')
+        self.client.get(url)
+        key_a = self._row_key(self.products[0])
+        key_b = self._row_key(self.products[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stock_ledger.receive(variant, self.shelf, Decimal('3'))
+
+        # Wiersz produktu B zostaje w cache, wiersz produktu nadrzędnego wariantu jest liczony od nowa
+        self.assertEqual(self._row_key(self.products[1]), key_b)
+        self.assertIsNotNone(cache.get(key_b))
+        self.assertNotEqual(self._row_key(self.products[0]), key_a)
+        response = self.client.get(url)
+        self.assertContains(response, '3,00')
+
+    def _row_key(self, product):
+        product.refresh_from_db()
+        return fragment_cache.row_key(
+            'product-row',
+            product,
+            fragment_cache.model_versions(fragment_cache.VERSIONED_MODELS),
+            object_versions=[fragment_cache.object_versions('stock', [product.pk])[product.pk]],
+        )
+
+class StartupProfileTests(SimpleTestCase):
+    def test_parse_importtime_skips_header(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     pandas._libs\n'
+            'import time:      3000 |       3120 |   pandas\n'
+        )
+
+        self.assertEqual(
+            parse_importtime(output),
+            [(120, 120, 2, 'pandas._libs'), (3000, 3120, 1, 'pandas')],
+        )
+
+    def test_urlconf_does_not_import_heavy_libraries(self):
+        out = io.StringIO()
+        call_command('profile_startup', '--limit', '5000', stdout=out)
+
+        modules = {line.split()[-1] for line in out.getvalue().splitlines() if ' ms  ' in line}
+        self.assertIn('wms.views.picking', modules)
+        self.assertTrue(modules.isdisjoint({'pandas', 'numpy', 'PIL', 'PIL.Image', 'openpyxl'}))
+
+
+class SubiektAsyncSyncTests(TestCase):
+    """Widoki async synchronizacji z Subiektem (subiekt.async_client)"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='sync', password='pass1234')
+        self.client.force_login(self.user)
+        self.known = Product.objects.create(code='ZNANY', name='Znany produkt', subiekt_id=101)
+
+    def _document(self, dok_id, number):
+        document = dok_Dokument(dok_Id=dok_id, dok_Nr=dok_id, dok_NrPelny=number, dok_DataWyst=date(2026, 1, 5))
+        document.dok_DataMag = None
+        document.dok_PlatTermin = None
+        for field in ('adr_Nazwa', 'adr_NazwaPelna', 'adr_Ulica', 'adr_Miejscowosc', 'adr_Kod', 'adr_Poczta', 'adr_Adres'):
+            setattr(document, field, '')
+        document.adr_Nazwa = 'Kontrahent'
+        return document
+
+    def _subiekt_product(self, product_id):
+        product = tw_Towar(tw_Id=product_id, tw_Symbol=f'SUB-{product_id}', tw_Nazwa=f'Towar {product_id}', tw_Opis='')
+        product.st_Stan = 4.0
+        product.st_StanRez = 1.0
+        product.grt_Nazwa = ''
+        return product
+
+    def _subiekt_products(self, product_ids):
+        return [self._subiekt_product(product_id) for product_id in product_ids]
+
+    def _positions(self, document_id):
+        return {
+            1: [{'ob_Id': 11, 'tw_Id': 101, 'ob_Ilosc': 2}],
+            2: [{'ob_Id': 21, 'tw_Id': 101, 'ob_Ilosc': 1}, {'ob_Id': 22, 'tw_Id': 102, 'ob_Ilosc': 5}],
+        }[document_id]
+
+    def test_sync_zk_orders_fetches_positions_and_missing_products(self):
+        manager = dok_Dokument.dokument_objects
+        with mock.patch.object(manager, 'get_zk', return_value=[self._document(1, 'ZK 1/2026'), self._document(2, 'ZK 2/2026')]), \
+                mock.patch.object(manager, '_get_document_positions', side_effect=self._positions) as positions, \
+                mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products) as products_by_ids:
+            response = self.client.post(reverse('wms:sync_zk_orders'))
+
+        self.assertRedirects(response, reverse('wms:order_list'), fetch_redirect_response=False)
+        self.assertEqual(positions.call_count, 2)
+        products_by_ids.assert_called_once_with([102])
+        created = Product.objects.get(subiekt_id=102)
+        self.assertEqual(created.subiekt_stock, Decimal('4'))
+        order = CustomerOrder.objects.get(order_number='ZK 2/2026')
+        self.assertEqual(
+            sorted(order.items.values_list('product__code', 'quantity')),
+            [('SUB-102', Decimal('5')), ('ZNANY', Decimal('1'))],
+        )
+
+    def test_sync_zd_orders_fetches_positions_only_for_new_orders(self):
+        SupplierOrder.objects.create(
+            order_number='ZD 1/2026', document_id=1, supplier_name='Kontrahent',
+            order_date=date(2026, 1, 5), expected_delivery_date=date(2026, 1, 5),
+        )
+        manager = dok_Dokument.dokument_objects
+        with mock.patch.object(manager, 'get_new_zd', return_value=[self._document(1, 'ZD 1/2026'), self._document(2, 'ZD 2/2026')]) as new_zd, \
+                mock.patch.object(manager, '_get_document_positions', side_effect=self._positions) as positions, \
+                mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products):
+            self.client.post(reverse('wms:sync_zd_orders'))
+
+        new_zd.assert_called_once_with(1, 20)
+        positions.assert_called_once_with(2)
+        order = SupplierOrder.objects.get(order_number='ZD 2/2026')
+        self.assertEqual(order.items.count(), 2)
+
+    def test_htmx_sync_product_updates_from_subiekt(self):
+        with mock.patch.object(tw_Towar.subiekt_objects, 'get_product_by_id', side_effect=self._subiekt_product):
+            response = self.client.post(reverse('wms:htmx_sync_product', args=[self.known.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('toastMessage', response['HX-Trigger'])
+        self.known.refresh_from_db()
+        self.assertEqual(self.known.code, 'SUB-101')
+        self.assertEqual(self.known.subiekt_stock_reserved, Decimal('1'))
+
+    def test_async_views_require_login(self):
+        self.client.logout()
+        with mock.patch.object(dok_Dokument.dokument_objects, 'get_zk') as get_zk:
+            response = self.client.post(reverse('wms:sync_zk_orders'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('wms:login'), response['Location'])
+        get_zk.assert_not_called()
+
+
+class ProductBulkSyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='bulk-sync', password='pass1234')
+        self.client.force_login(self.user)
+        self.group = ProductGroup.objects.create(name='Narzędzia', code='NARZ')
+        self.products = [
+            Product.objects.create(code=f'WMS-{index}', name=f'Stara nazwa {index}', subiekt_id=200 + index)
+            for index in range(5)
+        ]
+        self.products[0].groups.add(self.group)
+        self.local = Product.objects.create(code='LOKALNY', name='Bez Subiekta')
+
+    def _subiekt_products(self, product_ids):
+        products = []
+        for product_id in product_ids:
+            if product_id == 204:
+                continue  # usunięty w Subiekcie
+            product = tw_Towar(tw_Id=product_id, tw_Symbol=f'SUB-{product_id}', tw_Nazwa=f'Towar {product_id}', tw_Opis='')
+            product.st_Stan = 7.5
+            product.st_StanRez = 0.0
+            product.grt_Nazwa = 'Narzędzia' if product_id % 2 else 'Nowa grupa'
+            products.append(product)
+        return products
+
+    def test_sync_fetches_subiekt_in_chunks_and_updates_in_bulk(self):
+        with mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products) as by_ids:
+            result = sync_products(Product.objects.all(), chunk_size=2)
+
+        self.assertEqual([call.args[0] for call in by_ids.call_args_list], [[200, 201], [202, 203], [204]])
+        self.assertEqual((result.total, result.updated, result.groups_created), (5, 4, 1))
+        self.assertEqual(result.missing, [204])
+
+        self.products[1].refresh_from_db()
+        self.assertEqual(self.products[1].code, 'SUB-201')
+        self.assertEqual(self.products[1].subiekt_stock, Decimal('7.5'))
+        self.assertIsNotNone(self.products[1].last_sync_date)
+        self.assertEqual(
+            set(Product.objects.filter(groups__name='Nowa grupa').values_list('subiekt_id', flat=True)),
+            {200, 202},
+        )
+        # Dotychczasowa grupa zostaje, grupa z Subiektu dochodzi
+        self.assertEqual(self.products[0].groups.count(), 2)
+        self.assertEqual(Product.objects.get(pk=self.products[4].pk).code, 'WMS-4')
+
+    def test_sync_invalidates_order_candidates_after_commit(self):
+        with mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products), \
+                mock.patch.object(order_candidates, 'bump_codes_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                sync_products(Product.objects.filter(subiekt_id__in=[200, 201]))
+
+        bump.assert_called_once_with()
+
+    def test_code_taken_by_other_product_is_reported(self):
+        Product.objects.create(code='SUB-201', name='Inny produkt')
+        with mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products):
+            result = sync_products(Product.objects.filter(subiekt_id__in=[200, 201]))
+
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(Product.objects.get(subiekt_id=201).code, 'WMS-1')
+
+    def test_view_streams_progress_for_selection_with_variants(self):
+        variant = Product.objects.create(code='WMS-0-XL', name='Wariant', parent=self.products[0], subiekt_id=203)
+        with mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products):
+            response = self.client.post(
+                reverse('wms:htmx_bulk_sync_products'), {'product_ids': [self.products[0].pk, self.local.pk]}
+            )
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(lines[0], {'total': 2, 'processed': 0, 'percent': 0})
+        self.assertTrue(lines[-1]['done'])
+        self.assertEqual(lines[-1]['type'], 'success')
+        self.assertEqual(lines[-1]['updated'], 2)
+        variant.refresh_from_db()
+        self.assertEqual(variant.name, 'Towar 203')
+
+    def test_view_syncs_filter_result(self):
+        with mock.patch.object(tw_Towar.subiekt_objects, 'get_products_by_ids', side_effect=self._subiekt_products):
+            response = self.client.post(reverse('wms:htmx_bulk_sync_products'), {'group_id': self.group.pk})
+            summary = json.loads(b''.join(response.streaming_content).decode().splitlines()[-1])
+
+        self.assertEqual((summary['total'], summary['updated']), (1, 1))
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).code, 'SUB-200')
+
+
+class BarcodeSyncTests(TestCase):
+    def setUp(self):
+        self.first = Product.objects.create(code='KOD-1', name='Pierwszy', subiekt_id=301)
+        self.second = Product.objects.create(code='KOD-2', name='Drugi', subiekt_id=302)
+        self.local = Product.objects.create(code='KOD-L', name='Lokalny')
+        self.subiekt_rows = [
+            (301, 'ean', '5901234123457'),
+            (301, 'plu', '17'),
+            (301, 'extra', '2000000000015'),
+            (302, 'ean', '5900000000002'),
+            (999, 'ean', '5909999999999'),  # towar spoza WMS
+        ]
+
+    def _sync(self, **kwargs):
+        with mock.patch.object(tw_Towar.subiekt_objects, 'iter_product_codes', return_value=iter(self.subiekt_rows)):
+            return sync_barcodes(**kwargs)
+
+    def _codes(self, active=True):
+        return set(ProductCode.objects.filter(is_active=active).values_list('product__code', 'code'))
+
+    def test_creates_codes_from_all_sources_in_bulk(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, mock.patch.object(order_candidates, 'bump_codes_version') as bump:
+            with self.assertNumQueries(5):
+                result = self._sync()
+
+        self.assertEqual((result.rows, result.created, result.unknown_products), (5, 6, 1))
+        self.assertEqual(self._codes(), {
+            ('KOD-1', '5901234123457'), ('KOD-1', '17'), ('KOD-1', '2000000000015'), ('KOD-1', '301'),
+            ('KOD-2', '5900000000002'), ('KOD-2', '302'),
+        })
+        self.assertEqual(ProductCode.objects.get(code='17').description, SOURCE_DESCRIPTIONS['plu'])
+        bump.assert_called_once_with()
+        self.assertEqual(len(callbacks), 2)
+
+    def test_resync_updates_moved_codes_and_deactivates_missing(self):
+        self._sync()
+        self.subiekt_rows = [
+            (301, 'ean', '5901234123457'),
+            (302, 'plu', '17'),  # PLU przeniesione do innego towaru
+        ]
+        ProductCode.objects.filter(code='302').update(is_active=False)
+
+        result = self._sync()
+
+        self.assertEqual((result.created, result.updated, result.deactivated, result.unchanged), (0, 2, 2, 2))
+        self.assertEqual(ProductCode.objects.get(code='17').product, self.second)
+        self.assertTrue(ProductCode.objects.get(code='302').is_active)
+        self.assertEqual(self._codes(active=False), {('KOD-1', '2000000000015'), ('KOD-2', '5900000000002')})
+
+    def test_manual_codes_are_not_touched(self):
+        ProductCode.objects.create(product=self.local, code='17', description='Etykieta półki')
+        ProductCode.objects.create(product=self.first, code='5901234123457', description='Dodany ręcznie')
+        ProductCode.objects.create(product=self.second, code='RECZNY', description='Dodany ręcznie')
+
+        result = self._sync()
+
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('17', result.errors[0])
+        self.assertEqual(ProductCode.objects.get(code='17').product, self.local)
+        self.assertEqual(ProductCode.objects.get(code='5901234123457').description, 'Dodany ręcznie')
+        self.assertTrue(ProductCode.objects.get(code='RECZNY').is_active)
+
+    def test_dry_run_does_not_save(self):
+        result = self._sync(dry_run=True)
+
+        self.assertEqual(result.created, 6)
+        self.assertFalse(ProductCode.objects.exists())
+
+    def test_command_runs_without_input(self):
+        out = io.StringIO()
+        with mock.patch.object(tw_Towar.subiekt_objects, 'iter_product_codes', return_value=iter(self.subiekt_rows)):
+            call_command('sync_subiekt', '--sync-barcodes', '--no-input', stdout=out)
+
+        self.assertIn('Nowe kody utworzone: 6', out.getvalue())
+        self.assertEqual(ProductCode.objects.count(), 6)
@@ -1,114 +1,122 @@
 from django.urls import path
-from . import views
+from .views import accounts, dashboard, orders, picking, supplier_orders, receiving, products, locations, stock
 from django.urls import include
 
 app_name = 'wms'
 
 urlpatterns = [
     # Dashboard główny
-    path('', views.dashboard, name='dashboard'),
+    path('', dashboard.dashboard, name='dashboard'),
     
     # Dashboard kompletacji
-    path('kompletacja/', views.kompletacja_dashboard, name='kompletacja_dashboard'),
+    path('kompletacja/', dashboard.kompletacja_dashboard, name='kompletacja_dashboard'),
     
     # Dashboard przyjęć
-    path('przyjecia/', views.przyjecia_dashboard, name='przyjecia_dashboard'),
+    path('przyjecia/', dashboard.przyjecia_dashboard, name='przyjecia_dashboard'),
+
+    # Zdarzenia na żywo (SSE)
+    path('live/events/', dashboard.live_events, name='live_events'),
     
     # Zamówienia klientów
-    path('orders/', views.order_list, name='order_list'),
-    path('orders/<int:order_id>/', views.order_detail, name='order_detail'),
-    path('orders/<int:order_id>/create-picking/', views.create_picking_order, name='create_picking_order'),
-    path('sync-zk-orders/', views.sync_zk_orders, name='sync_zk_orders'),
-    path('picking/<int:picking_id>/start-or-continue/', views.start_or_continue_picking, name='start_or_continue_picking'),
-    path('picking/<int:picking_id>/change-status/', views.picking_order_change_status, name='picking_order_change_status'),
+    path('orders/', orders.order_list, name='order_list'),
+    path('orders/<int:order_id>/', orders.order_detail, name='order_detail'),
+    path('orders/<int:order_id>/create-picking/', orders.create_picking_order, name='create_picking_order'),
+    path('sync-zk-orders/', orders.sync_zk_orders, name='sync_zk_orders'),
+    path('picking/<int:picking_id>/start-or-continue/', orders.start_or_continue_picking, name='start_or_continue_picking'),
+    path('picking/<int:picking_id>/change-status/', orders.picking_order_change_status, name='picking_order_change_status'),
     
     # Zlecenia kompletacji (Terminacja)
-    path('picking/', views.picking_list, name='picking_list'),
-    path('picking/<int:picking_id>/', views.picking_detail, name='picking_detail'),
-    path('picking/<int:picking_id>/start/', views.start_picking, name='start_picking'),
-    path('picking/<int:picking_id>/fast/', views.picking_fast, name='picking_fast'),
-    path('picking/<int:picking_id>/complete/', views.complete_picking, name='complete_picking'),
-    path('picking/<int:picking_id>/htmx/submit/', views.htmx_picking_submit, name='htmx_picking_submit'),
-    path('picking/<int:picking_id>/htmx/table/', views.htmx_picking_table, name='htmx_picking_table'),
-    path('picking/<int:picking_id>/htmx/remove-item/<int:item_id>/', views.htmx_picking_remove_item, name='htmx_picking_remove_item'),
-    path('picking/<int:picking_id>/htmx/product-autocomplete/', views.htmx_picking_product_autocomplete, name='htmx_picking_product_autocomplete'),
+    path('picking/', picking.picking_list, name='picking_list'),
+    path('picking/<int:picking_id>/', picking.picking_detail, name='picking_detail'),
+    path('picking/<int:picking_id>/start/', picking.start_picking, name='start_picking'),
+    path('picking/<int:picking_id>/fast/', picking.picking_fast, name='picking_fast'),
+    path('picking/<int:picking_id>/complete/', picking.complete_picking, name='complete_picking'),
+    path('picking/<int:picking_id>/htmx/submit/', picking.htmx_picking_submit, name='htmx_picking_submit'),
+    path('picking/<int:picking_id>/htmx/table/', picking.htmx_picking_table, name='htmx_picking_table'),
+    path('picking/<int:picking_id>/htmx/remove-item/<int:item_id>/', picking.htmx_picking_remove_item, name='htmx_picking_remove_item'),
+    path('picking/<int:picking_id>/htmx/product-autocomplete/', picking.htmx_picking_product_autocomplete, name='htmx_picking_product_autocomplete'),
     
     # Zamówienia do dostawców (ZD)
-    path('supplier-orders/', views.supplier_order_list, name='supplier_order_list'),
-    path('supplier-orders/<int:order_id>/', views.supplier_order_detail, name='supplier_order_detail'),
-    path('supplier-orders/<int:supplier_order_id>/create-receiving/', views.create_receiving_order, name='create_receiving_order'),
-    path('sync-zd-orders/', views.sync_zd_orders, name='sync_zd_orders'),
-    path('htmx/delete-supplier-order/<int:order_id>/', views.htmx_delete_supplier_order, name='htmx_delete_supplier_order'),
+    path('supplier-orders/', supplier_orders.supplier_order_list, name='supplier_order_list'),
+    path('supplier-orders/<int:order_id>/', supplier_orders.supplier_order_detail, name='supplier_order_detail'),
+    path('supplier-orders/<int:supplier_order_id>/create-receiving/', receiving.create_receiving_order, name='create_receiving_order'),
+    path('sync-zd-orders/', supplier_orders.sync_zd_orders, name='sync_zd_orders'),
+    path('htmx/delete-supplier-order/<int:order_id>/', supplier_orders.htmx_delete_supplier_order, name='htmx_delete_supplier_order'),
     
     # Rejestry przyjęć (Regalacja)
-    path('receiving/', views.receiving_order_list, name='receiving_order_list'),
-    path('receiving/<int:receiving_id>/', views.receiving_order_detail, name='receiving_order_detail'),
-    path('receiving/<int:receiving_id>/fast/', views.receiving_order_fast, name='receiving_order_fast'),
-    path('receiving/<int:receiving_id>/complete/', views.complete_receiving, name='complete_receiving'),
-    path('receiving/<int:receiving_id>/change-status/', views.receiving_order_change_status, name='receiving_order_change_status'),
-    path('receiving/<int:receiving_id>/htmx/submit/', views.htmx_receiving_submit, name='htmx_receiving_submit'),
-    path('receiving/<int:receiving_id>/htmx/table/', views.htmx_receiving_table, name='htmx_receiving_table'),
-    path('receiving/<int:receiving_id>/htmx/remove-item/<int:item_id>/', views.htmx_receiving_remove_item, name='htmx_receiving_remove_item'),
-    path('receiving/<int:receiving_id>/htmx/product-autocomplete/', views.htmx_receiving_product_autocomplete, name='htmx_receiving_product_autocomplete'),
+    path('receiving/', receiving.receiving_order_list, name='receiving_order_list'),
+    path('receiving/<int:receiving_id>/', receiving.receiving_order_detail, name='receiving_order_detail'),
+    path('receiving/<int:receiving_id>/fast/', receiving.receiving_order_fast, name='receiving_order_fast'),
+    path('receiving/<int:receiving_id>/complete/', receiving.complete_receiving, name='complete_receiving'),
+    path('receiving/<int:receiving_id>/change-status/', receiving.receiving_order_change_status, name='receiving_order_change_status'),
+    path('receiving/<int:receiving_id>/htmx/submit/', receiving.htmx_receiving_submit, name='htmx_receiving_submit'),
+    path('receiving/<int:receiving_id>/htmx/table/', receiving.htmx_receiving_table, name='htmx_receiving_table'),
+    path('receiving/<int:receiving_id>/htmx/remove-item/<int:item_id>/', receiving.htmx_receiving_remove_item, name='htmx_receiving_remove_item'),
+    path('receiving/<int:receiving_id>/htmx/product-autocomplete/', receiving.htmx_receiving_product_autocomplete, name='htmx_receiving_product_autocomplete'),
     
     # Katalogi
-    path('products/', views.product_list, name='product_list'),
-    #path('products/<int:product_id>/edit-codes/', views.edit_product_codes, name='edit_product_codes'),
-    path('products/<int:product_id>/api/add-scanned-code/', views.api_add_scanned_code, name='api_add_scanned_code'),
-    path('product-groups/', views.product_group_list, name='product_group_list'),
-    path('product-groups/<int:group_id>/', views.product_group_detail, name='product_group_detail'),
-    path('barcodes/', views.barcodes_list, name='barcodes_list'),
-    path('locations/', views.location_list, name='location_list'),
-    path('htmx/location/create/', views.htmx_location_edit, name='htmx_location_create'),
-    path('htmx/location/<int:location_id>/edit/', views.htmx_location_edit, name='htmx_location_edit'),
-    path('htmx/location/<int:location_id>/delete/', views.htmx_location_delete, name='htmx_location_delete'),
-    path('htmx/location/<int:location_id>/photos/', views.htmx_location_photos, name='htmx_location_photos'),
-    path('htmx/location/<int:location_id>/photos-inline/', views.htmx_location_photos_inline, name='htmx_location_photos_inline'),
-    path('htmx/location/<int:location_id>/photo/upload/', views.htmx_location_photo_upload, name='htmx_location_photo_upload'),
-    path('htmx/location/<int:location_id>/photo/update/', views.htmx_location_photo_update, name='htmx_location_photo_update'),
-    path('htmx/location/<int:location_id>/photo/set-primary/', views.htmx_location_photo_set_primary, name='htmx_location_photo_set_primary'),
-    path('htmx/location/<int:location_id>/photo/delete/', views.htmx_location_photo_delete, name='htmx_location_photo_delete'),
-    path('htmx/location/tree/toggle/', views.htmx_location_tree_toggle, name='htmx_location_tree_toggle'),
-    path('stock/', views.stock_list, name='stock_list'),
-    path('stock/product/<int:product_id>/', views.stock_list, name='stock_list_by_product'),
-    path('stock/location/<int:location_id>/', views.stock_list, name='stock_list_by_location'),
-    path('stock/movements/', views.movement_list, name='movement_list'),
-    path('stock/<int:stock_id>/transfer/', views.stock_transfer, name='stock_transfer'),
+    path('products/', products.product_list, name='product_list'),
+    #path('products/<int:product_id>/edit-codes/', products.edit_product_codes, name='edit_product_codes'),
+    path('products/<int:product_id>/api/add-scanned-code/', products.api_add_scanned_code, name='api_add_scanned_code'),
+    path('product-groups/', products.product_group_list, name='product_group_list'),
+    path('product-groups/<int:group_id>/', products.product_group_detail, name='product_group_detail'),
+    path('barcodes/', products.barcodes_list, name='barcodes_list'),
+    path('locations/', locations.location_list, name='location_list'),
+    path('htmx/location/create/', locations.htmx_location_edit, name='htmx_location_create'),
+    path('htmx/location/<int:location_id>/edit/', locations.htmx_location_edit, name='htmx_location_edit'),
+    path('htmx/location/<int:location_id>/delete/', locations.htmx_location_delete, name='htmx_location_delete'),
+    path('htmx/location/<int:location_id>/photos/', locations.htmx_location_photos, name='htmx_location_photos'),
+    path('htmx/location/<int:location_id>/photos-inline/', locations.htmx_location_photos_inline, name='htmx_location_photos_inline'),
+    path('htmx/location/<int:location_id>/photo/upload/', locations.htmx_location_photo_upload, name='htmx_location_photo_upload'),
+    path('htmx/location/<int:location_id>/photo/update/', locations.htmx_location_photo_update, name='htmx_location_photo_update'),
+    path('htmx/location/<int:location_id>/photo/set-primary/', locations.htmx_location_photo_set_primary, name='htmx_location_photo_set_primary'),
+    path('htmx/location/<int:location_id>/photo/delete/', locations.htmx_location_photo_delete, name='htmx_location_photo_delete'),
+    path('htmx/location/tree/toggle/', locations.htmx_location_tree_toggle, name='htmx_location_tree_toggle'),
+    path('htmx/location/tree/<int:location_id>/children/', locations.htmx_location_tree_children, name='htmx_location_tree_children'),
+    path('stock/', stock.stock_list, name='stock_list'),
+    path('stock/product/<int:product_id>/', stock.stock_list, name='stock_list_by_product'),
+    path('stock/location/<int:location_id>/', stock.stock_list, name='stock_list_by_location'),
+    path('stock/movements/', stock.movement_list, name='movement_list'),
+    path('export/<slug:dataset>/', stock.export_dataset, name='export_dataset'),
+    path('stock/reconciliation/', stock.reconciliation_list, name='reconciliation_list'),
+    path('stock/reconciliation/<int:report_id>/', stock.reconciliation_detail, name='reconciliation_detail'),
+    path('stock/<int:stock_id>/transfer/', stock.stock_transfer, name='stock_transfer'),
     
 
     # Autentykacja
-    path('login/', views.login_view, name='login'),
-    path('logout/', views.logout_view, name='logout'),
-    path('change-password-first-time/', views.change_password_first_time, name='change_password_first_time'),
+    path('login/', accounts.login_view, name='login'),
+    path('logout/', accounts.logout_view, name='logout'),
+    path('change-password-first-time/', accounts.change_password_first_time, name='change_password_first_time'),
     
     # Settings
-    path('settings/', views.settings_view, name='settings'),
-    path('settings/toggle-auto-save/', views.toggle_auto_save_regalacje, name='toggle_auto_save_regalacje'),
+    path('settings/', accounts.settings_view, name='settings'),
+    path('settings/toggle-auto-save/', accounts.toggle_auto_save_regalacje, name='toggle_auto_save_regalacje'),
     
         # API
-    path('api/scan-barcode/', views.api_scan_barcode, name='api_scan_barcode'),
-    path('htmx/sync-product/<int:product_id>/', views.htmx_sync_product, name='htmx_sync_product'),
-    path('htmx/product-details/<int:product_id>/', views.htmx_product_details, name='htmx_product_details'),
-    path('htmx/delete-code/<int:product_id>/<int:code_id>/', views.htmx_delete_code, name='htmx_delete_code'),
-    path('htmx/product/<int:product_id>/add-code-modal/', views.htmx_add_code_modal, name='htmx_add_code_modal'),
-    path('htmx/product/<int:product_id>/codes-list/', views.htmx_product_codes_list, name='htmx_product_codes_list'),
-    path('htmx/product/<int:product_id>/add-code-inline/', views.htmx_add_code_inline, name='htmx_add_code_inline'),
-    path('htmx/product/<int:product_id>/images-inline/', views.htmx_product_images_inline, name='htmx_product_images_inline'),
-    path('htmx/product/<int:product_id>/variants/', views.htmx_product_variants, name='htmx_product_variants'),
-    path('htmx/product/<int:product_id>/row/', views.htmx_product_row, name='htmx_product_row'),
-    path('htmx/stock/<int:product_id>/row/', views.htmx_stock_row, name='htmx_stock_row'),
-    path('htmx/product/<int:product_id>/add-size-color/', views.htmx_add_size_color_modal, name='htmx_add_size_color_modal'),
-    path('htmx/product/<int:product_id>/edit-size-color/<int:variant_id>/', views.htmx_add_size_color_modal, name='htmx_edit_size_color_modal'),
-    path('htmx/product/<int:product_id>/edit-product-modal/', views.htmx_edit_product_modal, name='htmx_edit_product_modal'),
-    path('htmx/variant/<int:variant_id>/delete/', views.htmx_delete_variant, name='htmx_delete_variant'),
-    path('htmx/product/<int:product_id>/edit-codes/', views.htmx_edit_product_codes, name='htmx_edit_product_codes'),
-    path('htmx/product/<int:product_id>/edit-codes/<int:code_id>/', views.htmx_edit_product_codes, name='htmx_edit_product_codes'),
-    path('htmx/product-groups-autocomplete/', views.htmx_product_groups_autocomplete, name='htmx_product_groups_autocomplete'),
-    path('htmx/locations-autocomplete/', views.htmx_locations_autocomplete, name='htmx_locations_autocomplete'),
+    path('api/scan-barcode/', products.api_scan_barcode, name='api_scan_barcode'),
+    path('htmx/sync-product/<int:product_id>/', products.htmx_sync_product, name='htmx_sync_product'),
+    path('htmx/sync-products/', products.htmx_bulk_sync_products, name='htmx_bulk_sync_products'),
+    path('htmx/product-details/<int:product_id>/', products.htmx_product_details, name='htmx_product_details'),
+    path('htmx/delete-code/<int:product_id>/<int:code_id>/', products.htmx_delete_code, name='htmx_delete_code'),
+    path('htmx/product/<int:product_id>/add-code-modal/', products.htmx_add_code_modal, name='htmx_add_code_modal'),
+    path('htmx/product/<int:product_id>/codes-list/', products.htmx_product_codes_list, name='htmx_product_codes_list'),
+    path('htmx/product/<int:product_id>/add-code-inline/', products.htmx_add_code_inline, name='htmx_add_code_inline'),
+    path('htmx/product/<int:product_id>/images-inline/', products.htmx_product_images_inline, name='htmx_product_images_inline'),
+    path('htmx/product/<int:product_id>/variants/', products.htmx_product_variants, name='htmx_product_variants'),
+    path('htmx/product/<int:product_id>/row/', products.htmx_product_row, name='htmx_product_row'),
+    path('htmx/stock/<int:product_id>/row/', stock.htmx_stock_row, name='htmx_stock_row'),
+    path('htmx/product/<int:product_id>/add-size-color/', products.htmx_add_size_color_modal, name='htmx_add_size_color_modal'),
+    path('htmx/product/<int:product_id>/edit-size-color/<int:variant_id>/', products.htmx_add_size_color_modal, name='htmx_edit_size_color_modal'),
+    path('htmx/product/<int:product_id>/edit-product-modal/', products.htmx_edit_product_modal, name='htmx_edit_product_modal'),
+    path('htmx/variant/<int:variant_id>/delete/', products.htmx_delete_variant, name='htmx_delete_variant'),
+    path('htmx/product/<int:product_id>/edit-codes/', products.htmx_edit_product_codes, name='htmx_edit_product_codes'),
+    path('htmx/product/<int:product_id>/edit-codes/<int:code_id>/', products.htmx_edit_product_codes, name='htmx_edit_product_codes'),
+    path('htmx/product-groups-autocomplete/', products.htmx_product_groups_autocomplete, name='htmx_product_groups_autocomplete'),
+    path('htmx/locations-autocomplete/', locations.htmx_locations_autocomplete, name='htmx_locations_autocomplete'),
 
     
     # Profile
-    path('profile/edit/', views.profile_edit, name='profile_edit'),
+    path('profile/edit/', accounts.profile_edit, name='profile_edit'),
     
     # Assets
     path('assets/', include('assets.urls')),
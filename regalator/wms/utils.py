@@ -114,3 +114,37 @@ def get_or_create_product_from_subiekt(subiekt_id, stdout=None):
             stdout.write(f'  ❌ Błąd podczas pobierania produktu z Subiektu (ID: {subiekt_id}): {str(e)}')
         return None
 
+
+
+async def aget_or_create_products_from_subiekt(subiekt_ids):
+    """
+    Async, batched counterpart of get_or_create_product_from_subiekt().
+
+    Products missing in WMS are fetched from Subiekt concurrently (see
+    subiekt.async_client) and synced in one thread.
+
+    Args:
+        subiekt_ids: Iterable of Subiekt product IDs (tw_Id), None values are skipped
+
+    Returns:
+        dict: Subiekt ID -> WMS product; IDs found neither in WMS nor in Subiekt are omitted
+    """
+    from asgiref.sync import sync_to_async
+    from subiekt import async_client
+
+    subiekt_ids = {subiekt_id for subiekt_id in subiekt_ids if subiekt_id is not None}
+    if not subiekt_ids:
+        return {}
+
+    products = {
+        product.subiekt_id: product
+        async for product in Product.objects.filter(subiekt_id__in=subiekt_ids)
+    }
+    missing = subiekt_ids - products.keys()
+    if missing:
+        subiekt_products = await async_client.get_products_by_ids(sorted(missing))
+        synced = await sync_to_async(
+            lambda: [sync_product_from_subiekt(subiekt_product) for subiekt_product in subiekt_products.values()]
+        )()
+        products.update((product.subiekt_id, product) for product in synced)
+    return products
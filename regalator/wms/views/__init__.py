@@ -0,0 +1,7 @@
+"""
+Widoki WMS podzielone według grup URL (``wms.urls``).
+
+Każdy moduł importuje tylko zależności swojej grupy. Pakiet celowo nie
+reeksportuje widoków - moduł grupy (np. w komendzie lub teście) można
+zaimportować bez ładowania pozostałych.
+"""
@@ -0,0 +1,167 @@
+"""Widoki logowania, zmiany hasła, ustawień i profilu użytkownika."""
+
+from django.shortcuts import render, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
+from django.contrib.auth.forms import AuthenticationForm, SetPasswordForm
+from django.contrib.auth.models import User
+from ..models import UserProfile
+from ..forms import UserProfileForm
+from confetti import services as confetti_services
+import json
+from django.template.loader import render_to_string
+from ..context_processors import AUTO_SAVE_REGALACJE_KEY
+from django.contrib.auth.views import redirect_to_login
+from functools import wraps
+
+
+def async_login_required(view_func):
+    """``login_required`` dla widoków ``async def`` (Django 5.0 obsługuje tylko widoki synchroniczne)"""
+
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped_view
+
+
+def login_view(request):
+    """Widok logowania"""
+    if request.user.is_authenticated:
+        return redirect('wms:dashboard')
+    
+    # Pobierz listę wszystkich użytkowników
+    users = User.objects.all().order_by('username')
+    
+    if request.method == 'POST':
+        form = AuthenticationForm(request, data=request.POST)
+        if form.is_valid():
+            username = form.cleaned_data.get('username')
+            password = form.cleaned_data.get('password')
+            user = authenticate(username=username, password=password)
+            if user is not None:
+                login(request, user)
+                
+                # Sprawdź czy użytkownik musi zmienić hasło
+                profile, created = UserProfile.objects.get_or_create(user=user)
+                if not profile.password_changed:
+                    return redirect('wms:change_password_first_time')
+                
+                next_url = request.GET.get('next', '/')
+                return redirect(next_url)
+    else:
+        form = AuthenticationForm()
+    
+    return render(request, 'wms/login.html', {'form': form, 'users': users})
+
+
+@login_required
+def change_password_first_time(request):
+    """Widok zmiany hasła dla użytkowników logujących się po raz pierwszy"""
+    # Sprawdź czy użytkownik rzeczywiście musi zmienić hasło
+    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    if profile.password_changed:
+        return redirect('wms:dashboard')
+    
+    if request.method == 'POST':
+        form = SetPasswordForm(request.user, request.POST)
+        if form.is_valid():
+            form.save()
+            update_session_auth_hash(request, form.user)
+            
+            # Oznacz że użytkownik zmienił hasło
+            profile.password_changed = True
+            profile.save()
+            
+            messages.success(request, 'Hasło zostało pomyślnie zmienione!')
+            return redirect('wms:dashboard')
+    else:
+        form = SetPasswordForm(request.user)
+    
+    return render(request, 'wms/change_password_first_time.html', {'form': form})
+
+
+def logout_view(request):
+    """Widok wylogowania"""
+    logout(request)
+    messages.success(request, 'Zostałeś pomyślnie wylogowany.')
+    return redirect('wms:login')
+
+
+@login_required
+def settings_view(request):
+    """Strona ustawień użytkownika."""
+
+    auto_save_enabled = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+    context = {
+        "auto_save_enabled": auto_save_enabled,
+    }
+    return render(request, "wms/settings.html", context)
+
+
+@login_required
+def toggle_auto_save_regalacje(request):
+    """HTMX toggle for automatic regalation save setting."""
+
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    current_value = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+    new_value = not current_value
+    confetti_services.set_user_setting(request.user, AUTO_SAVE_REGALACJE_KEY, new_value)
+
+    target_id = request.headers.get('HX-Target') or ''
+    template_name = 'wms/partials/_settings_toggle_item.html'
+    if target_id == 'auto-save-inline-toggle':
+        template_name = 'wms/partials/_auto_save_toggle_inline.html'
+
+    html = render_to_string(
+        template_name,
+        {'auto_save_enabled': new_value},
+        request=request,
+    )
+    response = HttpResponse(html)
+    toast_message = (
+        'Automatyczne zapisywanie regalacji włączone'
+        if new_value
+        else 'Automatyczne zapisywanie regalacji wyłączone'
+    )
+    response['HX-Trigger'] = json.dumps(
+        {'toastMessage': {'type': 'success', 'value': toast_message}}
+    )
+    return response
+
+
+@login_required
+def profile_edit(request):
+    """Edycja profilu użytkownika"""
+    # Utwórz profil jeśli nie istnieje
+    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    
+    if request.method == 'POST':
+        form = UserProfileForm(request.POST, request.FILES, instance=profile, user=request.user)
+        if form.is_valid():
+            form.save()
+            messages.success(request, 'Profil został zaktualizowany pomyślnie.')
+            return redirect('wms:profile_edit')
+    else:
+        form = UserProfileForm(instance=profile, user=request.user)
+    
+    context = {
+        'form': form,
+        'profile': profile,
+    }
+    return render(request, 'wms/profile_edit.html', context)
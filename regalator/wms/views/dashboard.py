@@ -0,0 +1,133 @@
+"""Dashboardy procesów oraz strumień zdarzeń na żywo (SSE)."""
+
+from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from ..models import CustomerOrder, Location, PickingOrder, Product, SupplierOrder
+from assets.models import Asset
+from .. import live
+from ..replica import read_from_replica
+from .orders import _prepare_order_display
+from .supplier_orders import _prepare_supplier_order_display
+
+
+@login_required
+@read_from_replica
+def dashboard(request):
+    """Dashboard główny - wybór procesu"""
+    # Pobierz splash image
+    splash_image = Asset.get_splash_image()
+        
+    
+    # Ogólne statystyki
+    total_zk_orders = CustomerOrder.objects.count()
+    total_zd_orders = SupplierOrder.objects.count()
+    total_products = Product.objects.count()
+    total_locations = Location.objects.count()
+    
+    context = {
+        'splash_image': splash_image,
+        'total_zk_orders': total_zk_orders,
+        'total_zd_orders': total_zd_orders,
+        'total_products': total_products,
+        'total_locations': total_locations,
+    }
+    return render(request, 'wms/dashboard.html', context)
+
+
+@login_required
+def kompletacja_dashboard(request):
+    """Dashboard kompletacji (ZK)"""
+    # Statystyki kompletacji - liczone raz na zmianę (patrz wms.live)
+    summary = live.get_dashboard_summary(live.DASHBOARD_KOMPLETACJA)
+    
+    # Ostatnie zamówienia
+    recent_orders = list(
+        CustomerOrder.objects
+        .all()
+        .prefetch_related('items')
+        .prefetch_related(
+            Prefetch(
+                'pickingorder_set',
+                queryset=PickingOrder.objects.select_related('assigned_to')
+            )
+        )
+        .order_by('-created_at')[:10]
+    )
+    recent_counts = {
+        'pending': 0,
+        'created': 0,
+        'in_progress': 0,
+        'partially_completed': 0,
+        'completed': 0,
+        'cancelled': 0,
+    }
+    for order in recent_orders:
+        if order.status in recent_counts:
+            recent_counts[order.status] += 1
+        _prepare_order_display(order)
+    
+    context = {
+        **summary,
+        'recent_orders': recent_orders,
+        'recent_counts': recent_counts,
+        'live_topics': f'dashboard.{live.DASHBOARD_KOMPLETACJA},customer_order',
+    }
+    return render(request, 'wms/kompletacja_dashboard.html', context)
+
+
+@login_required
+def przyjecia_dashboard(request):
+    """Dashboard przyjęć (ZD)"""
+    # Statystyki przyjęć - liczone raz na zmianę (patrz wms.live)
+    summary = live.get_dashboard_summary(live.DASHBOARD_PRZYJECIA)
+    
+    # Ostatnie zamówienia ZD
+    recent_supplier_orders = list(
+        SupplierOrder.objects
+        .all()
+        .order_by('-created_at')[:10]
+        .prefetch_related('receiving_orders__assigned_to')
+    )
+    
+    recent_counts = {
+        'pending': 0,
+        'created': 0,
+        'in_progress': 0,
+        'partially_completed': 0,
+        'completed': 0,
+        'cancelled': 0,
+    }
+    for order in recent_supplier_orders:
+        if order.status in recent_counts:
+            recent_counts[order.status] += 1
+        _prepare_supplier_order_display(order)
+    
+    context = {
+        **summary,
+        'recent_supplier_orders': recent_supplier_orders,
+        'live_topics': f'dashboard.{live.DASHBOARD_PRZYJECIA}',
+        'recent_counts': recent_counts,
+    }
+    return render(request, 'wms/przyjecia_dashboard.html', context)
+
+
+async def live_events(request):
+    """Strumień SSE ze zmianami statusów i postępu (wymaga serwera ASGI)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        # Pod WSGI strumień zablokowałby worker - 204 wyłącza EventSource po stronie klienta
+        return HttpResponse(status=204)
+
+    topics = [topic.strip() for topic in request.GET.get('topics', '').split(',') if topic.strip()]
+    if not topics:
+        return HttpResponseBadRequest('Brak tematów subskrypcji')
+
+    response = StreamingHttpResponse(live.event_stream(topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
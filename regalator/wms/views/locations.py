@@ -0,0 +1,805 @@
+"""Widoki lokalizacji: lista, drzewo, edycja i zdjęcia."""
+
+from django.shortcuts import render, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.core.paginator import Paginator
+from django.db.models import Q, Count, F
+from ..models import Location, LocationImage, PickingItem, Stock
+from ..forms import LocationEditForm, LocationImageForm
+import json
+from ..location_index import search_locations
+
+
+LOCATION_TREE_SEARCH_LIMIT = 500
+
+
+def _location_child_counts(location_ids):
+    """Liczba bezpośrednich dzieci dla podanych lokalizacji - jedno zapytanie grupujące"""
+    if not location_ids:
+        return {}
+    return dict(
+        Location.objects.filter(parent_id__in=location_ids)
+        .values_list('parent_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+
+def _load_expanded_children(parent_ids, expanded_ids):
+    """
+    Doczytuje dzieci rozwiniętych węzłów poziom po poziomie
+    (jedno zapytanie na poziom drzewa). Zwraca mapę parent_id -> [dzieci].
+    """
+    children_map = {}
+    frontier = [loc_id for loc_id in parent_ids if loc_id in expanded_ids]
+    while frontier:
+        children = Location.objects.filter(parent_id__in=frontier).prefetch_related('images').order_by('name')
+        frontier = []
+        for child in children:
+            children_map.setdefault(child.parent_id, []).append(child)
+            if child.id in expanded_ids:
+                frontier.append(child.id)
+    return children_map
+
+
+def _load_matches_with_ancestors(matches):
+    """
+    Zwraca (roots, children_map) dla pasujących lokalizacji i ścieżek do ich
+    przodków - bez ładowania pozostałych gałęzi drzewa.
+    """
+    loaded = {loc.id: loc for loc in matches}
+    pending = {loc.parent_id for loc in matches if loc.parent_id and loc.parent_id not in loaded}
+    while pending:
+        parents = list(Location.objects.filter(id__in=pending).prefetch_related('images'))
+        for parent in parents:
+            loaded[parent.id] = parent
+        pending = {loc.parent_id for loc in parents if loc.parent_id and loc.parent_id not in loaded}
+
+    children_map = {}
+    roots = []
+    for loc in loaded.values():
+        if loc.parent_id and loc.parent_id in loaded:
+            children_map.setdefault(loc.parent_id, []).append(loc)
+        else:
+            roots.append(loc)
+    return roots, children_map
+
+
+def _build_location_tree(roots, children_map, matching_ids=None, base_level=0, root_parent_id=None):
+    """
+    Spłaszcza załadowaną część drzewa lokalizacji do listy wierszy.
+    Zwraca listę krotek: (location, level, has_matches, should_expand,
+    padding_left, is_last, has_children, parent_id, child_count).
+    Dzieci zwiniętych węzłów nie są renderowane - doczytuje je HTMX.
+    """
+    matching_ids = matching_ids or set()
+    loaded_ids = [loc.id for loc in roots]
+    for children in children_map.values():
+        loaded_ids.extend(child.id for child in children)
+    child_counts = _location_child_counts(loaded_ids)
+
+    result = []
+
+    def build_tree(locs, level, parent_id):
+        locs = sorted(locs, key=lambda x: x.name)
+        for idx, loc in enumerate(locs):
+            child_count = child_counts.get(loc.id, 0)
+            should_expand = loc.id in children_map
+            result.append((
+                loc,
+                level,
+                loc.id in matching_ids,
+                should_expand,
+                level * 30,
+                idx == len(locs) - 1,
+                child_count > 0,
+                parent_id,
+                child_count,
+            ))
+            if should_expand:
+                build_tree(children_map[loc.id], level + 1, loc.id)
+
+    build_tree(roots, base_level, root_parent_id)
+    return result
+
+
+def _get_expanded_location_ids(request):
+    expanded = request.session.get('location_tree_expanded', [])
+    if not isinstance(expanded, (list, set, tuple)):
+        return set()
+    return set(expanded)
+
+
+@login_required
+def htmx_location_tree_toggle(request):
+    """
+    HTMX endpoint do przełączania stanu rozwinięcia/zwinięcia węzła drzewa lokalizacji.
+    Zapisuje stan w sesji użytkownika.
+    """
+    if request.method != 'PUT':
+        return HttpResponseBadRequest("Only PUT method allowed")
+    
+    location_id = request.GET.get('location_id')
+    action = request.GET.get('action')  # 'expand' lub 'collapse'
+    
+    if not location_id or not action:
+        return HttpResponseBadRequest("Missing location_id or action")
+    
+    try:
+        location_id = int(location_id)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid location_id")
+    
+    # Pobierz aktualny stan z sesji
+    expanded_locations = request.session.get('location_tree_expanded', [])
+    if not isinstance(expanded_locations, list):
+        # Konwertuj na listę jeśli nie jest listą
+        expanded_locations = list(expanded_locations) if expanded_locations else []
+    
+    # Konwertuj na set dla łatwiejszej manipulacji
+    expanded_set = set(expanded_locations)
+    
+    # Aktualizuj stan
+    if action == 'expand':
+        expanded_set.add(location_id)
+    elif action == 'collapse':
+        expanded_set.discard(location_id)
+        # Usuń również wszystkie dzieci (opcjonalnie - jeśli chcesz zwijać całe poddrzewo)
+        # location = Location.objects.get(id=location_id)
+        # children_ids = location.get_descendants().values_list('id', flat=True)
+        # expanded_set.difference_update(children_ids)
+    else:
+        return HttpResponseBadRequest("Invalid action. Use 'expand' or 'collapse'")
+    
+    # Zapisz z powrotem do sesji
+    request.session['location_tree_expanded'] = list(expanded_set)
+    request.session.modified = True
+    
+    # Zwróć pustą odpowiedź (HTMX nie potrzebuje zawartości, tylko aktualizuje UI)
+    return HttpResponse(status=204)  # No Content
+
+
+@login_required
+def htmx_location_tree_children(request, location_id):
+    """
+    HTMX endpoint zwracający dzieci węzła drzewa lokalizacji (wraz z rozwiniętymi
+    wcześniej podgałęziami). Zapisuje rozwinięcie węzła w sesji.
+    """
+    location = get_object_or_404(Location, id=location_id)
+    try:
+        level = max(int(request.GET.get('level', 1)), 1)
+    except (TypeError, ValueError):
+        level = 1
+
+    expanded_ids = _get_expanded_location_ids(request)
+    expanded_ids.add(location.id)
+    request.session['location_tree_expanded'] = list(expanded_ids)
+    request.session.modified = True
+
+    children_map = _load_expanded_children([location.id], expanded_ids)
+    location_tree = _build_location_tree(
+        children_map.pop(location.id, []),
+        children_map,
+        base_level=level,
+        root_parent_id=location.id,
+    )
+    return render(request, 'wms/location_list.html#location-tree-nodes', {
+        'location_tree': location_tree,
+    })
+
+
+@login_required
+def location_list(request):
+    """Lista lokalizacji"""
+    search_query = request.GET.get('search', '')
+    location_type = request.GET.get('type', '')
+    view_mode = request.GET.get('view', 'tree')  # Domyślnie 'tree'
+
+    locations = Location.objects.prefetch_related('images').select_related('parent')
+    
+    if search_query:
+        locations = locations.filter(
+            Q(name__icontains=search_query) |
+            Q(barcode__icontains=search_query)
+        )
+    
+    if location_type:
+        locations = locations.filter(location_type=location_type)
+    
+    if view_mode == 'tree':
+        # Drzewo ładowane leniwie: korzenie + rozwinięte gałęzie,
+        # a przy wyszukiwaniu tylko trafienia i ścieżki do ich przodków
+        expanded_ids = _get_expanded_location_ids(request)
+
+        if search_query or location_type:
+            matches = list(locations.order_by('name')[:LOCATION_TREE_SEARCH_LIMIT])
+            roots, children_map = _load_matches_with_ancestors(matches)
+            matching_ids = {loc.id for loc in matches} if search_query else set()
+            total_count = len(matches)
+        else:
+            roots = list(
+                Location.objects.filter(parent__isnull=True).prefetch_related('images').order_by('name')
+            )
+            children_map = _load_expanded_children([loc.id for loc in roots], expanded_ids)
+            matching_ids = set()
+            total_count = Location.objects.count()
+
+        location_tree = _build_location_tree(roots, children_map, matching_ids)
+        context = {
+            'location_tree': location_tree,
+            'expanded_locations': expanded_ids,
+            'search_query': search_query,
+            'location_type': location_type,
+            'location_types': Location.LOCATION_TYPES,
+            'view_mode': view_mode,
+            'total_count': total_count,
+            'search_limit_reached': total_count >= LOCATION_TREE_SEARCH_LIMIT and bool(search_query or location_type),
+        }
+        
+        # Check if request comes from HTMX
+        if request.headers.get('HX-Request'):
+            return render(request, 'wms/location_list.html#location-tree', context)
+        
+        return render(request, 'wms/location_list.html', context)
+    else:
+        # Dla widoku tabeli - paginacja
+        locations = locations.order_by('barcode')
+        
+        # Paginacja
+        paginator = Paginator(locations, 50)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        
+        context = {
+            'page_obj': page_obj,
+            'search_query': search_query,
+            'location_type': location_type,
+            'location_types': Location.LOCATION_TYPES,
+            'view_mode': view_mode,
+        }
+
+        # Check if request comes from HTMX
+        if request.headers.get('HX-Request'):
+            return render(request, 'wms/location_list.html#location-table', context)
+        
+        return render(request, 'wms/location_list.html', context)
+
+
+@login_required
+def htmx_location_edit(request, location_id=None):
+    """HTMX endpoint for creating/editing location - returns edit form"""
+    location = None
+    if location_id:
+        location = get_object_or_404(Location, id=location_id)
+    
+    # Zbuduj breadcrumbs dla bieżącej lokalizacji (łańcuch parentów)
+    location_breadcrumbs = []
+    if location:
+        current = location
+        while current is not None:
+            location_breadcrumbs.append(current)
+            current = current.parent
+        location_breadcrumbs.reverse()
+    
+    if request.method == 'GET':
+        form = LocationEditForm(instance=location, location=location)
+        
+        context = {
+            'form': form,
+            'location': location,
+            'location_breadcrumbs': location_breadcrumbs,
+        }
+
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_location_edit_form.html', context)
+
+        response['HX-Trigger'] = json.dumps({
+            'modalMessage': {
+                'title': 'Nowa lokalizacja' if not location else 'Edycja lokalizacji',
+                #'body': response.content.decode('utf-8')
+            },
+        })
+
+        return response
+    
+    # Handle POST for form submission
+    if request.method == 'POST':
+        form = LocationEditForm(request.POST, instance=location, location=location)
+
+        context = {
+            'form': form,
+            'location': location,
+            'location_breadcrumbs': location_breadcrumbs,
+        }
+        
+        if form.is_valid():
+            try:
+                form.save()
+                
+                # Return success response with updated row
+                response = HttpResponse(status=200)
+                toast_message = {
+                    "toastMessage": {
+                        "value": "Lokalizacja została utworzona" if not location else "Lokalizacja została zaktualizowana",
+                        "type": "success"
+                    },
+                    'modalHide': {
+                        'value': 'modalHide'
+                    },
+                    "location-list-updated": {
+                        "value": "location-list-updated"
+                    }
+                }
+                response['HX-Trigger'] = json.dumps(toast_message)
+                return response
+                
+            except Exception as e:
+                context = {
+                    'form': form,
+                    'location': location,
+                    'error': f'Błąd podczas zapisu formularza: {str(e)}'
+                }
+           
+        return render(request, 'wms/partials/_location_edit_form.html', context)
+    
+    return HttpResponse(status=405)  # Method not allowed
+
+
+@login_required
+def htmx_location_delete(request, location_id):
+    """HTMX endpoint for deleting location"""
+    if request.method != 'DELETE':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        
+        # Check if location has any stock with quantity > 0 or reserved_quantity > 0
+        if Stock.objects.filter(
+            location=location
+        ).filter(
+            Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
+        ).exists():
+            response = HttpResponse(status=400)
+            toast_message = {
+                "toastMessage": {
+                    "value": "Nie można usunąć lokalizacji z produktami w magazynie",
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        
+        # Check if location has child locations
+        if Location.objects.filter(parent=location).exists():
+            response = HttpResponse(status=400)
+            toast_message = {
+                "toastMessage": {
+                    "value": "Nie można usunąć lokalizacji z podlokalizacjami",
+                    "type": "danger"
+                },
+                "location-list-updated": {
+                    "value": "location-list-updated"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        
+        location_name = location.name
+        location.delete()
+        
+        response = HttpResponse(status=200)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Lokalizacja {location_name} została usunięta",
+                "type": "success"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas usuwania lokalizacji: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_location_photos(request, location_id):
+    """HTMX endpoint for viewing location photos - returns photos modal"""
+    if request.method != 'GET':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        photos = location.images.all().order_by('created_at')
+        
+        # Create form for uploading new photos
+        upload_form = LocationImageForm(location=location, is_edit=False)
+        
+        context = {
+            'location': location,
+            'photos': photos,
+            'upload_form': upload_form,
+        }
+
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_location_photos_modal.html', context)
+
+        
+        response['HX-Trigger'] = json.dumps({
+            'modalMessage': {
+                'title': f'Zdjęcia lokalizacji: {location.name}',
+                #'body': response.content.decode('utf-8')
+            }
+        })
+
+        return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas ładowania zdjęć: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_location_photo_upload(request, location_id):
+    """HTMX endpoint for uploading location photos"""
+    if request.method != 'POST':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        
+        # Use the new form for validation and processing
+        form = LocationImageForm(request.POST, request.FILES, location=location, is_edit=False)
+        
+        if form.is_valid():
+            # Save the photo using the form's save method
+            photo = form.save()
+            
+            # Refresh photos list
+            photos = location.images.all().order_by('created_at')
+            upload_form = LocationImageForm(location=location, is_edit=False)
+            
+            context = {
+                'location': location,
+                'photos': photos,
+                'upload_form': upload_form,
+            }
+            
+            response = HttpResponse(status=200)
+            response.content = render(request, 'wms/partials/_location_photos_modal.html', context)
+            
+            toast_message = {
+                "toastMessage": {
+                    "value": "Zdjęcie zostało dodane",
+                    "type": "success"
+                },
+                "location-list-updated": {
+                    "value": "location-list-updated"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        else:
+            # Form validation failed
+            photos = location.images.all().order_by('created_at')
+            context = {
+                'location': location,
+                'photos': photos,
+                'upload_form': form,  # Pass the form with errors
+            }
+            
+            response = HttpResponse(status=400)
+            response.content = render(request, 'wms/partials/_location_photos_modal.html', context)
+            
+            # Get first error message
+            first_error = next(iter(form.errors.values()))[0] if form.errors else "Błąd walidacji formularza"
+            toast_message = {
+                "toastMessage": {
+                    "value": first_error,
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas dodawania zdjęcia: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_location_photo_update(request, location_id):
+    """HTMX endpoint for updating location photo details"""
+
+    response = HttpResponse(status=200)
+
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        photo_id = request.GET.get('photo_id') or request.POST.get('photo_id')
+        if not photo_id:
+            response = HttpResponse(status=400)
+            toast_message = {
+                "toastMessage": {
+                    "value": "Brak ID zdjęcia",
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        
+        photo = get_object_or_404(LocationImage, id=photo_id, location=location)
+
+        if request.method == 'GET':
+            form = LocationImageForm(location=location, instance=photo, is_edit=True)
+            context = {
+                'location': location,
+                'photo': photo,
+                'upload_form': form,
+            }
+            response = HttpResponse(status=200)
+            response.content = render(request, 'wms/partials/_location_photo_edit_modal.html', context)
+            return response
+        
+        if request.method == 'POST':
+        # Use the new form for validation and processing
+            form = LocationImageForm(request.POST, location=location, instance=photo, is_edit=True)
+        
+            if form.is_valid():
+            # Save the photo using the form's save method
+                form.save()
+                context = {
+                    'location': location,
+                    'photo': photo,
+                    'upload_form': form,
+                }
+            
+                response.content = render(request, 'wms/partials/_location_photo_edit_modal.html', context)
+            
+                toast_message = {
+                    "toastMessage": {
+                        "value": "Zdjęcie zostało zaktualizowane",
+                        "type": "success"
+                    }
+                }
+                response['HX-Trigger'] = json.dumps(toast_message)
+                return response
+            else:
+                context = {
+                    'location': location,
+                    'photo': photo,
+                    'upload_form': form,
+                }
+
+                toast_message = {
+                    "toastMessage": {
+                        "value": "Błąd podczas aktualizacji zdjęcia",
+                        "type": "danger"
+                    }
+                }
+                response['HX-Trigger'] = json.dumps(toast_message)
+                response.content = render(request, 'wms/partials/_location_photo_edit_modal.html', context)
+                return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas aktualizacji zdjęcia: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_location_photo_set_primary(request, location_id):
+    """HTMX endpoint for setting location photo as primary"""
+    if request.method != 'POST':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        photo_id = request.POST.get('photo_id')
+        if not photo_id:
+            response = HttpResponse(status=400)
+            toast_message = {
+                "toastMessage": {
+                    "value": "Brak ID zdjęcia",
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        photo = get_object_or_404(LocationImage, id=photo_id, location=location)
+        
+        photo.is_primary = True
+        photo.save()
+        
+        # Refresh photos list
+        photos = location.images.all().order_by('created_at')
+        upload_form = LocationImageForm(location=location, is_edit=False)
+        context = {
+            'location': location,
+            'photos': photos,
+            'upload_form': upload_form,
+        }
+        
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_location_photos_modal.html', context)
+        
+        toast_message = {
+            "toastMessage": {
+                "value": "Zdjęcie zostało ustawione jako główne",
+                "type": "success"
+            },
+            "location-list-updated": {
+                "value": "location-list-updated"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas ustawiania zdjęcia głównego: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_location_photo_delete(request, location_id):
+    """HTMX endpoint for deleting location photo"""
+    print(request.method)
+
+    if request.method != 'POST':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        photo_id = request.POST.get('photo_id')
+        if not photo_id:
+            response = HttpResponse(status=400)
+            toast_message = {
+                "toastMessage": {
+                    "value": "Brak ID zdjęcia",
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        photo = get_object_or_404(LocationImage, id=photo_id, location=location)
+        
+        photo.delete()
+        
+        # Refresh photos list
+        photos = location.images.all().order_by('created_at')
+        upload_form = LocationImageForm(location=location, is_edit=False)
+        context = {
+            'location': location,
+            'photos': photos,
+            'upload_form': upload_form,
+        }
+        
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_location_photos_modal.html', context)
+        
+        toast_message = {
+            "toastMessage": {
+                "value": "Zdjęcie zostało usunięte",
+                "type": "success"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas usuwania zdjęcia: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_location_photos_inline(request, location_id):
+    """HTMX endpoint for displaying location photos inline in the next row"""
+    if request.method != 'GET':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        location = get_object_or_404(Location, id=location_id)
+        photos = location.images.all().order_by('created_at')
+        
+        # Sprawdź czy to widok drzewa czy tabeli (z referera lub parametru)
+        referer = request.META.get('HTTP_REFERER', '')
+        is_tree_view = 'view=tree' in referer or request.GET.get('view') == 'tree'
+        
+        context = {
+            'location': location,
+            'photos': photos,
+            'is_tree_view': is_tree_view,
+        }
+        
+        # Return HTML content directly for inline display
+        return render(request, 'wms/partials/_location_photos_inline.html', context)
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas ładowania zdjęć: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_locations_autocomplete(request):
+    """HTMX endpoint for locations autocomplete (indeks prefiksowy w pamięci)"""
+    query = (
+        request.GET.get('q', '').strip()
+        or request.GET.get('location', '').strip()
+        or request.GET.get('location_code', '').strip()
+    )
+    picking_id = request.GET.get('picking_id', '').strip()
+
+    if not query:
+        return HttpResponse('')
+
+    # If picking_id is provided, limit to locations that still have items to pick
+    allowed_ids = None
+    if picking_id:
+        location_ids = set(
+            PickingItem.objects.filter(
+                picking_order_id=picking_id,
+                quantity_picked__lt=F('quantity_to_pick')
+            ).values_list('location_id', flat=True)
+        ) if picking_id.isdigit() else set()
+        if location_ids:
+            allowed_ids = location_ids
+
+    # Receiving can go to any location, so receiving_id does not narrow the results
+    exclude_ids = [int(value) for value in request.GET.getlist('exclude') if value.isdigit()]
+
+    locations = search_locations(query, allowed_ids=allowed_ids, exclude_ids=exclude_ids)
+
+    response = render(request, 'wms/partials/_location_autocomplete_options.html', {
+        'locations': locations,
+    })
+    response['HX-Trigger'] = 'location-autocomplete'
+    return response
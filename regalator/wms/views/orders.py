@@ -0,0 +1,454 @@
+"""Widoki zamówień klientów (ZK) i tworzenia zleceń kompletacji."""
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import HttpResponse
+from django.db import transaction
+from django.utils import timezone
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.db.models.functions import Lower
+from django.contrib.auth.models import User
+from decimal import Decimal
+from ..models import CustomerOrder, Location, OrderItem, PickingItem, PickingOrder, Stock
+from datetime import datetime
+from ..exports import filter_orders
+from ..numbering import SEQUENCE_PICKING, allocate_number
+from ..utils import aget_or_create_products_from_subiekt
+from .accounts import async_login_required
+from asgiref.sync import sync_to_async
+from subiekt import async_client
+
+
+@login_required
+def order_list(request):
+    """Lista zamówień klientów"""
+    status_filter = request.GET.get('status', '')
+    search_query = request.GET.get('search', '')
+    assigned_filter = request.GET.get('assigned', '')
+    
+    orders = filter_orders(request.GET).prefetch_related(
+        Prefetch(
+            'pickingorder_set',
+            queryset=PickingOrder.objects.select_related('assigned_to')
+        ),
+        'items'
+    )
+    
+    # Paginacja
+    paginator = Paginator(orders, 20)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+
+    for order in page_obj:
+        _prepare_order_display(order)
+    
+    assigned_users = User.objects.all().order_by(Lower('last_name'), Lower('first_name')).distinct()
+    
+    context = {
+        'page_obj': page_obj,
+        'status_filter': status_filter,
+        'search_query': search_query,
+        'assigned_filter': assigned_filter,
+        'assigned_users': assigned_users,
+        'status_choices': CustomerOrder.ORDER_STATUS,
+    }
+    return render(request, 'wms/order_list.html', context)
+
+
+@login_required
+def order_detail(request, order_id):
+    """Szczegóły zamówienia klienta"""
+    order = get_object_or_404(CustomerOrder, id=order_id)
+    picking_orders = (
+        PickingOrder.objects.filter(customer_order=order)
+        .select_related('assigned_to')
+        .prefetch_related('items__product', 'items__order_item')
+    )
+
+    order_items = list(order.items.select_related('product'))
+    picking_items = []
+    for picking_order in picking_orders:
+        picking_items.extend(list(picking_order.items.all()))
+
+    total_items, completed_items, partial_items, quantities = _calculate_order_progress(order, order_items, picking_items)
+    total_quantity, completed_quantity = quantities
+
+    pending_items = max(total_items - completed_items - partial_items, 0)
+    picking_progress = 0.0
+    if total_quantity > 0:
+        picking_progress = float((completed_quantity / total_quantity) * 100)
+        picking_progress = min(picking_progress, 100.0)
+
+    latest_picking = picking_orders.order_by('-created_at').first()
+    picking_active = picking_orders.filter(status='in_progress').exists()
+    picking_completed = picking_orders.filter(status='completed').count()
+    primary_unit = ''
+    if picking_items:
+        first_product = next((p.product for p in picking_items if getattr(p.product, 'unit', None)), None)
+        if first_product:
+            primary_unit = first_product.unit
+    elif order_items:
+        first_product = order_items[0].product
+        if first_product and getattr(first_product, 'unit', None):
+            primary_unit = first_product.unit
+    
+    context = {
+        'order': order,
+        'picking_orders': picking_orders,
+        'total_items': total_items,
+        'completed_items': completed_items,
+        'partial_items': partial_items,
+        'pending_items': pending_items,
+        'total_quantity': total_quantity,
+        'completed_quantity': completed_quantity,
+        'picking_progress': picking_progress,
+        'latest_picking': latest_picking,
+        'picking_active': picking_active,
+        'picking_completed_count': picking_completed,
+        'primary_unit': primary_unit,
+        'has_quantities': total_quantity > 0,
+    }
+    return render(request, 'wms/order_detail.html', context)
+
+
+@login_required
+def start_or_continue_picking(request, picking_id):
+    """Rozpoczyna lub kontynuuje kompletację i przekierowuje do procesu fast."""
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+    customer_order = picking_order.customer_order
+
+    if picking_order.status == 'created':
+        with transaction.atomic():
+            picking_order.status = 'in_progress'
+            picking_order.started_at = timezone.now()
+            picking_order.assigned_to = picking_order.assigned_to or request.user
+            picking_order.save(update_fields=['status', 'started_at', 'assigned_to'])
+        messages.success(request, f'Rozpoczęto kompletację {picking_order.order_number}.')
+    elif picking_order.status == 'in_progress':
+        messages.info(request, f'Kontynuujesz kompletację {picking_order.order_number}.')
+    elif picking_order.status == 'completed':
+        messages.warning(request, f'Zlecenie {picking_order.order_number} jest już zakończone.')
+        return redirect('wms:picking_detail', picking_id=picking_id)
+    else:
+        messages.warning(request, f'Zlecenie {picking_order.order_number} ma status {picking_order.get_status_display()} – brak możliwości kontynuacji.')
+        return redirect('wms:picking_detail', picking_id=picking_id)
+
+    return redirect('wms:picking_fast', picking_id=picking_id)
+
+
+@login_required
+def picking_order_change_status(request, picking_id):
+    """Zmiana statusu kompletacji (np. ponowne otwarcie zakończonej)."""
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+    new_status = request.POST.get('status')
+    allowed_statuses = {'created', 'in_progress'}
+
+    if new_status not in allowed_statuses:
+        messages.error(request, 'Wybrano nieprawidłowy status.')
+        return redirect('wms:picking_detail', picking_id=picking_id)
+
+    if new_status == picking_order.status:
+        messages.info(request, 'Status kompletacji pozostał bez zmian.')
+        return redirect('wms:picking_detail', picking_id=picking_id)
+
+    updates = ['status']
+    picking_order.status = new_status
+
+    if new_status == 'created':
+        if picking_order.started_at is not None:
+            picking_order.started_at = None
+            updates.append('started_at')
+        if picking_order.completed_at is not None:
+            picking_order.completed_at = None
+            updates.append('completed_at')
+    elif new_status == 'in_progress':
+        if not picking_order.started_at:
+            picking_order.started_at = timezone.now()
+            updates.append('started_at')
+        if picking_order.completed_at is not None:
+            picking_order.completed_at = None
+            updates.append('completed_at')
+
+    picking_order.save(update_fields=updates)
+
+    if new_status == 'in_progress':
+        messages.success(request, 'Status zaktualizowany. Kontynuuj kompletację.')
+        return redirect('wms:picking_fast', picking_id=picking_id)
+
+    messages.success(request, 'Status kompletacji został zaktualizowany.')
+    return redirect('wms:picking_detail', picking_id=picking_id)
+
+
+def _save_zk_orders(subiekt_zk_documents, positions, products):
+    """Zapisuje dokumenty ZK pobrane z Subiekta, zwraca (nowe, zaktualizowane) numery zamówień"""
+    new_orders = []
+    updated_orders = []
+
+    for zk_doc in subiekt_zk_documents:
+        try:
+            order_number = zk_doc.dok_NrPelny
+            customer_name = zk_doc.adr_Nazwa or zk_doc.adr_NazwaPelna or 'Nieznany klient'
+            address_candidates = [
+                zk_doc.adr_Adres,
+                zk_doc.adr_Ulica,
+                ' '.join(filter(None, [zk_doc.adr_Kod, zk_doc.adr_Miejscowosc])),
+                zk_doc.adr_Poczta,
+            ]
+            customer_address = ', '.join([part.strip() for part in address_candidates if part])
+
+            order_date_value = zk_doc.dok_DataWyst or timezone.now().date()
+            order_datetime = datetime.combine(order_date_value, datetime.min.time())
+            if timezone.is_naive(order_datetime):
+                order_datetime = timezone.make_aware(order_datetime, timezone.get_current_timezone())
+
+            defaults = {
+                'customer_name': customer_name,
+                'customer_address': customer_address,
+                'order_date': order_datetime,
+                'status': 'pending',
+                'total_value': Decimal('0'),
+                'notes': f'ZK z Subiekta: {order_number}',
+            }
+
+            order, created = CustomerOrder.objects.get_or_create(
+                order_number=order_number,
+                defaults=defaults
+            )
+
+            items_updated = False
+
+            if not created:
+                updated = False
+                if order.customer_name != customer_name:
+                    order.customer_name = customer_name
+                    updated = True
+                if order.customer_address != customer_address:
+                    order.customer_address = customer_address
+                    updated = True
+                if order.notes != defaults['notes']:
+                    order.notes = defaults['notes']
+                    updated = True
+                if order.status == 'pending' and defaults['status'] != 'pending':
+                    order.status = defaults['status']
+                    updated = True
+
+                if updated:
+                    order.save(update_fields=['customer_name', 'customer_address', 'notes'])
+                    updated_orders.append(order.order_number)
+            else:
+                new_orders.append(order.order_number)
+
+            total_value = Decimal('0')
+
+            zk_positions = positions.get(zk_doc.dok_Id, [])
+
+            if zk_positions:
+                for position in zk_positions:
+                    product = products.get(position.get('tw_Id'))
+                    if not product:
+                        continue
+
+                    quantity = Decimal(str(position.get('ob_Ilosc') or 0))
+                    order_item_defaults = {
+                        'quantity': quantity,
+                        'total_price': Decimal('0'),
+                    }
+                    order_item, item_created = OrderItem.objects.update_or_create(
+                        order=order,
+                        product=product,
+                        defaults=order_item_defaults
+                    )
+
+                    if not item_created and (
+                        order_item.quantity != quantity or order_item.total_price != Decimal('0')
+                    ):
+                        order_item.quantity = quantity
+                        order_item.total_price = Decimal('0')
+                        order_item.save(update_fields=['quantity', 'total_price'])
+                    items_updated = items_updated or item_created
+
+            order.total_value = total_value
+            order.save(update_fields=['total_value'])
+
+            if not created and items_updated and order.order_number not in updated_orders:
+                updated_orders.append(order.order_number)
+
+        except Exception:
+            continue
+
+    return new_orders, updated_orders
+
+
+@async_login_required
+async def sync_zk_orders(request):
+    """
+    Synchronizuje zamówienia klientów (ZK) z Subiekta. Pozycje dokumentów i
+    brakujące produkty pobierane są z Subiekta równolegle.
+    """
+    if request.method != 'POST':
+        messages.error(request, 'Nieprawidłowa metoda żądania')
+        return redirect('wms:order_list')
+
+    try:
+        subiekt_zk_documents = await async_client.get_zk(limit=20)
+
+        if not subiekt_zk_documents:
+            messages.info(request, 'Brak zamówień ZK do synchronizacji')
+            return redirect('wms:order_list')
+
+        positions = await async_client.get_positions_for(subiekt_zk_documents)
+        products = await aget_or_create_products_from_subiekt(
+            position.get('tw_Id') for zk_positions in positions.values() for position in zk_positions
+        )
+        new_orders, updated_orders = await sync_to_async(_save_zk_orders)(
+            subiekt_zk_documents, positions, products
+        )
+
+        if new_orders:
+            messages.success(
+                request,
+                f'Załadowano {len(new_orders)} nowych zamówień ZK: {", ".join(new_orders)}'
+            )
+
+        if updated_orders:
+            messages.info(
+                request,
+                f'Zaktualizowano {len(updated_orders)} istniejących zamówień ZK'
+            )
+
+        if not new_orders and not updated_orders:
+            messages.warning(request, 'Brak nowych zamówień ZK do załadowania')
+
+        return redirect('wms:order_list')
+
+    except Exception as e:
+        messages.error(request, f'Błąd podczas synchronizacji ZK: {str(e)}')
+        return redirect('wms:order_list')
+
+
+@login_required
+def create_picking_order(request, order_id):
+    """Tworzenie zlecenia kompletacji dla zamówienia"""
+    customer_order = get_object_or_404(CustomerOrder, id=order_id)
+    
+    if request.method == 'POST':
+        picking_order, created = _ensure_picking_order(customer_order, request.user)
+        if created:
+            messages.success(request, f'Utworzono zlecenie kompletacji: {picking_order.order_number}')
+        else:
+            messages.info(request, f'Zlecenie kompletacji już istnieje: {picking_order.order_number}')
+        return redirect('wms:picking_fast', picking_id=picking_order.id)
+    
+    return redirect('wms:order_detail', order_id=order_id)
+
+
+@transaction.atomic
+def _ensure_picking_order(customer_order, user):
+    existing = customer_order.pickingorder_set.exclude(status='cancelled').first()
+    if existing:
+        return existing, False
+
+    picking_order = PickingOrder.objects.create(
+        order_number=allocate_number(SEQUENCE_PICKING, ref=customer_order.order_number),
+        customer_order=customer_order,
+        status='created',
+        assigned_to=user
+    )
+
+    sequence = 1
+    for order_item in customer_order.items.all():
+        stock = Stock.objects.filter(
+            product=order_item.product,
+            quantity__gt=0
+        ).order_by('-quantity').first()
+
+        if stock:
+            location = stock.location
+        else:
+            location = Location.objects.filter(is_default=True).first()
+
+        PickingItem.objects.create(
+            picking_order=picking_order,
+            order_item=order_item,
+            product=order_item.product,
+            location=location,
+            quantity_to_pick=order_item.quantity,
+            quantity_picked=0,
+            is_completed=False,
+            sequence=sequence
+        )
+        sequence += 1
+
+    return picking_order, True
+
+
+def _calculate_order_progress(customer_order, order_items=None, picking_items=None):
+    order_items = order_items if order_items is not None else list(customer_order.items.all())
+    picking_items = picking_items if picking_items is not None else []
+
+    total_items = 0
+    completed_items = 0
+    partial_items = 0
+    total_quantity = Decimal('0')
+    completed_quantity = Decimal('0')
+
+    if picking_items:
+        total_items = len(picking_items)
+        for p_item in picking_items:
+            qty_to_pick = p_item.quantity_to_pick or Decimal('0')
+            qty_picked = p_item.quantity_picked or Decimal('0')
+
+            total_quantity += qty_to_pick
+            completed_quantity += min(qty_picked, qty_to_pick)
+
+            if qty_to_pick > 0:
+                if qty_picked >= qty_to_pick:
+                    completed_items += 1
+                elif qty_picked > 0:
+                    partial_items += 1
+            else:
+                completed_items += 1
+    else:
+        total_items = len(order_items)
+        for item in order_items:
+            item_quantity = item.quantity or Decimal('0')
+            item_completed = item.completed_quantity or Decimal('0')
+
+            total_quantity += item_quantity
+            completed_quantity += min(item_completed, item_quantity)
+
+            if item_quantity > 0:
+                if item_completed >= item_quantity:
+                    completed_items += 1
+                elif item_completed > 0:
+                    partial_items += 1
+            else:
+                completed_items += 1
+
+    return total_items, completed_items, partial_items, (total_quantity, completed_quantity)
+
+
+def _prepare_order_display(order):
+    total_items, completed_items, partial_items, quantities = _calculate_order_progress(order)
+    total_quantity, completed_quantity = quantities
+
+    order.total_items_count = total_items
+    order.completed_items_count = completed_items
+    order.partial_items_count = partial_items
+    order.total_quantity = total_quantity
+    order.completed_quantity = completed_quantity
+
+    picking_orders = list(order.pickingorder_set.all())
+    order.first_picking = picking_orders[0] if picking_orders else None
+    order.completed_picking_order = next((po for po in picking_orders if po.status == 'completed'), None)
+    order.picking_completed = bool(order.completed_picking_order)
+    order.can_continue_picking = any(po.status == 'in_progress' for po in picking_orders)
+    order.can_start_picking = not picking_orders or all(po.status == 'created' for po in picking_orders)
+    order.assigned_operator = next((po.assigned_to for po in picking_orders if po.assigned_to), None)
+
+    return order
@@ -0,0 +1,740 @@
+"""Widoki kompletacji (Terminacja): lista, szybkie skanowanie i operacje HTMX."""
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import HttpResponse
+from django.db import transaction
+from django.utils import timezone
+from django.core.paginator import Paginator
+from django.db.models import Q, Prefetch
+from django.db.models.functions import Lower
+from django.contrib.auth.models import User
+from decimal import Decimal, InvalidOperation
+from ..models import Location, PickingHistory, PickingItem, PickingOrder, Product
+import json
+from django.template.loader import render_to_string
+from .. import order_candidates
+from ..order_candidates import search_order_candidates
+from ..documents import build_wz_document
+from .. import stock_ledger
+
+
+@login_required
+def picking_list(request):
+    """Lista zleceń kompletacji"""
+    status_filter = request.GET.get('status', '')
+    search_query = request.GET.get('search', '')
+    assigned_filter = request.GET.get('assigned', '')
+    
+    picking_orders = PickingOrder.objects.all()
+    
+    if status_filter:
+        picking_orders = picking_orders.filter(status=status_filter)
+    
+    if search_query:
+        picking_orders = picking_orders.filter(
+            Q(order_number__icontains=search_query) |
+            Q(customer_order__customer_name__icontains=search_query)
+        )
+
+    if assigned_filter:
+        if assigned_filter == 'unassigned':
+            picking_orders = picking_orders.filter(assigned_to__isnull=True)
+        else:
+            try:
+                assigned_user_id = int(assigned_filter)
+            except (TypeError, ValueError):
+                assigned_user_id = None
+            if assigned_user_id:
+                picking_orders = picking_orders.filter(assigned_to_id=assigned_user_id)
+    
+    picking_orders = picking_orders.order_by('-created_at')
+    
+    # Paginacja
+    paginator = Paginator(picking_orders, 20)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    context = {
+        'page_obj': page_obj,
+        'status_filter': status_filter,
+        'search_query': search_query,
+        'assigned_filter': assigned_filter,
+        'assigned_users': User.objects.all().order_by(Lower('last_name'), Lower('first_name')).distinct(),
+        'status_choices': PickingOrder.PICKING_STATUS,
+    }
+    return render(request, 'wms/picking_list.html', context)
+
+
+@login_required
+def picking_detail(request, picking_id):
+    """Szczegóły zlecenia kompletacji"""
+    picking_order = (
+        PickingOrder.objects
+        .select_related('customer_order')
+        .prefetch_related(
+            Prefetch(
+                'items',
+                queryset=PickingItem.objects.select_related('product', 'location').prefetch_related('product__codes')
+            )
+        )
+        .get(id=picking_id)
+    )
+    picking_items = list(picking_order.items.all())
+    picking_history = (
+        PickingHistory.objects.filter(picking_item__picking_order=picking_order)
+        .select_related('user', 'product_scanned', 'location_scanned')
+        .order_by('-scanned_at')
+    )
+    context = {
+        'picking_order': picking_order,
+        'picking_items': picking_items,
+        'picking_history': picking_history,
+    }
+    return render(request, 'wms/picking_detail.html', context)
+
+
+@login_required
+def start_picking(request, picking_id):
+    """Rozpoczęcie kompletacji"""
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+    
+    if picking_order.status == 'created':
+        picking_order.status = 'in_progress'
+        picking_order.started_at = timezone.now()
+        picking_order.save()
+        
+        _clear_current_picking_item(request, picking_id)
+        _clear_current_picking_location(request, picking_id)
+        messages.success(request, f'Rozpoczęto kompletację {picking_order.order_number}')
+        return redirect('wms:picking_fast', picking_id=picking_id)
+    else:
+        messages.warning(request, f'Zlecenie {picking_order.order_number} nie może być rozpoczęte (status: {picking_order.get_status_display()})')
+    
+    return redirect('wms:picking_detail', picking_id=picking_id)
+
+
+def _picking_session_key(picking_id, suffix):
+    return f'picking_{picking_id}_{suffix}'
+
+
+def _get_current_picking_location(request, picking_id):
+    location_id = request.session.get(_picking_session_key(picking_id, 'location_id'))
+    if not location_id:
+        return None
+    try:
+        return Location.objects.get(id=location_id)
+    except Location.DoesNotExist:
+        request.session.pop(_picking_session_key(picking_id, 'location_id'), None)
+        return None
+
+
+def _set_current_picking_location(request, picking_id, location):
+    if location:
+        request.session[_picking_session_key(picking_id, 'location_id')] = location.id
+        request.session.modified = True
+
+
+def _clear_current_picking_location(request, picking_id):
+    key = _picking_session_key(picking_id, 'location_id')
+    if key in request.session:
+        request.session.pop(key, None)
+        request.session.modified = True
+
+
+def _get_current_picking_item(request, picking_id):
+    item_id = request.session.get(_picking_session_key(picking_id, 'item_id'))
+    if not item_id:
+        return None
+    try:
+        return PickingItem.objects.get(id=item_id, picking_order_id=picking_id)
+    except PickingItem.DoesNotExist:
+        request.session.pop(_picking_session_key(picking_id, 'item_id'), None)
+        return None
+
+
+def _set_current_picking_item(request, picking_id, picking_item):
+    if picking_item:
+        request.session[_picking_session_key(picking_id, 'item_id')] = picking_item.id
+        request.session.modified = True
+
+
+def _clear_current_picking_item(request, picking_id):
+    item_key = _picking_session_key(picking_id, 'item_id')
+    item_id = request.session.pop(item_key, None)
+    if item_id:
+        quantity_key = _picking_session_key(picking_id, f'quantity_{item_id}')
+        request.session.pop(quantity_key, None)
+    request.session.modified = True
+
+
+def _clear_picking_quantity_cache(request, picking_id, item_id):
+    key = _picking_session_key(picking_id, f'quantity_{item_id}')
+    if key in request.session:
+        request.session.pop(key, None)
+        request.session.modified = True
+
+
+def _decimal_to_input(value):
+    if value is None:
+        return ''
+    try:
+        decimal_value = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return ''
+    text = format(decimal_value, 'f')
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
+
+
+def _set_picking_item_default_quantity(request, picking_id, picking_item):
+    remaining = picking_item.quantity_to_pick - picking_item.quantity_picked
+    key = _picking_session_key(picking_id, f'quantity_{picking_item.id}')
+
+    if remaining > 0:
+        request.session[key] = _decimal_to_input(remaining)
+        request.session.modified = True
+    elif picking_item.quantity_picked > 0:
+        request.session[key] = _decimal_to_input(picking_item.quantity_picked)
+        request.session.modified = True
+    else:
+        if key in request.session:
+            request.session.pop(key, None)
+            request.session.modified = True
+
+
+def _apply_picking_operation(picking_order, picking_item, location, quantity, user, mode):
+    with transaction.atomic():
+        picking_item.refresh_from_db()
+        previous_quantity = picking_item.quantity_picked
+
+        if mode == 'overwrite':
+            delta = quantity - previous_quantity
+            new_total = quantity
+        else:
+            delta = quantity
+            new_total = previous_quantity + quantity
+
+        if new_total < 0:
+            raise ValueError('Nieprawidłowa ilość – wynik poniżej zera.')
+        if new_total > picking_item.quantity_to_pick:
+            raise ValueError('Nie można przekroczyć ilości do pobrania.')
+
+        # Aktualizacja stanu magazynowego (InsufficientStock przerywa operację)
+        stock_ledger.adjust(
+            picking_item.product,
+            location,
+            -delta,
+            user=user,
+            note=f"Terminacja {picking_order.order_number}",
+            untracked_ok=True,
+        )
+
+        # Aktualizacja pozycji kompletacji
+        picking_item.quantity_picked = new_total
+        picking_item.is_completed = new_total >= picking_item.quantity_to_pick
+        picking_item.location = location
+        picking_item.save(update_fields=['quantity_picked', 'is_completed', 'location'])
+
+        # Aktualizacja pozycji zamówienia
+        order_item = picking_item.order_item
+        order_item.completed_quantity = max(
+            Decimal('0'),
+            order_item.completed_quantity + delta
+        )
+        order_item.save(update_fields=['completed_quantity'])
+
+        # Zapis historii tylko dla dodatnich zmian
+        if delta > 0:
+            PickingHistory.objects.create(
+                picking_item=picking_item,
+                user=user,
+                location_scanned=location,
+                product_scanned=picking_item.product,
+                quantity_picked=delta
+            )
+
+        if picking_order.status == 'created':
+            picking_order.status = 'in_progress'
+            picking_order.started_at = timezone.now()
+            picking_order.save(update_fields=['status', 'started_at'])
+
+        # Jeżeli wszystkie pozycje skompletowane, oznacz zlecenie jako completed (bez generowania WZ)
+        if picking_order.items.filter(is_completed=False).exists():
+            if picking_order.status == 'completed':
+                picking_order.status = 'in_progress'
+                picking_order.completed_at = None
+                picking_order.save(update_fields=['status', 'completed_at'])
+            return False
+
+        picking_order.status = 'completed'
+        picking_order.completed_at = timezone.now()
+        picking_order.save(update_fields=['status', 'completed_at'])
+        return True
+
+
+def _build_picking_fast_context(request, picking_order, picking_id):
+    current_location = _get_current_picking_location(request, picking_id)
+    current_picking_item = _get_current_picking_item(request, picking_id)
+
+    picking_items = list(
+        picking_order.items.select_related('product', 'location')
+        .prefetch_related('product__codes')
+        .order_by('sequence')
+    )
+
+    pending_items = []
+    picked_items = []
+
+    for item in picking_items:
+        item.remaining_quantity = item.quantity_to_pick - item.quantity_picked
+        item.last_quantity_input = request.session.get(
+            _picking_session_key(picking_id, f'quantity_{item.id}')
+        )
+        if item.quantity_picked > 0:
+            picked_items.append(item)
+        if not item.is_completed:
+            pending_items.append(item)
+
+    selected_item = None
+    if current_picking_item:
+        for item in picking_items:
+            if item.id == current_picking_item.id:
+                selected_item = item
+                break
+        if selected_item:
+            current_picking_item = selected_item
+
+    form_mode = 'append'
+    form_quantity_value = ''
+    form_product_value = ''
+    form_product_display_value = ''
+    form_location_value = ''
+    form_location_display_value = ''
+    form_picking_item_id = ''
+
+    def _format_location_display(location):
+        if not location:
+            return ''
+        name = getattr(location, 'name', '') or ''
+        location_type_display = ''
+        if hasattr(location, 'get_location_type_display'):
+            try:
+                location_type_display = location.get_location_type_display() or ''
+            except Exception:
+                location_type_display = ''
+        if location_type_display:
+            return f"{name} / {location_type_display}" if name else location_type_display
+        return name or (location.barcode or '')
+
+    def _format_product_display(product, fallback=''):
+        if not product:
+            return fallback
+        name = getattr(product, 'name', '') or ''
+        if name:
+            return name
+        sku = getattr(product, 'sku', '') or ''
+        if sku:
+            return sku
+        code = getattr(product, 'code', '') or ''
+        if code:
+            return code
+        return fallback
+
+    if current_location:
+        form_location_value = current_location.barcode or ''
+        form_location_display_value = _format_location_display(current_location)
+
+    if current_picking_item:
+        form_picking_item_id = str(current_picking_item.id)
+        if current_picking_item.quantity_picked > 0:
+            form_mode = 'overwrite'
+
+        if current_picking_item.last_quantity_input:
+            form_quantity_value = current_picking_item.last_quantity_input
+        elif current_picking_item.quantity_picked > 0:
+            form_quantity_value = _decimal_to_input(current_picking_item.quantity_picked)
+        elif current_picking_item.remaining_quantity > 0:
+            form_quantity_value = _decimal_to_input(current_picking_item.remaining_quantity)
+
+        product_codes = list(current_picking_item.product.codes.all()) if hasattr(current_picking_item.product, 'codes') else []
+        if product_codes:
+            form_product_value = product_codes[0].code
+        else:
+            form_product_value = getattr(current_picking_item.product, 'code', '') or ''
+
+        form_product_display_value = _format_product_display(
+            current_picking_item.product,
+            form_product_value
+        )
+
+        if current_picking_item.location:
+            current_location = current_picking_item.location
+            form_location_value = current_location.barcode or ''
+            form_location_display_value = _format_location_display(current_location)
+
+    if not form_product_display_value:
+        form_product_display_value = form_product_value
+
+    focus_target = 'location_code'
+    if current_location:
+        focus_target = 'product_code'
+    if current_picking_item and current_location:
+        focus_target = 'quantity'
+
+    recent_locations = []
+    seen_location_ids = set()
+
+    def _append_location(loc):
+        if not loc:
+            return
+        location_id = getattr(loc, 'id', None)
+        if not location_id or location_id in seen_location_ids:
+            return
+        recent_locations.append(loc)
+        seen_location_ids.add(location_id)
+
+    if current_location and getattr(current_location, 'id', None):
+        _append_location(current_location)
+
+    for item in picking_items:
+        _append_location(getattr(item, 'location', None))
+
+    history_entries = (
+        PickingHistory.objects
+        .filter(picking_item__picking_order=picking_order, location_scanned__isnull=False)
+        .select_related('location_scanned')
+        .order_by('-scanned_at')[:50]
+    )
+
+    for entry in history_entries:
+        _append_location(entry.location_scanned)
+
+    return {
+        'picking_order': picking_order,
+        'pending_items': pending_items,
+        'picked_items': picked_items,
+        'current_location': current_location,
+        'current_picking_item': current_picking_item,
+        'focus_target': focus_target,
+        'form_mode': form_mode,
+        'form_quantity_value': form_quantity_value,
+        'form_product_value': form_product_value,
+        'form_product_display_value': form_product_display_value,
+        'form_location_value': form_location_value,
+        'form_location_display_value': form_location_display_value,
+        'form_picking_item_id': form_picking_item_id,
+        'recent_locations': recent_locations,
+    }
+
+
+@login_required
+def picking_fast(request, picking_id):
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+
+    if picking_order.status == 'created':
+        picking_order.status = 'in_progress'
+        picking_order.started_at = timezone.now()
+        picking_order.save(update_fields=['status', 'started_at'])
+
+    context = _build_picking_fast_context(request, picking_order, picking_id)
+    print(context['pending_items'])
+    print(context['picked_items'])
+    for item in context['pending_items']:
+        print(item.location)
+    for item in context['picked_items']:
+        print(item.location)
+    return render(request, 'wms/picking_fast.html', context)
+
+
+@login_required
+def htmx_picking_submit(request, picking_id):
+    if request.method != 'POST' or request.headers.get('HX-Request') != 'true':
+        return HttpResponse(status=405)
+
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+
+    location_code = request.POST.get('location_code', '').strip()
+    product_code = request.POST.get('product_code', '').strip()
+    quantity_text = request.POST.get('quantity', '').strip()
+    picking_item_id = request.POST.get('picking_item_id', '').strip()
+    action = request.POST.get('action', '').strip()
+    mode = request.POST.get('mode', 'append').strip()
+
+    feedback_message = None
+    feedback_type = 'info'
+
+    current_location = _get_current_picking_location(request, picking_id)
+    current_picking_item = _get_current_picking_item(request, picking_id)
+
+    if action == 'clear_selection':
+        _clear_current_picking_item(request, picking_id)
+        _clear_current_picking_location(request, picking_id)
+        current_location = None
+        current_picking_item = None
+        feedback_message = 'Wyczyszczono bieżące wybory.'
+        feedback_type = 'success'
+
+    if picking_item_id and feedback_type != 'error':
+        try:
+            picking_item = PickingItem.objects.select_related('location', 'product').get(
+                id=picking_item_id,
+                picking_order=picking_order
+            )
+        except PickingItem.DoesNotExist:
+            feedback_message = 'Wybrana pozycja kompletacji nie istnieje.'
+            feedback_type = 'error'
+        else:
+            _set_current_picking_item(request, picking_id, picking_item)
+            current_picking_item = picking_item
+            _set_picking_item_default_quantity(request, picking_id, picking_item)
+            if picking_item.location:
+                _set_current_picking_location(request, picking_id, picking_item.location)
+                current_location = picking_item.location
+            feedback_message = f'Wybrano produkt {picking_item.product.name}.'
+            feedback_type = 'success'
+
+    if location_code and feedback_type != 'error':
+        location = Location.objects.filter(barcode=location_code).first()
+        if not location:
+            location = Location.objects.filter(name__iexact=location_code).first()
+
+        if location:
+            _set_current_picking_location(request, picking_id, location)
+            current_location = location
+            feedback_message = f'Ustawiono lokalizację {location.name}.'
+            feedback_type = 'success'
+        else:
+            feedback_message = f'Lokalizacja {location_code} nie istnieje.'
+            feedback_type = 'error'
+
+    if product_code and feedback_type != 'error':
+        product = Product.find_by_code(product_code)
+        if product:
+            items_qs = PickingItem.objects.filter(
+                picking_order=picking_order,
+                product=product
+            ).select_related('location', 'product').order_by('is_completed', 'sequence')
+            if current_location:
+                items_qs = items_qs.filter(location=current_location)
+
+            picking_item = items_qs.first()
+            if picking_item:
+                _set_current_picking_item(request, picking_id, picking_item)
+                current_picking_item = picking_item
+                _set_picking_item_default_quantity(request, picking_id, picking_item)
+                if picking_item.location:
+                    _set_current_picking_location(request, picking_id, picking_item.location)
+                    current_location = picking_item.location
+                feedback_message = f'Wybrano produkt {picking_item.product.name}.'
+                feedback_type = 'success'
+            else:
+                feedback_message = f'Produkt {product.name} nie występuje w tej kompletacji dla wybranej lokalizacji.'
+                feedback_type = 'error'
+        else:
+            feedback_message = f'Nie znaleziono produktu dla kodu {product_code}.'
+            feedback_type = 'error'
+
+    completed_order = False
+
+    if quantity_text and feedback_type != 'error':
+        if not current_picking_item:
+            feedback_message = 'Najpierw wybierz pozycję kompletacji.'
+            feedback_type = 'error'
+        elif not current_location:
+            feedback_message = 'Najpierw wybierz lokalizację.'
+            feedback_type = 'error'
+        elif current_picking_item.location and current_picking_item.location != current_location:
+            feedback_message = f'Ta pozycja przypisana jest do lokalizacji {current_picking_item.location.name}.'
+            feedback_type = 'error'
+        else:
+            try:
+                quantity = Decimal(quantity_text.replace(',', '.'))
+                if quantity <= 0:
+                    raise ValueError
+            except (InvalidOperation, ValueError, TypeError):
+                feedback_message = 'Nieprawidłowa ilość. Wprowadź liczbę dodatnią.'
+                feedback_type = 'error'
+            else:
+                try:
+                    completed_order = _apply_picking_operation(
+                        picking_order,
+                        current_picking_item,
+                        current_location,
+                        quantity,
+                        request.user,
+                        mode
+                    )
+                except ValueError as exc:
+                    feedback_message = str(exc)
+                    feedback_type = 'error'
+                else:
+                    _set_picking_item_default_quantity(request, picking_id, current_picking_item)
+
+                    action_suffix = 'zaktualizowano' if mode == 'overwrite' else 'pobrano'
+                    feedback_message = (
+                        f'Pomyślnie {action_suffix} {quantity_text} szt. '
+                        f'{current_picking_item.product.name} z {current_location.name}.'
+                    )
+                    feedback_type = 'success'
+
+                    if completed_order:
+                        feedback_message += ' Kompletacja została zakończona.'
+                        _clear_current_picking_item(request, picking_id)
+                        _clear_current_picking_location(request, picking_id)
+                        current_picking_item = None
+                        current_location = None
+
+    context = _build_picking_fast_context(request, picking_order, picking_id)
+    html = render_to_string('wms/partials/_picking_fast_table.html', context, request=request)
+
+    response = HttpResponse(html, status=200)
+    triggers = {
+        'picking-fast-refresh': {'value': 'picking-fast-refresh'},
+    }
+
+    print(feedback_message, feedback_type)
+
+    if feedback_message:
+        triggers['toastMessage'] = {
+            'value': feedback_message,
+            'type': feedback_type
+        }
+
+    response['HX-Trigger'] = json.dumps(triggers)
+    return response
+
+
+@login_required
+def htmx_picking_table(request, picking_id):
+    if request.headers.get('HX-Request') != 'true':
+        return HttpResponse(status=405)
+
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+    context = _build_picking_fast_context(request, picking_order, picking_id)
+    html = render_to_string('wms/partials/_picking_fast_table.html', context, request=request)
+    return HttpResponse(html, status=200)
+
+
+@login_required
+def htmx_picking_remove_item(request, picking_id, item_id):
+    if request.method != 'POST' or request.headers.get('HX-Request') != 'true':
+        return HttpResponse(status=405)
+
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+    picking_item = get_object_or_404(PickingItem, id=item_id, picking_order=picking_order)
+
+    if picking_item.quantity_picked <= 0:
+        feedback_message = 'Ta pozycja nie posiada pobranej ilości.'
+        feedback_type = 'info'
+    else:
+        quantity = picking_item.quantity_picked
+        location = picking_item.location
+
+        try:
+            with transaction.atomic():
+                picking_item.quantity_picked = Decimal('0')
+                picking_item.is_completed = False
+                picking_item.save(update_fields=['quantity_picked', 'is_completed'])
+
+                order_item = picking_item.order_item
+                order_item.completed_quantity = max(
+                    Decimal('0'),
+                    order_item.completed_quantity - quantity
+                )
+                order_item.save(update_fields=['completed_quantity'])
+
+                if location:
+                    stock_ledger.receive(
+                        picking_item.product,
+                        location,
+                        quantity,
+                        user=request.user,
+                        note=f"Cofnięcie pobrania - Terminacja {picking_order.order_number}",
+                    )
+
+                _clear_picking_quantity_cache(request, picking_id, picking_item.id)
+
+                if picking_order.status == 'completed':
+                    picking_order.status = 'in_progress'
+                    picking_order.completed_at = None
+                    picking_order.save(update_fields=['status', 'completed_at'])
+
+            feedback_message = (
+                f'Usunięto pobraną ilość {quantity} szt. dla {picking_item.product.name}.'
+            )
+            feedback_type = 'success'
+        except Exception as exc:
+            feedback_message = f'Nie udało się usunąć pozycji: {exc}'
+            feedback_type = 'error'
+
+    context = _build_picking_fast_context(request, picking_order, picking_id)
+    html = render_to_string('wms/partials/_picking_fast_table.html', context, request=request)
+
+    response = HttpResponse(html, status=200)
+    triggers = {
+        'picking-fast-refresh': {'value': 'picking-fast-refresh'},
+        'toastMessage': {
+            'value': feedback_message,
+            'type': feedback_type
+        }
+    }
+
+    response['HX-Trigger'] = json.dumps(triggers)
+    return response
+
+
+@login_required
+def htmx_picking_product_autocomplete(request, picking_id):
+    query = request.GET.get('product', '').strip()
+    if not query:
+        query = request.GET.get('product_code', '').strip()
+    if not query:
+        return HttpResponse('')
+
+    picking_order = get_object_or_404(PickingOrder.objects.only('id'), id=picking_id)
+
+    options = []
+    for match in search_order_candidates(order_candidates.PICKING, picking_order.id, query):
+        candidate, item = match.candidate, match.item
+        remaining = order_candidates.remaining_quantity(item)
+        options.append({
+            'item_id': item.id,
+            'code': candidate.code or candidate.product_code,
+            'name': candidate.name or candidate.code or candidate.product_code,
+            'default_quantity': _decimal_to_input(remaining if remaining > 0 else item.quantity_to_pick),
+            'location_name': item.location.name if item.location else 'Brak lokalizacji',
+            'remaining': _decimal_to_input(remaining) if remaining > 0 else '',
+        })
+
+    return render(request, 'wms/partials/_picking_product_options.html', {'options': options})
+
+
+@login_required
+def complete_picking(request, picking_id):
+    """Zakończenie kompletacji"""
+    picking_order = get_object_or_404(PickingOrder, id=picking_id)
+    
+    if request.method == 'POST':
+        with transaction.atomic():
+            # Zakończ zlecenie kompletacji
+            picking_order.status = 'completed'
+            picking_order.completed_at = timezone.now()
+            picking_order.save()
+
+            customer_order = picking_order.customer_order
+            warehouse_doc = build_wz_document(picking_order)
+
+            if warehouse_doc:
+                messages.success(request, f'Zakończono kompletację. Utworzono dokument WZ {warehouse_doc.document_number}')
+            else:
+                messages.info(request, 'Zakończono kompletację. Brak pozycji do utworzenia dokumentu WZ.')
+
+            return redirect('wms:order_detail', order_id=customer_order.id)
+    
+    context = {
+        'picking_order': picking_order,
+    }
+    return render(request, 'wms/complete_picking.html', context)
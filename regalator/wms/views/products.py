@@ -0,0 +1,1171 @@
+"""Widoki katalogu produktów: lista, kody, warianty, zdjęcia i grupy."""
+
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils import timezone
+from django.core.paginator import Paginator
+from django.db.models import Q, CharField
+from django.db.models.functions import Cast
+from decimal import Decimal
+from ..models import Location, Product, ProductCode, ProductGroup, Stock
+from ..forms import ProductCodeForm, ProductColorSizeForm, ProductStockInlineFormSet, ProductForm
+import json
+import logging
+from django.urls import reverse
+from django.db import IntegrityError
+from ..signals import product_updated
+from ..exports import filter_products, filter_products_for_export
+from ..product_sync import iter_sync_products
+from ..replica import read_from_replica
+from .accounts import async_login_required
+from asgiref.sync import sync_to_async
+from subiekt import async_client
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@read_from_replica
+def product_list(request):
+    """Lista produktów"""
+    search_query = request.GET.get('search', '')
+    sync_filter = request.GET.get('sync', '')
+    group_filter = request.GET.get('group_id', '') or request.GET.get('group', '')
+    subiekt_filter = request.GET.get('subiekt', '')
+    
+    products, errors = filter_products(request.GET)
+    products = products.prefetch_related('images', 'parent')
+    
+    # Filtrowanie po statusie synchronizacji
+    if sync_filter == 'needs_sync':
+        products = products.filter(subiekt_id__isnull=False)
+        # Filtrowanie po różnicy stanów (wykonane w Pythonie dla lepszej wydajności)
+        products = [p for p in products if p.needs_sync]
+    elif sync_filter == 'synced':
+        products = products.filter(subiekt_id__isnull=False)
+        products = [p for p in products if not p.needs_sync]
+    
+    # Sprawdź czy products to lista (po filtrowaniu Python) czy QuerySet
+    if isinstance(products, list):
+        # Jeśli to lista, sortuj w Pythonie
+        products.sort(key=lambda x: x.name)
+    else:
+        # Jeśli to QuerySet, użyj order_by
+        products = products.order_by('name')
+    
+    # Remove duplicates: only show products without parents, or the first occurrence of each parent
+    seen_parent_ids = set()
+    unique_products = []
+    for product in products:
+        # Determine which product to display (parent or self)
+        display_product = product.parent if product.parent else product
+        
+        # Only add if we haven't seen this parent before
+        if display_product.id not in seen_parent_ids:
+            seen_parent_ids.add(display_product.id)
+            unique_products.append(product)
+    
+    products = unique_products
+    
+    # Paginacja
+    paginator = Paginator(products, 50)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    # Create dictionary mapping product_id to list of variants (only for current page)
+    # Get all unique product IDs from current page
+    current_page_product_ids = set()
+    for product in page_obj:
+        display_product = product.parent if product.parent else product
+        current_page_product_ids.add(display_product.id)
+    
+    # Apply same filters to variants query as main product query
+    variants_query = Product.objects.filter(parent_id__in=current_page_product_ids)
+    
+    # Apply search filter to variants if present
+    if search_query:
+        variants_query = variants_query.annotate(
+            subiekt_id_str=Cast('subiekt_id', CharField())
+        ).filter(
+            Q(code__icontains=search_query) |
+            Q(name__icontains=search_query) |
+            Q(codes__code__icontains=search_query) |
+            Q(subiekt_id_str__icontains=search_query)
+        ).distinct()
+    
+    # Apply group filter to variants if present
+    if group_filter:
+        if group_filter == 'no_group':
+            variants_query = variants_query.filter(groups__isnull=True)
+        else:
+            try:
+                # Try to convert to integer, if it fails, ignore the filter
+                group_id = int(group_filter)
+                variants_query = variants_query.filter(groups__id=group_id)
+            except (ValueError, TypeError):
+                # If group_filter is not a valid integer, ignore the filter
+                # Error already added above, no need to duplicate
+                pass
+    
+    # Apply subiekt filter to variants if present
+    if subiekt_filter:
+        if subiekt_filter == 'has_subiekt':
+            variants_query = variants_query.filter(subiekt_id__isnull=False)
+        elif subiekt_filter == 'no_subiekt':
+            variants_query = variants_query.filter(subiekt_id__isnull=True)
+        else:
+            try:
+                subiekt_id_int = int(subiekt_filter)
+                variants_query = variants_query.filter(subiekt_id=subiekt_id_int)
+            except ValueError:
+                variants_query = variants_query.filter(subiekt_id__icontains=subiekt_filter)
+    
+    # Apply sync filter to variants if present
+    if sync_filter == 'needs_sync':
+        variants_query = variants_query.filter(subiekt_id__isnull=False)
+        # Note: needs_sync property filtering would need to be done in Python for variants too
+    elif sync_filter == 'synced':
+        variants_query = variants_query.filter(subiekt_id__isnull=False)
+    
+    # Final query with ordering
+    variants_query = variants_query.select_related('parent').order_by('parent_id', 'name')
+    
+    # Build dictionary efficiently
+    product_variants_dict = {}
+    product_variant_ids_dict = {}
+    for variant in variants_query:
+        parent_id = variant.parent_id
+        if parent_id not in product_variants_dict:
+            product_variants_dict[parent_id] = []
+            product_variant_ids_dict[parent_id] = []
+        product_variants_dict[parent_id].append(variant)
+        product_variant_ids_dict[parent_id].append(variant.id)
+    
+    # Pobierz wszystkie grupy dla filtra
+    groups = ProductGroup.objects.filter(is_active=True).order_by('name')
+    
+    context = {
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'sync_filter': sync_filter,
+        'group_filter': group_filter,
+        'subiekt_filter': subiekt_filter,
+        'groups': groups,
+        'product_variants_dict': product_variants_dict,
+        'product_variant_ids_dict': product_variant_ids_dict,
+        'errors': errors,
+    }
+
+    if request.headers.get('HX-Request'):
+        return render(request, 'wms/product_list.html#product-list-table', context)
+
+    return render(request, 'wms/product_list.html', context)
+
+
+@login_required
+def htmx_product_row(request, product_id):
+    """HTMX endpoint for displaying product row inline in the next row"""
+    product = get_object_or_404(Product, id=product_id)
+    context = {
+        'display_product': product,
+    }
+    return render(request, 'wms/product_list.html#product-row-partial', context)
+
+
+@login_required
+def barcodes_list(request):
+    """Lista kodów produktów"""
+    search_query = request.GET.get('search', '')
+    code_type_filter = request.GET.get('type', '')
+
+    barcodes = ProductCode.objects.select_related('product').filter(is_active=True)
+    
+    if search_query:
+        barcodes = barcodes.filter(
+            Q(code__icontains=search_query) |
+            Q(product__name__icontains=search_query) |
+            Q(product__code__icontains=search_query) |
+            Q(description__icontains=search_query)
+        )
+    
+    if code_type_filter:
+        barcodes = barcodes.filter(code_type=code_type_filter)
+    
+    barcodes = barcodes.order_by('product__name', 'code')
+    
+    # Paginacja
+    paginator = Paginator(barcodes, 50)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    context = {
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'code_type_filter': code_type_filter,
+        'code_types': ProductCode.CODE_TYPES,
+    }
+    if request.headers.get('HX-Request'):
+        return render(request, 'wms/barcodes_list.html#barcodes-table', context)
+
+    return render(request, 'wms/barcodes_list.html', context)
+
+
+# API endpoints dla skanowania
+@login_required
+def api_scan_barcode(request):
+    """API do skanowania kodów kreskowych i QR"""
+    if request.method == 'POST':
+        data = json.loads(request.body)
+        scanned_code = data.get('barcode', '').strip()
+        scan_type = data.get('scan_type', 'product')
+        
+        try:
+            if scan_type == 'location':
+                location = Location.objects.get(barcode=scanned_code)
+                return JsonResponse({
+                    'success': True,
+                    'type': 'location',
+                    'data': {
+                        'id': location.id,
+                        'code': location.barcode,
+                        'name': location.name,
+                        'barcode': location.barcode,
+                    }
+                })
+            else:
+                # Znajdź produkt po dowolnym kodzie (barcode, QR, etc.)
+                product = Product.find_by_code(scanned_code)
+                if product:
+                    return JsonResponse({
+                        'success': True,
+                        'type': 'product',
+                        'data': {
+                            'id': product.id,
+                            'code': product.code,
+                            'name': product.name,
+                        }
+                    })
+                else:
+                    return JsonResponse({
+                        'success': False,
+                        'error': 'Nie znaleziono produktu o podanym kodzie.'
+                    })
+        except Location.DoesNotExist:
+            return JsonResponse({
+                'success': False,
+                'error': 'Nie znaleziono lokalizacji o podanym kodzie kreskowym.'
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Nieprawidłowe żądanie.'})
+
+
+def _apply_subiekt_product(product, subiekt_product):
+    """Aktualizuje produkt WMS danymi z Subiekta (nazwa, opis, stany, grupa)"""
+    product.code = subiekt_product.tw_Symbol
+    product.name = subiekt_product.tw_Nazwa
+    product.description = subiekt_product.tw_Opis or ''
+    
+    # Aktualizuj stany magazynowe z Subiektu
+    product.subiekt_stock = Decimal(str(getattr(subiekt_product, 'st_Stan', 0)))
+    product.subiekt_stock_reserved = Decimal(str(getattr(subiekt_product, 'st_StanRez', 0)))
+    product.last_sync_date = timezone.now()
+
+    # Obsługa grupy produktów
+    subiekt_group = getattr(subiekt_product, 'grt_Nazwa', '')
+    if subiekt_group:
+        wms_group, group_created = ProductGroup.objects.get_or_create(
+            name=subiekt_group,
+            defaults={
+                'code': subiekt_group[:20],  # Używamy nazwy jako kodu (max 20 znaków)
+                'description': f'Grupa z Subiekta: {subiekt_group}',
+                'color': '#007bff',  # Domyślny kolor
+            }
+        )
+        
+        if wms_group not in product.groups.all():
+            product.groups.add(wms_group)
+    
+    product.save()
+
+
+@async_login_required
+async def htmx_sync_product(request, product_id, stock_id=None):
+    """HTMX view do synchronizacji produktu z Subiektem (zapytanie do Subiekta nie blokuje workera ASGI)"""
+    if request.method == 'POST':
+        try:
+            product = await aget_object_or_404(Product, id=product_id)
+
+            # Pobierz produkt z Subiektu
+            subiekt_product = await async_client.get_product_by_id(product.subiekt_id)
+
+            if not subiekt_product:
+                raise Exception(f'Produkt o ID {product.subiekt_id} nie istnieje w Subiekcie')
+            
+            await sync_to_async(_apply_subiekt_product)(product, subiekt_product)
+            
+            # Create response
+            response = await sync_to_async(render)(request, 'wms/product_list.html#product-row', {
+                'product': product,
+                'subiekt_stock': product.subiekt_stock,
+                'subiekt_stock_reserved': product.subiekt_stock_reserved
+            })
+            
+            # Add success toast trigger
+            response['HX-Trigger'] = json.dumps({
+                'toastMessage': {'value': f'Produkt {product.name} został zsynchronizowany. Stan w Subiekcie: {product.subiekt_stock}', 'type': 'success'},
+                'subiekt-stock-synced-'+str(product.id): {'value': 'true'}
+            })
+            
+            return response
+            
+        except Exception as e:            # Add error toast trigger
+            response = HttpResponse(status=500)
+            response['HX-Trigger'] = json.dumps({
+                'toastMessage': {'value': f'Błąd synchronizacji: {str(e)}', 'type': 'danger'}
+            })
+            
+            return response
+    
+    # Add error toast trigger
+    response = HttpResponse(status=405)
+    response['HX-Trigger'] = json.dumps({
+        'toastMessage': {'value': 'Metoda nie dozwolona', 'type': 'danger'}
+    })
+    
+    return response
+
+
+def _bulk_sync_stream(queryset):
+    """Postęp synchronizacji jako NDJSON - jedna linia po każdej porcji, na końcu podsumowanie"""
+    result = None
+    yield json.dumps({'total': queryset.filter(subiekt_id__isnull=False).count(), 'processed': 0, 'percent': 0}) + '\n'
+    for result in iter_sync_products(queryset):
+        yield json.dumps(result.as_dict()) + '\n'
+
+    if result is None:
+        summary = {'done': True, 'type': 'warning', 'message': 'Brak produktów powiązanych z Subiektem do synchronizacji'}
+    else:
+        message = f'Zsynchronizowano {result.updated} z {result.total} produktów'
+        if result.missing:
+            message += f', brak w Subiekcie: {len(result.missing)}'
+        if result.errors:
+            message += f', błędy: {len(result.errors)} ({result.errors[0]})'
+        summary = dict(result.as_dict(), done=True, type='warning' if result.errors or result.missing else 'success', message=message)
+    yield json.dumps(summary) + '\n'
+
+
+@login_required
+def htmx_bulk_sync_products(request):
+    """
+    Zbiorcza synchronizacja z Subiektem: zaznaczone produkty (``product_ids``,
+    razem z wariantami) albo cały wynik filtrów listy. Postęp jest
+    strumieniowany jako NDJSON.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    selected = [value for value in request.POST.getlist('product_ids') if value.isdigit()]
+    if selected:
+        queryset = Product.objects.filter(Q(pk__in=selected) | Q(parent_id__in=selected))
+    else:
+        queryset = filter_products_for_export(request.POST)
+
+    response = StreamingHttpResponse(_bulk_sync_stream(queryset), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def htmx_product_details(request, product_id):
+    """HTMX view do pobierania szczegółów produktu"""
+    if request.method == 'GET':
+        try:
+            product = get_object_or_404(Product, id=product_id)
+            
+            # Pobierz stany magazynowe w lokalizacjach
+            stocks = Stock.objects.filter(product=product).select_related('location')
+            
+            # Pobierz kody produktu (barcodes, QR codes)
+            product_codes = product.codes.filter(is_active=True).order_by('code_type', 'code')
+            
+            # Oblicz statystyki
+            total_reserved = sum(stock.reserved_quantity for stock in stocks)
+            quantities = [stock.quantity for stock in stocks if stock.quantity > 0]
+            
+            max_stock = max(quantities) if quantities else None
+            min_stock = min(quantities) if quantities else None
+            avg_stock = sum(quantities) / len(quantities) if quantities else None
+            
+            # Oblicz statystyki dla HTML
+            total_stock = sum(stock.quantity for stock in stocks)
+            locations_count = stocks.values('location').distinct().count()
+            
+            # Oblicz różnicę z Subiektem
+            stock_difference = 0
+            if product.subiekt_stock is not None:
+                stock_difference = total_stock - product.subiekt_stock
+            
+            # Calculate available stock for each stock item
+            for stock in stocks:
+                stock.available_quantity = stock.quantity - stock.reserved_quantity
+            
+            context = {
+                'product': product,
+                'stocks': stocks,
+                'product_codes': product_codes,
+                'total_stock': total_stock,
+                'locations_count': locations_count,
+                'stock_difference': stock_difference,
+                'total_reserved': total_reserved,
+                'max_stock': max_stock,
+                'min_stock': min_stock,
+                'avg_stock': avg_stock,
+            }
+            
+            # Create response
+            response = render(request, 'wms/partials/product_details_modal.html', context)
+            
+            # Add modal trigger
+            response['HX-Trigger'] = json.dumps({
+                'modalMessage': {
+                    'title': f'Szczegóły produktu: {product.name}',
+                    #'body': response.content.decode('utf-8')
+                }
+            })
+            
+            return response
+            
+        except Exception as e:
+            # Create error response
+            response = render(request, 'wms/partials/error_modal.html', {
+                'error': str(e)
+            })
+            
+            # Add modal trigger
+            response['HX-Trigger'] = json.dumps({
+                'modalMessage': {
+                    'title': 'Błąd',
+                    'body': f'Wystąpił błąd podczas ładowania szczegółów produktu: {str(e)}'
+                }
+            })
+            
+            return response
+    
+    # Create response for invalid method
+    response = render(request, 'wms/partials/error_modal.html', {
+        'error': 'Metoda nie dozwolona'
+    })
+    
+    # Add modal trigger
+    response['HX-Trigger'] = json.dumps({
+        'modalMessage': {
+            'title': 'Błąd',
+            'body': 'Metoda nie dozwolona'
+        }
+    })
+    
+    return response
+
+
+@login_required
+def product_group_list(request):
+    """Lista grup produktów"""
+    search_query = request.GET.get('search', '')
+    
+    groups = ProductGroup.objects.all()
+    
+    if search_query:
+        groups = groups.filter(
+            Q(name__icontains=search_query) |
+            Q(code__icontains=search_query) |
+            Q(description__icontains=search_query)
+        )
+    
+    groups = groups.order_by('name')
+    
+    # Paginacja
+    paginator = Paginator(groups, 50)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    context = {
+        'page_obj': page_obj,
+        'search_query': search_query,
+    }
+    return render(request, 'wms/product_group_list.html', context)
+
+
+@login_required
+def product_group_detail(request, group_id):
+    """Szczegóły grupy produktów"""
+    group = get_object_or_404(ProductGroup, id=group_id)
+    products = Product.objects.filter(groups=group).order_by('name')
+    
+    context = {
+        'group': group,
+        'products': products,
+    }
+    return render(request, 'wms/product_group_detail.html', context)
+
+
+@login_required
+def htmx_edit_product_codes(request, product_id, code_id=None):
+    """Edycja kodów produktu z możliwością skanowania"""
+    product = get_object_or_404(Product, id=product_id)    
+    # Get existing codes
+    product_codes = product.codes.all().order_by('code_type', 'code')
+    
+    # If code_id is provided, we're editing an existing code
+    editing_code = None
+    if code_id:
+        editing_code = get_object_or_404(ProductCode, id=code_id, product=product)
+
+    context = {
+        'product': product,
+        'product_codes': product_codes,
+        'code_types': ProductCode.CODE_TYPES,
+        'form': ProductCodeForm(product=product, instance=editing_code),
+        'editing_code': editing_code,
+    }
+    
+    # Handle POST request for form submission
+    if request.method == 'POST':
+        form = ProductCodeForm(request.POST, product=product, instance=editing_code)
+        context['form'] = form
+        context['editing_code'] = editing_code
+        
+        if form.is_valid():
+            code = form.save(commit=False)
+            code.product = product
+            code.save()
+                    
+                    
+            context['editing_code'] = None
+            context['form'] = ProductCodeForm(product=product)
+                    
+            response = HttpResponse(status=200)
+            response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+            response['HX-Trigger'] = json.dumps({
+                'toastMessage': {
+                    'value': 'Kod zapisany pomyślnie!',
+                    'type': 'success'
+                },
+                'barcodes-list-updated': {
+                    'value': 'barcodes-list-updated',
+                    'code': code.code,
+                    'product_id': product.id
+                }
+            })
+
+            return response                
+
+    response = HttpResponse(status=200)
+    response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+
+    response['HX-Trigger'] = json.dumps({
+        'modalMessage': {
+            'title': f'Kody produktu - {product.name}',
+            #'body': response.content.decode('utf-8')
+        },
+    })
+
+    return response
+
+
+@login_required
+def api_add_scanned_code(request, product_id):
+    """API endpoint for adding scanned codes"""
+    if request.method == 'POST':
+        try:
+            product = get_object_or_404(Product, id=product_id)
+            data = json.loads(request.body)
+            scanned_code = data.get('code', '').strip()
+            code_type = data.get('type', 'barcode')
+            
+            if not scanned_code:
+                return JsonResponse({'success': False, 'error': 'Brak kodu do dodania'})
+            
+            # Check if code already exists
+            if ProductCode.objects.filter(code=scanned_code).exists():
+                return JsonResponse({'success': False, 'error': f'Kod {scanned_code} już istnieje w systemie'})
+            
+            # Create new code
+            ProductCode.objects.create(
+                product=product,
+                code=scanned_code,
+                code_type=code_type,
+                description=f'Dodano przez skanowanie ({code_type})',
+            )
+            
+            response = JsonResponse({
+                'success': True, 
+                'message': f'Dodano kod {scanned_code}',
+                'code': scanned_code,
+                'type': code_type
+            })
+            
+            # Add HTMX trigger for product codes list refresh
+            response['HX-Trigger'] = json.dumps({
+                "product-codes-list": {
+                    "value": "product-codes-list"
+                }
+            })
+            
+            return response
+            
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+    
+    return JsonResponse({'success': False, 'error': 'Nieprawidłowe żądanie'})
+
+
+@login_required
+def htmx_add_code_modal(request, product_id):
+    product = get_object_or_404(Product, id=product_id)
+
+    # Create form instance
+    form = ProductCodeForm(product=product)
+    
+    context = {
+        'product': product,
+        'code_types': ProductCode.CODE_TYPES,
+        'form': form
+    }
+
+    response = HttpResponse(status=200)
+
+    if request.method == 'POST':
+        # Handle form submission
+        action = request.POST.get('action')
+        code_id = request.POST.get('code_id')
+        
+        if action == 'add':
+            # Use form for validation
+            form = ProductCodeForm(request.POST, product=product)
+            if form.is_valid():
+                
+                # Create new code
+                form.instance.product = product
+                form.save()
+                
+                toast_message = {
+                    "toastMessage": {
+                        "value": f"Dodano kod: {form.cleaned_data['code']}",
+                        "type": "success"
+                    },
+                    "product-codes-list": {
+                        "value": "product-codes-list"
+                    }
+                }
+                response['HX-Trigger'] = json.dumps(toast_message)
+
+            else:
+                # Form validation failed
+                context['form'] = form
+                response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+                return response
+
+
+        #return HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+        return response
+
+    # Create response
+    response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+            
+    # Add modal trigger
+    response['HX-Trigger'] = json.dumps({
+        'modalMessage': {
+            'title': f'Dodaj kod ręcznie',
+            #'body': response.content.decode('utf-8')
+        }
+    })
+
+    return response
+
+
+@login_required
+def htmx_delete_code(request, product_id, code_id):
+    if request.method == 'DELETE':
+        try:
+            product = get_object_or_404(Product, id=product_id)
+            code = get_object_or_404(ProductCode, id=code_id, product=product)
+            code_value = code.code
+            code.delete()           
+            
+            # Create response
+            response = HttpResponse(status=200)
+            
+            # Add toast message header
+            toast_message = {
+                "toastMessage": {
+                    "value": f"Usunięto kod: {code_value}",
+                    "type": "success"
+                },
+                "product-codes-list": {
+                    "value": "product-codes-list"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            
+            return response
+        except ProductCode.DoesNotExist:
+            # Handle error with toast
+            response = HttpResponse(status=404)
+            toast_message = {
+                "toastMessage": {
+                    "value": "Nie znaleziono kodu do usunięcia",
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        except Exception as e:
+            # Handle other errors with toast
+            response = HttpResponse(status=500)
+            toast_message = {
+                "toastMessage": {
+                    "value": f"Błąd podczas usuwania kodu: {str(e)}",
+                    "type": "danger"
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+
+    # For non-DELETE requests
+    response = HttpResponse(status=405) # Method not allowed
+    toast_message = {
+        "toastMessage": {
+            "value": "Nieprawidłowe żądanie",
+            "type": "danger"
+        }
+    }
+    response['HX-Trigger'] = json.dumps(toast_message)
+    return response
+
+
+@login_required
+def htmx_product_codes_list(request, product_id):
+    """HTMX endpoint for refreshing product codes list"""
+    product = get_object_or_404(Product, id=product_id)
+    product_codes = product.codes.all().order_by('code_type', 'code')
+
+    context = {
+        'product': product,
+        'product_codes': product_codes,
+    }
+    
+    return render(request, 'wms/partials/_product_codes_modal.html#product_codes_list', context)
+
+
+@login_required
+def htmx_add_code_inline(request, product_id):
+    """HTMX endpoint for adding scanned codes inline from barcode scanner"""
+    context = {}
+
+    response = HttpResponse(status=200)
+
+    if request.method == 'POST':
+        try:
+            product = get_object_or_404(Product, id=product_id)
+            scanned_code = request.POST.get('code', '').strip()
+            scanner_active = request.POST.get('scanner_active', 'false')
+
+            if scanner_active == 'false':
+                toast_message = {
+                    "toastMessage": {
+                        "value": "Skaner został zatrzymany. Uruchom skaner aby dodać kody.",
+                        "type": "danger"
+                    }
+                }
+                context['success'] = False
+                context['message'] = 'Skaner został zatrzymany. Uruchom skaner aby dodać kody.'
+                response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+                response['HX-Trigger'] = json.dumps(toast_message)
+                return response
+            
+            if not scanned_code:
+                context['success'] = False
+                context['message'] = 'Brak kodu do dodania'
+                return render(request, 'wms/partials/_product_codes_modal.html', context)
+
+            new_code = ProductCode.objects.create(
+                product=product,
+                code=scanned_code,
+                code_type='barcode',
+                description=f'Zeskanowano: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")} przez {request.user.username}',
+  # Don't make scanned codes primary by default
+            )
+            
+            # Return success response
+            context['success'] = True
+            context['message'] = f'Dodano zeskanowany kod: {scanned_code}'
+            context['code_id'] = new_code.id
+            context['code'] = new_code.code
+            reload_codes = {
+                "product-codes-list": {
+                    "value": "product-codes-list"
+                }
+            }
+            response.content = render(request, 'wms/partials/_product_codes_modal.html', context)
+            response['HX-Trigger'] = json.dumps(reload_codes)
+            return response
+            
+        except IntegrityError as e:
+            code = ProductCode.objects.get(code=scanned_code)
+            context['success'] = False
+            if code.product == product:
+                context['message'] = f'Kod {scanned_code} już istnieje dla tego produktu'
+            else:
+                context['message'] = f'Kod {scanned_code} już jest używany dla produktu {code.product.name}'
+
+            return render(request, 'wms/partials/_product_codes_modal.html', context)
+        except Exception as e:
+            context['success'] = False
+            context['message'] = f'Błąd podczas dodawania kodu: {str(e)}'
+            return render(request, 'wms/partials/_product_codes_modal.html', context)
+    
+    context['success'] = False
+    context['message'] = 'Nieprawidłowe żądanie'
+    return render(request, 'wms/partials/_product_codes_modal.html', context)
+
+
+@login_required
+def htmx_product_images_inline(request, product_id):
+    """HTMX endpoint for displaying product images inline in the next row"""
+    if request.method != 'GET':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        product = get_object_or_404(Product, id=product_id)
+        images = product.images.all().order_by('created_at')
+        
+        context = {
+            'product': product,
+            'images': images,
+        }
+        
+        # Return HTML content directly for inline display
+        return render(request, 'wms/partials/_product_images_inline.html', context)
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas ładowania zdjęć: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_product_variants(request, product_id):
+    """HTMX endpoint for displaying product variants inline in the next row"""
+
+    if request.method != 'GET':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        product = get_object_or_404(Product, id=product_id)
+
+        # Check if variant_ids parameter is provided
+        variant_ids_param = request.GET.get('variant_ids')
+        if variant_ids_param:
+            # Parse comma-separated variant IDs
+            try:
+                variant_ids = [int(id.strip()) for id in variant_ids_param.split(',') if id.strip()]
+                product_variants = Product.objects.filter(id__in=variant_ids)
+            except ValueError:
+                # Fallback to original behavior if parsing fails
+                product_variants = Product.objects.filter(parent=product)
+        else:
+            # Original behavior - get variants by parent
+            product_variants = Product.objects.filter(parent=product)
+
+        context = {
+            'product': product,
+            'product_variants': product_variants,
+            'silent': request.GET.get('silent'),
+        }
+
+        # Return HTML content directly for inline display
+        return render(request, 'wms/partials/_product_variants_inline.html', context)
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        toast_message = {
+            "toastMessage": {
+                "value": f"Błąd podczas ładowania wariantów: {str(e)}",
+                "type": "danger"
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_delete_variant(request, variant_id):
+    """HTMX view for deleting product variants"""
+    if request.method != 'POST':
+        return HttpResponse(status=405)  # Method not allowed
+    
+    try:
+        # Current implementation stores size/color variants as child Product rows
+        variant = get_object_or_404(Product, id=variant_id)
+        if not variant.parent:
+            response = HttpResponse(status=500)
+            toast_message = {
+                'toastMessage': {
+                    'value': f'Błąd podczas usuwania wariantu: Brak produktu nadrzędnego',
+                    'type': 'danger'
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+
+        # Capture data before deletion
+        parent_id = variant.parent.id
+        # Delete the variant
+        variant.delete()
+
+        product = get_object_or_404(Product, id=parent_id)
+        # Child Product variants for size/color
+        product_variants = Product.objects.filter(parent=product).order_by('name')
+        
+        context = {
+            'product': product,
+            'product_variants': product_variants,
+        }
+        
+        # Return the updated variants HTML with success toast
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_product_variants_inline.html', context)
+        toast_message = {
+            'toastMessage': {
+                'value': f'Usunięto wariant',
+                'type': 'success'
+            }
+        }
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error deleting variant: {e}")
+        toast_message = {
+            'toastMessage': {
+                'value': f'Błąd podczas usuwania wariantu: {str(e)}',
+                'type': 'danger'
+            }
+        }
+        
+        response = HttpResponse(status=500)
+        response['HX-Trigger'] = json.dumps(toast_message)
+        return response
+
+
+@login_required
+def htmx_edit_product_modal(request, product_id):
+    """HTMX view for editing product modal"""
+    product = get_object_or_404(Product, id=product_id)
+    context = {
+        'product': product,
+        'action': reverse('wms:htmx_edit_product_modal', kwargs={'product_id': product.id}),
+        'mode': 'product',
+        'form': ProductForm(instance=product),
+        'stock_formset': ProductStockInlineFormSet(instance=product, prefix='stock')
+    }
+    response = HttpResponse(status=200)
+
+    if request.method == 'POST':
+        form = ProductForm(request.POST, instance=product)
+        stock_formset = ProductStockInlineFormSet(request.POST, instance=product, prefix='stock')
+        context['form'] = form
+        context['stock_formset'] = stock_formset
+
+        if form.is_valid() and stock_formset.is_valid():
+            form.save()
+            stock_formset.save()
+            # Dispatch signal for product update
+            product_updated.send(sender=None, product=product)
+            # Rebuild fresh, unbound form and formset to avoid rendering deleted rows/errors
+            context['form'] = ProductForm(instance=product)
+            context['stock_formset'] = ProductStockInlineFormSet(instance=product, prefix='stock')
+            response.content = render(request, 'wms/partials/_product_edit_modal_form.html', context)
+            toast_message = {
+                'toastMessage': {
+                    'value': 'Produkt został zaktualizowany',
+                    'type': 'success'
+                },
+                'product-list-updated': {
+                    'value': 'product-list-updated'
+                },
+                'stock-list-updated': {
+                    'value': 'stock-list-updated'
+                },
+                'modalMessage': {
+                    'title': f"Edytuj produkt - {product.name}",
+                    #'body': response.content.decode('utf-8')
+                }
+            }
+            response['HX-Trigger'] = json.dumps(toast_message)
+            return response
+        else:
+            response.content = render(request, 'wms/partials/_product_edit_modal_form.html', context)
+            response['HX-Trigger'] = json.dumps({
+                'modalMessage': {
+                    'title': f"Edytuj produkt - {product.name}",
+                    #'body': response.content.decode('utf-8')
+                },
+                'toastMessage': {
+                    'value': 'Wystąpił błąd podczas zapisywania formularza',
+                    'type': 'danger'
+                }
+            })
+            return response
+
+    response.content = render(request, 'wms/partials/_product_edit_modal_form.html', context)
+    response['HX-Trigger'] = json.dumps({
+        'modalMessage': {
+            'title': f"Edytuj produkt - {product.name}",
+            #'body': response.content.decode('utf-8')
+        }
+    })
+    return response
+
+
+@login_required
+def htmx_add_size_color_modal(request, product_id, variant_id=None):
+    """HTMX view for adding/editing size and color variant modal"""
+    product = get_object_or_404(Product, id=product_id)
+    variant = None
+    if variant_id:
+        variant = get_object_or_404(Product, id=variant_id)
+        # Ensure the variant belongs to this product
+        if not variant.parent or variant.parent.id != product.id:
+            return HttpResponse(status=404)
+
+    if request.method == 'GET':
+        initial = None
+        if variant:
+            variants_json = variant.variants or {}
+            initial = {
+                'size': variants_json.get('size', ''),
+                'color': variants_json.get('color', ''),
+            }
+        form = ProductColorSizeForm(parent=product, instance=variant, initial=initial)
+        stock_formset = ProductStockInlineFormSet(instance=variant if variant else Product(), prefix='stock')
+
+        context = {
+            'form': form,
+            'stock_formset': stock_formset,
+            'product': product,
+            'variant': variant,
+            'action': reverse('wms:htmx_edit_size_color_modal', kwargs={'product_id': product.id, 'variant_id': variant.id}) if variant else reverse('wms:htmx_add_size_color_modal', kwargs={'product_id': product.id})
+        }
+
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_product_size_color_form.html', context)
+        
+        response['HX-Trigger'] = json.dumps({
+            'modalMessage': {
+                'title': (f"Edytuj rozmiar i kolor - {product.name}" if variant else f"Dodaj rozmiar i kolor - {product.name}"),
+                #'body': response.content.decode('utf-8')
+            }
+        })
+        
+        return response
+    
+    # Handle POST for form submission
+    if request.method == 'POST':
+        form = ProductColorSizeForm(request.POST, parent=product, instance=variant)
+        stock_formset = ProductStockInlineFormSet(request.POST, instance=variant if variant else Product(), prefix='stock')
+
+        if form.is_valid() and stock_formset.is_valid():
+            try:
+                variant_obj = form.save()
+                # Use the already validated formset and assign the saved variant as instance
+                stock_formset.instance = variant_obj
+                stock_formset.save()
+
+                size_value = (variant_obj.variants or {}).get('size', '')
+                color_value = (variant_obj.variants or {}).get('color', '')
+                toast_message = {
+                    'toastMessage': {
+                        'value': (f"Zaktualizowano wariant: {size_value} - {color_value}" if variant else f"Dodano wariant: {size_value} - {color_value}"),
+                        'type': 'success'
+                    },
+                    'product-variants-updated': {
+                        'value': 'product-variants-updated'
+                    },
+                    'stock-list-updated': {
+                        'value': 'stock-list-updated'                    
+                    },
+                    'modalHide': {
+                        'value': 'modalHide'
+                    }
+                }
+
+                response = HttpResponse(status=200)
+                response['HX-Trigger'] = json.dumps(toast_message)
+                return response
+
+            except Exception as e:
+                toast_message = {
+                    'toastMessage': {
+                        'value': f'Błąd podczas zapisywania: {str(e)}',
+                        'type': 'danger'
+                    }
+                }
+                response = HttpResponse(status=500)
+                response['HX-Trigger'] = json.dumps(toast_message)
+                return response
+
+        # Form or formset has errors, return with errors
+        context = {
+            'form': form,
+            'stock_formset': stock_formset,
+            'product': product,
+            'variant': variant,
+            'action': reverse('wms:htmx_edit_size_color_modal', kwargs={'product_id': product.id, 'variant_id': variant.id}) if variant else reverse('wms:htmx_add_size_color_modal', kwargs={'product_id': product.id})
+        }
+
+        response = HttpResponse(status=200)
+        response.content = render(request, 'wms/partials/_product_size_color_form.html', context)
+
+        response['HX-Trigger'] = json.dumps({
+            'modalMessage': {
+                'title': (f"Edytuj rozmiar i kolor - {product.name}" if variant else f"Dodaj rozmiar i kolor - {product.name}"),
+                #'body': response.content.decode('utf-8')
+            },
+            'toastMessage': {
+                'value': 'Wystąpił błąd podczas zapisywania formularza',
+                'type': 'danger'
+            }
+        })
+
+        return response
+
+
+@login_required
+def htmx_product_groups_autocomplete(request):
+    """HTMX endpoint for product groups autocomplete"""
+    query = request.GET.get('group', '').strip()
+    if not query:
+        return HttpResponse('')
+
+    # Search for product groups by name or code
+    groups = ProductGroup.objects.filter(
+        Q(name__icontains=query) | Q(code__icontains=query),
+        is_active=True
+    ).order_by('name')[:10]  # Limit to 10 results
+
+    # Create HTML divs for the autocomplete dropdown
+    options_html = ''
+    for group in groups:
+        options_html += f'<div class="autocomplete-item" data-group-id="{group.id}" data-group-name="{group.name}" data-group-code="{group.code}">{group.code} - {group.name}</div>'
+    
+    return HttpResponse(options_html)
@@ -0,0 +1,881 @@
+"""Widoki przyjęć (Regalacja): rejestry, szybkie skanowanie i dokumenty PZ."""
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import HttpResponse
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.contrib.auth.models import User
+from decimal import Decimal, InvalidOperation
+from ..models import Location, Product, ReceivingHistory, ReceivingItem, ReceivingOrder, SupplierOrder
+from confetti import services as confetti_services
+import json
+from django.template.loader import render_to_string
+from ..context_processors import AUTO_SAVE_REGALACJE_KEY
+from ..putaway import suggest_putaway_locations
+from .. import order_candidates
+from ..order_candidates import search_order_candidates
+from ..numbering import SEQUENCE_RECEIVING, allocate_number
+from ..documents import build_pz_document
+from .. import stock_ledger
+from .picking import _decimal_to_input
+from .supplier_orders import _update_supplier_order_status
+
+
+@login_required
+def create_receiving_order(request, supplier_order_id):
+    """Tworzenie rejestru przyjęć (Regalacja)"""
+    supplier_order = get_object_or_404(SupplierOrder, id=supplier_order_id)
+    
+    if request.method == 'POST':
+        # Sprawdź czy już istnieje aktywna Regalacja dla tego ZD
+        existing_receiving = ReceivingOrder.objects.filter(
+            supplier_order=supplier_order,
+            status__in=['pending', 'in_progress']
+        ).first()
+        
+        if existing_receiving:
+            messages.warning(request, f'Regalacja już istnieje: {existing_receiving.order_number}')
+            return redirect('wms:supplier_order_detail', order_id=supplier_order_id)
+        
+        # Utwórz nową Regalację (numer i pozycje w jednej transakcji)
+        with transaction.atomic():
+            receiving_order = ReceivingOrder.objects.create(
+                order_number=allocate_number(SEQUENCE_RECEIVING, ref=supplier_order.order_number),
+                supplier_order=supplier_order,
+                status='pending',
+                assigned_to=request.user
+            )
+        
+            # Automatycznie oznacz zamówienie jako przeczytane
+            supplier_order.is_new = False
+            supplier_order.save()
+        
+            # Utwórz pozycje Regalacji na podstawie pozycji ZD
+            sequence = 1
+            for supplier_item in supplier_order.items.all():
+                ReceivingItem.objects.create(
+                    receiving_order=receiving_order,
+                    supplier_order_item=supplier_item,
+                    product=supplier_item.product,
+                    quantity_ordered=supplier_item.quantity_ordered,
+                    quantity_received=0,
+                    sequence=sequence
+                )
+                sequence += 1
+        
+        messages.success(request, f'Utworzono regalację: {receiving_order.order_number}')
+        return redirect('wms:receiving_order_detail', receiving_id=receiving_order.id)
+    
+    return redirect('wms:supplier_order_detail', order_id=supplier_order_id)
+
+
+@login_required
+def receiving_order_change_status(request, receiving_id):
+    """Zmiana statusu regalacji (np. ponowne otwarcie zakończonej)."""
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+    auto_save_enabled = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+    new_status = request.POST.get('status')
+    allowed_statuses = {'pending', 'in_progress'}
+
+    if new_status not in allowed_statuses:
+        messages.error(request, 'Wybrano nieprawidłowy status.')
+        return redirect('wms:receiving_order_detail', receiving_id=receiving_id)
+
+    if new_status == receiving_order.status:
+        messages.info(request, 'Status regalacji pozostał bez zmian.')
+        return redirect('wms:receiving_order_detail', receiving_id=receiving_id)
+
+    updates = ['status']
+    receiving_order.status = new_status
+
+    if new_status == 'pending':
+        if receiving_order.started_at is not None:
+            receiving_order.started_at = None
+            updates.append('started_at')
+        if receiving_order.completed_at is not None:
+            receiving_order.completed_at = None
+            updates.append('completed_at')
+    elif new_status == 'in_progress':
+        if not receiving_order.started_at:
+            receiving_order.started_at = timezone.now()
+            updates.append('started_at')
+        if receiving_order.completed_at is not None:
+            receiving_order.completed_at = None
+            updates.append('completed_at')
+
+    receiving_order.save(update_fields=updates)
+
+    _update_supplier_order_status(receiving_order.supplier_order)
+
+    messages.success(request, 'Status regalacji został zaktualizowany.')
+
+    if new_status == 'in_progress':
+        return redirect('wms:receiving_order_fast', receiving_id=receiving_id)
+    return redirect('wms:receiving_order_detail', receiving_id=receiving_id)
+
+
+@login_required
+def receiving_order_list(request):
+    """Lista rejestrów przyjęć (Regalacja)"""
+    search_query = request.GET.get('search', '')
+    status_filter = request.GET.get('status', '')
+    assigned_filter = request.GET.get('assigned', '')
+    
+    receiving_orders = ReceivingOrder.objects.all()
+    
+    if search_query:
+        receiving_orders = receiving_orders.filter(
+            Q(order_number__icontains=search_query) |
+            Q(supplier_order__order_number__icontains=search_query) |
+            Q(supplier_order__supplier_name__icontains=search_query)
+        )
+    
+    if status_filter:
+        receiving_orders = receiving_orders.filter(status=status_filter)
+
+    if assigned_filter:
+        if assigned_filter == 'unassigned':
+            receiving_orders = receiving_orders.filter(assigned_to__isnull=True)
+        else:
+            try:
+                assigned_user_id = int(assigned_filter)
+            except (TypeError, ValueError):
+                assigned_user_id = None
+            if assigned_user_id:
+                receiving_orders = receiving_orders.filter(assigned_to_id=assigned_user_id)
+    
+    assigned_users = User.objects.all().order_by(Lower('last_name'), Lower('first_name')).distinct()
+
+    context = {
+        'receiving_orders': receiving_orders,
+        'search_query': search_query,
+        'status_filter': status_filter,
+        'assigned_filter': assigned_filter,
+        'assigned_users': assigned_users,
+        'status_choices': ReceivingOrder.RECEIVING_STATUS_CHOICES,
+    }
+    return render(request, 'wms/receiving_order_list.html', context)
+
+
+@login_required
+def receiving_order_detail(request, receiving_id):
+    """Szczegóły rejestru przyjęć"""
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+    
+    context = {
+        'receiving_order': receiving_order,
+        'pending_items': receiving_order.items.filter(quantity_received=0),
+        'received_items': receiving_order.items.filter(quantity_received__gt=0),
+        'history': receiving_order.history.all()[:10],  # Ostatnie 10 wpisów
+    }
+    return render(request, 'wms/receiving_order_detail.html', context)
+
+
+def _receiving_session_key(receiving_id, suffix):
+    return f'receiving_{receiving_id}_{suffix}'
+
+
+def _get_current_location(request, receiving_id):
+    location_id = request.session.get(_receiving_session_key(receiving_id, 'location_id'))
+    if not location_id:
+        return None
+    try:
+        return Location.objects.get(id=location_id)
+    except Location.DoesNotExist:
+        request.session.pop(_receiving_session_key(receiving_id, 'location_id'), None)
+        return None
+
+
+def _set_current_location(request, receiving_id, location):
+    if location:
+        request.session[_receiving_session_key(receiving_id, 'location_id')] = location.id
+        request.session.modified = True
+
+
+def _clear_current_location(request, receiving_id):
+    if _receiving_session_key(receiving_id, 'location_id') in request.session:
+        request.session.pop(_receiving_session_key(receiving_id, 'location_id'), None)
+        request.session.modified = True
+
+
+def _get_current_receiving_item(request, receiving_id):
+    item_id = request.session.get(_receiving_session_key(receiving_id, 'item_id'))
+    if not item_id:
+        return None
+    try:
+        return ReceivingItem.objects.get(id=item_id, receiving_order_id=receiving_id)
+    except ReceivingItem.DoesNotExist:
+        request.session.pop(_receiving_session_key(receiving_id, 'item_id'), None)
+        return None
+
+
+def _set_current_receiving_item(request, receiving_id, receiving_item):
+    if receiving_item:
+        request.session[_receiving_session_key(receiving_id, 'item_id')] = receiving_item.id
+        request.session.modified = True
+
+
+def _clear_current_receiving_item(request, receiving_id):
+    item_session_key = _receiving_session_key(receiving_id, 'item_id')
+    item_id = request.session.pop(item_session_key, None)
+    if item_id:
+        quantity_key = _receiving_session_key(receiving_id, f'quantity_{item_id}')
+        request.session.pop(quantity_key, None)
+    request.session.modified = True
+
+
+def _clear_item_quantity_cache(request, receiving_id, item_id):
+    quantity_key = _receiving_session_key(receiving_id, f'quantity_{item_id}')
+    if quantity_key in request.session:
+        request.session.pop(quantity_key, None)
+        request.session.modified = True
+
+
+def _set_item_default_quantity(request, receiving_id, receiving_item):
+    remaining = receiving_item.quantity_ordered - receiving_item.quantity_received
+    quantity_key = _receiving_session_key(receiving_id, f'quantity_{receiving_item.id}')
+
+    if remaining > 0:
+        request.session[quantity_key] = str(remaining)
+        request.session.modified = True
+    elif receiving_item.quantity_received > 0:
+        request.session[quantity_key] = str(receiving_item.quantity_received)
+        request.session.modified = True
+    else:
+        if quantity_key in request.session:
+            request.session.pop(quantity_key, None)
+            request.session.modified = True
+
+
+def _apply_receiving_intake(receiving_order, receiving_item, location, quantity, user):
+    with transaction.atomic():
+        receiving_item.quantity_received += quantity
+        receiving_item.location = location
+        receiving_item.save(update_fields=['quantity_received', 'location'])
+
+        supplier_item = receiving_item.supplier_order_item
+        supplier_item.quantity_received += quantity
+        supplier_item.save(update_fields=['quantity_received'])
+
+        _update_supplier_order_status(receiving_order.supplier_order)
+
+        ReceivingHistory.objects.create(
+            receiving_order=receiving_order,
+            product=receiving_item.product,
+            location=location,
+            quantity_received=quantity,
+            scanned_by=user
+        )
+
+        stock_ledger.receive(
+            receiving_item.product,
+            location,
+            quantity,
+            user=user,
+            note=f"Regalacja {receiving_order.order_number}",
+        )
+
+        if receiving_order.status == 'pending':
+            receiving_order.status = 'in_progress'
+            receiving_order.started_at = timezone.now()
+            receiving_order.save(update_fields=['status', 'started_at'])
+
+        receiving_order.refresh_from_db()
+
+    return receiving_order.status == 'completed'
+
+
+def _build_receiving_fast_context(request, receiving_order, receiving_id, *, auto_save_enabled=None):
+    current_location = _get_current_location(request, receiving_id)
+    current_receiving_item = _get_current_receiving_item(request, receiving_id)
+
+    receiving_items = list(
+        receiving_order.items.select_related('product', 'location')
+        .prefetch_related('product__codes')
+        .order_by('sequence')
+    )
+
+    pending_items = []
+    received_items = []
+
+    for item in receiving_items:
+        item.remaining_quantity = item.quantity_ordered - item.quantity_received
+        item.last_quantity_input = request.session.get(_receiving_session_key(receiving_id, f'quantity_{item.id}'))
+        if item.quantity_received > 0:
+            received_items.append(item)
+        else:
+            pending_items.append(item)
+
+    selected_item = None
+    if current_receiving_item:
+        for item in receiving_items:
+            if item.id == current_receiving_item.id:
+                selected_item = item
+                break
+        if selected_item:
+            current_receiving_item = selected_item
+
+    if auto_save_enabled is None:
+        auto_save_enabled = bool(
+            confetti_services.get_effective_setting(
+                AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+            )
+        )
+
+    form_mode = 'append'
+    form_quantity_value = ''
+    form_product_value = ''
+    form_product_display_value = ''
+    form_location_value = ''
+    form_location_display_value = ''
+
+    def _format_location_display(location):
+        if not location:
+            return ''
+        name = getattr(location, 'name', '') or getattr(location, 'barcode', '') or ''
+        location_type_display = ''
+        if hasattr(location, 'get_location_type_display'):
+            try:
+                location_type_display = location.get_location_type_display() or ''
+            except Exception:
+                location_type_display = ''
+        if location_type_display:
+            return f"{name} / {location_type_display}"
+        return name
+
+    def _format_product_display(product, code_value=''):
+        if not product:
+            return code_value
+        name = getattr(product, 'name', '') or ''
+        if name:
+            return name
+        sku = getattr(product, 'sku', '') or ''
+        if sku:
+            return sku
+        return code_value
+
+    if current_location:
+        form_location_value = current_location.barcode or ''
+        form_location_display_value = _format_location_display(current_location)
+
+    if current_receiving_item:
+        if current_receiving_item.quantity_received > 0:
+            form_mode = 'overwrite'
+        if current_receiving_item.last_quantity_input:
+            form_quantity_value = current_receiving_item.last_quantity_input
+        elif current_receiving_item.quantity_received > 0:
+            form_quantity_value = str(current_receiving_item.quantity_received)
+        elif current_receiving_item.remaining_quantity > 0:
+            form_quantity_value = str(current_receiving_item.remaining_quantity)
+
+        # Prefill product code using first associated code if available
+        product_codes = list(current_receiving_item.product.codes.all()) if hasattr(current_receiving_item.product, 'codes') else []
+        if product_codes:
+            form_product_value = product_codes[0].code
+        else:
+            form_product_value = getattr(current_receiving_item.product, 'sku', '') or ''
+        form_product_display_value = _format_product_display(current_receiving_item.product, form_product_value)
+
+        if current_receiving_item.location:
+            current_location = current_receiving_item.location
+            form_location_value = current_location.barcode or ''
+            form_location_display_value = _format_location_display(current_location)
+
+    if not form_product_display_value:
+        form_product_display_value = form_product_value
+
+    focus_target = 'location_code'
+    if current_location:
+        focus_target = 'product_code'
+    if current_receiving_item and current_location:
+        focus_target = 'quantity'
+
+    recent_locations = []
+    seen_location_ids = set()
+
+    def _append_location(loc):
+        if not loc:
+            return
+        location_id = getattr(loc, 'id', None)
+        if not location_id:
+            return
+        if location_id in seen_location_ids:
+            return
+        recent_locations.append(loc)
+        seen_location_ids.add(location_id)
+
+    if current_location and getattr(current_location, 'id', None):
+        _append_location(current_location)
+
+    for item in received_items:
+        _append_location(getattr(item, 'location', None))
+
+    history_entries = (
+        receiving_order.history
+        .filter(location__isnull=False)
+        .select_related('location')
+        .only('location__id', 'location__name', 'location__barcode')
+        [:50]
+    )
+
+    for entry in history_entries:
+        if not entry.location_id:
+            continue
+        _append_location(entry.location)
+
+    putaway_suggestions = []
+    if current_receiving_item and current_receiving_item.remaining_quantity > 0:
+        putaway_suggestions = suggest_putaway_locations(
+            current_receiving_item, origin=current_location
+        )
+
+    return {
+        'receiving_order': receiving_order,
+        'pending_items': pending_items,
+        'received_items': received_items,
+        'receiving_items': receiving_items,
+        'current_location': current_location,
+        'current_receiving_item': current_receiving_item,
+        'focus_target': focus_target,
+        'form_mode': form_mode,
+        'form_quantity_value': form_quantity_value,
+        'form_product_value': form_product_value,
+        'form_product_display_value': form_product_display_value,
+        'form_location_value': form_location_value,
+        'form_location_display_value': form_location_display_value,
+        'recent_locations': recent_locations,
+        'putaway_suggestions': putaway_suggestions,
+        'auto_save_enabled': auto_save_enabled,
+    }
+
+
+@login_required
+def receiving_order_fast(request, receiving_id):
+    """Nowy, jednookienkowy widok przyjęcia"""
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+
+    if receiving_order.status == 'pending':
+        receiving_order.status = 'in_progress'
+        receiving_order.started_at = timezone.now()
+        receiving_order.save(update_fields=['status', 'started_at'])
+
+    auto_save_enabled = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+
+    context = _build_receiving_fast_context(
+        request, receiving_order, receiving_id, auto_save_enabled=auto_save_enabled
+    )
+
+    return render(request, 'wms/receiving_fast.html', context)
+
+
+@login_required
+def htmx_receiving_submit(request, receiving_id):
+    if request.method != 'POST' or request.headers.get('HX-Request') != 'true':
+        return HttpResponse(status=405)
+
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+    auto_save_enabled = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+
+    location_code = request.POST.get('location_code', '').strip()
+    product_code = request.POST.get('product_code', '').strip()
+    quantity_text = request.POST.get('quantity', '').strip()
+    receiving_item_id = request.POST.get('receiving_item_id', '').strip()
+    action = request.POST.get('action', '').strip()
+    mode = request.POST.get('mode', 'append').strip()  # append lub overwrite
+    should_auto_submit = (
+        auto_save_enabled and request.POST.get('auto_submit_after_select') == '1'
+    )
+
+    feedback_message = None
+    feedback_type = 'info'
+
+    current_location = _get_current_location(request, receiving_id)
+    current_receiving_item = _get_current_receiving_item(request, receiving_id)
+
+    if action == 'clear_selection':
+        _clear_current_receiving_item(request, receiving_id)
+        _clear_current_location(request, receiving_id)
+        current_location = None
+        current_receiving_item = None
+        feedback_message = 'Wyczyszczono bieżące wybory.'
+        feedback_type = 'success'
+
+    if receiving_item_id and feedback_type != 'error':
+        try:
+            receiving_item = ReceivingItem.objects.get(id=receiving_item_id, receiving_order=receiving_order)
+        except ReceivingItem.DoesNotExist:
+            feedback_message = 'Wybrana pozycja przyjęcia nie istnieje.'
+            feedback_type = 'error'
+        else:
+            _set_current_receiving_item(request, receiving_id, receiving_item)
+            current_receiving_item = receiving_item
+            if receiving_item.location:
+                _set_current_location(request, receiving_id, receiving_item.location)
+                current_location = receiving_item.location
+            _set_item_default_quantity(request, receiving_id, receiving_item)
+            feedback_message = f'Wybrano produkt {receiving_item.product.name}.'
+            feedback_type = 'success'
+
+    # Obsługa lokalizacji
+    if location_code:
+        location = Location.objects.filter(barcode=location_code).first()
+        if not location:
+            location = Location.objects.filter(name__iexact=location_code).first()
+
+        if location:
+            _set_current_location(request, receiving_id, location)
+            current_location = location
+            feedback_message = f'Ustawiono lokalizację {location.name}.'
+            feedback_type = 'success'
+        else:
+            feedback_message = f'Lokalizacja {location_code} nie istnieje.'
+            feedback_type = 'error'
+
+    # Obsługa produktu
+    if product_code and feedback_type != 'error':
+        product = Product.find_by_code(product_code)
+        if product:
+            receiving_item = ReceivingItem.objects.filter(
+                receiving_order=receiving_order,
+                product=product
+            ).select_related('product').first()
+
+            if receiving_item:
+                _set_current_receiving_item(request, receiving_id, receiving_item)
+                current_receiving_item = receiving_item
+                _set_item_default_quantity(request, receiving_id, receiving_item)
+                feedback_message = f'Wybrano produkt {receiving_item.product.name}.'
+                feedback_type = 'success'
+            else:
+                feedback_message = f'Produkt {product.name} nie znajduje się w tej regalacji.'
+                feedback_type = 'error'
+        else:
+            feedback_message = f'Nie znaleziono produktu dla kodu {product_code}.'
+            feedback_type = 'error'
+
+    if (
+        should_auto_submit
+        and current_receiving_item
+        and feedback_type != 'error'
+    ):
+        quantity_key = _receiving_session_key(
+            receiving_id, f'quantity_{current_receiving_item.id}'
+        )
+        cached_quantity = request.session.get(quantity_key)
+        if not cached_quantity:
+            remaining = current_receiving_item.quantity_ordered - current_receiving_item.quantity_received
+            if remaining > 0:
+                cached_quantity = str(remaining)
+        if not current_location:
+            feedback_message = 'Najpierw wybierz lokalizację przyjęcia, aby użyć autozapisu.'
+            feedback_type = 'warning'
+            should_auto_submit = False
+        elif not cached_quantity:
+            feedback_message = 'Brak domyślnej ilości do zapisania dla tej pozycji.'
+            feedback_type = 'warning'
+            should_auto_submit = False
+        else:
+            quantity_text = cached_quantity
+            mode = 'append'
+
+    # Obsługa ilości
+    if quantity_text and feedback_type != 'error':
+        if not current_receiving_item:
+            feedback_message = 'Najpierw wybierz produkt z tej regalacji.'
+            feedback_type = 'error'
+        elif not current_location:
+            feedback_message = 'Najpierw wybierz lokalizację przyjęcia.'
+            feedback_type = 'error'
+        else:
+            try:
+                quantity = Decimal(quantity_text)
+                if quantity <= 0:
+                    raise ValueError
+            except (ValueError, TypeError, InvalidOperation):
+                feedback_message = 'Nieprawidłowa ilość. Wprowadź liczbę dodatnią.'
+                feedback_type = 'error'
+            else:
+                if mode == 'overwrite':
+                    with transaction.atomic():
+                        previous_quantity = current_receiving_item.quantity_received
+
+                        delta = quantity - previous_quantity
+
+                        current_receiving_item.quantity_received = quantity
+                        current_receiving_item.location = current_location
+                        current_receiving_item.save(update_fields=['quantity_received', 'location'])
+
+                        supplier_item = current_receiving_item.supplier_order_item
+                        supplier_item.quantity_received = max(Decimal('0'), supplier_item.quantity_received + delta)
+                        supplier_item.save(update_fields=['quantity_received'])
+
+                        stock_ledger.adjust(
+                            current_receiving_item.product,
+                            current_location,
+                            delta,
+                            user=request.user,
+                            note=f"Regalacja {receiving_order.order_number}",
+                            clamp=True,
+                        )
+
+                        if delta != 0:
+                            ReceivingHistory.objects.create(
+                                receiving_order=receiving_order,
+                                product=current_receiving_item.product,
+                                location=current_location,
+                                quantity_received=delta,
+                                scanned_by=request.user
+                            )
+
+                        received_order_completed = False
+                        if receiving_order.status == 'pending':
+                            receiving_order.status = 'in_progress'
+                            receiving_order.started_at = timezone.now()
+                            receiving_order.save(update_fields=['status', 'started_at'])
+
+                        receiving_order.refresh_from_db()
+
+                        if receiving_order.received_items == receiving_order.total_items and receiving_order.total_items > 0:
+                            receiving_order.status = 'completed'
+                            receiving_order.completed_at = timezone.now()
+                            receiving_order.save(update_fields=['status', 'completed_at'])
+                            create_warehouse_document(receiving_order)
+                            received_order_completed = True
+
+                    completed = received_order_completed
+                else:
+                    completed = _apply_receiving_intake(
+                        receiving_order,
+                        current_receiving_item,
+                        current_location,
+                        quantity,
+                        request.user
+                    )
+
+                current_receiving_item.refresh_from_db()
+
+                feedback_message = (
+                    f'Przyjęto {quantity} szt. {current_receiving_item.product.name} '
+                    f'w {current_location.name}.'
+                )
+                feedback_type = 'success'
+
+                request.session[_receiving_session_key(receiving_id, f'quantity_{current_receiving_item.id}')] = str(quantity)
+                request.session.modified = True
+
+                if mode == 'overwrite':
+                    feedback_message = (
+                        f'Uaktualniono pozycję {current_receiving_item.product.name} '
+                        f'na {quantity} szt. w {current_location.name}.'
+                    )
+                    feedback_type = 'success'
+
+                if completed:
+                    feedback_message += ' Regalacja została zakończona.'
+                    _clear_current_receiving_item(request, receiving_id)
+                    _clear_current_location(request, receiving_id)
+
+    context = _build_receiving_fast_context(
+        request, receiving_order, receiving_id, auto_save_enabled=auto_save_enabled
+    )
+
+    html = render_to_string('wms/partials/_receiving_fast_table.html', context, request=request)
+
+    response = HttpResponse(html, status=200)
+    triggers = {}
+
+    if feedback_message:
+        triggers['toastMessage'] = {
+            'value': feedback_message,
+            'type': feedback_type
+        }
+
+    triggers['receiving-fast-refresh'] = {
+        'value': 'receiving-fast-refresh'
+    }
+
+    response['HX-Trigger'] = json.dumps(triggers)
+    return response
+
+
+@login_required
+def htmx_receiving_table(request, receiving_id):
+    if request.headers.get('HX-Request') != 'true':
+        return HttpResponse(status=405)
+
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+    auto_save_enabled = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+
+    context = _build_receiving_fast_context(
+        request, receiving_order, receiving_id, auto_save_enabled=auto_save_enabled
+    )
+
+    html = render_to_string('wms/partials/_receiving_fast_table.html', context, request=request)
+    return HttpResponse(html, status=200)
+
+
+@login_required
+def htmx_receiving_remove_item(request, receiving_id, item_id):
+    if request.method != 'POST' or request.headers.get('HX-Request') != 'true':
+        return HttpResponse(status=405)
+
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+    auto_save_enabled = bool(
+        confetti_services.get_effective_setting(
+            AUTO_SAVE_REGALACJE_KEY, user=request.user, default=False
+        )
+    )
+    receiving_item = get_object_or_404(ReceivingItem, id=item_id, receiving_order=receiving_order)
+
+    if receiving_item.quantity_received <= 0:
+        feedback_message = 'Ta pozycja nie posiada przyjętej ilości.'
+        feedback_type = 'info'
+    else:
+        quantity = receiving_item.quantity_received
+        location = receiving_item.location
+
+        with transaction.atomic():
+            supplier_item = receiving_item.supplier_order_item
+            supplier_item.quantity_received = max(Decimal('0'), supplier_item.quantity_received - quantity)
+            supplier_item.save(update_fields=['quantity_received'])
+
+            receiving_item.quantity_received = Decimal('0')
+            receiving_item.location = None
+            receiving_item.save(update_fields=['quantity_received', 'location'])
+
+            if location:
+                stock_ledger.issue(
+                    receiving_item.product,
+                    location,
+                    quantity,
+                    user=request.user,
+                    note=f"Cofnięcie przyjęcia - Regalacja {receiving_order.order_number}",
+                    clamp=True,
+                )
+
+            _update_supplier_order_status(receiving_order.supplier_order)
+
+            # Update receiving order status if needed
+            remaining_received = receiving_order.items.filter(quantity_received__gt=0).exists()
+            if not remaining_received:
+                receiving_order.status = 'pending'
+                receiving_order.completed_at = None
+                receiving_order.started_at = None
+                receiving_order.save(update_fields=['status', 'completed_at', 'started_at'])
+            else:
+                if receiving_order.status == 'completed':
+                    receiving_order.status = 'in_progress'
+                    receiving_order.completed_at = None
+                    receiving_order.save(update_fields=['status', 'completed_at'])
+
+        _update_supplier_order_status(receiving_order.supplier_order)
+        receiving_order.supplier_order.refresh_from_db()
+
+        _clear_item_quantity_cache(request, receiving_id, item_id)
+        current_item = _get_current_receiving_item(request, receiving_id)
+        if current_item and current_item.id == item_id:
+            _clear_current_receiving_item(request, receiving_id)
+
+        feedback_message = f'Cofnięto przyjęcie pozycji {receiving_item.product.name}.'
+        feedback_type = 'success'
+
+    context = _build_receiving_fast_context(
+        request, receiving_order, receiving_id, auto_save_enabled=auto_save_enabled
+    )
+    html = render_to_string('wms/partials/_receiving_fast_table.html', context, request=request)
+
+    response = HttpResponse(html, status=200)
+    response['HX-Trigger'] = json.dumps({
+        'toastMessage': {
+            'value': feedback_message,
+            'type': feedback_type
+        },
+        'receiving-fast-refresh': {
+            'value': 'receiving-fast-refresh'
+        }
+    })
+    return response
+
+
+@transaction.atomic
+def create_warehouse_document(receiving_order):
+    """Tworzenie dokumentu PZ na podstawie Regalacji"""
+    document = build_pz_document(receiving_order)
+    _update_supplier_order_status(receiving_order.supplier_order)
+    return document
+
+
+@login_required
+def complete_receiving(request, receiving_id):
+    """Zakończenie regalacji"""
+    receiving_order = get_object_or_404(ReceivingOrder, id=receiving_id)
+    
+    if request.method == 'POST':
+        with transaction.atomic():
+            receiving_order.status = 'completed'
+            receiving_order.completed_at = timezone.now()
+            receiving_order.save()
+            
+            # Utwórz dokument PZ
+            create_warehouse_document(receiving_order)
+            
+            messages.success(request, f'Zakończono regalację {receiving_order.order_number}. Utworzono dokument PZ.')
+            return redirect('wms:receiving_order_detail', receiving_id=receiving_order.id)
+    
+    return redirect('wms:receiving_order_detail', receiving_id=receiving_order.id)
+
+
+@login_required
+def htmx_receiving_product_autocomplete(request, receiving_id):
+    query = request.GET.get('product', '').strip()
+    if not query:
+        query = request.GET.get('product_code', '').strip()
+    if not query:
+        return HttpResponse('')
+
+    receiving_order = get_object_or_404(ReceivingOrder.objects.only('id'), id=receiving_id)
+
+    options = []
+    matches = search_order_candidates(
+        order_candidates.RECEIVING, receiving_order.id, query, unique_products=True
+    )
+    for match in matches:
+        candidate, item = match.candidate, match.item
+        remaining = order_candidates.remaining_quantity(item)
+        options.append({
+            'product_id': candidate.product_id,
+            'code': candidate.code,
+            'name': candidate.name or candidate.code or 'Produkt',
+            'default_quantity': _decimal_to_input(remaining) if remaining > 0 else '',
+            'ordered': item.quantity_ordered,
+            'received': item.quantity_received,
+            'remaining': remaining,
+        })
+
+    if not options:
+        return HttpResponse('')
+
+    return render(request, 'wms/partials/_receiving_product_options.html', {'options': options})
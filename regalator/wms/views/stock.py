@@ -0,0 +1,318 @@
+"""Widoki stanów magazynowych, przesunięć, ruchów, uzgodnień i eksportów."""
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.db import transaction
+from django.core.paginator import Paginator
+from django.db.models import Count
+from ..models import Location, Product, Stock, StockMovement, StockReconciliation, StockReconciliationLine
+from ..forms import StockTransferForm, LocationPickerWidget
+import json
+import logging
+from django.urls import reverse
+from django.utils.http import urlencode
+from ..exports import filter_movements, filter_reconciliation_lines, filter_stocks
+from ..reconciliation import run_reconciliation
+from ..documents import build_mm_document
+from .. import exports
+from .. import stock_ledger
+from ..replica import read_from_replica
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+def htmx_stock_row(request, product_id):
+    """HTMX endpoint for displaying stock row inline in the next row"""
+    product = get_object_or_404(Product, id=product_id)
+    stock = Stock.objects.get(product=product)
+    context = {
+        'product': product,
+        'stock': stock,
+    }
+    
+    response = HttpResponse(status=200)
+    response.content = render(request, 'wms/stock_list.html#stock-row-partial', context)
+    return response
+
+
+@login_required
+@read_from_replica
+def stock_list(request, product_id=None, location_id=None):
+    """Lista stanów magazynowych"""
+    search_query = request.GET.get('search', '')
+    location_filter = request.GET.get('location', '')
+    product_filter = request.GET.get('product', '')
+    # product_id może być w URL (jako parametr funkcji) lub w GET (dla kompatybilności wstecznej)
+    if not product_id:
+        product_id = request.GET.get('product_id', '')
+    # location_id może być w URL (jako parametr funkcji) lub w GET (dla kompatybilności wstecznej)
+    if not location_id:
+        location_id = request.GET.get('location_id', '')
+    # Konwertuj product_id na string dla dalszego użycia (jeśli jest int z URL)
+    product_id_str = str(product_id) if product_id else ''
+    subiekt_id_filter = request.GET.get('subiekt_id', '')
+    
+    try:
+        product = Product.objects.get(id=product_id) if product_id else None
+    except Product.DoesNotExist:
+        product = None
+    except ValueError:
+        product = None
+    
+    try:
+        location = Location.objects.get(id=location_id) if location_id else None
+    except Location.DoesNotExist:
+        location = None
+    except ValueError:
+        location = None
+    
+    stocks = filter_stocks(request.GET, product_id=product_id, location_id=location_id).select_related(
+        'product', 'location'
+    )
+    
+    # Paginacja
+    paginator = Paginator(stocks, 100)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    
+    # Filtr lokalizacji jako picker z wyszukiwaniem zamiast listy wszystkich lokalizacji
+    location_picker = LocationPickerWidget(
+        value_field='name',
+        placeholder='Wszystkie lokalizacje',
+    ).render('location', location_filter, attrs={'id': 'location'})
+    recent_movements = []
+    if product:
+        recent_movements = list(
+            StockMovement.objects.filter(product=product)
+            .select_related('source_location', 'target_location', 'performed_by')
+            .order_by('-created_at')[:10]
+        )
+    
+    # Zbuduj breadcrumbs dla lokalizacji (jeśli location_id jest w URL)
+    location_breadcrumbs = []
+    if location:
+        current = location
+        while current is not None:
+            location_breadcrumbs.append(current)
+            current = current.parent
+        location_breadcrumbs.reverse()
+    
+    # Sprawdź czy jest zapisany toast message z transferu
+    stock_transfer_toast = None
+    if 'stock_transfer_toast' in request.session:
+        try:
+            stock_transfer_toast = json.loads(request.session.pop('stock_transfer_toast'))
+            request.session.modified = True
+        except (json.JSONDecodeError, KeyError):
+            pass
+    
+    context = {
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'location_filter': location_filter,
+        'location_id': location_id,
+        'location': location,
+        'location_breadcrumbs': location_breadcrumbs,
+        'product_filter': product_filter,
+        'subiekt_id_filter': subiekt_id_filter,
+        'product': product,
+        'location_picker': location_picker,
+        'recent_movements': recent_movements,
+        'stock_transfer_toast': stock_transfer_toast,
+        # location_id/product_id z URL przekazywane do eksportu jako parametry
+        'export_extra_query': urlencode({
+            key: value for key, value in (('location_id', location_id), ('product_id', product_id_str)) if value
+        }),
+    }
+
+    # Check if request comes from HTMX
+    if request.headers.get('HX-Request'):
+        return render(request, 'wms/stock_list.html#stock-table', context)
+    
+    return render(request, 'wms/stock_list.html', context)
+
+
+@login_required
+def stock_transfer(request, stock_id):
+    """Przesunięcie towaru między lokalizacjami"""
+    stock = get_object_or_404(
+        Stock.objects.select_related('product', 'location'),
+        id=stock_id
+    )
+
+    # Pobierz parametr return_location z GET lub POST (dla zachowania filtru lokalizacji)
+    return_location = request.GET.get('return_location') or request.POST.get('return_location', '')
+    subiekt_id_filter = request.GET.get('subiekt_id') or request.POST.get('subiekt_id', '')
+
+    form = StockTransferForm(stock=stock)
+    if request.method == 'POST':
+        form = StockTransferForm(request.POST, stock=stock)
+        if form.is_valid():
+            quantity = form.cleaned_data['quantity']
+            target_location = form.cleaned_data['target_location']
+            note = form.cleaned_data['note']
+
+            transfer_successful = False
+
+            try:
+                with transaction.atomic():
+                    movement = stock_ledger.transfer(
+                        stock.product,
+                        stock.location,
+                        target_location,
+                        quantity,
+                        user=request.user,
+                        note=note,
+                    )
+                    build_mm_document([movement], notes=note)
+                    transfer_successful = True
+            except stock_ledger.InsufficientStock:
+                form.add_error('quantity', 'Brak wystarczającej ilości w lokalizacji źródłowej.')
+
+            if transfer_successful:
+                # Buduj URL powrotu z parametrem location (jeśli był przekazany)
+                redirect_params = []
+                if return_location:
+                    redirect_params.append(f'location={return_location}')
+                if subiekt_id_filter:
+                    redirect_params.append(f'subiekt_id={subiekt_id_filter}')
+                
+                redirect_url = reverse('wms:stock_list')
+                if redirect_params:
+                    redirect_url += '?' + '&'.join(redirect_params)
+                
+                # Zapisz toast message w session (będzie odczytany przez JavaScript po redirect)
+                toast_data = {
+                    'value': f'Przeniesiono {quantity} {stock.product.unit} z {stock.location.name} do {target_location.name}.',
+                    'type': 'success'
+                }
+                request.session['stock_transfer_toast'] = json.dumps(toast_data)
+                request.session.modified = True
+                
+                return redirect(redirect_url)
+
+    recent_movements = StockMovement.objects.filter(product=stock.product).select_related(
+        'source_location', 'target_location', 'performed_by'
+    ).order_by('-created_at')[:10]
+
+    context = {
+        'stock': stock,
+        'form': form,
+        'recent_movements': recent_movements,
+        'return_location': return_location,
+        'subiekt_id_filter': subiekt_id_filter,
+    }
+
+    return render(request, 'wms/stock_transfer.html', context)
+
+
+@login_required
+@read_from_replica
+def movement_list(request):
+    """Historia ruchów towaru"""
+    movements = filter_movements(request.GET).select_related(
+        'product', 'source_location', 'target_location', 'performed_by'
+    )
+
+    product_query = request.GET.get('product')
+    location_query = request.GET.get('location')
+    movement_type = request.GET.get('movement_type')
+
+    paginator = Paginator(movements, 50)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+
+    context = {
+        'page_obj': page_obj,
+        'product_query': product_query or '',
+        'location_query': location_query or '',
+        'movement_type': movement_type or '',
+        'movement_types': StockMovement.MOVEMENT_TYPES,
+    }
+
+    return render(request, 'wms/movement_list.html', context)
+
+
+@login_required
+@read_from_replica
+def reconciliation_list(request):
+    """Raporty uzgodnienia stanów WMS z Subiektem; POST uruchamia nowe uzgodnienie"""
+    if request.method == 'POST':
+        try:
+            report = run_reconciliation(user=request.user)
+        except Exception as exc:
+            logger.exception('Błąd uzgadniania stanów z Subiektem')
+            messages.error(request, f'Nie udało się uzgodnić stanów z Subiektem: {exc}')
+            return redirect('wms:reconciliation_list')
+        messages.success(
+            request,
+            f'Uzgodnienie zakończone: {report.discrepancies_count} rozbieżności '
+            f'na {report.products_checked} pozycji ({report.duration_ms} ms).'
+        )
+        return redirect('wms:reconciliation_detail', report_id=report.id)
+
+    reports = StockReconciliation.objects.select_related('created_by').order_by('-created_at')
+    paginator = Paginator(reports, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    return render(request, 'wms/reconciliation_list.html', {'page_obj': page_obj})
+
+
+@login_required
+@read_from_replica
+def reconciliation_detail(request, report_id):
+    """Rozbieżności jednego raportu uzgodnienia (filtry: status, search)"""
+    report = get_object_or_404(StockReconciliation, id=report_id)
+    params = request.GET.copy()
+    params['report'] = str(report.id)
+
+    lines = filter_reconciliation_lines(params).select_related('product')
+    paginator = Paginator(lines, 100)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    status_counts = dict(
+        report.lines.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    query = request.GET.copy()
+    query.pop('page', None)
+
+    context = {
+        'report': report,
+        'page_obj': page_obj,
+        'status_filter': request.GET.get('status', ''),
+        'search_query': request.GET.get('search', ''),
+        'status_choices': [
+            (code, label, status_counts.get(code, 0)) for code, label in StockReconciliationLine.STATUS_CHOICES
+        ],
+        'filter_query': query.urlencode(),
+        'export_extra_query': urlencode({'report': report.id}),
+    }
+
+    if request.headers.get('HX-Request'):
+        return render(request, 'wms/reconciliation_detail.html#lines-table', context)
+    return render(request, 'wms/reconciliation_detail.html', context)
+
+
+@login_required
+@read_from_replica
+def export_dataset(request, dataset):
+    """Eksport listy (z filtrami z query stringu) do CSV lub XLSX, wysyłany strumieniowo"""
+    export = exports.DATASETS.get(dataset)
+    if export is None:
+        return HttpResponseBadRequest('Nieznany eksport')
+
+    export_format = request.GET.get('format', exports.CSV)
+    if export_format not in exports.FORMATS:
+        return HttpResponseBadRequest('Nieobsługiwany format eksportu')
+
+    response = StreamingHttpResponse(
+        exports.export_chunks(export, request.GET, export_format),
+        content_type=exports.FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(export_format)}"'
+    # Bez buforowania w nginx - plik trafia do klienta w trakcie generowania
+    response['X-Accel-Buffering'] = 'no'
+    return response
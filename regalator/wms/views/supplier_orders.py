@@ -0,0 +1,328 @@
+"""Widoki zamówień do dostawców (ZD) i synchronizacji z Subiektem."""
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import HttpResponse
+from django.utils import timezone
+from django.db.models import Q, Sum, Count, Prefetch, F
+from django.db.models.functions import Lower
+from django.contrib.auth.models import User
+from decimal import Decimal
+from ..models import ReceivingOrder, SupplierOrder, SupplierOrderItem
+from ..utils import aget_or_create_products_from_subiekt
+from .accounts import async_login_required
+from asgiref.sync import sync_to_async
+from subiekt import async_client
+import json
+
+
+@login_required
+def supplier_order_list(request):
+    """Lista zamówień do dostawców (ZD)"""
+    search_query = request.GET.get('search', '')
+    status_filter = request.GET.get('status', '')
+    assigned_filter = request.GET.get('assigned', '')
+    
+    supplier_orders = SupplierOrder.objects.all().prefetch_related(
+        Prefetch('receiving_orders', queryset=ReceivingOrder.objects.select_related('assigned_to')),
+        'items'
+    )
+    
+    order_list = list(supplier_orders)
+    for order in order_list:
+        _prepare_supplier_order_display(order)
+    
+    assigned_users = User.objects.all().order_by(Lower('last_name'), Lower('first_name')).distinct()
+    
+    context = {
+        'supplier_orders': order_list,
+        'search_query': search_query,
+        'status_filter': status_filter,
+        'assigned_filter': assigned_filter,
+        'assigned_users': assigned_users,
+        'status_choices': SupplierOrder.SUPPLIER_STATUS_CHOICES,
+    }
+    return render(request, 'wms/supplier_order_list.html', context)
+
+
+@login_required
+def supplier_order_detail(request, order_id):
+    """Szczegóły zamówienia do dostawcy"""
+    supplier_order = get_object_or_404(SupplierOrder, id=order_id)
+    
+    context = {
+        'supplier_order': supplier_order,
+        'receiving_orders': supplier_order.receiving_orders.all(),
+    }
+    return render(request, 'wms/supplier_order_detail.html', context)
+
+
+def _save_zd_orders(subiekt_zd_documents, positions, products):
+    """Zapisuje dokumenty ZD pobrane z Subiekta, zwraca (nowe, zaktualizowane) numery zamówień"""
+    new_orders = []
+    updated_orders = []
+
+    for zd_doc in subiekt_zd_documents:
+        try:
+            # Check if order already exists
+            existing_order = SupplierOrder.objects.filter(order_number=zd_doc.dok_NrPelny).first()
+            
+            if existing_order:
+                # Check if order needs updating
+                new_supplier_name = zd_doc.adr_Nazwa or zd_doc.adr_NazwaPelna or 'Nieznany dostawca'
+                new_order_date = zd_doc.dok_DataWyst or timezone.now().date()
+                new_expected_delivery_date = zd_doc.dok_PlatTermin or zd_doc.dok_DataMag or zd_doc.dok_DataWyst or timezone.now().date()
+                new_actual_delivery_date = zd_doc.dok_DataOtrzym
+                new_notes = f'ZD z Subiektu: {zd_doc.dok_NrPelny}'
+                
+                # Only update if there are actual changes
+                new_document_number = zd_doc.dok_Nr
+                new_document_id = zd_doc.dok_Id
+                if (existing_order.supplier_name != new_supplier_name or
+                    existing_order.order_date != new_order_date or
+                    existing_order.expected_delivery_date != new_expected_delivery_date or
+                    existing_order.actual_delivery_date != new_actual_delivery_date or
+                    existing_order.notes != new_notes or
+                    existing_order.document_number != new_document_number or
+                    existing_order.document_id != new_document_id):
+                    
+                    existing_order.supplier_name = new_supplier_name
+                    existing_order.supplier_code = ''
+                    existing_order.document_number = new_document_number  # Store original document number
+                    existing_order.document_id = new_document_id  # Store document ID
+                    existing_order.order_date = new_order_date
+                    existing_order.expected_delivery_date = new_expected_delivery_date
+                    existing_order.actual_delivery_date = new_actual_delivery_date
+                    existing_order.notes = new_notes
+                    existing_order.updated_at = timezone.now()
+                    existing_order.save()
+                    updated_orders.append(existing_order.order_number)
+            else:
+                # Create new order
+                supplier_order = SupplierOrder.objects.create(
+                    order_number=zd_doc.dok_NrPelny,
+                    document_number=zd_doc.dok_Nr,  # Store original document number
+                    document_id=zd_doc.dok_Id,  # Store document ID
+                    supplier_name=zd_doc.adr_Nazwa or zd_doc.adr_NazwaPelna or 'Nieznany dostawca',
+                    supplier_code='',
+                    order_date=zd_doc.dok_DataWyst or timezone.now().date(),
+                    expected_delivery_date=zd_doc.dok_PlatTermin or zd_doc.dok_DataMag or zd_doc.dok_DataWyst or timezone.now().date(),
+                    actual_delivery_date=zd_doc.dok_DataOtrzym,
+                    status='pending',
+                    notes=f'ZD z Subiektu: {zd_doc.dok_NrPelny}',
+                    is_new=True  # Mark as new
+                )
+                new_orders.append(supplier_order.order_number)
+                
+                # Try to sync order items if available
+                try:
+                    zd_positions = positions.get(zd_doc.dok_Id, [])
+                    
+                    if zd_positions:
+                        for position in zd_positions:
+                            product = products.get(position['tw_Id'])
+                            
+                            if product:
+                                SupplierOrderItem.objects.get_or_create(
+                                    supplier_order=supplier_order,
+                                    product=product,
+                                    defaults={
+                                        'quantity_ordered': Decimal(str(position.get('ob_Ilosc', 0))),
+                                        'quantity_received': 0,
+                                        'notes': f'Pozycja z Subiektu: {position.get("ob_Id", "")}'
+                                    }
+                                )
+                except Exception as e:
+                    # Log error but continue with order creation
+                    pass
+            
+        except Exception as e:
+            # Log error but continue with other orders
+            continue
+
+    return new_orders, updated_orders
+
+
+@async_login_required
+async def sync_zd_orders(request):
+    """
+    Sync ZD orders from Subiekt. Positions of new documents and missing
+    products are fetched from Subiekt concurrently.
+    """
+    if request.method != 'POST':
+        messages.error(request, 'Nieprawidłowa metoda żądania')
+        return redirect('wms:supplier_order_list')
+    
+    try:
+        # Get the latest document_id from SupplierOrder
+        latest_document_id = await SupplierOrder.objects.filter(
+            document_id__isnull=False
+        ).order_by('-document_id').values_list('document_id', flat=True).afirst() or 0
+
+        if latest_document_id == 0:
+            subiekt_zd_documents = await async_client.get_zd(limit=20)
+        else:
+            subiekt_zd_documents = await async_client.get_new_zd(
+                latest_document_id=latest_document_id, 
+                limit=20
+            )
+        
+        if not subiekt_zd_documents:
+            messages.info(request, 'Brak nowych dokumentów ZD do synchronizacji')
+            return redirect('wms:supplier_order_list')
+
+        # Pozycje są potrzebne tylko dla nowych zamówień
+        existing_numbers = {
+            order_number async for order_number in SupplierOrder.objects.filter(
+                order_number__in=[zd_doc.dok_NrPelny for zd_doc in subiekt_zd_documents]
+            ).values_list('order_number', flat=True)
+        }
+        positions = await async_client.get_positions_for(
+            zd_doc for zd_doc in subiekt_zd_documents if zd_doc.dok_NrPelny not in existing_numbers
+        )
+        products = await aget_or_create_products_from_subiekt(
+            position['tw_Id'] for zd_positions in positions.values() for position in zd_positions
+        )
+        new_orders, updated_orders = await sync_to_async(_save_zd_orders)(
+            subiekt_zd_documents, positions, products
+        )
+        
+        # Add success messages
+        if new_orders:
+            order_list = ', '.join(new_orders)
+            messages.success(request, f'Załadowano {len(new_orders)} nowych zamówień ZD: {order_list}')
+        
+        if updated_orders:
+            messages.info(request, f'Zaktualizowano {len(updated_orders)} istniejących zamówień')
+        
+        if not new_orders and not updated_orders:
+            messages.warning(request, 'Brak nowych zamówień do załadowania')
+        
+        return redirect('wms:supplier_order_list')
+        
+    except Exception as e:
+        messages.error(request, f'Błąd podczas synchronizacji: {str(e)}')
+        return redirect('wms:supplier_order_list')
+
+
+@login_required
+def htmx_delete_supplier_order(request, order_id):
+    """HTMX action to delete a supplier order"""
+    if request.method != 'DELETE':
+        response = HttpResponse(status=405)
+        response['HX-Trigger'] = json.dumps({
+            'toastMessage': {
+                'type': 'danger',
+                'value': 'Metoda nie dozwolona'
+            }
+        })
+        return response
+    
+    try:
+        supplier_order = get_object_or_404(SupplierOrder, id=order_id)
+        order_number = supplier_order.order_number
+        supplier_name = supplier_order.supplier_name
+        
+        # Delete the order
+        supplier_order.delete()
+        
+        # Return empty response to remove the row, with toast
+        response = HttpResponse(status=200)
+        response['HX-Trigger'] = json.dumps({
+            'toastMessage': {
+                'type': 'success',
+                'value': f'✓ Usunięto zamówienie ZD {order_number} - {supplier_name}'
+            }
+        })
+        return response
+        
+    except Exception as e:
+        response = HttpResponse(status=500)
+        response['HX-Trigger'] = json.dumps({
+            'toastMessage': {
+                'type': 'danger',
+                'value': f'✗ Błąd podczas usuwania zamówienia: {str(e)}'
+            }
+        })
+        return response
+
+
+def _update_supplier_order_status(supplier_order):
+    """Aktualizuje status ZD bazując na postępie regalacji."""
+    if not supplier_order:
+        return
+
+    items = supplier_order.items.all()
+    if not items.exists():
+        return
+
+    active_receiving_exists = supplier_order.receiving_orders.filter(
+        status__in=['pending', 'in_progress']
+    ).exists()
+
+    aggregates = items.aggregate(
+        total_ordered=Sum('quantity_ordered'),
+        total_received=Sum('quantity_received'),
+    )
+
+    total_ordered = aggregates.get('total_ordered') or Decimal('0')
+    total_received = aggregates.get('total_received') or Decimal('0')
+    any_received = total_received > 0
+    all_fully_received = not items.filter(quantity_received__lt=F('quantity_ordered')).exists()
+
+    new_status = supplier_order.status
+    new_delivery_date = supplier_order.actual_delivery_date
+
+    if active_receiving_exists:
+        new_status = 'in_receiving'
+    elif total_ordered > 0 and all_fully_received and total_received >= total_ordered:
+        new_status = 'received'
+        new_delivery_date = timezone.now().date()
+    elif any_received or supplier_order.receiving_orders.exists():
+        new_status = 'partially_received'
+        if not new_delivery_date:
+            new_delivery_date = timezone.now().date()
+    else:
+        if supplier_order.status in ('received', 'partially_received'):
+            new_status = 'confirmed'
+            new_delivery_date = None
+
+    updates = []
+    if new_status != supplier_order.status:
+        supplier_order.status = new_status
+        updates.append('status')
+    if new_delivery_date != supplier_order.actual_delivery_date:
+        supplier_order.actual_delivery_date = new_delivery_date
+        updates.append('actual_delivery_date')
+
+    if updates:
+        supplier_order.save(update_fields=updates)
+
+
+def _prepare_supplier_order_display(order):
+    if not hasattr(order, '_display_prepared'):
+        if hasattr(order, 'items'):
+            items_qs = list(order.items.all())
+            display_total_items = len(items_qs)
+            display_received_items = sum(1 for item in items_qs if getattr(item, 'quantity_received', 0) > 0)
+        else:
+            order_summary = order.items.aggregate(
+                total=Count('id'),
+                received=Count('id', filter=Q(quantity_received__gt=0))
+            ) if hasattr(order, 'items') else {'total': 0, 'received': 0}
+            display_total_items = order_summary.get('total', 0)
+            display_received_items = order_summary.get('received', 0)
+
+        order.display_total_items = display_total_items
+        order.display_received_items = display_received_items
+ 
+        receiving_orders = list(order.receiving_orders.all()) if hasattr(order, 'receiving_orders') else []
+        order.display_has_active_receiving = any(ro.status in ['pending', 'in_progress'] for ro in receiving_orders)
+        order.display_has_any_receiving = bool(receiving_orders)
+        order.display_active_receiving = next((ro for ro in receiving_orders if ro.status in ['pending', 'in_progress']), None)
+        order.display_last_receiving = next((ro for ro in receiving_orders if ro.status == 'completed'), None)
+        order.display_active_receiving_assignment = next((ro.assigned_to for ro in receiving_orders if ro.status in ['pending', 'in_progress'] and ro.assigned_to), None)
+        order._display_prepared = True
+ 
+    return order
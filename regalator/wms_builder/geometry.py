@@ -0,0 +1,312 @@
+"""
+Skompilowana geometria układu magazynu dla kanwy buildera.
+
+Strefy, regały i półki są zapisywane jako jeden dokument z bezwzględnymi
+prostokątami (floaty, bez przeliczania Decimal przy każdym renderze) oraz
+siatką przestrzenną: komórka ``GRID_CELL_SIZE`` x ``GRID_CELL_SIZE`` -> klucze
+elementów, które ją przecinają. Siatka pozwala wybrać elementy widoczne w
+oknie (viewport culling) i znaleźć półkę pod punktem bez przeglądania
+całego planu.
+
+Dokument trzymany jest w cache współdzielonym pod kluczem z numerem wersji
+magazynu. Zmiana pozycji lub rozmiaru (endpointy przeciągania) aktualizuje
+dokument przyrostowo; pozostałe zmiany (tworzenie, edycja, usuwanie,
+synchronizacja z lokalizacjami) podbijają wersję i dokument jest budowany
+od nowa przy następnym odczycie.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Warehouse, WarehouseRack, WarehouseShelf, WarehouseZone
+
+GRID_CELL_SIZE = 100.0
+GEOMETRY_FIELDS = frozenset({'x', 'y', 'width', 'height', 'updated_at'})
+
+VERSION_KEY = 'wms_builder:geometry:{warehouse_id}:version'
+DOCUMENT_KEY = 'wms_builder:geometry:{warehouse_id}:{version}'
+DOCUMENT_TIMEOUT = 24 * 60 * 60
+
+# Kolejność od najgłębszego elementu - pierwszeństwo przy trafieniu punktem
+KIND_DEPTH = {'shelf': 0, 'rack': 1, 'zone': 2}
+
+_memo_lock = threading.Lock()
+# warehouse_id -> (wersja, dokument); dokumenty danej wersji są niezmienne
+_memo: Dict[int, Tuple[int, dict]] = {}
+
+
+def element_key(kind: str, element_id: int) -> str:
+    return f'{kind}:{element_id}'
+
+
+def _version_key(warehouse_id: int) -> str:
+    return VERSION_KEY.format(warehouse_id=warehouse_id)
+
+
+def _document_key(warehouse_id: int, version: int) -> str:
+    return DOCUMENT_KEY.format(warehouse_id=warehouse_id, version=version)
+
+
+def _current_version(warehouse_id: int) -> int:
+    key = _version_key(warehouse_id)
+    version = cache.get(key)
+    if version is None:
+        # Znacznik czasu - po wypadnięciu klucza wersja nie wraca do starej wartości
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(warehouse_id: int) -> int:
+    key = _version_key(warehouse_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, None)
+        return version
+
+
+def invalidate_layout(warehouse_id: int) -> None:
+    """Unieważnia geometrię magazynu po zatwierdzeniu transakcji."""
+
+    transaction.on_commit(lambda: _bump_version(warehouse_id))
+
+
+# --- Budowanie ---------------------------------------------------------------
+
+def _cells(rect: dict, cell_size: float) -> Iterable[str]:
+    x0 = math.floor(rect['abs_x'] / cell_size)
+    y0 = math.floor(rect['abs_y'] / cell_size)
+    # Prawa/dolna krawędź należy do ostatniej komórki, którą prostokąt faktycznie przecina
+    x1 = math.floor(max(rect['abs_x'], rect['abs_x'] + rect['width'] - 1e-9) / cell_size)
+    y1 = math.floor(max(rect['abs_y'], rect['abs_y'] + rect['height'] - 1e-9) / cell_size)
+    for cx in range(x0, x1 + 1):
+        for cy in range(y0, y1 + 1):
+            yield f'{cx}:{cy}'
+
+
+def _index(document: dict, key: str) -> None:
+    element = document['elements'][key]
+    element['cells'] = list(_cells(element, document['cell_size']))
+    for cell in element['cells']:
+        document['grid'].setdefault(cell, []).append(key)
+
+
+def _unindex(document: dict, key: str) -> None:
+    grid = document['grid']
+    for cell in document['elements'][key].get('cells', ()):
+        keys = grid.get(cell)
+        if keys and key in keys:
+            keys.remove(key)
+            if not keys:
+                del grid[cell]
+
+
+def build_layout(warehouse_id: int, *, cell_size: float = GRID_CELL_SIZE) -> dict:
+    """Buduje dokument geometrii z trzech zapytań (bez instancji modeli)."""
+
+    warehouse = Warehouse.objects.values('width', 'height').get(id=warehouse_id)
+    document = {
+        'warehouse_id': warehouse_id,
+        'width': float(warehouse['width']),
+        'height': float(warehouse['height']),
+        'cell_size': cell_size,
+        'elements': {},
+        'children': {},
+        'grid': {},
+    }
+    columns = ('id', 'name', 'color', 'location_id', 'x', 'y', 'width', 'height')
+    levels = (
+        ('zone', WarehouseZone.objects.filter(warehouse_id=warehouse_id), None, None),
+        ('rack', WarehouseRack.objects.filter(zone__warehouse_id=warehouse_id), 'zone_id', 'zone'),
+        ('shelf', WarehouseShelf.objects.filter(rack__zone__warehouse_id=warehouse_id), 'rack_id', 'rack'),
+    )
+    elements = document['elements']
+    for kind, queryset, parent_field, parent_kind in levels:
+        fields = columns + ((parent_field,) if parent_field else ())
+        model_ordering = queryset.model._meta.ordering
+        for row in queryset.order_by(*model_ordering, 'id').values_list(*fields):
+            values = dict(zip(fields, row))
+            parent = element_key(parent_kind, values[parent_field]) if parent_field else None
+            if parent is not None and parent not in elements:
+                continue
+            x, y = float(values['x']), float(values['y'])
+            parent_element = elements.get(parent)
+            key = element_key(kind, values['id'])
+            elements[key] = {
+                'key': key,
+                'kind': kind,
+                'id': values['id'],
+                'parent': parent,
+                'name': values['name'],
+                'color': values['color'],
+                'location_id': values['location_id'],
+                'x': x,
+                'y': y,
+                'width': float(values['width']),
+                'height': float(values['height']),
+                'abs_x': x + (parent_element['abs_x'] if parent_element else 0.0),
+                'abs_y': y + (parent_element['abs_y'] if parent_element else 0.0),
+            }
+            document['children'].setdefault(parent or '', []).append(key)
+            _index(document, key)
+    return document
+
+
+def get_layout(warehouse_id: int) -> dict:
+    """
+    Aktualny dokument geometrii magazynu.
+
+    Zwracany słownik jest współdzielony w procesie - nie należy go modyfikować.
+    """
+
+    version = _current_version(warehouse_id)
+    memo = _memo.get(warehouse_id)
+    if memo is not None and memo[0] == version:
+        return memo[1]
+
+    document = cache.get(_document_key(warehouse_id, version))
+    if document is None:
+        document = build_layout(warehouse_id)
+        document['version'] = version
+        cache.set(_document_key(warehouse_id, version), document, DOCUMENT_TIMEOUT)
+    with _memo_lock:
+        _memo[warehouse_id] = (version, document)
+    return document
+
+
+# --- Aktualizacja przyrostowa ------------------------------------------------
+
+def _descendants(document: dict, key: str) -> List[str]:
+    result = []
+    pending = list(document['children'].get(key, ()))
+    while pending:
+        child = pending.pop()
+        result.append(child)
+        pending.extend(document['children'].get(child, ()))
+    return result
+
+
+def apply_geometry_change(warehouse_id: int, kind: str, element_id: int, *,
+                          x: float, y: float, width: float, height: float) -> bool:
+    """
+    Przesuwa/zmienia rozmiar elementu w zapisanym dokumencie (wraz z potomkami).
+
+    Zwraca ``False``, jeśli dokumentu nie ma w cache albo wersja zmieniła się
+    równolegle - wtedy dokument zostanie zbudowany od nowa przy odczycie.
+    """
+
+    version = _current_version(warehouse_id)
+    # Świeża kopia z cache współdzielonego - memo procesu pozostaje nietknięte
+    document = cache.get(_document_key(warehouse_id, version))
+    key = element_key(kind, element_id)
+    if document is None or key not in document['elements']:
+        _bump_version(warehouse_id)
+        return False
+
+    element = document['elements'][key]
+    dx, dy = float(x) - element['x'], float(y) - element['y']
+    moved = [key, *_descendants(document, key)] if (dx or dy) else [key]
+    for moved_key in moved:
+        _unindex(document, moved_key)
+        moved_element = document['elements'][moved_key]
+        moved_element['abs_x'] += dx
+        moved_element['abs_y'] += dy
+    element.update(x=float(x), y=float(y), width=float(width), height=float(height))
+    for moved_key in moved:
+        _index(document, moved_key)
+
+    new_version = _bump_version(warehouse_id)
+    if new_version != version + 1:
+        # Ktoś inny zmienił układ w międzyczasie - nie zapisuj niepełnej łatki
+        return False
+    document['version'] = new_version
+    cache.set(_document_key(warehouse_id, new_version), document, DOCUMENT_TIMEOUT)
+    return True
+
+
+def warehouse_id_for(instance) -> int:
+    """Magazyn elementu buildera (strefy, regału lub półki)."""
+
+    if isinstance(instance, WarehouseZone):
+        return instance.warehouse_id
+    if isinstance(instance, WarehouseRack):
+        return WarehouseZone.objects.filter(id=instance.zone_id).values_list('warehouse_id', flat=True).get()
+    return WarehouseRack.objects.filter(id=instance.rack_id).values_list('zone__warehouse_id', flat=True).get()
+
+
+# --- Zapytania przestrzenne --------------------------------------------------
+
+def _intersects(element: dict, x0: float, y0: float, x1: float, y1: float) -> bool:
+    return (
+        element['abs_x'] < x1 and element['abs_x'] + element['width'] > x0
+        and element['abs_y'] < y1 and element['abs_y'] + element['height'] > y0
+    )
+
+
+def _contains(element: dict, x: float, y: float) -> bool:
+    return (
+        element['abs_x'] <= x <= element['abs_x'] + element['width']
+        and element['abs_y'] <= y <= element['abs_y'] + element['height']
+    )
+
+
+def elements_in_viewport(document: dict, x0: float, y0: float, x1: float, y1: float,
+                         kinds: Optional[Iterable[str]] = None) -> List[dict]:
+    """Elementy przecinające prostokąt widoku (od stref do półek)."""
+
+    cell_size = document['cell_size']
+    kinds = set(kinds) if kinds else None
+    candidates = set()
+    for cx in range(math.floor(x0 / cell_size), math.floor(x1 / cell_size) + 1):
+        for cy in range(math.floor(y0 / cell_size), math.floor(y1 / cell_size) + 1):
+            candidates.update(document['grid'].get(f'{cx}:{cy}', ()))
+    elements = document['elements']
+    found = [
+        elements[key] for key in candidates
+        if (kinds is None or elements[key]['kind'] in kinds) and _intersects(elements[key], x0, y0, x1, y1)
+    ]
+    found.sort(key=lambda element: (-KIND_DEPTH[element['kind']], element['id']))
+    return found
+
+
+def hit_test(document: dict, x: float, y: float) -> Optional[dict]:
+    """Najgłębszy element (półka, potem regał, strefa) zawierający punkt."""
+
+    cell = f'{math.floor(x / document["cell_size"])}:{math.floor(y / document["cell_size"])}'
+    elements = document['elements']
+    hits = [elements[key] for key in document['grid'].get(cell, ()) if _contains(elements[key], x, y)]
+    if not hits:
+        return None
+    return min(hits, key=lambda element: (KIND_DEPTH[element['kind']], element['id']))
+
+
+def layout_tree(document: dict) -> List[dict]:
+    """Zagnieżdżona struktura stref -> regałów -> półek dla szablonu kanwy."""
+
+    elements = document['elements']
+    children = document['children']
+
+    def _node(key, nested_key=None):
+        element = elements[key]
+        node = {
+            'element': element,
+            'text_x': element['abs_x'] + element['width'] / 2,
+            'text_y': element['abs_y'] + element['height'] / 2,
+        }
+        if nested_key:
+            node[nested_key] = [
+                _node(child, 'shelves' if nested_key == 'racks' else None)
+                for child in children.get(key, ())
+            ]
+        return node
+
+    return [_node(key, 'racks') for key in children.get('', ())]
@@ -0,0 +1,51 @@
+"""
+Nakładka mapy cieplnej na kanwę buildera.
+
+Wartości własne lokalizacji (z agregatów ``wms.location_stats``) są
+sumowane w górę drzewa geometrii: regał dostaje sumę swoich półek, strefa -
+sumę regałów. Wynik jest kluczowany identyfikatorem ``Location``, więc
+kanwa koloruje elementy po ``data-location-id`` bez dodatkowych zapytań.
+
+Dla regałów i stref liczba SKU jest sumą z podległych lokalizacji - produkt
+leżący na dwóch półkach liczony jest dwukrotnie.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+from wms.location_stats import DEFAULT_PICK_DAYS, METRIC_PICKS, METRICS, location_metric_values
+
+from .geometry import KIND_DEPTH
+
+
+def heatmap_overlay(layout: dict, metric: str, *, days: int = DEFAULT_PICK_DAYS) -> dict:
+    """Niezerowe wartości metryki dla zsynchronizowanych elementów i maksimum per rodzaj."""
+
+    own_values = location_metric_values(metric, days=days)
+    elements = layout['elements']
+    totals: Dict[str, float] = {}
+    # Od najgłębszych elementów, żeby rodzic dostał już zsumowane dzieci
+    for element in sorted(elements.values(), key=lambda element: KIND_DEPTH[element['kind']]):
+        key = element['key']
+        totals[key] = totals.get(key, 0.0) + own_values.get(element['location_id'], 0.0)
+        if element['parent']:
+            totals[element['parent']] = totals.get(element['parent'], 0.0) + totals[key]
+
+    values = {}
+    maximum = {kind: 0.0 for kind in KIND_DEPTH}
+    for key, total in totals.items():
+        element = elements[key]
+        # Zera pomijane - kanwa traktuje brak wpisu jako zero
+        if not element['location_id'] or not total:
+            continue
+        values[str(element['location_id'])] = round(total, 2)
+        maximum[element['kind']] = max(maximum[element['kind']], total)
+
+    return {
+        'metric': metric,
+        'label': METRICS[metric],
+        'days': days if metric == METRIC_PICKS else None,
+        'max': maximum,
+        'values': values,
+    }
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wms_builder.models import Warehouse
+from wms_builder.services import sync_layout_to_locations
+
+
+class Command(BaseCommand):
+    help = 'Synchronizuje układ magazynu z buildera (strefy, regały, półki) do lokalizacji WMS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warehouse',
+            type=int,
+            help='ID magazynu w builderze (domyślnie wszystkie magazyny)',
+        )
+
+    def handle(self, *args, **options):
+        warehouses = Warehouse.objects.order_by('id')
+        if options['warehouse']:
+            warehouses = warehouses.filter(id=options['warehouse'])
+            if not warehouses.exists():
+                raise CommandError(f'Magazyn o ID {options["warehouse"]} nie istnieje')
+
+        for warehouse in warehouses:
+            try:
+                result = sync_layout_to_locations(warehouse_id=warehouse.id)
+            except ValueError as exc:
+                raise CommandError(f'{warehouse.name}: {exc}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{warehouse.name}: utworzono {result.created}, zaktualizowano {result.updated}, '
+                f'bez zmian {result.unchanged} lokalizacji'
+            ))
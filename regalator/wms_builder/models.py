@@ -2,7 +2,6 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
-from django.db.models import Q
 from decimal import Decimal
 
 
@@ -43,8 +42,52 @@ class Warehouse(models.Model):
         return self.name
 
 
-class WarehouseZone(models.Model):
+class BuilderElementMixin(models.Model):
+    """Sprawdzanie i usuwanie elementu buildera razem z poddrzewem i lokalizacjami WMS"""
+
+    # Klucz typu elementu w wms_builder.services (zone/rack/shelf)
+    builder_kind = None
+
+    class Meta:
+        abstract = True
+
+    def is_location_empty(self):
+        """Sprawdza czy powiązana Location jest pusta (nie ma powiązań)"""
+        if not self.location_id:
+            return True
+        from .services import location_blockers
+        return not location_blockers([self.location_id])
+
+    def can_delete(self):
+        """Sprawdza czy można usunąć element (Location musi być pusta)"""
+        return self.is_location_empty()
+
+    def delete(self, *args, **kwargs):
+        """Usuwa element z poddrzewem; zablokowane elementy zostają i zgłaszany jest ValidationError"""
+        deleted_items = kwargs.pop('deleted_items', None)  # Lista do zbierania informacji o usuniętych elementach
+
+        if self.location_id and getattr(self.location, '_deleting_from_builder', False):
+            # Location jest właśnie usuwana w WMS - usuń sam element (regały i półki kaskadowo)
+            from .geometry import invalidate_layout, warehouse_id_for
+            invalidate_layout(warehouse_id_for(self))
+            name = self.name
+            result = super().delete(*args, **kwargs)
+            if deleted_items is not None:
+                deleted_items.append({'type': self.builder_kind, 'name': name})
+            return result
+
+        from .services import delete_subtree
+        result = delete_subtree(**{f'{self.builder_kind}_ids': [self.pk]})
+        if deleted_items is not None:
+            deleted_items.extend(result.deleted_items)
+        if result.blocked:
+            raise ValidationError(result.error_message())
+
+
+class WarehouseZone(BuilderElementMixin, models.Model):
     """Strefa - top-level areas in warehouse"""
+    builder_kind = 'zone'
+
     warehouse = models.ForeignKey(
         Warehouse,
         on_delete=models.CASCADE,
@@ -102,43 +145,6 @@ class WarehouseZone(models.Model):
     def __str__(self):
         return f"{self.warehouse.name} - {self.name}"
     
-    def is_location_empty(self):
-        """Sprawdza czy powiązana Location jest pusta (nie ma powiązań)"""
-        if not self.location:
-            return True
-        
-        from wms.models import Stock, StockMovement, PickingHistory, ReceivingHistory, DocumentItem, Location
-        
-        # Sprawdź wszystkie powiązania
-        # Sprawdź tylko Stock z quantity > 0 lub reserved_quantity > 0
-        has_stock = Stock.objects.filter(
-            location=self.location
-        ).filter(
-            Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
-        ).exists()
-        has_movements = StockMovement.objects.filter(
-            Q(source_location=self.location) | Q(target_location=self.location)
-        ).exists()
-        has_picking_history = PickingHistory.objects.filter(location_scanned=self.location).exists()
-        has_receiving_history = ReceivingHistory.objects.filter(location=self.location).exists()
-        has_document_items = DocumentItem.objects.filter(location=self.location).exists()
-        has_children = Location.objects.filter(parent=self.location).exists()
-        
-        return not any([
-            has_stock,
-            has_movements,
-            has_picking_history,
-            has_receiving_history,
-            has_document_items,
-            has_children
-        ])
-    
-    def can_delete(self):
-        """Sprawdza czy można usunąć strefę (Location musi być pusta)"""
-        if not self.location:
-            return True
-        return self.is_location_empty()
-    
     def sync_to_location(self, barcode, sync_children=True, _syncing=False):
         """Synchronizuje strefę do Location w WMS oraz wszystkie regały i półki w strefie
         
@@ -202,96 +208,10 @@ class WarehouseZone(models.Model):
         
         return self.location
     
-    def delete(self, *args, **kwargs):
-        """Usuwa strefę, sprawdzając czy Location jest pusta"""
-        deleted_items = kwargs.pop('deleted_items', None)  # Lista do zbierania informacji o usuniętych elementach
-        
-        if self.location:
-            # Jeśli Location jest już w trakcie usuwania, po prostu odłącz relację
-            if hasattr(self.location, '_deleting_from_builder') and self.location._deleting_from_builder:
-                self.location = None
-                self.save(update_fields=['location'])
-            else:
-                from wms.models import Location, Stock, StockMovement, PickingHistory, ReceivingHistory, DocumentItem
-                
-                # Najpierw usuń Location dla wszystkich półek i regałów w strefie
-                # (child locations blokują usunięcie Location strefy)
-                # Nie dodawaj ich do deleted_items tutaj - zostaną dodane podczas usuwania samych elementów
-                for rack in self.racks.all():
-                    # Usuń Location dla wszystkich półek w regale
-                    for shelf in rack.shelves.all():
-                        if shelf.location:
-                            # Sprawdź czy Location półki nie ma innych powiązań
-                            # Sprawdź tylko Stock z quantity > 0 lub reserved_quantity > 0
-                            has_other_relations = any([
-                                Stock.objects.filter(
-                                    location=shelf.location
-                                ).filter(
-                                    Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
-                                ).exists(),
-                                StockMovement.objects.filter(
-                                    Q(source_location=shelf.location) | Q(target_location=shelf.location)
-                                ).exists(),
-                                PickingHistory.objects.filter(location_scanned=shelf.location).exists(),
-                                ReceivingHistory.objects.filter(location=shelf.location).exists(),
-                                DocumentItem.objects.filter(location=shelf.location).exists(),
-                                Location.objects.filter(parent=shelf.location).exists()
-                            ])
-                            if not has_other_relations:
-                                shelf.location._deleting_from_builder = True
-                                shelf.location.delete()
-                    
-                    # Usuń Location dla regału (jeśli nie ma innych powiązań poza child locations)
-                    if rack.location:
-                        # Sprawdź tylko Stock z quantity > 0 lub reserved_quantity > 0
-                        has_other_relations = any([
-                            Stock.objects.filter(
-                                location=rack.location
-                            ).filter(
-                                Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
-                            ).exists(),
-                            StockMovement.objects.filter(
-                                Q(source_location=rack.location) | Q(target_location=rack.location)
-                            ).exists(),
-                            PickingHistory.objects.filter(location_scanned=rack.location).exists(),
-                            ReceivingHistory.objects.filter(location=rack.location).exists(),
-                            DocumentItem.objects.filter(location=rack.location).exists(),
-                            # Child locations już usunęliśmy powyżej
-                        ])
-                        if not has_other_relations:
-                            rack.location._deleting_from_builder = True
-                            rack.location.delete()
-                
-                # Teraz sprawdź czy Location strefy jest pusta
-                if not self.is_location_empty():
-                    raise ValidationError(
-                        f"Nie można usunąć strefy '{self.name}' - powiązana lokalizacja '{self.location.name}' "
-                        f"ma powiązania z innymi obiektami (Stock, StockMovement, PickingHistory, itp.)"
-                    )
-                # Oznacz Location że jest usuwane z powodu usuwania elementu buildera
-                # (zapobiega cyklicznemu usuwaniu w sygnale)
-                self.location._deleting_from_builder = True
-                # Usuń Location jeśli jest pusta
-                location_name = self.location.name
-                self.location.delete()
-                if deleted_items is not None:
-                    deleted_items.append({'type': 'zone_location', 'name': location_name})
-        
-        # Ręcznie usuń wszystkie regały (aby ich metody delete() były wywoływane i zbierały deleted_items)
-        # Zamiast polegać na CASCADE, który nie wywołuje metody delete()
-        # Location dla regałów i półek są już usunięte powyżej, więc metody delete() nie będą próbowały usuwać Location ponownie
-        racks_to_delete = list(self.racks.all())
-        for rack in racks_to_delete:
-            rack.delete(deleted_items=deleted_items)
-        
-        zone_name = self.name
-        super().delete(*args, **kwargs)
-        if deleted_items is not None:
-            deleted_items.append({'type': 'zone', 'name': zone_name})
-
-
-class WarehouseRack(models.Model):
+class WarehouseRack(BuilderElementMixin, models.Model):
     """Regał - racks within zones"""
+    builder_kind = 'rack'
+
     zone = models.ForeignKey(
         WarehouseZone,
         on_delete=models.CASCADE,
@@ -349,43 +269,6 @@ class WarehouseRack(models.Model):
     def __str__(self):
         return f"{self.zone.name} - {self.name}"
     
-    def is_location_empty(self):
-        """Sprawdza czy powiązana Location jest pusta (nie ma powiązań)"""
-        if not self.location:
-            return True
-        
-        from wms.models import Stock, StockMovement, PickingHistory, ReceivingHistory, DocumentItem, Location
-        
-        # Sprawdź wszystkie powiązania
-        # Sprawdź tylko Stock z quantity > 0 lub reserved_quantity > 0
-        has_stock = Stock.objects.filter(
-            location=self.location
-        ).filter(
-            Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
-        ).exists()
-        has_movements = StockMovement.objects.filter(
-            Q(source_location=self.location) | Q(target_location=self.location)
-        ).exists()
-        has_picking_history = PickingHistory.objects.filter(location_scanned=self.location).exists()
-        has_receiving_history = ReceivingHistory.objects.filter(location=self.location).exists()
-        has_document_items = DocumentItem.objects.filter(location=self.location).exists()
-        has_children = Location.objects.filter(parent=self.location).exists()
-        
-        return not any([
-            has_stock,
-            has_movements,
-            has_picking_history,
-            has_receiving_history,
-            has_document_items,
-            has_children
-        ])
-    
-    def can_delete(self):
-        """Sprawdza czy można usunąć regał (Location musi być pusta)"""
-        if not self.location:
-            return True
-        return self.is_location_empty()
-    
     def sync_to_location(self, barcode, sync_children=True, _syncing=False):
         """Synchronizuje regał do Location w WMS oraz nadrzędną strefę jeśli nie jest zsynchronizowana
         
@@ -448,67 +331,10 @@ class WarehouseRack(models.Model):
         
         return self.location
     
-    def delete(self, *args, **kwargs):
-        """Usuwa regał, sprawdzając czy Location jest pusta"""
-        deleted_items = kwargs.pop('deleted_items', None)  # Lista do zbierania informacji o usuniętych elementach
-        
-        if self.location:
-            # Jeśli Location jest już w trakcie usuwania, po prostu odłącz relację
-            if hasattr(self.location, '_deleting_from_builder') and self.location._deleting_from_builder:
-                self.location = None
-                self.save(update_fields=['location'])
-            else:
-                from wms.models import Stock, StockMovement, PickingHistory, ReceivingHistory, DocumentItem, Location
-                
-                # Najpierw usuń Location dla wszystkich półek w regale
-                # (child locations blokują usunięcie Location regału)
-                # Nie dodawaj ich do deleted_items tutaj - zostaną dodane podczas usuwania samych półek
-                for shelf in self.shelves.all():
-                    if shelf.location:
-                        # Sprawdź czy Location półki nie ma innych powiązań
-                        has_other_relations = any([
-                            Stock.objects.filter(location=shelf.location).exists(),
-                            StockMovement.objects.filter(
-                                Q(source_location=shelf.location) | Q(target_location=shelf.location)
-                            ).exists(),
-                            PickingHistory.objects.filter(location_scanned=shelf.location).exists(),
-                            ReceivingHistory.objects.filter(location=shelf.location).exists(),
-                            DocumentItem.objects.filter(location=shelf.location).exists(),
-                            Location.objects.filter(parent=shelf.location).exists()
-                        ])
-                        if not has_other_relations:
-                            shelf.location._deleting_from_builder = True
-                            shelf.location.delete()
-                
-                # Teraz sprawdź czy Location regału jest pusta
-                if not self.is_location_empty():
-                    raise ValidationError(
-                        f"Nie można usunąć regału '{self.name}' - powiązana lokalizacja '{self.location.name}' "
-                        f"ma powiązania z innymi obiektami (Stock, StockMovement, PickingHistory, itp.)"
-                    )
-                # Oznacz Location że jest usuwane z powodu usuwania elementu buildera
-                # (zapobiega cyklicznemu usuwaniu w sygnale)
-                self.location._deleting_from_builder = True
-                # Usuń Location jeśli jest pusta
-                location_name = self.location.name
-                self.location.delete()
-                if deleted_items is not None:
-                    deleted_items.append({'type': 'rack_location', 'name': location_name})
-        
-        # Ręcznie usuń wszystkie półki (aby ich metody delete() były wywoływane i zbierały deleted_items)
-        # Zamiast polegać na CASCADE, który nie wywołuje metody delete()
-        shelves_to_delete = list(self.shelves.all())
-        for shelf in shelves_to_delete:
-            shelf.delete(deleted_items=deleted_items)
-        
-        rack_name = self.name
-        super().delete(*args, **kwargs)
-        if deleted_items is not None:
-            deleted_items.append({'type': 'rack', 'name': rack_name})
-
-
-class WarehouseShelf(models.Model):
+class WarehouseShelf(BuilderElementMixin, models.Model):
     """Półka - shelves within racks"""
+    builder_kind = 'shelf'
+
     rack = models.ForeignKey(
         WarehouseRack,
         on_delete=models.CASCADE,
@@ -566,43 +392,6 @@ class WarehouseShelf(models.Model):
     def __str__(self):
         return f"{self.rack.name} - {self.name}"
     
-    def is_location_empty(self):
-        """Sprawdza czy powiązana Location jest pusta (nie ma powiązań)"""
-        if not self.location:
-            return True
-        
-        from wms.models import Stock, StockMovement, PickingHistory, ReceivingHistory, DocumentItem, Location
-        
-        # Sprawdź wszystkie powiązania
-        # Sprawdź tylko Stock z quantity > 0 lub reserved_quantity > 0
-        has_stock = Stock.objects.filter(
-            location=self.location
-        ).filter(
-            Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
-        ).exists()
-        has_movements = StockMovement.objects.filter(
-            Q(source_location=self.location) | Q(target_location=self.location)
-        ).exists()
-        has_picking_history = PickingHistory.objects.filter(location_scanned=self.location).exists()
-        has_receiving_history = ReceivingHistory.objects.filter(location=self.location).exists()
-        has_document_items = DocumentItem.objects.filter(location=self.location).exists()
-        has_children = Location.objects.filter(parent=self.location).exists()
-        
-        return not any([
-            has_stock,
-            has_movements,
-            has_picking_history,
-            has_receiving_history,
-            has_document_items,
-            has_children
-        ])
-    
-    def can_delete(self):
-        """Sprawdza czy można usunąć półkę (Location musi być pusta)"""
-        if not self.location:
-            return True
-        return self.is_location_empty()
-    
     def sync_to_location(self, barcode, _syncing=False):
         """Synchronizuje półkę do Location w WMS oraz nadrzędny regał i strefę jeśli nie są zsynchronizowane
         
@@ -659,33 +448,3 @@ class WarehouseShelf(models.Model):
             self.save(update_fields=['location'])
         
         return self.location
-    
-    def delete(self, *args, **kwargs):
-        """Usuwa półkę, sprawdzając czy Location jest pusta"""
-        deleted_items = kwargs.pop('deleted_items', None)  # Lista do zbierania informacji o usuniętych elementach
-        
-        if self.location:
-            # Jeśli Location jest już w trakcie usuwania, po prostu odłącz relację
-            if hasattr(self.location, '_deleting_from_builder') and self.location._deleting_from_builder:
-                self.location = None
-                self.save(update_fields=['location'])
-            else:
-                if not self.is_location_empty():
-                    raise ValidationError(
-                        f"Nie można usunąć półki '{self.name}' - powiązana lokalizacja '{self.location.name}' "
-                        f"ma powiązania z innymi obiektami (Stock, StockMovement, PickingHistory, itp.)"
-                    )
-                # Oznacz Location że jest usuwane z powodu usuwania elementu buildera
-                # (zapobiega cyklicznemu usuwaniu w sygnale)
-                self.location._deleting_from_builder = True
-                # Usuń Location jeśli jest pusta
-                location_name = self.location.name
-                self.location.delete()
-                if deleted_items is not None:
-                    deleted_items.append({'type': 'shelf_location', 'name': location_name})
-        
-        shelf_name = self.name
-        super().delete(*args, **kwargs)
-        if deleted_items is not None:
-            deleted_items.append({'type': 'shelf', 'name': shelf_name})
-
@@ -0,0 +1,372 @@
+"""
+Operacje na całych poddrzewach buildera (strefa -> regały -> półki).
+
+Zależności wszystkich powiązanych lokalizacji WMS sprawdzane są kilkoma
+zgrupowanymi zapytaniami (po jednym na typ powiązania), a nie osobno dla
+każdej półki i regału. Elementy bez blokad usuwane są hurtowo razem z ich
+lokalizacjami; sygnały synchronizujące builder z ``Location`` są na ten czas
+wyłączone.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.db import transaction
+from django.db.models import Q
+
+from .geometry import invalidate_layout
+from .models import WarehouseRack, WarehouseShelf, WarehouseZone
+from .signals import location_sync_suspended
+
+ZONE = 'zone'
+RACK = 'rack'
+SHELF = 'shelf'
+
+ELEMENT_MODELS = {
+    ZONE: WarehouseZone,
+    RACK: WarehouseRack,
+    SHELF: WarehouseShelf,
+}
+
+ELEMENT_LABELS = {
+    ZONE: 'Strefa',
+    RACK: 'Regał',
+    SHELF: 'Półka',
+}
+
+# Powody blokady usunięcia lokalizacji
+REASON_STOCK = 'stock'
+REASON_MOVEMENTS = 'movements'
+REASON_PICKING_HISTORY = 'picking_history'
+REASON_RECEIVING_HISTORY = 'receiving_history'
+REASON_DOCUMENTS = 'documents'
+REASON_CHILD_LOCATIONS = 'child_locations'
+REASON_BLOCKED_CHILDREN = 'blocked_children'
+
+REASON_LABELS = {
+    REASON_STOCK: 'stany magazynowe',
+    REASON_MOVEMENTS: 'ruchy magazynowe',
+    REASON_PICKING_HISTORY: 'historia kompletacji',
+    REASON_RECEIVING_HISTORY: 'historia przyjęć',
+    REASON_DOCUMENTS: 'pozycje dokumentów',
+    REASON_CHILD_LOCATIONS: 'lokalizacje podrzędne spoza buildera',
+    REASON_BLOCKED_CHILDREN: 'zablokowane elementy podrzędne',
+}
+
+
+@dataclass
+class BuilderElement:
+    kind: str
+    id: int
+    name: str
+    location_id: Optional[int]
+    parent_id: Optional[int] = None
+    reasons: Set[str] = field(default_factory=set)
+
+    @property
+    def blocked(self) -> bool:
+        return bool(self.reasons)
+
+    def describe(self) -> str:
+        reasons = ', '.join(REASON_LABELS[reason] for reason in sorted(self.reasons))
+        return f'{ELEMENT_LABELS[self.kind]} "{self.name}": {reasons}'
+
+
+@dataclass
+class SubtreePlan:
+    zones: List[BuilderElement] = field(default_factory=list)
+    racks: List[BuilderElement] = field(default_factory=list)
+    shelves: List[BuilderElement] = field(default_factory=list)
+    location_names: Dict[int, str] = field(default_factory=dict)
+    warehouse_ids: Set[int] = field(default_factory=set)
+
+    def elements(self) -> List[BuilderElement]:
+        # Od liści do korzenia - w tej kolejności elementy są usuwane
+        return [*self.shelves, *self.racks, *self.zones]
+
+    @property
+    def blocked(self) -> List[BuilderElement]:
+        return [element for element in self.elements() if element.blocked]
+
+    @property
+    def deletable(self) -> List[BuilderElement]:
+        return [element for element in self.elements() if not element.blocked]
+
+
+@dataclass
+class DeleteResult:
+    plan: SubtreePlan
+    # Format zgodny z ``deleted_items`` z metod delete() modeli
+    deleted_items: List[dict] = field(default_factory=list)
+
+    @property
+    def blocked(self) -> List[BuilderElement]:
+        return self.plan.blocked
+
+    def error_message(self) -> str:
+        blocked = self.blocked
+        if not blocked:
+            return ''
+        details = '; '.join(element.describe() for element in blocked[:5])
+        if len(blocked) > 5:
+            details += f' (i {len(blocked) - 5} więcej)'
+        return f'Nie można usunąć {len(blocked)} element(ów) - powiązane lokalizacje są w użyciu. {details}'
+
+
+def location_blockers(location_ids: Iterable[int]) -> Dict[int, Set[str]]:
+    """
+    Powody, dla których lokalizacji nie można usunąć - jedno zapytanie na typ powiązania.
+
+    Lokalizacje podrzędne z tego samego zbioru nie blokują rodzica (zostaną
+    usunięte razem z nim).
+    """
+
+    from wms.models import DocumentItem, Location, PickingHistory, ReceivingHistory, Stock, StockMovement
+
+    location_ids = set(location_ids)
+    blockers: Dict[int, Set[str]] = defaultdict(set)
+    if not location_ids:
+        return blockers
+
+    def mark(reason, ids):
+        for location_id in ids:
+            if location_id in location_ids:
+                blockers[location_id].add(reason)
+
+    # Stany z zerową ilością i rezerwacją nie blokują (jak w is_location_empty)
+    mark(REASON_STOCK, Stock.objects.filter(location_id__in=location_ids).filter(
+        Q(quantity__gt=0) | Q(reserved_quantity__gt=0)
+    ).values_list('location_id', flat=True).distinct())
+    movements = StockMovement.objects.filter(
+        Q(source_location_id__in=location_ids) | Q(target_location_id__in=location_ids)
+    ).values_list('source_location_id', 'target_location_id').distinct()
+    for source_id, target_id in movements:
+        mark(REASON_MOVEMENTS, (source_id, target_id))
+    mark(REASON_PICKING_HISTORY, PickingHistory.objects.filter(
+        location_scanned_id__in=location_ids
+    ).values_list('location_scanned_id', flat=True).distinct())
+    mark(REASON_RECEIVING_HISTORY, ReceivingHistory.objects.filter(
+        location_id__in=location_ids
+    ).values_list('location_id', flat=True).distinct())
+    mark(REASON_DOCUMENTS, DocumentItem.objects.filter(
+        location_id__in=location_ids
+    ).values_list('location_id', flat=True).distinct())
+    mark(REASON_CHILD_LOCATIONS, Location.objects.filter(parent_id__in=location_ids).exclude(
+        id__in=location_ids
+    ).values_list('parent_id', flat=True).distinct())
+    return blockers
+
+
+def plan_subtree_delete(*, zone_ids: Iterable[int] = (), rack_ids: Iterable[int] = (),
+                        shelf_ids: Iterable[int] = ()) -> SubtreePlan:
+    """
+    Zbiera poddrzewa podanych elementów i oznacza, które z nich są zablokowane.
+
+    Element jest zablokowany, jeśli jego lokalizacja ma powiązania albo
+    zablokowany jest którykolwiek z elementów podrzędnych.
+    """
+
+    from wms.models import Location
+
+    zone_ids, rack_ids, shelf_ids = set(zone_ids), set(rack_ids), set(shelf_ids)
+    plan = SubtreePlan()
+    if zone_ids:
+        for pk, name, location_id, warehouse_id in WarehouseZone.objects.filter(id__in=zone_ids).values_list(
+            'id', 'name', 'location_id', 'warehouse_id'
+        ):
+            plan.zones.append(BuilderElement(ZONE, pk, name, location_id))
+            plan.warehouse_ids.add(warehouse_id)
+    if zone_ids or rack_ids:
+        for pk, name, location_id, zone_id, warehouse_id in WarehouseRack.objects.filter(
+            Q(zone_id__in=zone_ids) | Q(id__in=rack_ids)
+        ).values_list('id', 'name', 'location_id', 'zone_id', 'zone__warehouse_id'):
+            plan.racks.append(BuilderElement(RACK, pk, name, location_id, zone_id))
+            plan.warehouse_ids.add(warehouse_id)
+    all_rack_ids = {rack.id for rack in plan.racks}
+    if all_rack_ids or shelf_ids:
+        for pk, name, location_id, rack_id, warehouse_id in WarehouseShelf.objects.filter(
+            Q(rack_id__in=all_rack_ids) | Q(id__in=shelf_ids)
+        ).values_list('id', 'name', 'location_id', 'rack_id', 'rack__zone__warehouse_id'):
+            plan.shelves.append(BuilderElement(SHELF, pk, name, location_id, rack_id))
+            plan.warehouse_ids.add(warehouse_id)
+
+    location_ids = {element.location_id for element in plan.elements() if element.location_id}
+    if location_ids:
+        plan.location_names = dict(Location.objects.filter(id__in=location_ids).values_list('id', 'name'))
+        blockers = location_blockers(location_ids)
+        for element in plan.elements():
+            element.reasons |= blockers.get(element.location_id, set())
+
+    # Blokada dziecka blokuje rodzica (półka -> regał -> strefa)
+    blocked_racks = {shelf.parent_id for shelf in plan.shelves if shelf.blocked}
+    for rack in plan.racks:
+        if rack.id in blocked_racks:
+            rack.reasons.add(REASON_BLOCKED_CHILDREN)
+    blocked_zones = {rack.parent_id for rack in plan.racks if rack.blocked}
+    for zone in plan.zones:
+        if zone.id in blocked_zones:
+            zone.reasons.add(REASON_BLOCKED_CHILDREN)
+    return plan
+
+
+def delete_subtree(*, zone_ids: Iterable[int] = (), rack_ids: Iterable[int] = (),
+                   shelf_ids: Iterable[int] = ()) -> DeleteResult:
+    """
+    Usuwa hurtowo niezablokowane elementy poddrzewa i ich lokalizacje WMS.
+
+    Zablokowane elementy (wraz z przodkami) zostają - opisuje je
+    ``DeleteResult.blocked``.
+    """
+
+    from wms.models import Location
+
+    plan = plan_subtree_delete(zone_ids=zone_ids, rack_ids=rack_ids, shelf_ids=shelf_ids)
+    result = DeleteResult(plan=plan)
+    deletable = plan.deletable
+    if not deletable:
+        return result
+
+    ids_by_kind = defaultdict(list)
+    for element in deletable:
+        ids_by_kind[element.kind].append(element.id)
+    location_ids = [element.location_id for element in deletable if element.location_id]
+
+    with transaction.atomic(), location_sync_suspended():
+        for kind in (SHELF, RACK, ZONE):
+            if ids_by_kind[kind]:
+                ELEMENT_MODELS[kind].objects.filter(id__in=ids_by_kind[kind]).delete()
+        if location_ids:
+            Location.objects.filter(id__in=location_ids).delete()
+        for warehouse_id in plan.warehouse_ids:
+            invalidate_layout(warehouse_id)
+
+    for element in deletable:
+        if element.location_id:
+            location_name = plan.location_names.get(element.location_id, element.name)
+            result.deleted_items.append({'type': f'{element.kind}_location', 'name': location_name})
+        result.deleted_items.append({'type': element.kind, 'name': element.name})
+    return result
+
+
+# --- Synchronizacja układu magazynu do lokalizacji WMS ----------------------
+
+LOCATION_DESCRIPTIONS = {
+    ZONE: 'Strefa z buildera: {name}',
+    RACK: 'Regał z buildera: {name}',
+    SHELF: 'Półka z buildera: {name}',
+}
+
+SYNC_FIELDS = ('name', 'location_type', 'parent', 'description')
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.created + self.updated + self.unchanged
+
+
+def _default_barcode(kind: str, element_id: int, parent_barcode: Optional[str]) -> str:
+    # Te same wzorce co w widokach synchronizacji pojedynczych elementów
+    if kind == ZONE:
+        return f'ZONE-{element_id}'
+    if kind == RACK:
+        return f'{parent_barcode}-R{element_id}'
+    return f'{parent_barcode}-S{element_id}'
+
+
+def sync_layout_to_locations(*, warehouse_id: Optional[int] = None,
+                             zone_ids: Optional[Iterable[int]] = None) -> SyncResult:
+    """
+    Synchronizuje strefy, regały i półki magazynu (lub wybranych stref) do ``Location``.
+
+    Docelowe drzewo lokalizacji jest wyliczane w pamięci i porównywane z
+    istniejącymi rekordami; nowe lokalizacje tworzone są ``bulk_create``
+    (poziom po poziomie, żeby znać rodziców), zmienione - ``bulk_update``.
+    Wszystko w jednej transakcji, bez sygnałów builder <-> Location.
+
+    Rzuca ``ValueError``, jeśli wygenerowany kod kreskowy należy już do
+    innej lokalizacji.
+    """
+
+    from wms.fragment_cache import invalidate_rows
+    from wms.location_index import bump_location_index_version
+    from wms.models import Location
+
+    zones = WarehouseZone.objects.all()
+    if warehouse_id is not None:
+        zones = zones.filter(warehouse_id=warehouse_id)
+    if zone_ids is not None:
+        zones = zones.filter(id__in=list(zone_ids))
+    zones = list(zones.order_by('id'))
+    racks = list(WarehouseRack.objects.filter(zone__in=[zone.id for zone in zones]).order_by('id'))
+    shelves = list(WarehouseShelf.objects.filter(rack__in=[rack.id for rack in racks]).order_by('id'))
+    result = SyncResult()
+    if not zones:
+        return result
+
+    levels = ((ZONE, zones, None), (RACK, racks, 'zone_id'), (SHELF, shelves, 'rack_id'))
+    location_ids = [element.location_id for _, elements, _ in levels for element in elements if element.location_id]
+    existing = Location.objects.in_bulk(location_ids)
+
+    with transaction.atomic(), location_sync_suspended():
+        # id elementu nadrzędnego -> jego lokalizacja (uzupełniane poziom po poziomie)
+        parent_locations: Dict[int, Location] = {}
+        for kind, elements, parent_field in levels:
+            model = ELEMENT_MODELS[kind]
+            current_locations: Dict[int, Location] = {}
+            to_create = []
+            to_update = []
+            for element in elements:
+                parent = parent_locations.get(getattr(element, parent_field)) if parent_field else None
+                target = {
+                    'name': element.name,
+                    'location_type': kind,
+                    'parent_id': parent.id if parent else None,
+                    'description': LOCATION_DESCRIPTIONS[kind].format(name=element.name),
+                }
+                location = existing.get(element.location_id)
+                if location is None:
+                    barcode = _default_barcode(kind, element.id, parent.barcode if parent else None)
+                    location = Location(barcode=barcode, **target)
+                    to_create.append((element, location))
+                elif any(getattr(location, name) != value for name, value in target.items()):
+                    for name, value in target.items():
+                        setattr(location, name, value)
+                    to_update.append(location)
+                else:
+                    result.unchanged += 1
+                current_locations[element.id] = location
+
+            if to_create:
+                barcodes = [location.barcode for _, location in to_create]
+                taken = list(Location.objects.filter(barcode__in=barcodes).values_list('barcode', flat=True)[:5])
+                if taken:
+                    raise ValueError(f"Kody kreskowe są już używane przez inne lokalizacje: {', '.join(taken)}")
+                Location.objects.bulk_create([location for _, location in to_create], batch_size=1000)
+                # Nie każdy backend (MySQL) zwraca klucze z bulk_create - odczytaj je po kodach
+                ids_by_barcode = dict(Location.objects.filter(barcode__in=barcodes).values_list('barcode', 'id'))
+                for element, location in to_create:
+                    location.id = ids_by_barcode[location.barcode]
+                    element.location_id = location.id
+                model.objects.bulk_update([element for element, _ in to_create], ['location'], batch_size=1000)
+                result.created += len(to_create)
+            if to_update:
+                Location.objects.bulk_update(to_update, SYNC_FIELDS, batch_size=1000)
+                result.updated += len(to_update)
+            parent_locations = current_locations
+
+        if result.created or result.updated:
+            transaction.on_commit(bump_location_index_version)
+            invalidate_rows('location')
+        if result.created:
+            for warehouse_id in {zone.warehouse_id for zone in zones}:
+                invalidate_layout(warehouse_id)
+    return result
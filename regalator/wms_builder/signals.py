@@ -1,17 +1,37 @@
+from django.db import transaction
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.core.cache import cache
+from contextlib import contextmanager
 from decimal import Decimal
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+_sync_state = threading.local()
+
+
+@contextmanager
+def location_sync_suspended():
+    """Wyłącza synchronizację builder <-> Location w sygnałach (operacje hurtowe)"""
+    previous = getattr(_sync_state, 'suspended', False)
+    _sync_state.suspended = True
+    try:
+        yield
+    finally:
+        _sync_state.suspended = previous
+
+
+def location_sync_is_suspended():
+    return getattr(_sync_state, 'suspended', False)
+
 
 @receiver(post_save, sender='wms.Location')
 def update_location_to_builder(sender, instance, created, **kwargs):
     """Aktualizuje Location w odpowiednim elemencie buildera (tylko update)"""
     # Obsługuj tylko zdarzenia typu update (nie tworzenie nowych)
-    if created:
+    if created or location_sync_is_suspended():
         return
     
     toast_message = None
@@ -63,6 +83,9 @@ def update_location_to_builder(sender, instance, created, **kwargs):
 @receiver(pre_delete, sender='wms.Location')
 def delete_builder_element_on_location_delete(sender, instance, **kwargs):
     """Usuwa powiązany element w builderze przed usunięciem Location"""
+    if location_sync_is_suspended():
+        return
+
     try:
         # Sprawdź czy Location jest usuwane z powodu usuwania elementu buildera
         # (w takim przypadku element buildera jest już w trakcie usuwania i nie powinniśmy go usuwać ponownie)
@@ -89,3 +112,26 @@ def delete_builder_element_on_location_delete(sender, instance, **kwargs):
         # Ignoruj błędy (np. jeśli wms_builder nie jest zainstalowany)
         logger.warning(f"Błąd usuwania elementu buildera przy usuwaniu Location: {e}")
 
+
+@receiver(post_save, sender='wms_builder.Warehouse')
+def invalidate_warehouse_geometry(sender, instance, **kwargs):
+    """Zmiana magazynu (np. wymiarów) - przebuduj geometrię kanwy"""
+    from .geometry import invalidate_layout
+    invalidate_layout(instance.id)
+
+
+@receiver(post_save, sender='wms_builder.WarehouseZone')
+@receiver(post_save, sender='wms_builder.WarehouseRack')
+@receiver(post_save, sender='wms_builder.WarehouseShelf')
+def update_layout_geometry(sender, instance, created, update_fields=None, **kwargs):
+    """Przesunięcie lub zmiana rozmiaru aktualizuje geometrię przyrostowo, inne zmiany ją unieważniają"""
+    from .geometry import GEOMETRY_FIELDS, apply_geometry_change, invalidate_layout, warehouse_id_for
+
+    warehouse_id = warehouse_id_for(instance)
+    if created or not update_fields or not GEOMETRY_FIELDS.issuperset(update_fields):
+        invalidate_layout(warehouse_id)
+        return
+
+    kind, element_id = instance.builder_kind, instance.id
+    rect = {'x': instance.x, 'y': instance.y, 'width': instance.width, 'height': instance.height}
+    transaction.on_commit(lambda: apply_geometry_change(warehouse_id, kind, element_id, **rect))
@@ -0,0 +1,102 @@
+/**
+ * Warehouse Builder - heatmap overlay (stock quantity, SKU count, pick frequency)
+ */
+
+class WarehouseHeatmap {
+    constructor() {
+        this.svg = document.getElementById('warehouse-svg');
+        this.metricSelect = document.getElementById('heatmapMetric');
+        this.daysSelect = document.getElementById('heatmapDays');
+        this.legend = document.getElementById('heatmapLegend');
+        this.legendLabel = document.getElementById('heatmapLegendLabel');
+        this.request = null;
+    }
+
+    init() {
+        if (!this.svg || !this.metricSelect) {
+            return;
+        }
+        this.metricSelect.addEventListener('change', () => this.refresh());
+        if (this.daysSelect) {
+            this.daysSelect.addEventListener('change', () => this.refresh());
+        }
+    }
+
+    rects() {
+        return this.svg.querySelectorAll('rect[data-kind]');
+    }
+
+    refresh() {
+        const metric = this.metricSelect.value;
+        if (this.daysSelect) {
+            this.daysSelect.hidden = metric !== 'picks';
+        }
+        if (!metric) {
+            this.clear();
+            return;
+        }
+
+        const params = new URLSearchParams({ metric });
+        if (this.daysSelect) {
+            params.set('days', this.daysSelect.value);
+        }
+        if (this.request) {
+            this.request.abort();
+        }
+        this.request = new AbortController();
+        fetch(`${this.metricSelect.dataset.url}?${params}`, { signal: this.request.signal })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => this.apply(data))
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Heatmap load failed:', error);
+                }
+            });
+    }
+
+    color(value, max) {
+        const ratio = max > 0 ? Math.min(value / max, 1) : 0;
+        // Od żółtego (mało) do czerwonego (najwięcej)
+        return `hsl(${Math.round(60 * (1 - ratio))}, 90%, ${Math.round(55 - 10 * ratio)}%)`;
+    }
+
+    apply(data) {
+        this.rects().forEach(rect => {
+            if (!rect.dataset.originalFill) {
+                rect.dataset.originalFill = rect.getAttribute('fill');
+            }
+            const locationId = rect.dataset.locationId;
+            const value = locationId ? (data.values[locationId] || 0) : null;
+            if (value === null) {
+                rect.setAttribute('fill', '#adb5bd');
+                return;
+            }
+            rect.setAttribute('fill', this.color(value, data.max[rect.dataset.kind]));
+        });
+        if (this.legend) {
+            this.legend.hidden = false;
+            this.legendLabel.textContent = data.days ? `${data.label}, ${data.days} dni` : data.label;
+        }
+    }
+
+    clear() {
+        this.rects().forEach(rect => {
+            if (rect.dataset.originalFill) {
+                rect.setAttribute('fill', rect.dataset.originalFill);
+                delete rect.dataset.originalFill;
+            }
+        });
+        if (this.legend) {
+            this.legend.hidden = true;
+        }
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    new WarehouseHeatmap().init();
+});
@@ -0,0 +1,254 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from wms.models import Location, Product, Stock
+
+from .geometry import get_layout, hit_test
+from .models import Warehouse, WarehouseRack, WarehouseShelf, WarehouseZone
+from .services import (
+    REASON_BLOCKED_CHILDREN,
+    REASON_STOCK,
+    delete_subtree,
+    plan_subtree_delete,
+    sync_layout_to_locations,
+)
+
+
+class SubtreeDeleteTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='builder', password='pass1234')
+        self.client.force_login(self.user)
+        self.warehouse = Warehouse.objects.create(name='Magazyn główny')
+        self.zone = WarehouseZone.objects.create(warehouse=self.warehouse, name='Strefa A')
+        for rack_index in range(3):
+            rack = WarehouseRack.objects.create(zone=self.zone, name=f'R{rack_index}')
+            for shelf_index in range(4):
+                WarehouseShelf.objects.create(rack=rack, name=f'R{rack_index}-P{shelf_index}')
+        self.zone.sync_to_location('ZA')
+
+    def _put_stock_on(self, shelf):
+        product = Product.objects.create(code='BLD-1', name='Produkt')
+        Stock.objects.create(product=product, location=shelf.location, quantity=Decimal('1'))
+
+    def test_plan_query_count_does_not_depend_on_subtree_size(self):
+        with CaptureQueriesContext(connection) as small:
+            plan_subtree_delete(shelf_ids=[WarehouseShelf.objects.first().id])
+        with CaptureQueriesContext(connection) as whole_zone:
+            plan = plan_subtree_delete(zone_ids=[self.zone.id])
+
+        self.assertEqual(len(plan.shelves), 12)
+        self.assertLessEqual(len(whole_zone), len(small) + 2)
+
+    def test_blocked_shelf_keeps_its_ancestors_and_rest_is_deleted(self):
+        blocked_shelf = WarehouseShelf.objects.select_related('location', 'rack').get(name='R1-P2')
+        self._put_stock_on(blocked_shelf)
+
+        result = delete_subtree(zone_ids=[self.zone.id])
+
+        blocked = {(element.kind, element.name): element.reasons for element in result.blocked}
+        self.assertEqual(blocked, {
+            ('shelf', 'R1-P2'): {REASON_STOCK},
+            ('rack', 'R1'): {REASON_BLOCKED_CHILDREN},
+            ('zone', 'Strefa A'): {REASON_BLOCKED_CHILDREN},
+        })
+        self.assertEqual(list(WarehouseShelf.objects.values_list('name', flat=True)), ['R1-P2'])
+        self.assertEqual(list(WarehouseRack.objects.values_list('name', flat=True)), ['R1'])
+        self.assertEqual(
+            set(Location.objects.values_list('barcode', flat=True)),
+            {'ZA', blocked_shelf.rack.location.barcode, blocked_shelf.location.barcode},
+        )
+        self.assertIn({'type': 'shelf_location', 'name': 'R0-P0'}, result.deleted_items)
+
+        with self.assertRaises(ValidationError):
+            WarehouseZone.objects.get(id=self.zone.id).delete()
+
+    def test_delete_view_removes_zone_with_locations(self):
+        response = self.client.post(reverse('wms_builder:htmx_zone_delete', args=[self.zone.id]))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('toastMessageList', json.loads(response['HX-Trigger']))
+        self.assertFalse(WarehouseZone.objects.exists())
+        self.assertFalse(WarehouseShelf.objects.exists())
+        self.assertFalse(Location.objects.exists())
+
+    def test_deleting_location_in_wms_removes_builder_element(self):
+        rack = WarehouseRack.objects.select_related('location').get(name='R0')
+        rack.location.delete()
+
+        self.assertFalse(WarehouseRack.objects.filter(id=rack.id).exists())
+        self.assertEqual(WarehouseShelf.objects.count(), 8)
+
+
+class LayoutSyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='builder', password='pass1234')
+        self.client.force_login(self.user)
+        self.warehouse = Warehouse.objects.create(name='Magazyn główny')
+        for zone_index in range(2):
+            zone = WarehouseZone.objects.create(warehouse=self.warehouse, name=f'S{zone_index}')
+            for rack_index in range(3):
+                rack = WarehouseRack.objects.create(zone=zone, name=f'S{zone_index}-R{rack_index}')
+                for shelf_index in range(4):
+                    WarehouseShelf.objects.create(rack=rack, name=f'S{zone_index}-R{rack_index}-P{shelf_index}')
+
+    def test_sync_builds_location_tree_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_layout_to_locations(warehouse_id=self.warehouse.id)
+
+        self.assertEqual((result.created, result.updated, result.unchanged), (32, 0, 0))
+        self.assertLess(len(queries), 25)
+        shelf = WarehouseShelf.objects.select_related('location__parent__parent', 'rack__zone').get(name='S1-R2-P3')
+        self.assertEqual(shelf.location.location_type, 'shelf')
+        self.assertEqual(shelf.location.barcode, f'ZONE-{shelf.rack.zone_id}-R{shelf.rack_id}-S{shelf.id}')
+        self.assertEqual(shelf.location.parent.parent, shelf.rack.zone.location)
+
+    def test_resync_updates_only_changed_locations(self):
+        sync_layout_to_locations(warehouse_id=self.warehouse.id)
+        WarehouseRack.objects.filter(name='S0-R1').update(name='Regał przy bramie')
+
+        result = sync_layout_to_locations(warehouse_id=self.warehouse.id)
+
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 31))
+        location = Location.objects.get(name='Regał przy bramie', location_type='rack')
+        # Sygnał Location -> builder był wyłączony, więc nie ma toastu w cache
+        self.assertIsNone(cache.get(f'location_update_toast_{location.id}_rack'))
+
+    def test_barcode_conflict_rolls_back(self):
+        zone = WarehouseZone.objects.get(name='S0')
+        Location.objects.create(name='Obca', location_type='zone', barcode=f'ZONE-{zone.id}')
+
+        with self.assertRaises(ValueError):
+            sync_layout_to_locations(warehouse_id=self.warehouse.id)
+        self.assertEqual(Location.objects.count(), 1)
+
+    def test_warehouse_sync_view(self):
+        response = self.client.post(reverse('wms_builder:htmx_warehouse_sync_to_locations', args=[self.warehouse.id]))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('utworzono 32', json.loads(response['HX-Trigger'])['toastMessage']['value'])
+        self.assertFalse(WarehouseShelf.objects.filter(location__isnull=True).exists())
+
+
+class GeometryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='builder', password='pass1234')
+        self.client.force_login(self.user)
+        self.warehouse = Warehouse.objects.create(name='Magazyn główny', width=2000, height=1000)
+        self.zone = WarehouseZone.objects.create(warehouse=self.warehouse, name='Strefa A', x=100, y=100, width=800, height=600)
+        self.rack = WarehouseRack.objects.create(zone=self.zone, name='R1', x=50, y=50, width=200, height=100)
+        self.shelf = WarehouseShelf.objects.create(rack=self.rack, name='R1-P1', x=10, y=10, width=60, height=40)
+        self.zone.sync_to_location('ZA')
+        self.shelf.refresh_from_db()
+
+    def test_layout_has_absolute_coordinates(self):
+        layout = get_layout(self.warehouse.id)
+
+        shelf = layout['elements'][f'shelf:{self.shelf.id}']
+        self.assertEqual((shelf['abs_x'], shelf['abs_y']), (160.0, 160.0))
+        self.assertEqual(shelf['parent'], f'rack:{self.rack.id}')
+        self.assertEqual(shelf['location_id'], self.shelf.location_id)
+
+    def test_rack_drag_patches_layout_incrementally(self):
+        version = get_layout(self.warehouse.id)['version']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('wms_builder:htmx_rack_update_position', args=[self.rack.id]), {'x': '300', 'y': '50'}
+            )
+
+        self.assertEqual(response.status_code, 204)
+        with CaptureQueriesContext(connection) as queries:
+            layout = get_layout(self.warehouse.id)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(layout['version'], version + 1)
+        shelf = layout['elements'][f'shelf:{self.shelf.id}']
+        self.assertEqual((shelf['abs_x'], shelf['abs_y']), (410.0, 160.0))
+        self.assertEqual(hit_test(layout, 420, 170)['key'], f'shelf:{self.shelf.id}')
+        self.assertEqual(hit_test(layout, 170, 170)['key'], f'zone:{self.zone.id}')
+
+    def test_creating_element_invalidates_layout(self):
+        version = get_layout(self.warehouse.id)['version']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WarehouseShelf.objects.create(rack=self.rack, name='R1-P2', x=100, y=10, width=60, height=40)
+
+        layout = get_layout(self.warehouse.id)
+        self.assertGreater(layout['version'], version)
+        self.assertEqual(len(layout['children'][f'rack:{self.rack.id}']), 2)
+
+    def test_layout_endpoint_culls_to_viewport(self):
+        url = reverse('wms_builder:warehouse_layout', args=[self.warehouse.id])
+
+        response = self.client.get(url, {'bbox': '150,150,200,200', 'kinds': 'shelf'})
+        self.assertEqual([element['id'] for element in response.json()['elements']], [self.shelf.id])
+        response = self.client.get(url, {'bbox': '1000,0,2000,1000'})
+        self.assertEqual(response.json()['elements'], [])
+        self.assertEqual(self.client.get(url, {'bbox': '1,2'}).status_code, 400)
+
+    def test_hit_endpoint_returns_shelf_location(self):
+        response = self.client.get(
+            reverse('wms_builder:warehouse_layout_hit', args=[self.warehouse.id]), {'x': '165', 'y': '165'}
+        )
+
+        data = response.json()
+        self.assertEqual(data['element']['kind'], 'shelf')
+        self.assertEqual(data['location']['id'], self.shelf.location_id)
+
+    def test_detail_view_renders_from_cached_layout(self):
+        url = reverse('wms_builder:warehouse_detail', args=[self.warehouse.id])
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'R1-P1')
+        self.assertLess(len(queries), 10)
+
+
+class HeatmapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='builder', password='pass1234')
+        self.client.force_login(self.user)
+        self.warehouse = Warehouse.objects.create(name='Magazyn główny')
+        self.zone = WarehouseZone.objects.create(warehouse=self.warehouse, name='Strefa A')
+        self.rack = WarehouseRack.objects.create(zone=self.zone, name='R1')
+        self.shelves = [WarehouseShelf.objects.create(rack=self.rack, name=f'R1-P{index}') for index in range(2)]
+        sync_layout_to_locations(warehouse_id=self.warehouse.id)
+        for shelf, quantity in zip(self.shelves, ('3', '5')):
+            shelf.refresh_from_db()
+            product = Product.objects.create(code=f'HM-{shelf.id}', name='Produkt')
+            Stock.objects.create(product=product, location=shelf.location, quantity=Decimal(quantity))
+        self.rack.refresh_from_db()
+        self.zone.refresh_from_db()
+
+    def test_overlay_rolls_values_up_to_racks_and_zones(self):
+        url = reverse('wms_builder:warehouse_heatmap', args=[self.warehouse.id])
+
+        response = self.client.get(url, {'metric': 'quantity'})
+
+        data = response.json()
+        self.assertEqual(data['values'], {
+            str(self.shelves[0].location_id): 3.0,
+            str(self.shelves[1].location_id): 5.0,
+            str(self.rack.location_id): 8.0,
+            str(self.zone.location_id): 8.0,
+        })
+        self.assertEqual(data['max']['shelf'], 5.0)
+
+    def test_overlay_rejects_unknown_metric_and_days(self):
+        url = reverse('wms_builder:warehouse_heatmap', args=[self.warehouse.id])
+
+        self.assertEqual(self.client.get(url, {'metric': 'volume'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'metric': 'picks', 'days': '0'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'metric': 'picks', 'days': '7'}).json()['values'], {})
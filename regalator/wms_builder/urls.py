@@ -11,6 +11,10 @@ urlpatterns = [
     path('warehouses/<int:warehouse_id>/zones/<int:zone_id>/racks/<int:rack_id>/', views.warehouse_detail, name='warehouse_detail_rack'),
     path('warehouses/<int:warehouse_id>/edit/', views.warehouse_edit, name='warehouse_edit'),
     path('warehouses/<int:warehouse_id>/delete/', views.warehouse_delete, name='warehouse_delete'),
+    path('warehouses/<int:warehouse_id>/layout/', views.warehouse_layout, name='warehouse_layout'),
+    path('warehouses/<int:warehouse_id>/layout/hit/', views.warehouse_layout_hit, name='warehouse_layout_hit'),
+    path('warehouses/<int:warehouse_id>/heatmap/', views.warehouse_heatmap, name='warehouse_heatmap'),
+    path('warehouses/<int:warehouse_id>/sync-to-locations/', views.htmx_warehouse_sync_to_locations, name='htmx_warehouse_sync_to_locations'),
     
     # Zone HTMX endpoints
     path('warehouses/<int:warehouse_id>/zones/create/', views.htmx_zone_create, name='htmx_zone_create'),
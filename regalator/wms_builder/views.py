@@ -3,13 +3,20 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.urls import reverse
-from django.core.exceptions import ValidationError
+from django.utils.html import escape
 from django.db import transaction
 from .models import Warehouse, WarehouseZone, WarehouseRack, WarehouseShelf
 from .forms import WarehouseForm, ZoneForm, RackForm, ShelfForm, ZoneSyncForm, RackSyncForm, ShelfSyncForm
+from .geometry import elements_in_viewport, get_layout, hit_test, layout_tree
+from .heatmap import heatmap_overlay
+from .services import delete_subtree, sync_layout_to_locations
 from decimal import Decimal, InvalidOperation
 import json
 
+from wms.location_stats import DEFAULT_PICK_DAYS, METRIC_QUANTITY, METRICS as HEATMAP_METRICS, PICK_RETENTION_DAYS
+
+HEATMAP_DAYS = (7, 30, 90)
+
 
 def _generate_copy_label(name):
     base = (name or '').strip() or 'Kopia'
@@ -71,6 +78,37 @@ def _build_toast_triggers(deleted_items):
     }
 
 
+def _delete_builder_element_response(kind, element_id):
+    """Usuwa element z poddrzewem i zwraca odpowiedź z toastami (204 lub 400 gdy coś jest zablokowane)"""
+    result = delete_subtree(**{f'{kind}_ids': [element_id]})
+    if not result.blocked:
+        response = HttpResponse(status=204)
+        response['HX-Trigger'] = json.dumps(_build_toast_triggers(result.deleted_items))
+        return response
+
+    error_message = result.error_message()
+    response = HttpResponse(
+        f'<div class="alert alert-danger">{escape(error_message)}</div>',
+        status=400
+    )
+    triggers = {
+        'toastMessage': {
+            'value': error_message,
+            'type': 'danger'
+        }
+    }
+    # Elementy bez blokad zostały usunięte - pokaż je listą toastów
+    if result.deleted_items:
+        triggers['toastMessageList'] = {
+            'toasts': [
+                {'value': f'{_get_deleted_item_label(item["type"], item["name"])} została usunięta.', 'type': 'success'}
+                for item in result.deleted_items
+            ]
+        }
+    response['HX-Trigger'] = json.dumps(triggers)
+    return response
+
+
 def _serialize_shelf(shelf):
     return {
         'id': shelf.id,
@@ -164,7 +202,6 @@ def warehouse_list(request):
 def warehouse_detail(request, warehouse_id, zone_id=None, rack_id=None):
     """Main view with SVG canvas showing warehouse layout"""
     warehouse = get_object_or_404(Warehouse, id=warehouse_id)
-    zones = warehouse.zones.all().prefetch_related('racks__shelves')
     active_zone = None
     active_rack = None
 
@@ -187,38 +224,9 @@ def warehouse_detail(request, warehouse_id, zone_id=None, rack_id=None):
     elif zone_id is not None:
         active_zone = get_object_or_404(warehouse.zones, id=zone_id)
     
-    # Calculate absolute positions for rendering
-    zones_data = []
-    for zone in zones:
-        racks_data = []
-        for rack in zone.racks.all():
-            shelves_data = []
-            for shelf in rack.shelves.all():
-                abs_x = float(zone.x + rack.x + shelf.x)
-                abs_y = float(zone.y + rack.y + shelf.y)
-                shelves_data.append({
-                    'shelf': shelf,
-                    'abs_x': abs_x,
-                    'abs_y': abs_y,
-                    'text_x': abs_x + float(shelf.width) / 2,
-                    'text_y': abs_y + float(shelf.height) / 2,
-                })
-            abs_x = float(zone.x + rack.x)
-            abs_y = float(zone.y + rack.y)
-            racks_data.append({
-                'rack': rack,
-                'abs_x': abs_x,
-                'abs_y': abs_y,
-                'text_x': abs_x + float(rack.width) / 2,
-                'text_y': abs_y + float(rack.height) / 2,
-                'shelves': shelves_data,
-            })
-        zones_data.append({
-            'zone': zone,
-            'text_x': float(zone.x + zone.width / 2),
-            'text_y': float(zone.y + zone.height / 2),
-            'racks': racks_data,
-        })
+    # Bezwzględne pozycje z dokumentu geometrii (przebudowywanego tylko po zmianach układu)
+    layout = get_layout(warehouse.id)
+    zones_data = layout_tree(layout)
     
     breadcrumbs = [
         {'label': 'Magazyny', 'url': reverse('wms_builder:warehouse_list')},
@@ -236,16 +244,97 @@ def warehouse_detail(request, warehouse_id, zone_id=None, rack_id=None):
     
     context = {
         'warehouse': warehouse,
-        'zones': zones,
+        'zones': [zone_data['element'] for zone_data in zones_data],
         'zones_data': zones_data,
         'active_zone': active_zone,
         'active_rack': active_rack,
         'detail_base_url': reverse('wms_builder:warehouse_detail', args=[warehouse.id]),
+        'heatmap_metrics': HEATMAP_METRICS,
+        'heatmap_days': HEATMAP_DAYS,
+        'heatmap_default_days': DEFAULT_PICK_DAYS,
         'breadcrumbs': breadcrumbs,
     }
     return render(request, 'wms_builder/warehouse_detail.html', context)
 
 
+def _public_element(element):
+    return {key: value for key, value in element.items() if key != 'cells'}
+
+
+def _parse_floats(value, count):
+    parts = [float(part) for part in (value or '').split(',')]
+    if len(parts) != count:
+        raise ValueError(value)
+    return parts
+
+
+@login_required
+def warehouse_layout(request, warehouse_id):
+    """Layout geometry as JSON, optionally culled to a viewport (?bbox=x0,y0,x1,y1&kinds=shelf,rack)"""
+    warehouse = get_object_or_404(Warehouse, id=warehouse_id)
+    layout = get_layout(warehouse.id)
+    kinds = [kind for kind in request.GET.get('kinds', '').split(',') if kind]
+
+    if request.GET.get('bbox'):
+        try:
+            x0, y0, x1, y1 = _parse_floats(request.GET['bbox'], 4)
+        except ValueError:
+            return JsonResponse({'error': 'Nieprawidłowy parametr bbox.'}, status=400)
+        elements = elements_in_viewport(layout, x0, y0, x1, y1, kinds=kinds)
+    else:
+        elements = [
+            element for element in layout['elements'].values()
+            if not kinds or element['kind'] in kinds
+        ]
+
+    return JsonResponse({
+        'version': layout['version'],
+        'width': layout['width'],
+        'height': layout['height'],
+        'elements': [_public_element(element) for element in elements],
+    })
+
+
+@login_required
+def warehouse_layout_hit(request, warehouse_id):
+    """Element (shelf, rack or zone) under a canvas point with its WMS location"""
+    from wms.models import Location
+
+    warehouse = get_object_or_404(Warehouse, id=warehouse_id)
+    try:
+        x, y = float(request.GET['x']), float(request.GET['y'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Podaj współrzędne x i y.'}, status=400)
+
+    element = hit_test(get_layout(warehouse.id), x, y)
+    location = None
+    if element and element['location_id']:
+        location = Location.objects.filter(id=element['location_id']).values(
+            'id', 'name', 'barcode', 'location_type'
+        ).first()
+    return JsonResponse({
+        'element': _public_element(element) if element else None,
+        'location': location,
+    })
+
+
+@login_required
+def warehouse_heatmap(request, warehouse_id):
+    """Heatmap overlay keyed by Location id (?metric=quantity|skus|picks&days=30)"""
+    warehouse = get_object_or_404(Warehouse, id=warehouse_id)
+    metric = request.GET.get('metric', METRIC_QUANTITY)
+    if metric not in HEATMAP_METRICS:
+        return JsonResponse({'error': 'Nieznana metryka mapy cieplnej.'}, status=400)
+    try:
+        days = int(request.GET.get('days', DEFAULT_PICK_DAYS))
+    except ValueError:
+        return JsonResponse({'error': 'Nieprawidłowa liczba dni.'}, status=400)
+    if not 1 <= days <= PICK_RETENTION_DAYS:
+        return JsonResponse({'error': f'Liczba dni musi być z zakresu 1-{PICK_RETENTION_DAYS}.'}, status=400)
+
+    return JsonResponse(heatmap_overlay(get_layout(warehouse.id), metric, days=days))
+
+
 @login_required
 def warehouse_create(request):
     """Create new warehouse"""
@@ -386,7 +475,7 @@ def htmx_zone_update_position(request, zone_id):
         y = Decimal(request.POST.get('y', '0'))
         zone.x = x
         zone.y = y
-        zone.save()
+        zone.save(update_fields=['x', 'y', 'updated_at'])
         return HttpResponse(status=204)
     except (ValueError, TypeError):
         return HttpResponse(status=400)
@@ -405,7 +494,7 @@ def htmx_zone_update_size(request, zone_id):
             return HttpResponse(status=400)
         zone.width = width
         zone.height = height
-        zone.save()
+        zone.save(update_fields=['width', 'height', 'updated_at'])
         return HttpResponse(status=204)
     except (ValueError, TypeError):
         return HttpResponse(status=400)
@@ -437,43 +526,7 @@ def htmx_zone_edit(request, zone_id):
 def htmx_zone_delete(request, zone_id):
     """Delete zone"""
     zone = get_object_or_404(WarehouseZone, id=zone_id)
-    try:
-        deleted_items = []
-        zone.delete(deleted_items=deleted_items)
-        
-        # Wyświetl toasty dla wszystkich usuniętych elementów
-        triggers = _build_toast_triggers(deleted_items)
-        response = HttpResponse(status=204)
-        response['HX-Trigger'] = json.dumps(triggers)
-        return response
-    except ValidationError as e:
-        # ValidationError.messages może być listą, więc wyodrębnij pierwszy komunikat
-        if hasattr(e, 'messages') and e.messages:
-            error_message = e.messages[0] if isinstance(e.messages, list) else str(e.messages)
-        else:
-            error_message = str(e)
-            # Jeśli str(e) zwraca listę jako string, spróbuj wyodrębnić pierwszy element
-            if error_message.startswith('[') and error_message.endswith(']'):
-                try:
-                    import ast
-                    parsed = ast.literal_eval(error_message)
-                    if isinstance(parsed, list) and len(parsed) > 0:
-                        error_message = parsed[0]
-                except:
-                    pass
-        
-        response = HttpResponse(
-            f'<div class="alert alert-danger">{error_message}</div>',
-            status=400
-        )
-        toast_message = {
-            "toastMessage": {
-                "value": error_message,
-                "type": "danger"
-            }
-        }
-        response['HX-Trigger'] = json.dumps(toast_message)
-        return response
+    return _delete_builder_element_response('zone', zone.id)
 
 
 @login_required
@@ -601,7 +654,7 @@ def htmx_rack_update_position(request, rack_id):
         y = Decimal(request.POST.get('y', '0'))
         rack.x = x
         rack.y = y
-        rack.save()
+        rack.save(update_fields=['x', 'y', 'updated_at'])
         return HttpResponse(status=204)
     except (ValueError, TypeError):
         return HttpResponse(status=400)
@@ -619,7 +672,7 @@ def htmx_rack_update_size(request, rack_id):
             return HttpResponse(status=400)
         rack.width = width
         rack.height = height
-        rack.save()
+        rack.save(update_fields=['width', 'height', 'updated_at'])
         return HttpResponse(status=204)
     except (ValueError, TypeError):
         return HttpResponse(status=400)
@@ -651,43 +704,7 @@ def htmx_rack_edit(request, rack_id):
 def htmx_rack_delete(request, rack_id):
     """Delete rack"""
     rack = get_object_or_404(WarehouseRack, id=rack_id)
-    try:
-        deleted_items = []
-        rack.delete(deleted_items=deleted_items)
-        
-        # Wyświetl toasty dla wszystkich usuniętych elementów
-        triggers = _build_toast_triggers(deleted_items)
-        response = HttpResponse(status=204)
-        response['HX-Trigger'] = json.dumps(triggers)
-        return response
-    except ValidationError as e:
-        # ValidationError.messages może być listą, więc wyodrębnij pierwszy komunikat
-        if hasattr(e, 'messages') and e.messages:
-            error_message = e.messages[0] if isinstance(e.messages, list) else str(e.messages)
-        else:
-            error_message = str(e)
-            # Jeśli str(e) zwraca listę jako string, spróbuj wyodrębnić pierwszy element
-            if error_message.startswith('[') and error_message.endswith(']'):
-                try:
-                    import ast
-                    parsed = ast.literal_eval(error_message)
-                    if isinstance(parsed, list) and len(parsed) > 0:
-                        error_message = parsed[0]
-                except:
-                    pass
-        
-        response = HttpResponse(
-            f'<div class="alert alert-danger">{error_message}</div>',
-            status=400
-        )
-        toast_message = {
-            "toastMessage": {
-                "value": error_message,
-                "type": "danger"
-            }
-        }
-        response['HX-Trigger'] = json.dumps(toast_message)
-        return response
+    return _delete_builder_element_response('rack', rack.id)
 
 
 @login_required
@@ -809,7 +826,7 @@ def htmx_shelf_update_position(request, shelf_id):
         y = Decimal(request.POST.get('y', '0'))
         shelf.x = x
         shelf.y = y
-        shelf.save()
+        shelf.save(update_fields=['x', 'y', 'updated_at'])
         return HttpResponse(status=204)
     except (ValueError, TypeError):
         return HttpResponse(status=400)
@@ -827,7 +844,7 @@ def htmx_shelf_update_size(request, shelf_id):
             return HttpResponse(status=400)
         shelf.width = width
         shelf.height = height
-        shelf.save()
+        shelf.save(update_fields=['width', 'height', 'updated_at'])
         return HttpResponse(status=204)
     except (ValueError, TypeError):
         return HttpResponse(status=400)
@@ -859,46 +876,7 @@ def htmx_shelf_edit(request, shelf_id):
 def htmx_shelf_delete(request, shelf_id):
     """Delete shelf"""
     shelf = get_object_or_404(WarehouseShelf, id=shelf_id)
-    print(f"Deleting shelf: {shelf.name}")
-    try:
-        deleted_items = []
-        shelf.delete(deleted_items=deleted_items)
-        
-        # Wyświetl toasty dla wszystkich usuniętych elementów
-        triggers = _build_toast_triggers(deleted_items)
-        response = HttpResponse(status=204)
-        response['HX-Trigger'] = json.dumps(triggers)
-        return response
-    except ValidationError as e:
-        print(f"Error deleting shelf: {e}")
-        # ValidationError.messages może być listą, więc wyodrębnij pierwszy komunikat
-        if hasattr(e, 'messages') and e.messages:
-            error_message = e.messages[0] if isinstance(e.messages, list) else str(e.messages)
-        else:
-            error_message = str(e)
-            # Jeśli str(e) zwraca listę jako string, spróbuj wyodrębnić pierwszy element
-            if error_message.startswith('[') and error_message.endswith(']'):
-                try:
-                    import ast
-                    parsed = ast.literal_eval(error_message)
-                    if isinstance(parsed, list) and len(parsed) > 0:
-                        error_message = parsed[0]
-                except:
-                    pass
-        
-        response = HttpResponse(
-            f'<div class="alert alert-danger">{error_message}</div>',
-            status=400
-        )
-        toast_message = {
-            "toastMessage": {
-                "value": error_message,
-                "type": "danger"
-            }
-        }
-        response['HX-Trigger'] = json.dumps(toast_message)
-        print(f"Sending toast message: {toast_message}")
-        return response
+    return _delete_builder_element_response('shelf', shelf.id)
 
 
 @login_required
@@ -944,7 +922,8 @@ def htmx_zone_sync_to_location(request, zone_id):
                 # Generuj automatyczny kod kreskowy na podstawie ID strefy
                 # Jeśli Location już istnieje, użyj istniejącego kodu
                 barcode = zone.location.barcode if zone.location else f"ZONE-{zone.id}"
-                zone.sync_to_location(barcode)
+                # Strefa razem z regałami i półkami - hurtowo, bez zapisu per element
+                sync_layout_to_locations(zone_ids=[zone.id])
                 
                 # Odśwież obiekt, aby mieć aktualne dane z Location
                 zone.refresh_from_db()
@@ -977,6 +956,37 @@ def htmx_zone_sync_to_location(request, zone_id):
     })
 
 
+@login_required
+@require_http_methods(["POST"])
+def htmx_warehouse_sync_to_locations(request, warehouse_id):
+    """Synchronize the whole warehouse layout to Locations"""
+    warehouse = get_object_or_404(Warehouse, id=warehouse_id)
+    try:
+        result = sync_layout_to_locations(warehouse_id=warehouse.id)
+    except ValueError as e:
+        response = HttpResponse(status=400)
+        response['HX-Trigger'] = json.dumps({
+            'toastMessage': {
+                'value': str(e),
+                'type': 'danger'
+            }
+        })
+        return response
+
+    response = HttpResponse(status=204)
+    response['HX-Refresh'] = 'true'
+    response['HX-Trigger'] = json.dumps({
+        'toastMessage': {
+            'value': (
+                f'Magazyn "{warehouse.name}" zsynchronizowany: utworzono {result.created}, '
+                f'zaktualizowano {result.updated}, bez zmian {result.unchanged} lokalizacji.'
+            ),
+            'type': 'success'
+        }
+    })
+    return response
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def htmx_rack_sync_to_location(request, rack_id):